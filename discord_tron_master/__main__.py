@@ -1,4 +1,7 @@
 print(f"Loading main file..")
+from discord_tron_master.classes.startup_profile import startup_profiler
+
+startup_profiler.install_import_timer()
 import logging, threading
 from discord_tron_master.classes import log_format
 
@@ -13,10 +16,21 @@ from discord_tron_master.classes.queue_manager import QueueManager
 from discord_tron_master.classes.command_processor import CommandProcessor
 from discord_tron_master.classes.text_game_webui_runner import TextGameWebUIRunner
 from discord_tron_master.classes.webui_image_bridge import WebUIImageBridge
+from discord_tron_master.classes.metrics import MetricsServer, metrics_registry
+from discord_tron_master.classes.model_catalog import model_catalog
+from discord_tron_master.classes.history_writer import history_writer
+from discord_tron_master.classes.service_times import service_time_estimator
+from discord_tron_master.classes.tracing import job_tracer
+from discord_tron_master.classes.image_backends import image_backends
 
 config = AppConfig()
 
-api = API()
+with startup_profiler.phase("api_init"):
+    api = API()
+with startup_profiler.phase("model_catalog"):
+    model_catalog.warm(api.app)
+# Loads the learned service times on its own thread.
+service_time_estimator.start()
 from discord_tron_master.auth import Auth
 
 auth = Auth()
@@ -40,7 +54,8 @@ intents.typing = False
 intents.presences = False
 intents.message_content = True
 PREFIX = "!"
-discord_bot = DiscordBot(token=config.get_discord_api_key())
+with startup_profiler.phase("discord_client_init"):
+    discord_bot = DiscordBot(token=config.get_discord_api_key())
 
 # Initialize the command processor
 command_processor = CommandProcessor(queue_manager, worker_manager, discord_bot)
@@ -50,6 +65,7 @@ websocket_hub = WebSocketHub(
 )
 text_game_webui_runner = TextGameWebUIRunner(config)
 webui_image_bridge = WebUIImageBridge(config, discord_bot)
+metrics_server = MetricsServer(metrics_registry)
 
 
 import asyncio, concurrent
@@ -63,15 +79,34 @@ asyncio.run(discord_bot.set_worker_manager(worker_manager))
 asyncio.run(discord_bot.set_websocket_hub(websocket_hub))
 
 
+def _log_startup_failure(name):
+    def callback(future):
+        exc = future.exception()
+        if exc is not None:
+            logging.error("Startup task %s failed: %s", name, exc, exc_info=exc)
+
+    return callback
+
+
 def main():
     from discord_tron_master.adapters.emulator_bridge import EmulatorBridge as ZorkEmulator
 
-    cleared_inflight = ZorkEmulator.clear_all_inflight_claims()
-    if cleared_inflight:
-        logging.warning(
-            "Cleared %s abandoned inflight turn claim(s) during startup recovery.",
-            cleared_inflight,
-        )
+    def recover_inflight_claims():
+        # Initialises the text game engine as a side effect.
+        with startup_profiler.phase("zork_recovery"):
+            cleared_inflight = ZorkEmulator.clear_all_inflight_claims()
+        if cleared_inflight:
+            logging.warning(
+                "Cleared %s abandoned inflight turn claim(s) during startup recovery.",
+                cleared_inflight,
+            )
+
+    def start_text_game_webui():
+        # The web UI claims turns too, so it must not start until recovery
+        # has cleared the previous process's claims.
+        recovery.result()
+        with startup_profiler.phase("text_game_webui_start"):
+            text_game_webui_runner.start()
 
     def run_websocket_hub():
         loop = asyncio.new_event_loop()
@@ -84,8 +119,25 @@ def main():
         discord_bot.event_loop = loop
         loop.run_until_complete(discord_bot.run())
 
-    webui_image_bridge.start()
-    text_game_webui_runner.start()
+    # Independent subsystems start alongside the Discord login; the gateway
+    # connection waits for recovery so no turn is claimed before it finishes.
+    startup_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup")
+    recovery = startup_pool.submit(recover_inflight_claims)
+    recovery.add_done_callback(_log_startup_failure("zork_recovery"))
+    discord_bot.startup_gates.append(recovery)
+    startup_pool.submit(webui_image_bridge.start).add_done_callback(
+        _log_startup_failure("webui_image_bridge")
+    )
+    startup_pool.submit(start_text_game_webui).add_done_callback(
+        _log_startup_failure("text_game_webui")
+    )
+    startup_pool.shutdown(wait=False)
+    metrics_port = config.get_metrics_port()
+    if config.is_metrics_enabled() and metrics_port is not None:
+        try:
+            metrics_server.start(config.get_metrics_host(), metrics_port)
+        except OSError as e:
+            logging.error("Could not start metrics endpoint: %s", e)
     try:
         with ThreadPoolExecutor(max_workers=1) as executor:
             tasks = [
@@ -101,6 +153,10 @@ def main():
     finally:
         text_game_webui_runner.stop()
         webui_image_bridge.stop()
+        metrics_server.stop()
+        history_writer.close()
+        job_tracer.flush()
+        image_backends.shutdown()
 
 
 # A simple wrapper to run Flask in a thread.
@@ -16,6 +16,7 @@ import sqlite3
 import threading
 from typing import Any, Optional, Tuple
 
+from discord_tron_master.classes.webui_echo_outbox import webui_echo_outbox
 from discord_tron_master.adapters.tge_ports import (
     get_tge_completion_overrides,
     reset_tge_completion_overrides,
@@ -314,6 +315,7 @@ class EmulatorBridge(metaclass=_EmulatorBridgeMeta):
         llm.set_log_callback(_zork_log)
         # DTM shows inventory only on reaction/command, not in every narration.
         cls._emu.append_inventory_to_narration = False
+        cls._install_turn_hooks()
         logger.info("EmulatorBridge: TGE ZorkEmulator initialized")
 
     @staticmethod
@@ -387,7 +389,9 @@ class EmulatorBridge(metaclass=_EmulatorBridgeMeta):
     @classmethod
     def enable_channel(cls, guild_id, channel_id, actor_id=None):
         cls._ensure_init()
-        return cls._emu.enable_channel(guild_id, channel_id, str(actor_id) if actor_id else "0")
+        result = cls._emu.enable_channel(guild_id, channel_id, str(actor_id) if actor_id else "0")
+        webui_echo_outbox.invalidate_route()
+        return result
 
     @classmethod
     def bind_channel_campaign(cls, channel_session, campaign_id, *, enabled=None):
@@ -410,7 +414,9 @@ class EmulatorBridge(metaclass=_EmulatorBridgeMeta):
             row.updated_at = cls.utcnow()
             cls._emu._store_session_metadata(row, meta)
             session.commit()
-            return row
+        # The session may have moved between campaigns; drop cached echo routes.
+        webui_echo_outbox.invalidate_route()
+        return row
 
     @classmethod
     def set_channel_label(cls, channel_session, label):
@@ -596,6 +602,79 @@ class EmulatorBridge(metaclass=_EmulatorBridgeMeta):
         cls._ensure_init()
         cls._emu.end_turn(str(campaign_id), str(user_id))
 
+    @classmethod
+    def _install_turn_hooks(cls):
+        """Wrap the emulator's ``begin_turn``/``end_turn`` to publish claim changes.
+
+        TGE also claims and releases internally (timed events, ``manage_claim``
+        turns), so the hooks sit on the instance rather than in the bridge
+        classmethods.  Releases wake queued claim waiters and drain waiters.
+        """
+        from discord_tron_master.classes.turn_claims import turn_claim_coordinator
+        from discord_tron_master.classes.turn_drain import turn_drain_coordinator
+
+        original_begin = getattr(cls._emu, "begin_turn", None)
+        if callable(original_begin) and not getattr(original_begin, "_dtm_turn_hook", False):
+
+            async def _begin_turn(campaign_id, *args, **kwargs):
+                result = await original_begin(campaign_id, *args, **kwargs)
+                claimed = result[0] if isinstance(result, tuple) and result else None
+                if claimed is not None:
+                    actor_id = args[0] if args else kwargs.get("actor_id")
+                    turn_drain_coordinator.turn_started(claimed, actor_id)
+                return result
+
+            _begin_turn._dtm_turn_hook = True
+            cls._emu.begin_turn = _begin_turn
+
+        original_end = getattr(cls._emu, "end_turn", None)
+        if callable(original_end) and not getattr(original_end, "_dtm_turn_hook", False):
+
+            def _end_turn(campaign_id, *args, **kwargs):
+                try:
+                    return original_end(campaign_id, *args, **kwargs)
+                finally:
+                    actor_id = args[0] if args else kwargs.get("actor_id")
+                    turn_drain_coordinator.turn_finished(campaign_id, actor_id)
+                    turn_claim_coordinator.notify_released(campaign_id)
+
+            _end_turn._dtm_turn_hook = True
+            cls._emu.end_turn = _end_turn
+
+    @classmethod
+    def inflight_claim_expires_in(cls, campaign_id=None, *, soonest=False) -> float | None:
+        """Seconds until an unexpired ``InflightTurn`` claim expires, if any.
+
+        With *campaign_id*, reports that campaign's claim; otherwise all claims
+        are considered.  *soonest* picks the earliest expiry instead of the latest.
+        """
+        cls._ensure_init()
+        session_factory = cls._session_factory
+        if session_factory is None:
+            return None
+        from datetime import datetime, timezone
+        from text_game_engine.persistence.sqlalchemy.models import InflightTurn
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        filters = [InflightTurn.expires_at > now]
+        if campaign_id is not None:
+            campaign_column = getattr(InflightTurn, "campaign_id", None)
+            if campaign_column is None:
+                return None
+            filters.append(campaign_column == str(campaign_id))
+        order = InflightTurn.expires_at.asc() if soonest else InflightTurn.expires_at.desc()
+        with session_factory() as session:
+            expires_at = (
+                session.query(InflightTurn.expires_at)
+                .filter(*filters)
+                .order_by(order)
+                .limit(1)
+                .scalar()
+            )
+        if expires_at is None:
+            return None
+        return max(0.0, (expires_at - now).total_seconds())
+
     @classmethod
     def pop_turn_ephemeral_notices(cls, *args, **kwargs):
         cls._ensure_init()
@@ -1438,19 +1517,45 @@ class EmulatorBridge(metaclass=_EmulatorBridgeMeta):
     @classmethod
     def request_shutdown(cls):
         cls._ensure_init()
+        from discord_tron_master.classes.turn_claims import turn_claim_coordinator
+        from discord_tron_master.classes.turn_drain import turn_drain_coordinator
+
+        turn_drain_coordinator.request_drain()
+        cls._shutdown_requested = True
+        # Queued turns that haven't claimed yet should hand off rather than start.
+        turn_claim_coordinator.wake_all()
         fn = getattr(cls._emu, "request_shutdown", None)
         if callable(fn):
             return fn()
-        cls._shutdown_requested = True
-        backend_inflight = getattr(cls._emu, "_inflight_turns", None)
-        if backend_inflight is not None:
-            cls._inflight_turns = backend_inflight
         logger.info("EmulatorBridge: using bridge-local shutdown/drain fallback")
         return None
 
     @classmethod
-    def clear_all_inflight_claims(cls) -> int:
+    def is_draining(cls) -> bool:
+        from discord_tron_master.classes.turn_drain import turn_drain_coordinator
+
+        return cls._shutdown_requested or turn_drain_coordinator.draining
+
+    @classmethod
+    def drain_status(cls) -> dict:
+        from discord_tron_master.classes.turn_drain import turn_drain_coordinator
+
+        return turn_drain_coordinator.status()
+
+    @classmethod
+    def clear_all_inflight_claims(cls, campaign_ids=None) -> int:
+        """Delete ``InflightTurn`` claims and forget their local tracking.
+
+        With *campaign_ids*, only those campaigns' claims are removed, so claims
+        owned by other processes (the webui) are left to expire on their own.
+        """
         cls._ensure_init()
+        from discord_tron_master.classes.turn_drain import turn_drain_coordinator
+
+        if campaign_ids is not None:
+            campaign_ids = [str(cid) for cid in campaign_ids]
+            if not campaign_ids:
+                return 0
         deleted = 0
         try:
             session_factory = cls._session_factory
@@ -1458,7 +1563,10 @@ class EmulatorBridge(metaclass=_EmulatorBridgeMeta):
                 from text_game_engine.persistence.sqlalchemy.models import InflightTurn
 
                 with session_factory() as session:
-                    deleted = int(session.query(InflightTurn).delete() or 0)
+                    query = session.query(InflightTurn)
+                    if campaign_ids is not None:
+                        query = query.filter(InflightTurn.campaign_id.in_(campaign_ids))
+                    deleted = int(query.delete(synchronize_session=False) or 0)
                     session.commit()
         except Exception:
             logger.warning("Failed to clear inflight turn claims", exc_info=True)
@@ -1466,7 +1574,7 @@ class EmulatorBridge(metaclass=_EmulatorBridgeMeta):
         try:
             backend_inflight = getattr(cls._emu, "_inflight_turns", None)
             backend_lock = getattr(cls._emu, "_inflight_turns_lock", None)
-            if backend_inflight is not None:
+            if backend_inflight is not None and campaign_ids is None:
                 if backend_lock is not None:
                     with backend_lock:
                         backend_inflight.clear()
@@ -1474,68 +1582,47 @@ class EmulatorBridge(metaclass=_EmulatorBridgeMeta):
                     backend_inflight.clear()
             claims = getattr(cls._emu, "_claims", None)
             if isinstance(claims, dict):
-                claims.clear()
+                if campaign_ids is None:
+                    claims.clear()
+                else:
+                    for key in list(claims):
+                        if str(key) in campaign_ids:
+                            claims.pop(key, None)
         except Exception:
             logger.debug("Failed to clear emulator-local inflight state", exc_info=True)
-        cls._inflight_turns = set()
+        turn_drain_coordinator.forget(campaign_ids)
+        cls._inflight_turns = {
+            (campaign_id, actor_id)
+            for campaign_id, actor_id, _age in turn_drain_coordinator.active_turns()
+        }
         if deleted:
             logger.warning("Cleared %s inflight turn claim(s)", deleted)
         return deleted
 
     @classmethod
-    async def wait_for_drain(cls, timeout=600):
+    async def wait_for_drain(cls, timeout=600, *, on_progress=None):
+        """Wait for in-flight turns to finish; returns ``False`` on timeout.
+
+        Completion is signalled by the ``end_turn`` hook, so this returns as
+        soon as the slowest active turn releases its claim.  *on_progress*
+        receives ``drain_status()`` after every release and may be async.
+        """
         cls._ensure_init()
-        fn = getattr(cls._emu, "wait_for_drain", None)
-        if callable(fn):
-            drained = await fn(timeout=timeout)
-            if drained:
-                return True
-        backend_inflight = getattr(cls._emu, "_inflight_turns", None)
-        backend_lock = getattr(cls._emu, "_inflight_turns_lock", None)
-        loop = asyncio.get_running_loop()
-        deadline = loop.time() + max(0, float(timeout))
-        while loop.time() < deadline:
-            try:
-                if backend_inflight is None:
-                    active = set()
-                elif backend_lock is not None:
-                    with backend_lock:
-                        active = set(backend_inflight)
-                else:
-                    active = set(backend_inflight)
-            except Exception:
-                active = set()
-            db_active = 0
-            try:
-                session_factory = cls._session_factory
-                if session_factory is not None:
-                    from datetime import datetime, timezone
-                    from text_game_engine.persistence.sqlalchemy.models import InflightTurn
-
-                    with session_factory() as session:
-                        now = datetime.now(timezone.utc).replace(tzinfo=None)
-                        db_active = int(
-                            session.query(InflightTurn)
-                            .filter(InflightTurn.expires_at > now)
-                            .count()
-                        )
-            except Exception:
-                db_active = 0
-            cls._inflight_turns = active
-            if not active and db_active <= 0:
-                return True
-            await asyncio.sleep(0.25)
-        try:
-            if backend_inflight is None:
-                cls._inflight_turns = set()
-            elif backend_lock is not None:
-                with backend_lock:
-                    cls._inflight_turns = set(backend_inflight)
-            else:
-                cls._inflight_turns = set(backend_inflight)
-        except Exception:
-            pass
-        return False
+        from discord_tron_master.classes.turn_drain import turn_drain_coordinator
+
+        async def external_claims_expire_in():
+            return await asyncio.to_thread(cls.inflight_claim_expires_in, soonest=True)
+
+        drained = await turn_drain_coordinator.wait_until_idle(
+            timeout,
+            external_claims_expire_in=external_claims_expire_in,
+            on_progress=on_progress,
+        )
+        cls._inflight_turns = {
+            (campaign_id, actor_id)
+            for campaign_id, actor_id, _age in turn_drain_coordinator.active_turns()
+        }
+        return drained
 
     # -- Utility / Processing --------------------------------------------------
 
@@ -11,7 +11,6 @@ import asyncio
 import contextvars
 import hashlib
 import logging
-import re
 from types import SimpleNamespace
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -36,6 +35,25 @@ def get_tge_completion_overrides() -> dict[str, Any]:
     return dict(current or {}) if isinstance(current, dict) else {}
 
 
+_TGE_COMPLETION_STREAM: contextvars.ContextVar[Any] = contextvars.ContextVar(
+    "dtm_tge_completion_stream",
+    default=None,
+)
+
+
+def set_tge_completion_stream(stream: Any) -> contextvars.Token:
+    """Stream completions made by TGE in this context into *stream* (see ``classes.streaming``)."""
+    return _TGE_COMPLETION_STREAM.set(stream)
+
+
+def reset_tge_completion_stream(token: contextvars.Token) -> None:
+    _TGE_COMPLETION_STREAM.reset(token)
+
+
+def get_tge_completion_stream() -> Any:
+    return _TGE_COMPLETION_STREAM.get()
+
+
 # ---------------------------------------------------------------------------
 # TextCompletionAdapter
 # ---------------------------------------------------------------------------
@@ -69,12 +87,18 @@ class TextCompletionAdapter:
     ) -> str | None:
         gpt = self._make_gpt()
         overrides = get_tge_completion_overrides()
+        stream = get_tge_completion_stream()
+        if stream is not None:
+            # Each completion in a turn starts the preview over; the sink's
+            # renderer decides which of them (the narration) is shown.
+            stream.restart()
         return await gpt.turbo_completion(
             system_prompt,
             prompt,
             temperature=temperature,
             max_tokens=max_tokens,
             thinking_enabled=bool(overrides.get("thinking_enabled", True)),
+            stream=stream,
         )
 
 
@@ -595,121 +619,48 @@ class ZorkMemoryAdapter:
 # IMDBLookupAdapter
 # ---------------------------------------------------------------------------
 class IMDBLookupAdapter:
-    """Standalone IMDB scraper behind ``IMDBLookupPort``.
+    """Cached, concurrent IMDB lookups behind ``IMDBLookupPort``.
 
-    This is a direct reimplementation rather than a wrapper, because the
-    original code lives inside ZorkEmulator as @classmethods with no
-    external dependencies beyond ``requests``.
+    The port is synchronous, so each call is answered from the on-disk cache
+    when possible and otherwise blocks its caller, bounded by the engine
+    timeout, while the lookup runs on ``IMDBLookupEngine``'s own event loop.
     """
 
-    SUGGEST_URL = "https://sg.media-imdb.com/suggestion/{first}/{query}.json"
     TIMEOUT = 5
 
-    def _search_single(self, query: str, max_results: int = 3) -> list[dict]:
-        import requests as _requests
+    def __init__(self, *, engine=None):
+        self._engine = engine
 
-        clean = re.sub(r"[^\w\s]", "", query.strip().lower())
-        if not clean:
-            return []
-        first = clean[0] if clean[0].isalpha() else "a"
-        encoded = clean.replace(" ", "_")
-        url = self.SUGGEST_URL.format(first=first, query=encoded)
+    def _get_engine(self):
+        if self._engine is None:
+            from discord_tron_master.classes.imdb_lookup import get_imdb_lookup_engine
+
+            self._engine = get_imdb_lookup_engine()
+        return self._engine
+
+    def _run(self, coro, default, timeout: float):
+        engine = self._get_engine()
         try:
-            resp = _requests.get(
-                url, timeout=self.TIMEOUT, headers={"User-Agent": "Mozilla/5.0"}
-            )
-            if resp.status_code != 200:
-                return []
-        except Exception:
-            return []
-        data = resp.json()
-        results: list[dict] = []
-        for item in data.get("d", [])[:max_results]:
-            title = item.get("l")
-            if not title:
-                continue
-            results.append({
-                "imdb_id": item.get("id", ""),
-                "title": title,
-                "year": item.get("y"),
-                "type": item.get("q", ""),
-                "stars": item.get("s", ""),
-            })
-        return results
+            return engine.run_sync(coro, timeout=timeout)
+        except Exception as exc:
+            logger.debug("IMDB lookup failed: %s", exc)
+            return default
 
     def search(self, query: str, max_results: int = 3) -> list[dict]:
-        results = self._search_single(query, max_results)
-        if results:
-            return results
-        stripped = re.sub(
-            r"\b(s\d+e\d+|season\s*\d+|episode\s*\d+|ep\s*\d+)\b",
-            "",
-            query,
-            flags=re.IGNORECASE,
-        ).strip()
-        if stripped and stripped != query:
-            results = self._search_single(stripped, max_results)
-            if results:
-                return results
-        words = query.strip().split()
-        for length in range(len(words) - 1, 1, -1):
-            sub = " ".join(words[:length])
-            results = self._search_single(sub, max_results)
-            if results:
-                return results
-        return []
-
-    def fetch_details(self, imdb_id: str) -> dict:
-        import json as _json
+        from discord_tron_master.classes.imdb_lookup import _MISS
 
-        import requests as _requests
+        engine = self._get_engine()
+        cached = engine.cached_search(query, max_results)
+        if cached is not _MISS:
+            return cached
+        # Fallback variants run concurrently, so a search takes one request
+        # timeout, and details fetches run together in one details timeout.
+        return self._run(engine.search(query, max_results), [], engine.timeout)
 
-        if not imdb_id or not imdb_id.startswith("tt"):
-            return {}
-        url = f"https://www.imdb.com/title/{imdb_id}/"
-        try:
-            resp = _requests.get(
-                url,
-                timeout=self.TIMEOUT + 3,
-                headers={
-                    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64)",
-                    "Accept-Language": "en-US,en;q=0.9",
-                },
-            )
-            if resp.status_code != 200:
-                return {}
-            match = re.search(
-                r'<script[^>]+type="application/ld\+json"[^>]*>(.*?)</script>',
-                resp.text,
-                re.DOTALL,
-            )
-            if not match:
-                return {}
-            ld_data = _json.loads(match.group(1))
-            details: dict = {}
-            if ld_data.get("description"):
-                details["description"] = ld_data["description"]
-            genre = ld_data.get("genre")
-            if genre:
-                details["genre"] = genre if isinstance(genre, list) else [genre]
-            actors = ld_data.get("actor", [])
-            if actors and isinstance(actors, list):
-                details["actors"] = [
-                    a.get("name", "") for a in actors[:6] if a.get("name")
-                ]
-            return details
-        except Exception:
-            return {}
+    def fetch_details(self, imdb_id: str) -> dict:
+        engine = self._get_engine()
+        return self._run(engine.fetch_details(imdb_id), {}, engine.timeout + 3)
 
     def enrich(self, results: list[dict], max_enrich: int = 1) -> list[dict]:
-        for r in results[:max_enrich]:
-            imdb_id = r.get("imdb_id", "")
-            if imdb_id:
-                details = self.fetch_details(imdb_id)
-                if details.get("description"):
-                    r["description"] = details["description"]
-                if details.get("genre"):
-                    r["genre"] = details["genre"]
-                if details.get("actors"):
-                    r["stars"] = ", ".join(details["actors"])
-        return results
+        engine = self._get_engine()
+        return self._run(engine.enrich(results, max_enrich), results, engine.timeout + 3)
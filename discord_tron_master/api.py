@@ -1,6 +1,6 @@
 import logging
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_restful import Api, Resource
 from discord_tron_master.classes.database_handler import DatabaseHandler
 from discord_tron_master.classes.command_processors import (
@@ -12,13 +12,13 @@ from discord_tron_master.classes.app_config import AppConfig
 from PIL import Image, UnidentifiedImageError, PngImagePlugin
 from io import BytesIO
 import io, asyncio
-from scipy.io.wavfile import read as read_wav
-from scipy.io.wavfile import write as write_wav
 import base64
 from discord_tron_master.classes.webui_image_bridge import (
     apply_webui_backend_config,
     enqueue_webui_image_job,
+    notify_webui_outbox,
 )
+from discord_tron_master.classes import metrics
 
 
 class API:
@@ -231,6 +231,31 @@ class API:
             body, status = apply_webui_backend_config(self.config, data)
             return jsonify(body), status
 
+        @self.app.route("/api/zork/outbox/notify", methods=["POST"])
+        def webui_outbox_notify():
+            """Wake the Discord echo consumer after the web UI writes an outbox event."""
+            provided_secret = request.headers.get("X-DTM-Link-Secret", "")
+            expected_secret = str(
+                self.config.get_text_game_webui_link_secret() or ""
+            ).strip()
+            if not provided_secret or provided_secret != expected_secret:
+                return jsonify({"error": "Invalid link secret"}), 403
+
+            data = request.get_json(force=True, silent=True) or {}
+            body, status = notify_webui_outbox(data)
+            return jsonify(body), status
+
+        @self.app.route("/metrics", methods=["GET"])
+        def metrics_export():
+            """Prometheus text exposition of the runtime metrics."""
+            if not self.config.is_metrics_enabled():
+                return jsonify({"error": "Metrics are disabled"}), 404
+            if not self.check_auth(request):
+                return jsonify({"error": "Authentication required"}), 401
+            return Response(
+                metrics.metrics_registry.render(), mimetype=metrics.CONTENT_TYPE
+            )
+
     def check_auth(self, request):
         try:
             access_token = request.headers.get("Authorization")
@@ -1,6 +1,6 @@
 ## Just an example for now. We're following the bot.
 
-import os
+import asyncio, importlib, os
 import discord, logging
 from discord.ext import commands
 from discord_tron_master.websocket_hub import WebSocketHub
@@ -9,6 +9,7 @@ from discord_tron_master.classes.worker_manager import WorkerManager
 from discord_tron_master.classes.custom_help import CustomHelp
 from discord_tron_master.classes.app_config import AppConfig
 from discord_tron_master.classes.discord import message_helpers as helper
+from discord_tron_master.classes.startup_profile import startup_profiler
 
 config = AppConfig()
 
@@ -22,6 +23,10 @@ class DiscordBot:
         self.queue_manager = None
         self.worker_manager = None
         self.event_loop = None
+        # concurrent.futures.Future objects that must finish before the
+        # gateway connects (e.g. startup recovery running in another thread).
+        self.startup_gates = []
+        self._hub_task = None
         intents = discord.Intents.default()
         intents.members = True
         intents.message_content = True
@@ -48,37 +53,80 @@ class DiscordBot:
 
     async def on_ready(self):
         logging.info("Bot is ready!")
-        await self.websocket_hub.run()
+        startup_profiler.milestone("discord_ready")
+        await self.start_websocket_hub()
+        startup_profiler.report()
+
+    async def start_websocket_hub(self):
+        # The hub used to start from on_ready, which also fires on every
+        # reconnect; start it once, as early as possible.
+        if self._hub_task is None:
+            self._hub_task = asyncio.ensure_future(self._run_websocket_hub())
+        await asyncio.shield(self._hub_task)
+
+    async def _run_websocket_hub(self):
+        with startup_profiler.phase("websocket_hub"):
+            await self.websocket_hub.run()
+        startup_profiler.milestone("hub_accepting_workers")
+
+    async def _on_first_command(self, ctx):
+        startup_profiler.milestone("first_command")
+        self.bot.remove_listener(self._on_first_command, "on_command")
 
     async def run(self):
-        await self.load_cogs()
         self.bot.event(self.on_ready)
-        await self.bot.start(self.token)
+        self.bot.add_listener(self._on_first_command, "on_command")
+        # Log in and start the hub while the cog modules import.
+        with startup_profiler.phase("discord_login"):
+            login = asyncio.ensure_future(self.bot.login(self.token))
+            hub = asyncio.ensure_future(self.start_websocket_hub())
+            await self.load_cogs()
+            await login
+        for gate in self.startup_gates:
+            with startup_profiler.phase("startup_gates"):
+                try:
+                    await asyncio.wrap_future(gate)
+                except Exception as e:
+                    logging.error(f"Startup task failed: {e}")
+        await hub
+        await self.bot.connect()
 
-    async def load_cogs(self, cogs_path="discord_tron_master/cogs"):
-        import logging
+    @staticmethod
+    def _import_cog_modules(cogs_path):
+        modules = []
+        for root, _, files in os.walk(cogs_path):
+            logging.info("Found cogs: " + str(files))
+            for file in sorted(files):
+                if file.endswith(".py") and not file.startswith("__"):
+                    cog_path = (
+                        os.path.join(root, file)
+                        .replace("/", ".")
+                        .replace("\\", ".")[:-3]
+                    )
+                    try:
+                        modules.append(
+                            (cog_path, file, importlib.import_module(cog_path))
+                        )
+                    except Exception as e:
+                        logging.error(f"Failed to load cog: {cog_path}")
+                        logging.error(e)
+        return modules
 
+    async def load_cogs(self, cogs_path="discord_tron_master/cogs"):
         logging.info("Loading cogs! Path: " + cogs_path)
         try:
-            for root, _, files in os.walk(cogs_path):
-                logging.info("Found cogs: " + str(files))
-                for file in files:
-                    if file.endswith(".py") and not file.startswith("__"):
-                        cog_path = (
-                            os.path.join(root, file)
-                            .replace("/", ".")
-                            .replace("\\", ".")[:-3]
-                        )
-                        try:
-                            import importlib
-
-                            cog_module = importlib.import_module(cog_path)
-                            cog_class_name = getattr(cog_module, file[:-3].capitalize())
-                            await self.bot.add_cog(cog_class_name(self.bot))
-                            logging.info(f"Loaded cog: {cog_path}")
-                        except Exception as e:
-                            logging.error(f"Failed to load cog: {cog_path}")
-                            logging.error(e)
+            # Imports run in a thread so the loop keeps serving the login.
+            with startup_profiler.phase("cog_imports"):
+                modules = await asyncio.to_thread(self._import_cog_modules, cogs_path)
+            with startup_profiler.phase("cog_setup"):
+                for cog_path, file, cog_module in modules:
+                    try:
+                        cog_class_name = getattr(cog_module, file[:-3].capitalize())
+                        await self.bot.add_cog(cog_class_name(self.bot))
+                        logging.info(f"Loaded cog: {cog_path}")
+                    except Exception as e:
+                        logging.error(f"Failed to load cog: {cog_path}")
+                        logging.error(e)
         except Exception as e:
             logging.error(f"Ran into error: {e}")
             raise e
@@ -0,0 +1,237 @@
+"""Admission control for new jobs.
+
+``QueueManager.enqueue_job`` asks ``admission_controller`` before a job joins
+a worker queue.  Work is turned away while:
+
+* the user or guild already has ``max_inflight_per_user`` /
+  ``max_inflight_per_guild`` jobs queued or running;
+* the projected wait for the job type exceeds ``max_wait_seconds``, or
+  ``bulk_max_wait_seconds`` for jobs in the bulk lane, which are deferred
+  first so interactive prompts keep their headroom.
+
+The projected wait is the smallest predicted backlog among capable workers,
+from learned service times; ``job_seconds`` only covers job types with no
+history yet.  Rejections raise ``AdmissionRejected`` with a message the cogs
+relay to the user as-is, so nothing is held in memory for work that would
+only sit in the queue.
+
+Admission is off unless ``admission.enabled`` is set.  With it on, a single
+``!generate-x`` burst counts against ``max_inflight_per_user`` like any other
+job, so size that limit above the largest burst the bot accepts.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any
+
+from discord_tron_master.classes import metrics
+from discord_tron_master.classes.job_lanes import BULK_LANE
+from discord_tron_master.classes.service_times import format_duration, service_time_estimator
+from discord_tron_master.exceptions.admission import AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+USER_LIMIT = "user_inflight"
+GUILD_LIMIT = "guild_inflight"
+QUEUE_WAIT = "queue_wait"
+
+
+def job_guild_id(job: Any):
+    """Best-effort guild id for *job*, from the Discord context in its payload."""
+    payload = getattr(job, "payload", None)
+    if not isinstance(payload, (tuple, list)) or len(payload) < 3:
+        return None
+    guild = getattr(payload[2], "guild", None)
+    return getattr(guild, "id", None)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        *,
+        enabled: bool = False,
+        max_wait_seconds: float = 900.0,
+        bulk_max_wait_seconds: float = 300.0,
+        max_inflight_per_user: int = 10,
+        max_inflight_per_guild: int = 40,
+        default_job_seconds: float = 30.0,
+        job_seconds: dict[str, float] | None = None,
+        exempt_job_types: list[str] | None = None,
+        stale_after_seconds: float = 3600.0,
+    ):
+        self.enabled = bool(enabled)
+        self.max_wait_seconds = float(max_wait_seconds or 0)
+        self.bulk_max_wait_seconds = float(bulk_max_wait_seconds or 0)
+        self.max_inflight_per_user = int(max_inflight_per_user or 0)
+        self.max_inflight_per_guild = int(max_inflight_per_guild or 0)
+        self.default_job_seconds = float(default_job_seconds)
+        self.job_seconds = {str(k): float(v) for k, v in (job_seconds or {}).items()}
+        self.exempt_job_types = set(exempt_job_types or ())
+        self.stale_after_seconds = float(stale_after_seconds)
+        self._lock = threading.Lock()
+        # job_id -> (user key, guild key, admitted at)
+        self._inflight: dict[str, tuple[str, str | None, float]] = {}
+        self._per_user: dict[str, int] = {}
+        self._per_guild: dict[str, int] = {}
+        self._last_purge = time.monotonic()
+
+    @classmethod
+    def from_config(cls, config=None) -> "AdmissionController":
+        if config is None:
+            from discord_tron_master.classes.app_config import AppConfig
+
+            config = AppConfig()
+        raw = config.get_admission_config()
+        return cls(
+            enabled=raw.get("enabled", False),
+            max_wait_seconds=raw.get("max_wait_seconds"),
+            bulk_max_wait_seconds=raw.get("bulk_max_wait_seconds"),
+            max_inflight_per_user=raw.get("max_inflight_per_user"),
+            max_inflight_per_guild=raw.get("max_inflight_per_guild"),
+            default_job_seconds=raw.get("default_job_seconds") or 30.0,
+            job_seconds=raw.get("job_seconds") or {},
+            exempt_job_types=raw.get("exempt_job_types") or [],
+            stale_after_seconds=raw.get("stale_after_seconds") or 3600.0,
+        )
+
+    # -- Projection ------------------------------------------------------------
+
+    def expected_job_seconds(self, job_type: str) -> float:
+        return self.job_seconds.get(job_type, self.default_job_seconds)
+
+    def projected_wait(self, job_type: str, queues: dict) -> float | None:
+        """Seconds until a new *job_type* job would start, or None with no capable worker.
+
+        *queues* is ``QueueManager.queues``.
+        """
+        best = None
+        for worker_id, worker_info in list(queues.items()):
+            if (worker_info.get("supported_job_types") or {}).get(job_type) is not True:
+                continue
+            backlog = service_time_estimator.backlog_seconds(
+                worker_id, worker_info["queue"], self.expected_job_seconds
+            )
+            if best is None or backlog < best:
+                best = backlog
+        return best
+
+    # -- Decisions -------------------------------------------------------------
+
+    def check(
+        self,
+        job_type: str,
+        user_id,
+        guild_id=None,
+        *,
+        lane: str | None = None,
+        queues: dict | None = None,
+    ) -> AdmissionRejected | None:
+        """Return why a job would be turned away right now, or None if it would be admitted."""
+        if not self.enabled or job_type in self.exempt_job_types:
+            return None
+        user_key = str(user_id)
+        guild_key = str(guild_id) if guild_id is not None else None
+        with self._lock:
+            self._purge_stale()
+            user_count = self._per_user.get(user_key, 0)
+            guild_count = self._per_guild.get(guild_key, 0) if guild_key else 0
+        if self.max_inflight_per_user and user_count >= self.max_inflight_per_user:
+            return AdmissionRejected(
+                f"You already have {user_count} jobs queued or running. "
+                "Wait for some of them to finish before sending more.",
+                reason=USER_LIMIT,
+            )
+        if guild_key and self.max_inflight_per_guild and guild_count >= self.max_inflight_per_guild:
+            return AdmissionRejected(
+                f"This server already has {guild_count} jobs queued or running. "
+                "Please try again once a few have finished.",
+                reason=GUILD_LIMIT,
+            )
+        if queues is None:
+            return None
+        projected = self.projected_wait(job_type, queues)
+        limit = self.bulk_max_wait_seconds if lane == BULK_LANE else self.max_wait_seconds
+        if projected is not None and limit and projected > limit:
+            retry_after = projected - limit
+            return AdmissionRejected(
+                f"The {job_type} workers are saturated: about {format_duration(projected)} "
+                f"of work is queued ahead of this. Please try again in ~{format_duration(retry_after)}.",
+                reason=QUEUE_WAIT,
+                retry_after=retry_after,
+            )
+        return None
+
+    def admit(self, job: Any, queues: dict | None = None) -> None:
+        """Record *job* as in flight, or raise ``AdmissionRejected``."""
+        job_type = job.job_type
+        if not self.enabled or job_type in self.exempt_job_types:
+            return
+        user_key = str(getattr(job, "author_id", None))
+        guild_id = job_guild_id(job)
+        guild_key = str(guild_id) if guild_id is not None else None
+        rejection = self.check(
+            job_type, user_key, guild_id, lane=getattr(job, "lane", None), queues=queues
+        )
+        if rejection is not None:
+            metrics.admission_rejections.labels(job_type, rejection.reason).inc()
+            logger.info(
+                "Rejected %s job %s for user %s: %s", job_type, job.id, user_key, rejection.reason
+            )
+            raise rejection
+        with self._lock:
+            if job.id in self._inflight:
+                return
+            self._inflight[job.id] = (user_key, guild_key, time.monotonic())
+            self._per_user[user_key] = self._per_user.get(user_key, 0) + 1
+            if guild_key:
+                self._per_guild[guild_key] = self._per_guild.get(guild_key, 0) + 1
+
+    def release(self, job_id: str) -> None:
+        """Forget a finished, lost or cancelled job."""
+        with self._lock:
+            self._release_locked(job_id)
+
+    def inflight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def _release_locked(self, job_id: str) -> None:
+        entry = self._inflight.pop(job_id, None)
+        if entry is None:
+            return
+        user_key, guild_key, _ = entry
+        _decrement(self._per_user, user_key)
+        if guild_key:
+            _decrement(self._per_guild, guild_key)
+
+    def _purge_stale(self) -> None:
+        # Jobs whose finish never arrived would otherwise hold a slot forever.
+        now = time.monotonic()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        cutoff = now - self.stale_after_seconds
+        for job_id in [job_id for job_id, entry in self._inflight.items() if entry[2] < cutoff]:
+            self._release_locked(job_id)
+
+
+def _decrement(counts: dict, key) -> None:
+    remaining = counts.get(key, 0) - 1
+    if remaining > 0:
+        counts[key] = remaining
+    else:
+        counts.pop(key, None)
+
+
+def _load_controller() -> AdmissionController:
+    try:
+        return AdmissionController.from_config()
+    except Exception:
+        logger.warning("Could not load admission config; using defaults.", exc_info=True)
+        return AdmissionController()
+
+
+admission_controller = _load_controller()
@@ -17,6 +17,8 @@ DEFAULT_CONFIG = {
         "model": "llama3.1",
         "keep_alive": "30m",
         "timeout_seconds": 600,
+        "max_batch_size": 8,
+        "swap_penalty_rounds": 2,
     },
     "huggingface_api": {
         "api_key": None,
@@ -58,6 +60,88 @@ DEFAULT_CONFIG = {
         "dtm_image_bridge_host": "127.0.0.1",
         "dtm_image_bridge_port": 5099,
     },
+    "metrics": {
+        "enabled": False,
+        "host": "127.0.0.1",
+        "port": None,
+    },
+    "tracing": {
+        "sample_rate": 0.0,
+        "exporter": "sqlite",
+        "path": None,
+    },
+    "job_lanes": {
+        "default_lane": "interactive",
+        "aging_seconds": 60,
+        "lanes": {
+            "interactive": {"priority": 0, "max_in_progress": None},
+            "bulk": {"priority": 1, "max_in_progress": None},
+        },
+    },
+    "admission": {
+        "enabled": False,
+        "max_wait_seconds": 900,
+        "bulk_max_wait_seconds": 300,
+        "max_inflight_per_user": 10,
+        "max_inflight_per_guild": 40,
+        "default_job_seconds": 30,
+        "job_seconds": {},
+        "exempt_job_types": ["ollama"],
+        "stale_after_seconds": 3600,
+    },
+    "job_deadlines": {
+        "ack_timeout": 15,
+        "min_ack_timeout": 2,
+        "max_ack_timeout": 120,
+        "adaptive": True,
+        "backoff": 2.0,
+        "ack_timeouts": {},
+        "completion_timeouts": {},
+        "tick_seconds": 0.1,
+    },
+    "model_affinity": {
+        "enabled": True,
+        "swap_penalty_seconds": 45,
+        "warm_models": 1,
+        "reorder_window": 4,
+        "max_bypass": 3,
+        "max_bypass_seconds": 60,
+    },
+    "model_selection": {
+        "enabled": True,
+        "min_confidence": 0.6,
+        "min_rule_hits": 2,
+        "cache_size": 2048,
+        "cache_ttl_seconds": 86400,
+        "neighbour_samples": 1000,
+        "neighbour_min_similarity": 0.5,
+        "audit_rate": 0.05,
+        "rules": None,
+        "default_resolution": {"width": 1024, "height": 1024},
+    },
+    "image_backends": {
+        "max_workers": 8,
+        "http_timeout_seconds": 120,
+    },
+    "user_history": {
+        "batch_size": 100,
+        "flush_interval_seconds": 2.0,
+        "max_buffered": 10000,
+    },
+    "streaming": {
+        "enabled": True,
+        # Discord allows roughly five edits per five seconds per channel.
+        "edit_interval_seconds": 1.0,
+        "min_chars": 24,
+    },
+    "completion_cache": {
+        "enabled": True,
+        "max_entries": 1024,
+        "max_bytes": 4000000,
+        "ttl_seconds": 600,
+        # Requests at or below this temperature (or with a seed) are cached.
+        "max_temperature": 0.0,
+    },
 }
 
 DEFAULT_USER_CONFIG = {
@@ -165,8 +249,10 @@ class AppConfig:
         result = getattr(logging, level.upper(), "ERROR")
         return result
 
-    def get_user_config(self, user_id):
-        self.reload_config()
+    def get_user_config(self, user_id, reload: bool = True):
+        # Callers that reloaded moments ago pass reload=False to skip a second parse.
+        if reload:
+            self.reload_config()
         user_config = self.config.get("users", {}).get(str(user_id), {})
         merged_settings = self.merge_dicts(DEFAULT_USER_CONFIG, user_config)
         if "model" not in merged_settings:
@@ -229,6 +315,16 @@ class AppConfig:
         self.reload_config()
         return int(self.config.get("ollama", {}).get("timeout_seconds", 600))
 
+    def get_ollama_max_batch_size(self):
+        """Upper bound on completions per worker message; workers advertise their own limit."""
+        self.reload_config()
+        return max(1, int(self.config.get("ollama", {}).get("max_batch_size", 8)))
+
+    def get_ollama_swap_penalty_rounds(self):
+        """How many batches of queueing a remote worker model switch is treated as costing."""
+        self.reload_config()
+        return float(self.config.get("ollama", {}).get("swap_penalty_rounds", 2))
+
     def get_websocket_hub_host(self):
         self.reload_config()
         return self.config.get("websocket_hub", {}).get("host", "localhost")
@@ -728,3 +824,119 @@ class AppConfig:
         host = self.get_text_game_webui_dtm_image_bridge_host()
         port = self.get_text_game_webui_dtm_image_bridge_port()
         return f"http://{host}:{port}"
+
+    def get_metrics_config(self):
+        self.reload_config()
+        raw = self.config.get("metrics", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return self.merge_dicts(DEFAULT_CONFIG["metrics"], raw)
+
+    def is_metrics_enabled(self):
+        return bool(self.get_metrics_config().get("enabled", False))
+
+    def get_metrics_host(self):
+        return str(self.get_metrics_config().get("host") or "127.0.0.1")
+
+    def get_tracing_config(self):
+        self.reload_config()
+        raw = self.config.get("tracing", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return self.merge_dicts(DEFAULT_CONFIG["tracing"], raw)
+
+    def get_tracing_sample_rate(self):
+        try:
+            return float(self.get_tracing_config().get("sample_rate") or 0.0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def get_tracing_exporter(self):
+        """Span sink: "sqlite", "jsonl", or "none"."""
+        return str(self.get_tracing_config().get("exporter") or "none").strip().lower()
+
+    def get_tracing_path(self):
+        value = self.get_tracing_config().get("path")
+        return str(value).strip() if value else None
+
+    def get_job_lane_config(self):
+        """Priority lanes for waiting jobs; lower priority values are served first."""
+        self.reload_config()
+        raw = self.config.get("job_lanes", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return self.merge_dicts(DEFAULT_CONFIG["job_lanes"], raw)
+
+    def get_admission_config(self):
+        """Limits applied when a job is enqueued (off by default); a limit of 0 disables that check."""
+        self.reload_config()
+        raw = self.config.get("admission", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return self.merge_dicts(DEFAULT_CONFIG["admission"], raw)
+
+    def get_job_deadline_config(self):
+        """Ack/completion timeouts; per-job-type maps override the adaptive ack timeout."""
+        self.reload_config()
+        raw = self.config.get("job_deadlines", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return self.merge_dicts(DEFAULT_CONFIG["job_deadlines"], raw)
+
+    def get_model_affinity_config(self):
+        """Model swap penalty for routing and how far a worker may look past the queue head."""
+        self.reload_config()
+        raw = self.config.get("model_affinity", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return self.merge_dicts(DEFAULT_CONFIG["model_affinity"], raw)
+
+    def get_model_selection_config(self):
+        """Local model/resolution selection; the LLM is asked below min_confidence."""
+        self.reload_config()
+        raw = self.config.get("model_selection", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return self.merge_dicts(DEFAULT_CONFIG["model_selection"], raw)
+
+    def get_image_backend_config(self):
+        """Thread pool size and HTTP timeout for third-party image backends."""
+        self.reload_config()
+        raw = self.config.get("image_backends", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return self.merge_dicts(DEFAULT_CONFIG["image_backends"], raw)
+
+    def get_user_history_config(self):
+        """Write-behind batching for user history rows."""
+        self.reload_config()
+        raw = self.config.get("user_history", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return self.merge_dicts(DEFAULT_CONFIG["user_history"], raw)
+
+    def get_streaming_config(self):
+        """Whether completions stream into Discord, and how often previews are edited."""
+        self.reload_config()
+        raw = self.config.get("streaming", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return self.merge_dicts(DEFAULT_CONFIG["streaming"], raw)
+
+    def get_completion_cache_config(self):
+        """Size, lifetime and eligibility of cached completion results."""
+        self.reload_config()
+        raw = self.config.get("completion_cache", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return self.merge_dicts(DEFAULT_CONFIG["completion_cache"], raw)
+
+    def get_metrics_port(self):
+        """Port for the standalone metrics endpoint, or None to serve only on the Flask API."""
+        value = self.get_metrics_config().get("port")
+        if value in (None, ""):
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
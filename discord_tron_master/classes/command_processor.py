@@ -7,6 +7,7 @@ from discord_tron_master.classes.command_processors import hardware
 from discord_tron_master.classes.command_processors import discord as discord_module
 from discord_tron_master.classes.command_processors import ollama as ollama_module
 import logging, json, websocket
+from discord_tron_master.classes.structured_log import LazyPayload
 
 
 class CommandProcessor:
@@ -38,6 +39,7 @@ class CommandProcessor:
             },
             "ollama": {
                 "complete_result": ollama_module.complete_result,
+                "complete_delta": ollama_module.complete_delta,
             },
             # Add more command handlers as needed
         }
@@ -49,31 +51,25 @@ class CommandProcessor:
             if handler is None:
                 # No handler found for the command
                 logging.error(
-                    f"No handler found in module "
-                    + str(message["module_name"])
-                    + " for command "
-                    + command
-                    + ", arguments: "
-                    + str(message["arguments"])
+                    "No handler found in module %s for command %s, arguments: %s",
+                    message["module_name"],
+                    command,
+                    LazyPayload(message["arguments"]),
                 )
                 return
             logging.debug(
-                "Executing incoming "
-                + str(handler)
-                + " for module "
-                + str(message["module_name"])
-                + ", command "
-                + command
-                + ", arguments: "
-                + str(message["arguments"])
-                + ", data: "
-                + str(message["data"])
+                "Executing incoming %s for module %s, command %s, arguments: %s, data: %s",
+                getattr(handler, "__qualname__", handler),
+                message["module_name"],
+                command,
+                LazyPayload(message["arguments"]),
+                LazyPayload(message["data"]),
             )
             # We pass "self" in so that it has access to our command processor.
             command_result = await handler(
                 self, message["arguments"], message["data"], websocket
             )
-            logging.debug(f"Command returned result, {command_result}")
+            logging.debug("Command returned result, %s", LazyPayload(command_result))
             return command_result
         except RegistrationError as e:
             raise e
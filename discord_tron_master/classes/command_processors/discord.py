@@ -4,12 +4,12 @@ import websocket, discord, base64, logging, time, hashlib, gzip, os, requests
 from websockets.client import WebSocketClientProtocol
 from io import BytesIO
 from discord_tron_master.classes.app_config import AppConfig
+from discord_tron_master.classes.tracing import job_tracer
+from discord_tron_master.classes.structured_log import LazyPayload
 from PIL import Image, PngImagePlugin
 from websockets import WebSocketClientProtocol
 
 config = AppConfig()
-from scipy.io.wavfile import write as write_wav
-from scipy.io.wavfile import read as read_wav
 
 BARK_SAMPLE_RATE = 24_000
 web_root = config.get_web_root()
@@ -420,7 +420,19 @@ def _strip_worker_image_details(message: str) -> str:
 async def send_message(
     command_processor, arguments: Dict, data: Dict, websocket: WebSocketClientProtocol
 ):
-    logger.debug(f"Entering send_message: {arguments} {data}")
+    job_id = None
+    if job_tracer.enabled:
+        job_id = _find_first_key(arguments, "job_id") or _find_first_key(data, "job_id")
+    with job_tracer.span("discord_delivery", job_id):
+        return await _send_message(command_processor, arguments, data, websocket)
+
+
+async def _send_message(
+    command_processor, arguments: Dict, data: Dict, websocket: WebSocketClientProtocol
+):
+    logger.debug(
+        "Entering send_message: %s %s", LazyPayload(arguments), LazyPayload(data)
+    )
     channel = await command_processor.discord.find_channel(data["channel"]["id"])
     if channel is None:
         # WebUI-originated job (channel_id=0): no Discord channel to post to,
@@ -494,9 +506,7 @@ async def send_message(
                             arguments["image_prompt"],
                             extra_image={
                                 "label": arguments["image_model"],
-                                "data": requests.get(
-                                    arguments["image_url_list"][0]
-                                ).content,
+                                "url": arguments["image_url_list"][0],
                             },
                         )
 
@@ -594,7 +604,9 @@ async def send_message(
 async def send_large_message(
     command_processor, arguments: Dict, data: Dict, websocket: WebSocketClientProtocol
 ):
-    logger.debug(f"Entering send_large_message: {arguments} {data}")
+    logger.debug(
+        "Entering send_large_message: %s %s", LazyPayload(arguments), LazyPayload(data)
+    )
     channel = await command_processor.discord.find_channel(data["channel"]["id"])
     if channel is not None:
         try:
@@ -616,7 +628,9 @@ async def send_image(
     data: Dict[str, str],
     websocket: WebSocketClientProtocol,
 ):
-    logger.debug(f"Entering send_image: {arguments} {data}")
+    logger.debug(
+        "Entering send_image: %s %s", LazyPayload(arguments), LazyPayload(data)
+    )
     channel = await command_processor.discord.find_channel(data["channel"]["id"])
     if channel is not None:
         try:
@@ -689,7 +703,9 @@ async def edit_message(
 async def send_embed(
     command_processor, arguments: Dict, data: Dict, websocket: WebSocketClientProtocol
 ):
-    logger.debug(f"Entering send_embed: {arguments} {data}")
+    logger.debug(
+        "Entering send_embed: %s %s", LazyPayload(arguments), LazyPayload(data)
+    )
     channel = await command_processor.discord.find_channel(data["channel"]["id"])
     if channel is not None:
         try:
@@ -704,7 +720,7 @@ async def send_file(
     command_processor, arguments: Dict, data: Dict, websocket: WebSocketClientProtocol
 ):
     logger.debug(
-        f"Entering send_file: {arguments} {data} {websocket} {command_processor}"
+        "Entering send_file: %s %s", LazyPayload(arguments), LazyPayload(data)
     )
     channel = await command_processor.discord.find_channel(data["channel"]["id"])
     if channel is not None:
@@ -733,7 +749,7 @@ async def create_thread(
     command_processor, arguments: Dict, data: Dict, websocket: WebSocketClientProtocol
 ):
     logger.debug(
-        f"Entering create_thread: {arguments} {data} {websocket} {command_processor}"
+        "Entering create_thread: %s %s", LazyPayload(arguments), LazyPayload(data)
     )
     channel = await command_processor.discord.find_channel(data["channel"]["id"])
     logger.debug(f"Found channel? {channel}")
@@ -858,13 +874,7 @@ async def create_thread(
                                 user_id=arguments["user_id"],
                                 extra_image={
                                     "label": arguments["image_model"],
-                                    "data": Image.open(
-                                        BytesIO(
-                                            requests.get(
-                                                arguments["image_url_list"][0]
-                                            ).content
-                                        )
-                                    ),
+                                    "url": arguments["image_url_list"][0],
                                 },
                             )
                         except Exception as e:
@@ -954,7 +964,9 @@ async def delete_thread(
 async def send_message_to_thread(
     command_processor, arguments: Dict, data: Dict, websocket: WebSocketClientProtocol
 ):
-    logger.debug(f"Entering send_message_to_thread: {arguments} {data}")
+    logger.debug(
+        "Entering send_message_to_thread: %s %s", LazyPayload(arguments), LazyPayload(data)
+    )
     channel = await command_processor.discord.find_channel(data["channel"]["id"])
     if channel is not None:
         try:
@@ -1037,12 +1049,16 @@ async def get_audio_url(audio_data):
     sample_rate, audio_array = extract_wav(audio_data)
     filename = f"{time.time()}{hashlib.md5(audio_data).hexdigest()}.wav"
     # Save the audio file and get its URL
+    from scipy.io.wavfile import write as write_wav
+
     write_wav(os.path.join(web_root, filename), sample_rate, audio_array)
     audio_url = f"\n{url_base}/{filename}"
     return audio_url
 
 
 def extract_wav(audio_data):
+    from scipy.io.wavfile import read as read_wav
+
     wav_binary_stream = BytesIO(audio_data)
     return read_wav(wav_binary_stream)
 
@@ -6,3 +6,10 @@ async def complete_result(command_processor, payload, data, websocket):
     if not message and isinstance(payload, dict):
         message = payload
     return await remote_ollama_broker.complete_request(message)
+
+
+async def complete_delta(command_processor, payload, data, websocket):
+    message = data if isinstance(data, dict) else {}
+    if not message and isinstance(payload, dict):
+        message = payload
+    return await remote_ollama_broker.stream_delta(message)
@@ -0,0 +1,180 @@
+"""Reuse of completion results for identical requests.
+
+``GPT.turbo_completion`` keys each request on a hash of everything that
+decides its output (backend, resolved model, role, prompt, temperature,
+max tokens, thinking, seed) and asks ``completion_cache`` for it:
+
+* a stored answer younger than ``ttl_seconds`` is returned at once;
+* if the same request is already in flight, the caller waits for that
+  call instead of making its own, on whichever event loop it runs;
+* otherwise the caller makes the call, and a non-empty answer is stored.
+
+Only deterministic requests are cached by default: temperature at most
+``max_temperature`` (0 unless configured) or a fixed seed.  Callers pass
+``cache=True`` for requests that may be reused anyway (a classification
+at a high temperature) and ``cache=False`` for ones that must vary.
+Streamed requests are never cached.
+
+Entries are evicted least recently used first once there are more than
+``max_entries`` or they hold more than ``max_bytes`` of text.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from discord_tron_master.classes import metrics
+
+logger = logging.getLogger(__name__)
+
+# Set on an in-flight call that raised; its waiters make their own call.
+_FAILED = object()
+
+
+class CompletionCache:
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        max_entries: int = 1024,
+        max_bytes: int = 4_000_000,
+        ttl_seconds: float = 600.0,
+        max_temperature: float = 0.0,
+    ):
+        self.enabled = bool(enabled)
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_temperature = float(max_temperature)
+        self._lock = threading.Lock()
+        # key -> (text, stored at, size in bytes)
+        self._entries: OrderedDict[str, tuple[str, float, int]] = OrderedDict()
+        self._bytes = 0
+        self._pending: dict[str, concurrent.futures.Future] = {}
+
+    @classmethod
+    def from_config(cls, config=None) -> "CompletionCache":
+        if config is None:
+            from discord_tron_master.classes.app_config import AppConfig
+
+            config = AppConfig()
+        raw = config.get_completion_cache_config()
+        return cls(
+            enabled=raw.get("enabled", True),
+            max_entries=raw.get("max_entries") or 1024,
+            max_bytes=raw.get("max_bytes") or 4_000_000,
+            ttl_seconds=raw.get("ttl_seconds") or 600.0,
+            max_temperature=raw.get("max_temperature") or 0.0,
+        )
+
+    # -- Policy ----------------------------------------------------------------
+
+    def should_cache(self, temperature, seed=None, requested: bool | None = None) -> bool:
+        """Whether a request may be answered from, and stored in, the cache."""
+        if not self.enabled or requested is False:
+            return False
+        if requested:
+            return True
+        if seed is not None:
+            return True
+        try:
+            return float(temperature) <= self.max_temperature
+        except (TypeError, ValueError):
+            return False
+
+    @staticmethod
+    def key(**request) -> str:
+        """A stable hash of the request fields, independent of their order."""
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    # -- Lookup ----------------------------------------------------------------
+
+    async def get_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[str | None]]
+    ) -> str | None:
+        while True:
+            with self._lock:
+                text = self._lookup(key)
+                if text is not None:
+                    metrics.completion_cache_requests.labels("hit").inc()
+                    return text
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = concurrent.futures.Future()
+                    owner = True
+                else:
+                    owner = False
+            if owner:
+                break
+            metrics.completion_cache_requests.labels("coalesced").inc()
+            # Shielded: a waiter giving up must not cancel the shared call.
+            result = await asyncio.shield(asyncio.wrap_future(pending))
+            if result is not _FAILED:
+                return result
+        metrics.completion_cache_requests.labels("miss").inc()
+        result = _FAILED
+        try:
+            result = await compute()
+            if result:
+                self._store(key, result)
+            return result
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.set_result(result)
+
+    def _lookup(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        text, stored_at, size = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            self._evict(key, "ttl")
+            return None
+        self._entries.move_to_end(key)
+        return text
+
+    def _store(self, key: str, text: str) -> None:
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[2]
+            self._entries[key] = (text, time.monotonic(), size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)), "size")
+
+    def _evict(self, key: str, reason: str) -> None:
+        self._bytes -= self._entries.pop(key)[2]
+        metrics.completion_cache_evictions.labels(reason).inc()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+def _load_cache() -> CompletionCache:
+    try:
+        return CompletionCache.from_config()
+    except Exception:
+        logger.warning("Could not load completion cache config; using defaults.", exc_info=True)
+        return CompletionCache()
+
+
+completion_cache = _load_cache()
+metrics.completion_cache_entries.set_function(lambda: len(completion_cache))
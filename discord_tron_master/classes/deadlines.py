@@ -0,0 +1,440 @@
+"""Per-job acknowledgment and completion deadlines.
+
+Each worker keeps a ``JobDeadlines`` instance.  When a job is sent, an
+acknowledgment deadline is scheduled for it.  When the worker acknowledges
+the job, that deadline is cancelled and a completion deadline takes its
+place if the job type has one configured.  Deadlines live in a hierarchical
+``TimerWheel``, so scheduling, cancelling and expiring each cost O(1)
+regardless of how many jobs are in flight.  The worker's monitor task sleeps
+until the earliest deadline instead of scanning every job on a fixed tick.
+
+Acknowledgment timeouts come from ``DeadlinePolicy``.  A job type can carry
+a fixed timeout in config; otherwise the timeout adapts to the observed ack
+latency for that type (smoothed mean plus four mean deviations, as TCP does
+for its retransmission timer) and backs off on every resubmission.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+ACK = "ack"
+COMPLETION = "completion"
+
+
+class TimerWheel:
+    """Hierarchical timing wheel keyed by arbitrary hashable keys.
+
+    Time is measured in ticks of *tick_seconds*.  Level ``i`` has 64 slots
+    covering ``64 ** i`` ticks each; a timer sits in the lowest level whose
+    span covers its distance from the current tick and cascades down as the
+    wheel turns.  A timer never fires before its deadline and at most one
+    tick after it.  The wheel is not thread-safe; ``JobDeadlines`` guards it.
+    """
+
+    SLOT_BITS = 6
+    SLOTS = 1 << SLOT_BITS
+    LEVELS = 4
+
+    def __init__(self, tick_seconds: float = 0.1, start: float = 0.0):
+        if tick_seconds <= 0:
+            raise ValueError("tick_seconds must be positive")
+        self.tick_seconds = float(tick_seconds)
+        self._now_tick = int(start // self.tick_seconds)
+        self._levels: list[list[dict[Hashable, tuple[float, int]]]] = [
+            [{} for _ in range(self.SLOTS)] for _ in range(self.LEVELS)
+        ]
+        self._counts = [0] * self.LEVELS
+        # key -> (level, slot); level -1 means "already due".
+        self._entries: dict[Hashable, tuple[int, int]] = {}
+        self._due: dict[Hashable, float] = {}
+        self._horizon = self.SLOTS**self.LEVELS - 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    @property
+    def now(self) -> float:
+        return self._now_tick * self.tick_seconds
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """Schedule *key* to expire at *deadline*, replacing any earlier timer."""
+        self.cancel(key)
+        self._place(key, float(deadline), math.ceil(deadline / self.tick_seconds))
+
+    def cancel(self, key: Hashable) -> bool:
+        location = self._entries.pop(key, None)
+        if location is None:
+            return False
+        level, slot = location
+        if level < 0:
+            del self._due[key]
+        else:
+            del self._levels[level][slot][key]
+            self._counts[level] -= 1
+        return True
+
+    def deadline(self, key: Hashable) -> float | None:
+        location = self._entries.get(key)
+        if location is None:
+            return None
+        level, slot = location
+        if level < 0:
+            return self._due[key]
+        return self._levels[level][slot][key][0]
+
+    def clear(self) -> None:
+        for level in self._levels:
+            for slot in level:
+                slot.clear()
+        self._counts = [0] * self.LEVELS
+        self._entries.clear()
+        self._due.clear()
+
+    def _place(self, key: Hashable, deadline: float, tick: int) -> None:
+        delta = tick - self._now_tick
+        if delta <= 0:
+            self._due[key] = deadline
+            self._entries[key] = (-1, 0)
+            return
+        # Timers beyond the top level's span park at its edge and are
+        # re-placed from their real tick when they cascade.
+        slot_tick = tick if delta <= self._horizon else self._now_tick + self._horizon
+        delta = slot_tick - self._now_tick
+        level = 0
+        while delta >= 1 << (self.SLOT_BITS * (level + 1)):
+            level += 1
+        slot = (slot_tick >> (self.SLOT_BITS * level)) & (self.SLOTS - 1)
+        self._levels[level][slot][key] = (deadline, tick)
+        self._counts[level] += 1
+        self._entries[key] = (level, slot)
+
+    def advance(self, now: float) -> list[tuple[Hashable, float]]:
+        """Turn the wheel to *now*; return ``(key, deadline)`` for every expired timer."""
+        fired = list(self._due.items())
+        for key, _ in fired:
+            del self._entries[key]
+        self._due.clear()
+
+        target = int(now // self.tick_seconds)
+        mask = self.SLOTS - 1
+        while self._now_tick < target:
+            lowest = next((level for level, count in enumerate(self._counts) if count), None)
+            if lowest is None:
+                self._now_tick = target
+                break
+            if lowest > 0:
+                # Nothing can fire before the next boundary of the lowest
+                # occupied level, so skip straight to the tick before it.
+                shift = self.SLOT_BITS * lowest
+                boundary = ((self._now_tick >> shift) + 1) << shift
+                if boundary - 1 > self._now_tick:
+                    self._now_tick = min(target, boundary - 1)
+                    continue
+            tick = self._now_tick + 1
+            self._now_tick = tick
+            for level in range(self.LEVELS - 1, 0, -1):
+                shift = self.SLOT_BITS * level
+                if tick & ((1 << shift) - 1) or not self._counts[level]:
+                    continue
+                bucket = self._levels[level][(tick >> shift) & mask]
+                if not bucket:
+                    continue
+                entries = list(bucket.items())
+                bucket.clear()
+                self._counts[level] -= len(entries)
+                for key, (deadline, real_tick) in entries:
+                    del self._entries[key]
+                    if real_tick <= tick:
+                        fired.append((key, deadline))
+                    else:
+                        self._place(key, deadline, real_tick)
+            bucket = self._levels[0][tick & mask]
+            if bucket:
+                entries = list(bucket.items())
+                bucket.clear()
+                self._counts[0] -= len(entries)
+                for key, (deadline, _) in entries:
+                    del self._entries[key]
+                    fired.append((key, deadline))
+        return fired
+
+    def next_wakeup(self) -> float | None:
+        """Return when ``advance`` next has work to do, or ``None`` if the wheel is empty.
+
+        This is the earliest level-0 deadline or the next cascade of an
+        occupied higher slot, whichever comes first.
+        """
+        if self._due:
+            return self.now
+        if not self._entries:
+            return None
+        mask = self.SLOTS - 1
+        best = None
+        if self._counts[0]:
+            for offset in range(1, self.SLOTS):
+                if self._levels[0][(self._now_tick + offset) & mask]:
+                    best = self._now_tick + offset
+                    break
+        for level in range(1, self.LEVELS):
+            if not self._counts[level]:
+                continue
+            shift = self.SLOT_BITS * level
+            block = self._now_tick >> shift
+            for offset in range(1, self.SLOTS + 1):
+                if self._levels[level][(block + offset) & mask]:
+                    boundary = (block + offset) << shift
+                    if best is None or boundary < best:
+                        best = boundary
+                    break
+        return None if best is None else best * self.tick_seconds
+
+
+class DeadlinePolicy:
+    """Per-job-type acknowledgment and completion timeouts."""
+
+    # Smoothing gains for the mean and mean deviation (RFC 6298).
+    ALPHA = 0.125
+    BETA = 0.25
+
+    def __init__(
+        self,
+        *,
+        ack_timeout: float = 15.0,
+        min_ack_timeout: float = 2.0,
+        max_ack_timeout: float = 120.0,
+        adaptive: bool = True,
+        backoff: float = 2.0,
+        ack_timeouts: dict[str, float] | None = None,
+        completion_timeouts: dict[str, float] | None = None,
+        tick_seconds: float = 0.1,
+    ):
+        self.default_ack_timeout = float(ack_timeout)
+        self.min_ack_timeout = float(min_ack_timeout)
+        self.max_ack_timeout = max(float(max_ack_timeout), self.min_ack_timeout)
+        self.adaptive = bool(adaptive)
+        self.backoff = max(1.0, float(backoff))
+        self.ack_timeouts = {str(k): float(v) for k, v in (ack_timeouts or {}).items() if v}
+        self.completion_timeouts = {
+            str(k): float(v) for k, v in (completion_timeouts or {}).items() if v
+        }
+        self.tick_seconds = float(tick_seconds)
+        self._lock = threading.Lock()
+        # job_type -> [smoothed latency, mean deviation]
+        self._latency: dict[str, list[float]] = {}
+
+    @classmethod
+    def from_config(cls, config=None) -> "DeadlinePolicy":
+        if config is None:
+            from discord_tron_master.classes.app_config import AppConfig
+
+            config = AppConfig()
+        raw = config.get_job_deadline_config()
+        return cls(
+            ack_timeout=raw.get("ack_timeout") or 15.0,
+            min_ack_timeout=raw.get("min_ack_timeout") or 2.0,
+            max_ack_timeout=raw.get("max_ack_timeout") or 120.0,
+            adaptive=raw.get("adaptive", True),
+            backoff=raw.get("backoff") or 2.0,
+            ack_timeouts=raw.get("ack_timeouts") or {},
+            completion_timeouts=raw.get("completion_timeouts") or {},
+            tick_seconds=raw.get("tick_seconds") or 0.1,
+        )
+
+    def observe_ack(self, job_type: str, latency: float) -> None:
+        latency = max(0.0, float(latency))
+        with self._lock:
+            state = self._latency.get(job_type)
+            if state is None:
+                self._latency[job_type] = [latency, latency / 2]
+                return
+            smoothed, deviation = state
+            state[1] = (1 - self.BETA) * deviation + self.BETA * abs(smoothed - latency)
+            state[0] = (1 - self.ALPHA) * smoothed + self.ALPHA * latency
+
+    def ack_timeout(self, job_type: str, attempt: int = 1) -> float:
+        """Seconds to wait for an ack on the *attempt*-th send of a *job_type* job."""
+        fixed = self.ack_timeouts.get(job_type)
+        if fixed is not None:
+            base = fixed
+        else:
+            base = self.default_ack_timeout
+            if self.adaptive:
+                with self._lock:
+                    state = self._latency.get(job_type)
+                    if state is not None:
+                        base = state[0] + 4 * state[1]
+            base = min(max(base, self.min_ack_timeout), self.max_ack_timeout)
+        if attempt > 1:
+            base = min(base * self.backoff ** (attempt - 1), max(base, self.max_ack_timeout))
+        return base
+
+    def completion_timeout(self, job_type: str) -> float | None:
+        return self.completion_timeouts.get(job_type)
+
+    def ack_timeouts_by_type(self) -> dict[str, float]:
+        with self._lock:
+            job_types = set(self._latency) | set(self.ack_timeouts)
+        return {job_type: self.ack_timeout(job_type) for job_type in job_types}
+
+
+class JobDeadlines:
+    """Acknowledgment and completion deadlines for the jobs of one worker.
+
+    ``expect_ack``, ``acknowledged`` and ``cancel`` may be called from any
+    thread; ``wait`` and ``expired`` belong to the worker's monitor task.
+    """
+
+    def __init__(
+        self,
+        policy: DeadlinePolicy | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.policy = policy if policy is not None else deadline_policy
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._wheel = TimerWheel(self.policy.tick_seconds, start=clock())
+        # job_id -> (job_type, sent_at, attempts)
+        self._sent: dict[str, tuple[str, float, int]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._event: asyncio.Event | None = None
+        self._sleeping_until: float | None = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._wheel)
+
+    def pending_acks(self) -> int:
+        with self._lock:
+            return len(self._sent)
+
+    def attempts(self, job_id: str) -> int:
+        with self._lock:
+            entry = self._sent.get(job_id)
+        return entry[2] if entry else 0
+
+    def expect_ack(self, job: Any) -> float:
+        """Start (or restart, after a resubmission) the ack deadline for *job*."""
+        now = self._clock()
+        with self._lock:
+            previous = self._sent.get(job.id)
+            attempts = previous[2] + 1 if previous else 1
+            self._sent[job.id] = (job.job_type, now, attempts)
+            deadline = now + self.policy.ack_timeout(job.job_type, attempts)
+            self._wheel.schedule((job.id, ACK), deadline)
+        self._wake_if_before(deadline)
+        return deadline
+
+    def acknowledged(self, job: Any) -> None:
+        """Cancel the ack deadline, learn from its latency, and start the completion deadline."""
+        now = self._clock()
+        completion_timeout = self.policy.completion_timeout(job.job_type)
+        with self._lock:
+            entry = self._sent.pop(job.id, None)
+            self._wheel.cancel((job.id, ACK))
+            if completion_timeout is not None:
+                deadline = now + completion_timeout
+                self._wheel.schedule((job.id, COMPLETION), deadline)
+        # Only first sends are sampled: after a resubmission the ack cannot be
+        # matched to a particular send.
+        if entry is not None and entry[2] == 1:
+            self.policy.observe_ack(job.job_type, now - entry[1])
+        if completion_timeout is not None:
+            self._wake_if_before(deadline)
+
+    def cancel(self, job_id: str) -> None:
+        with self._lock:
+            self._sent.pop(job_id, None)
+            self._wheel.cancel((job_id, ACK))
+            self._wheel.cancel((job_id, COMPLETION))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sent.clear()
+            self._wheel.clear()
+        self._wake()
+
+    def expired(self) -> list[tuple[str, str]]:
+        """Return ``(job_id, ACK | COMPLETION)`` for every deadline that has passed."""
+        with self._lock:
+            fired = self._wheel.advance(self._clock())
+        return [key for key, _ in fired]
+
+    def next_deadline(self) -> float | None:
+        with self._lock:
+            return self._wheel.next_wakeup()
+
+    async def wait(self, max_wait: float | None = None) -> None:
+        """Sleep until the next deadline, an earlier one being scheduled, or ``clear``."""
+        loop = asyncio.get_running_loop()
+        if self._event is None or self._loop is not loop:
+            self._loop = loop
+            self._event = asyncio.Event()
+        self._event.clear()
+        wake_at = self.next_deadline()
+        timeout = None if wake_at is None else max(0.0, wake_at - self._clock())
+        if max_wait is not None:
+            timeout = max_wait if timeout is None else min(timeout, max_wait)
+        self._sleeping_until = None if timeout is None else self._clock() + timeout
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._sleeping_until = None
+
+    def _wake_if_before(self, deadline: float) -> None:
+        sleeping_until = self._sleeping_until
+        if self._event is not None and (sleeping_until is None or deadline < sleeping_until):
+            self._wake()
+
+    def _wake(self) -> None:
+        loop, event = self._loop, self._event
+        if loop is None or event is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            event.set()
+            return
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass
+
+
+def _load_policy() -> DeadlinePolicy:
+    try:
+        return DeadlinePolicy.from_config()
+    except Exception:
+        logger.warning("Could not load job deadline config; using defaults.", exc_info=True)
+        return DeadlinePolicy()
+
+
+deadline_policy = _load_policy()
+
+
+def _register_metrics() -> None:
+    from discord_tron_master.classes import metrics
+
+    metrics.metrics_registry.callback_gauge(
+        "job_ack_timeout_seconds",
+        "Current acknowledgment timeout for a first send, by job type.",
+        ("job_type",),
+        deadline_policy.ack_timeouts_by_type,
+    )
+
+
+_register_metrics()
@@ -1,10 +1,99 @@
-import json, logging, os
+import copy, json, logging, os, tempfile, threading, time
 from pathlib import Path
 
 DEFAULT_CONFIG = {"home_guild": None, "guilds": {}}
 DEFAULT_GUILD_CONFIG = {}
 
 
+class _GuildStore:
+    """The parsed guilds.json, shared by every ``Guilds`` instance for that path.
+
+    The file is re-read only when its mtime or size changes, and that is
+    checked at most every ``STAT_INTERVAL`` seconds, so per-command checks
+    such as ``is_channel_banned`` are in-memory lookups.  Writes go through
+    ``save``, which replaces the file atomically and updates the cache.
+    """
+
+    STAT_INTERVAL = 1.0
+    _stores = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._signature = None
+        self._checked_at = 0.0
+        self.config = copy.deepcopy(DEFAULT_CONFIG)
+        # guild id -> frozenset of banned channel ids
+        self.banned_channels = {}
+
+    @classmethod
+    def for_path(cls, path):
+        with cls._stores_lock:
+            store = cls._stores.get(path)
+            if store is None:
+                store = cls._stores[path] = cls(path)
+            return store
+
+    def current(self, force=False):
+        """The cached config, reloaded first if the file changed on disk."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.STAT_INTERVAL:
+            return self.config
+        with self._lock:
+            self._checked_at = now
+            if not os.path.exists(self.path):
+                self.save({})
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature != self._signature:
+                with open(self.path, "r") as config_file:
+                    raw = json.load(config_file)
+                self._install(raw, signature)
+            return self.config
+
+    def save(self, config):
+        with self._lock:
+            directory = os.path.dirname(self.path) or "."
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=".guilds.", suffix=".json", dir=directory
+            )
+            try:
+                with os.fdopen(fd, "w") as config_file:
+                    json.dump(config, config_file, indent=4)
+                    config_file.flush()
+                    os.fsync(config_file.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+            stat = os.stat(self.path)
+            # Round-trip so the cache matches the file exactly (e.g. int keys become str).
+            self._install(
+                json.loads(json.dumps(config)), (stat.st_mtime_ns, stat.st_size)
+            )
+            self._checked_at = time.monotonic()
+
+    def _install(self, raw, signature):
+        config = Guilds.merge_dicts(DEFAULT_CONFIG, raw)
+        banned = {}
+        for guild_id, guild_config in (config.get("guilds") or {}).items():
+            channels = (
+                guild_config.get("banned_channels")
+                if isinstance(guild_config, dict)
+                else None
+            )
+            if channels:
+                banned[str(guild_id)] = frozenset(
+                    channel for channel in channels if isinstance(channel, (int, str))
+                )
+        # Swapped in together so readers never see a half-built state.
+        self.config, self.banned_channels, self._signature = config, banned, signature
+
+
 class Guilds:
     def __init__(self):
         parent = os.path.dirname(Path(__file__).resolve().parent)
@@ -12,6 +101,7 @@ class Guilds:
         config_path = os.path.join(parent, "config")
         self.config_path = os.path.join(config_path, "guilds.json")
         self.example_config_path = os.path.join(config_path, "example.json")
+        self._store = _GuildStore.for_path(self.config_path)
         self.reload_config()
 
     @staticmethod
@@ -29,39 +119,36 @@ class Guilds:
         return result
 
     def reload_config(self):
-        if not os.path.exists(self.config_path):
-            with open(self.config_path, "w") as config_file:
-                json.dump({}, config_file, indent=4)
-        with open(self.config_path, "r") as config_file:
-            self.config = json.load(config_file)
-        self.config = self.merge_dicts(DEFAULT_CONFIG, self.config)
+        # Shared and read-only; setters copy before they change anything.
+        self.config = self._store.current()
+
+    def _save_config(self, config):
+        logging.info(f"Saving config: {config}")
+        self._store.save(config)
+        self.config = self._store.config
 
     def get_config_value(self, value):
         self.reload_config()
-        return self.config.get(value, None)
+        return copy.deepcopy(self.config.get(value, None))
 
     def set_config_value(self, key, value):
-        self.reload_config()
-        self.config[key] = value
-        with open(self.config_path, "w") as config_file:
-            logging.info(f"Saving config: {self.config}")
-            json.dump(self.config, config_file, indent=4)
+        config = copy.deepcopy(self._store.current(force=True))
+        config[key] = value
+        self._save_config(config)
 
     def get_guild_config(self, guild_id=None):
         self.reload_config()
         guild_config = self.config.get("guilds", {})
-        logging.debug(f"Guild config: {guild_config}")
+        logging.debug("Guild config: %s", guild_config)
         if guild_id is not None:
             guild_config = guild_config.get(str(guild_id), {})
-            return self.merge_dicts(DEFAULT_GUILD_CONFIG, guild_config)
-        return self.merge_dicts(DEFAULT_CONFIG, guild_config)
+            return copy.deepcopy(self.merge_dicts(DEFAULT_GUILD_CONFIG, guild_config))
+        return copy.deepcopy(self.merge_dicts(DEFAULT_CONFIG, guild_config))
 
     def set_guild_config(self, guild_id, guild_config):
-        self.reload_config()
-        self.config["guilds"][guild_id] = guild_config
-        with open(self.config_path, "w") as config_file:
-            logging.info(f"Saving config: {self.config}")
-            return json.dump(self.config, config_file, indent=4)
+        config = copy.deepcopy(self._store.current(force=True))
+        config["guilds"][guild_id] = guild_config
+        return self._save_config(config)
 
     def set_guild_setting(self, guild_id, setting_key, value):
         guild_id = str(guild_id)
@@ -70,7 +157,6 @@ class Guilds:
         return self.set_guild_config(guild_id, guild_config)
 
     def get_guild_setting(self, guild_id, setting_key, default_value=None):
-        self.reload_config()
         guild_id = str(guild_id)
         guild_config = self.get_guild_config(guild_id)
         return guild_config.get(setting_key, default_value)
@@ -92,7 +178,8 @@ class Guilds:
         """
         Check if a channel is banned from generating images.
         """
-        banned_channels = self.get_guild_setting(guild_id, "banned_channels")
+        self._store.current()
+        banned_channels = self._store.banned_channels.get(str(guild_id))
         if banned_channels and channel_id in banned_channels:
             return True
         return False
@@ -0,0 +1,216 @@
+"""Write-behind buffer for ``user_history`` rows.
+
+Generation history is written for statistics and prompt search.  Nothing
+reads it back on the request path, so image commands should not wait on a
+MySQL round trip for each row.  ``history_writer.add`` builds the row
+(timestamp and once-encoded ``config_blob``) on the caller's thread and
+buffers it.  A background thread writes the buffer with multi-row INSERTs
+when ``batch_size`` rows are waiting or ``flush_interval_seconds`` have
+passed, whichever comes first.
+
+Delivery guarantees:
+
+* rows are written in the order they were added;
+* a failed write keeps its rows at the front of the buffer and the next
+  flush retries them;
+* ``close`` (registered with ``atexit`` and called by ``__main__`` on the
+  way out) flushes whatever is buffered before it returns;
+* a hard crash loses at most the rows added since the last flush (one
+  interval or one batch);
+* if the database stays unreachable the buffer is capped at
+  ``max_buffered`` rows and the oldest are dropped, counted in
+  ``user_history_rows{outcome="dropped"}``.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+
+from discord_tron_master.classes import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryWriter:
+    def __init__(
+        self,
+        *,
+        batch_size: int = 100,
+        flush_interval_seconds: float = 2.0,
+        max_buffered: int = 10000,
+        app=None,
+    ):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_seconds = max(0.05, float(flush_interval_seconds))
+        self.max_buffered = max(self.batch_size, int(max_buffered))
+        self.app = app
+        self._lock = threading.Lock()
+        # Serialises flushes so rows are written in order.
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending: list[dict] = []
+        # Rows trimmed off the front by the max_buffered cap, ever.
+        self._dropped = 0
+        self._dropping = False
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    @classmethod
+    def from_config(cls, config=None) -> "HistoryWriter":
+        if config is None:
+            from discord_tron_master.classes.app_config import AppConfig
+
+            config = AppConfig()
+        raw = config.get_user_history_config()
+        return cls(
+            batch_size=raw.get("batch_size") or 1,
+            flush_interval_seconds=raw.get("flush_interval_seconds") or 0.0,
+            max_buffered=raw.get("max_buffered") or 0,
+        )
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(self, user, message, prompt: str, config_blob: dict = None) -> None:
+        self.add_many(
+            [{"user": user, "message": message, "prompt": prompt, "config_blob": config_blob}]
+        )
+
+    def add_many(self, entries: list) -> None:
+        """Buffer ``UserHistory.add_entry``-style dicts (user, message, prompt, config_blob)."""
+        from discord_tron_master.models.user_history import UserHistory
+
+        now = time.time()
+        rows = [
+            UserHistory.new_row(
+                entry["user"],
+                entry["message"],
+                entry["prompt"],
+                entry.get("config_blob"),
+                date_created=now,
+            )
+            for entry in entries
+        ]
+        if not rows:
+            return
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._pending.extend(rows)
+                dropped = len(self._pending) - self.max_buffered
+                if dropped > 0:
+                    del self._pending[:dropped]
+                    self._dropped += dropped
+                    metrics.user_history_rows.labels("dropped").inc(dropped)
+                    if not self._dropping:
+                        # Once per outage; the metric has the running count.
+                        self._dropping = True
+                        logger.error(
+                            "User history buffer is full (%s rows); dropping the oldest rows until a write succeeds.",
+                            self.max_buffered,
+                        )
+                full = len(self._pending) >= self.batch_size
+        if closed:
+            # Shutting down: nobody will flush after us, so write through.
+            self._write(rows)
+            return
+        self._start()
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of rows written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[: self.batch_size]
+                    dropped_before = self._dropped
+                if not batch:
+                    return written
+                if not self._write(batch):
+                    return written
+                with self._lock:
+                    # add_many only appends or trims the front, so whatever
+                    # the cap did not push out is still at the front.
+                    del self._pending[: max(0, len(batch) - (self._dropped - dropped_before))]
+                    self._dropping = False
+                written += len(batch)
+
+    def close(self) -> None:
+        """Stop the background thread and flush the buffer before returning."""
+        with self._lock:
+            self._closed = True
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.flush_interval_seconds + 5)
+        self.flush()
+        if self._pending:
+            logger.error(
+                "Exiting with %s user history row(s) that could not be written.",
+                len(self._pending),
+            )
+
+    def _write(self, rows: list) -> bool:
+        from discord_tron_master.classes.app_config import AppConfig
+        from discord_tron_master.models.user_history import UserHistory
+
+        app = self.app or AppConfig.get_flask()
+        if app is None:
+            logger.warning("Cannot write user history before the Flask app exists.")
+            return False
+        started = time.perf_counter()
+        try:
+            with app.app_context():
+                UserHistory.add_entries(rows)
+        except Exception:
+            logger.warning(
+                "Could not write %s user history row(s); will retry.", len(rows), exc_info=True
+            )
+            metrics.user_history_rows.labels("failed").inc(len(rows))
+            return False
+        metrics.user_history_rows.labels("written").inc(len(rows))
+        logger.debug(
+            "Wrote %s user history row(s) in %.1fms",
+            len(rows),
+            (time.perf_counter() - started) * 1000,
+        )
+        return True
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="user_history_writer", daemon=True
+            )
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval_seconds)
+            self._wakeup.clear()
+            if self._closed:
+                # close() does the final flush on its own thread.
+                return
+            self.flush()
+
+
+def _load_writer() -> HistoryWriter:
+    try:
+        return HistoryWriter.from_config()
+    except Exception:
+        logger.warning("Could not load user history config; using defaults.", exc_info=True)
+        return HistoryWriter()
+
+
+history_writer = _load_writer()
+metrics.user_history_pending.set_function(lambda: history_writer.pending)
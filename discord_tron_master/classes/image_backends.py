@@ -0,0 +1,126 @@
+"""Shared execution for third-party image backends.
+
+The comparison collage, DALL-E, Stability and the gradio hub spaces are
+all slow network calls made from the bot's event loop.  They go through
+``image_backends``:
+
+* ``fetch`` / ``post`` use one long-lived aiohttp session per event loop,
+  so HTTP backends never block the loop;
+* ``run`` puts clients that only have a blocking API (gradio_client, the
+  OpenAI SDK) and CPU-bound Pillow work on one bounded, long-lived thread
+  pool.  ``max_workers`` caps how many such calls run at once across all
+  requests, so a burst of comparisons queues instead of spawning threads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class ImageBackendExecutor:
+    def __init__(self, *, max_workers: int = 8, http_timeout_seconds: float = 120.0):
+        self.max_workers = max(1, int(max_workers))
+        self.http_timeout_seconds = float(http_timeout_seconds)
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        # One session per event loop; aiohttp sessions are bound to theirs.
+        self._sessions: dict = {}
+
+    @classmethod
+    def from_config(cls, config=None) -> "ImageBackendExecutor":
+        if config is None:
+            from discord_tron_master.classes.app_config import AppConfig
+
+            config = AppConfig()
+        raw = config.get_image_backend_config()
+        return cls(
+            max_workers=raw.get("max_workers") or 1,
+            http_timeout_seconds=raw.get("http_timeout_seconds") or 120.0,
+        )
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="image_backend"
+                    )
+        return self._executor
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking *fn* on the shared pool and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def _get_session(self):
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.http_timeout_seconds)
+            )
+            self._sessions[loop] = session
+        return session
+
+    async def fetch(self, url: str, headers: dict = None) -> bytes:
+        """GET *url*; raises on transport errors and non-2xx responses."""
+        session = await self._get_session()
+        async with session.get(url, headers=headers) as resp:
+            resp.raise_for_status()
+            return await resp.read()
+
+    async def post(self, url: str, headers: dict = None, data=None) -> tuple[int, bytes]:
+        """POST *data* (dict, bytes or ``aiohttp.FormData``); returns ``(status, body)``."""
+        session = await self._get_session()
+        async with session.post(url, headers=headers, data=data) as resp:
+            return resp.status, await resp.read()
+
+    async def fetch_image(self, url: str):
+        """Download *url* and decode it as a PIL image off the event loop."""
+        content = await self.fetch(url)
+        return await self.run(decode_image, content)
+
+    async def close(self) -> None:
+        """Close the calling loop's HTTP session."""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def decode_image(content: bytes):
+    from PIL import Image
+
+    image = Image.open(BytesIO(content))
+    # Decode now, on this thread, rather than lazily on first use.
+    image.load()
+    return image
+
+
+def _load_executor() -> ImageBackendExecutor:
+    try:
+        return ImageBackendExecutor.from_config()
+    except Exception:
+        logger.warning("Could not load image backend config; using defaults.", exc_info=True)
+        return ImageBackendExecutor()
+
+
+image_backends = _load_executor()
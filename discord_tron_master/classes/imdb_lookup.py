@@ -0,0 +1,436 @@
+"""Cached, concurrent IMDB lookups for Zork campaign setup.
+
+Suggestion and title lookups are cached in a local SQLite database (positive
+and negative results, each with their own TTL).  Identical lookups that are
+already in flight share one request, and the fallback query variants for a
+search are fired concurrently; the most specific variant with a non-empty
+answer wins, as it did when they were tried one after another.
+
+All network I/O runs on a dedicated event loop thread so that every caller
+of TGE's synchronous ``IMDBLookupPort`` shares the same cache, coalescing
+table and HTTP session.  SQLite reads and writes made from that loop run in a
+worker thread so a slow disk never stalls the lookups in flight.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data")
+_DB_PATH = os.path.join(_DB_DIR, "imdb_cache.db")
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS imdb_cache (
+    cache_key   TEXT PRIMARY KEY,
+    payload     TEXT NOT NULL,
+    expires_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_imdb_cache_expires ON imdb_cache(expires_at);
+"""
+
+_EPISODE_MARKER_RE = re.compile(
+    r"\b(s\d+e\d+|season\s*\d+|episode\s*\d+|ep\s*\d+)\b",
+    flags=re.IGNORECASE,
+)
+_MISS = object()
+
+
+class IMDBLookupEngine:
+    """Async IMDB suggestion/detail lookups with a persistent cache."""
+
+    SUGGEST_URL = "https://sg.media-imdb.com/suggestion/{first}/{query}.json"
+    TITLE_URL = "https://www.imdb.com/title/{imdb_id}/"
+    TIMEOUT = 5
+    POSITIVE_TTL_SECONDS = 7 * 24 * 3600
+    NEGATIVE_TTL_SECONDS = 6 * 3600
+
+    def __init__(
+        self,
+        *,
+        db_path: str | None = None,
+        suggest_url: str | None = None,
+        title_url: str | None = None,
+        timeout: float | None = None,
+        positive_ttl: float | None = None,
+        negative_ttl: float | None = None,
+    ):
+        self.db_path = db_path or _DB_PATH
+        self.suggest_url = suggest_url or self.SUGGEST_URL
+        self.title_url = title_url or self.TITLE_URL
+        self.timeout = float(timeout if timeout is not None else self.TIMEOUT)
+        self.positive_ttl = float(
+            positive_ttl if positive_ttl is not None else self.POSITIVE_TTL_SECONDS
+        )
+        self.negative_ttl = float(
+            negative_ttl if negative_ttl is not None else self.NEGATIVE_TTL_SECONDS
+        )
+        self._conn_local = threading.local()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_lock = threading.Lock()
+        self._session = None
+        self._session_loop: asyncio.AbstractEventLoop | None = None
+
+    # -- Query helpers ---------------------------------------------------------
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        clean = re.sub(r"[^\w\s]", "", str(query or "").strip().lower())
+        return " ".join(clean.split())
+
+    @classmethod
+    def fallback_queries(cls, query: str) -> List[str]:
+        """Return the normalized query variants tried for a search, most specific first."""
+        candidates = [query]
+        stripped = _EPISODE_MARKER_RE.sub("", query).strip()
+        if stripped and stripped != query:
+            candidates.append(stripped)
+        words = str(query or "").strip().split()
+        for length in range(len(words) - 1, 1, -1):
+            candidates.append(" ".join(words[:length]))
+        seen = set()
+        ordered = []
+        for candidate in candidates:
+            normalized = cls.normalize_query(candidate)
+            if normalized and normalized not in seen:
+                seen.add(normalized)
+                ordered.append(normalized)
+        return ordered
+
+    # -- Persistent cache ------------------------------------------------------
+
+    def _get_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._conn_local, "conn", None)
+        if conn is not None:
+            return conn
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA_SQL)
+        self._conn_local.conn = conn
+        return conn
+
+    def cache_get(self, key: str) -> Any:
+        """Return the cached value for *key*, or ``_MISS`` when absent or expired."""
+        try:
+            row = self._get_conn().execute(
+                "SELECT payload, expires_at FROM imdb_cache WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+        except Exception:
+            logger.debug("IMDB cache read failed for %s", key, exc_info=True)
+            return _MISS
+        if row is None or float(row[1]) <= time.time():
+            return _MISS
+        try:
+            return json.loads(row[0])
+        except (TypeError, ValueError):
+            return _MISS
+
+    def cache_put(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO imdb_cache (cache_key, payload, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + float(ttl)),
+            )
+            conn.commit()
+        except Exception:
+            logger.debug("IMDB cache write failed for %s", key, exc_info=True)
+
+    async def _cache_lookup(self, key: str) -> Any:
+        return await asyncio.to_thread(self.cache_get, key)
+
+    async def _cache_result(self, key: str, value: Any) -> None:
+        ttl = self.positive_ttl if value else self.negative_ttl
+        await asyncio.to_thread(self.cache_put, key, value, ttl)
+
+    def purge_expired(self) -> int:
+        conn = self._get_conn()
+        cursor = conn.execute(
+            "DELETE FROM imdb_cache WHERE expires_at <= ?",
+            (time.time(),),
+        )
+        conn.commit()
+        return int(cursor.rowcount or 0)
+
+    # -- Coalescing ------------------------------------------------------------
+
+    async def _coalesce(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run *factory* once per *key* at a time; concurrent callers share its result.
+
+        The shared work runs as its own task, so a caller that gives up (for
+        example a losing fallback variant) does not cancel it for the others,
+        and its result still lands in the cache.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+
+            def _finished(done, key=key):
+                if self._inflight.get(key) is done:
+                    self._inflight.pop(key, None)
+                if not done.cancelled():
+                    # Retrieve so failures nobody awaited are not logged as unhandled.
+                    done.exception()
+
+            task.add_done_callback(_finished)
+        return await asyncio.shield(task)
+
+    async def _get_session(self):
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession()
+            self._session_loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    # -- HTTP ------------------------------------------------------------------
+
+    async def _get(self, session, url: str, headers: dict, timeout: float) -> Optional[Tuple[int, str]]:
+        import aiohttp
+
+        try:
+            async with session.get(
+                url,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as resp:
+                return resp.status, await resp.text()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.debug("IMDB request failed for %s: %s", url, exc)
+            return None
+
+    async def _fetch_suggestions(
+        self, session, clean: str, max_results: int
+    ) -> Optional[List[dict]]:
+        """Return suggestions for a normalized query, ``[]`` for none, ``None`` on transport failure."""
+        key = f"suggest:{max_results}:{clean}"
+        cached = await self._cache_lookup(key)
+        if cached is not _MISS:
+            return cached
+
+        async def _load():
+            first = clean[0] if clean[0].isalpha() else "a"
+            url = self.suggest_url.format(first=first, query=clean.replace(" ", "_"))
+            response = await self._get(
+                session, url, {"User-Agent": "Mozilla/5.0"}, self.timeout
+            )
+            if response is None:
+                return None
+            status, body = response
+            if status == 404:
+                await self._cache_result(key, [])
+                return []
+            if status != 200:
+                return None
+            try:
+                data = json.loads(body)
+            except (TypeError, ValueError):
+                return None
+            results: List[dict] = []
+            for item in (data.get("d") or [])[:max_results]:
+                title = item.get("l")
+                if not title:
+                    continue
+                results.append({
+                    "imdb_id": item.get("id", ""),
+                    "title": title,
+                    "year": item.get("y"),
+                    "type": item.get("q", ""),
+                    "stars": item.get("s", ""),
+                })
+            await self._cache_result(key, results)
+            return results
+
+        return await self._coalesce(key, _load)
+
+    # -- Public API ------------------------------------------------------------
+
+    async def search(self, query: str, max_results: int = 3) -> List[dict]:
+        candidates = self.fallback_queries(query)
+        if not candidates:
+            return []
+        key = f"search:{max_results}:{candidates[0]}"
+        cached = await self._cache_lookup(key)
+        if cached is not _MISS:
+            return cached
+        return await self._coalesce(
+            key, lambda: self._search_uncached(key, candidates, max_results)
+        )
+
+    async def _search_uncached(
+        self, key: str, candidates: List[str], max_results: int
+    ) -> List[dict]:
+        session = await self._get_session()
+        tasks = [
+            asyncio.ensure_future(self._fetch_suggestions(session, clean, max_results))
+            for clean in candidates
+        ]
+        failed = False
+        try:
+            # All variants are in flight; take the most specific one that hits.
+            for task in tasks:
+                try:
+                    results = await task
+                except Exception:
+                    results = None
+                if results is None:
+                    failed = True
+                    continue
+                if results:
+                    await self._cache_result(key, results)
+                    return results
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        # Only remember a miss when every variant was answered authoritatively.
+        if not failed:
+            await self._cache_result(key, [])
+        return []
+
+    async def fetch_details(self, imdb_id: str) -> dict:
+        if not imdb_id or not imdb_id.startswith("tt"):
+            return {}
+        key = f"details:{imdb_id}"
+        cached = await self._cache_lookup(key)
+        if cached is not _MISS:
+            return cached
+        return await self._coalesce(key, lambda: self._fetch_details_uncached(key, imdb_id))
+
+    async def _fetch_details_uncached(self, key: str, imdb_id: str) -> dict:
+        session = await self._get_session()
+        response = await self._get(
+            session,
+            self.title_url.format(imdb_id=imdb_id),
+            {
+                "User-Agent": "Mozilla/5.0 (X11; Linux x86_64)",
+                "Accept-Language": "en-US,en;q=0.9",
+            },
+            self.timeout + 3,
+        )
+        if response is None:
+            return {}
+        status, body = response
+        if status != 200:
+            if status == 404:
+                await self._cache_result(key, {})
+            return {}
+        try:
+            details = self._parse_details(body)
+        except Exception:
+            return {}
+        await self._cache_result(key, details)
+        return details
+
+    @staticmethod
+    def _parse_details(html: str) -> dict:
+        match = re.search(
+            r'<script[^>]+type="application/ld\+json"[^>]*>(.*?)</script>',
+            html,
+            re.DOTALL,
+        )
+        if not match:
+            return {}
+        ld_data = json.loads(match.group(1))
+        details: dict = {}
+        if ld_data.get("description"):
+            details["description"] = ld_data["description"]
+        genre = ld_data.get("genre")
+        if genre:
+            details["genre"] = genre if isinstance(genre, list) else [genre]
+        actors = ld_data.get("actor", [])
+        if actors and isinstance(actors, list):
+            details["actors"] = [
+                a.get("name", "") for a in actors[:6] if a.get("name")
+            ]
+        return details
+
+    async def enrich(self, results: List[dict], max_enrich: int = 1) -> List[dict]:
+        targets = [r for r in results[:max_enrich] if r.get("imdb_id")]
+        details_list = await asyncio.gather(
+            *(self.fetch_details(r["imdb_id"]) for r in targets)
+        )
+        for r, details in zip(targets, details_list):
+            if details.get("description"):
+                r["description"] = details["description"]
+            if details.get("genre"):
+                r["genre"] = details["genre"]
+            if details.get("actors"):
+                r["stars"] = ", ".join(details["actors"])
+        return results
+
+    # -- Loop bridging ---------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._loop_lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever,
+                name="imdb-lookup",
+                daemon=True,
+            )
+            thread.start()
+            self._loop = loop
+            return loop
+
+    def submit(self, coro) -> "asyncio.Future":
+        """Schedule *coro* on the engine loop; returns a ``concurrent.futures.Future``."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run_sync(self, coro, timeout: float | None = None) -> Any:
+        """Block the calling thread until *coro* finishes on the engine loop."""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    def cached_search(self, query: str, max_results: int = 3) -> Any:
+        """Return a cached search result without touching the network, or ``_MISS``."""
+        candidates = self.fallback_queries(query)
+        if not candidates:
+            return []
+        return self.cache_get(f"search:{max_results}:{candidates[0]}")
+
+
+_engine: IMDBLookupEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_imdb_lookup_engine() -> IMDBLookupEngine:
+    global _engine
+    if _engine is not None:
+        return _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = IMDBLookupEngine()
+        return _engine
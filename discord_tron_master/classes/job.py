@@ -1,5 +1,7 @@
 import uuid, logging, json, time
 from typing import Dict, Any
+from discord_tron_master.classes.deadlines import deadline_policy
+from discord_tron_master.classes.tracing import job_tracer
 
 
 class Job:
@@ -10,6 +12,7 @@ class Job:
         command_name: str,
         author_id: str,
         payload: Dict[str, Any],
+        user_config: Dict[str, Any] = None,
     ):
         self.id = str(uuid.uuid4())
         self.job_id = self.id
@@ -30,6 +33,18 @@ class Job:
         # Has the remote side ack'd the thing?
         self.acknowledged = False
         self.acknowledged_date = None
+        # Read once here so format_payload, which runs on dispatch, does no disk I/O.
+        self.user_config = (
+            user_config if user_config is not None else self._read_user_config()
+        )
+        job_tracer.start(self.id, job_type=job_type, command=command_name)
+
+    def _read_user_config(self):
+        try:
+            config, ctx = self.payload[1], self.payload[2]
+            return config.get_user_config(user_id=ctx.author.id)
+        except (AttributeError, IndexError, TypeError):
+            return None
 
     def is_migrated(self):
         return (self.migrated, self.migrated_date)
@@ -47,10 +62,10 @@ class Job:
 
     def needs_resubmission(self):
         """
-        If the job isn't acknowledged within 15 seconds, we need to resubmit it.
+        If the job isn't acknowledged within its ack timeout, we need to resubmit it.
         """
         if not all(self.is_acknowledged()) and self.executed:
-            if (time.time() - self.executed_date) > 15:
+            if (time.time() - self.executed_date) > deadline_policy.ack_timeout(self.job_type):
                 self.executed = False
                 self.executed_date = None
                 return True
@@ -72,7 +87,7 @@ class Job:
         elif num_artefacts == 6:
             bot, config, ctx, prompt, discord_first_message, image = self.payload
         logging.info(f"Formatting message for payload: {self.payload}")
-        user_config = config.get_user_config(user_id=ctx.author.id)
+        user_config = self.user_config
         message = {
             "job_type": self.job_type,
             "job_id": self.id,
@@ -160,7 +175,8 @@ class Job:
         self.executed = True
         self.executed_date = time.time()
         websocket = self.worker.websocket
-        message = await self.format_payload()
+        with job_tracer.span("format_payload", self.id):
+            message = await self.format_payload()
         try:
             await self.worker.send_websocket_message(json.dumps(message))
         except Exception as e:
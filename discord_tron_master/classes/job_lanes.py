@@ -0,0 +1,307 @@
+"""Priority lanes for waiting jobs.
+
+Every waiting job sits in a lane (``interactive`` or ``bulk`` by default,
+more can be configured).  Within a lane jobs stay in FIFO order.  Across
+lanes the next job is the lane head with the smallest
+``enqueued_at + priority * aging_seconds``.  A bulk job therefore yields to
+fresh interactive jobs, but only until it has waited ``aging_seconds`` per
+priority step, so it cannot starve.
+
+A lane may also cap how many of its jobs are in progress across all
+workers at once (``max_in_progress``); while a lane is at its cap its jobs
+are skipped and the other lanes keep flowing.
+
+Jobs are put in a lane from ``job.lane``, which ``QueueManager.enqueue_job``
+fills from the ``job_lane()`` context when the caller did not set one::
+
+    with job_lane(BULK_LANE):
+        await self._generate_prompt(ctx, prompt, copies=count)
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE_LANE = "interactive"
+BULK_LANE = "bulk"
+
+current_lane: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "current_lane", default=None
+)
+
+
+@contextlib.contextmanager
+def job_lane(name: str):
+    """Put jobs enqueued inside this block into lane *name*."""
+    token = current_lane.set(name)
+    try:
+        yield
+    finally:
+        current_lane.reset(token)
+
+
+class LanePolicy:
+    """Lane priorities, aging, and the cluster-wide in-progress count per lane."""
+
+    def __init__(
+        self,
+        lanes: dict[str, dict] | None = None,
+        *,
+        default_lane: str = INTERACTIVE_LANE,
+        aging_seconds: float = 60.0,
+    ):
+        if lanes is None:
+            lanes = {INTERACTIVE_LANE: {"priority": 0}, BULK_LANE: {"priority": 1}}
+        self.priorities: dict[str, int] = {}
+        self.caps: dict[str, int] = {}
+        for name, settings in lanes.items():
+            settings = settings if isinstance(settings, dict) else {}
+            self.priorities[str(name)] = int(settings.get("priority") or 0)
+            cap = settings.get("max_in_progress")
+            if cap not in (None, ""):
+                self.caps[str(name)] = max(0, int(cap))
+        self.default_lane = default_lane if default_lane in self.priorities else INTERACTIVE_LANE
+        self.priorities.setdefault(self.default_lane, 0)
+        self.aging_seconds = max(0.0, float(aging_seconds))
+        self._lock = threading.Lock()
+        self._in_progress: dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, config=None) -> "LanePolicy":
+        if config is None:
+            from discord_tron_master.classes.app_config import AppConfig
+
+            config = AppConfig()
+        raw = config.get_job_lane_config()
+        return cls(
+            raw.get("lanes") or None,
+            default_lane=raw.get("default_lane") or INTERACTIVE_LANE,
+            aging_seconds=raw.get("aging_seconds") or 0.0,
+        )
+
+    def lane_for(self, job: Any) -> str:
+        lane = getattr(job, "lane", None)
+        return lane if lane in self.priorities else self.default_lane
+
+    def rank(self, lane: str, enqueued_at: float) -> float:
+        return enqueued_at + self.priorities.get(lane, 0) * self.aging_seconds
+
+    def has_capacity(self, lane: str) -> bool:
+        cap = self.caps.get(lane)
+        if cap is None:
+            return True
+        with self._lock:
+            return self._in_progress.get(lane, 0) < cap
+
+    def started(self, lane: str) -> None:
+        with self._lock:
+            self._in_progress[lane] = self._in_progress.get(lane, 0) + 1
+
+    def finished(self, lane: str) -> None:
+        with self._lock:
+            remaining = self._in_progress.get(lane, 0) - 1
+            if remaining > 0:
+                self._in_progress[lane] = remaining
+            else:
+                self._in_progress.pop(lane, None)
+
+    def in_progress_by_lane(self) -> dict[str, int]:
+        with self._lock:
+            counts = dict(self._in_progress)
+        return {lane: counts.get(lane, 0) for lane in self.priorities}
+
+
+class LaneQueue:
+    """Waiting jobs split into lanes, behind the deque interface callers already use.
+
+    Iteration, indexing and ``popleft`` follow dispatch order (lane rank,
+    FIFO within a lane), ignoring lane caps.  ``peek_available`` and
+    ``pop_available`` apply the caps and are what ``JobQueue`` uses to hand
+    out work; they also take the worker's model affinity preference.
+    """
+
+    def __init__(self, policy: LanePolicy | None = None, jobs: Iterable = ()):
+        self.policy = policy if policy is not None else lane_policy
+        self._lanes: dict[str, deque] = {}
+        self._lock = threading.RLock()
+        self.extend(jobs)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(lane) for lane in self._lanes.values())
+
+    def __bool__(self) -> bool:
+        with self._lock:
+            return any(self._lanes.values())
+
+    def __iter__(self) -> Iterator:
+        return iter([job for _, job in self._ordered()])
+
+    def __contains__(self, job) -> bool:
+        with self._lock:
+            return any(job in lane for lane in self._lanes.values())
+
+    def __getitem__(self, index):
+        if index == 0:
+            _, job = self._next(respect_caps=False)
+            if job is None:
+                raise IndexError("deque index out of range")
+            return job
+        return self._ordered()[index][1]
+
+    def __repr__(self) -> str:
+        with self._lock:
+            sizes = {name: len(lane) for name, lane in self._lanes.items()}
+        return f"LaneQueue({sizes})"
+
+    def append(self, job) -> None:
+        if getattr(job, "enqueued_at", None) is None:
+            job.enqueued_at = time.monotonic()
+        lane = self.policy.lane_for(job)
+        with self._lock:
+            self._lanes.setdefault(lane, deque()).append(job)
+
+    def extend(self, jobs: Iterable) -> None:
+        with self._lock:
+            for job in jobs:
+                self.append(job)
+
+    def remove(self, job) -> None:
+        with self._lock:
+            for lane in self._lanes.values():
+                try:
+                    lane.remove(job)
+                    return
+                except ValueError:
+                    continue
+        raise ValueError("LaneQueue.remove(x): x not in queue")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lanes.clear()
+
+    def popleft(self):
+        with self._lock:
+            name, job = self._next(respect_caps=False)
+            if job is None:
+                raise IndexError("pop from an empty deque")
+            return self._lanes[name].popleft()
+
+    def peek_available(self, prefer=None):
+        """The next job whose lane is under its cap, or None.
+
+        *prefer* is an optional ``AffinityPreference``; see ``_select``.
+        """
+        return self._select(prefer)[0][1]
+
+    def first_available(self, predicate):
+        """The first job in dispatch order whose lane is under its cap and that *predicate* accepts."""
+        for _, job in self._ordered(respect_caps=True):
+            if predicate(job):
+                return job
+        return None
+
+    def pop_available(self, prefer=None):
+        """Pop the next job whose lane is under its cap; returns ``(lane, job)``."""
+        with self._lock:
+            (name, job), passed_over = self._select(prefer)
+            if job is None:
+                return None, None
+            for skipped in passed_over:
+                skipped.affinity_bypasses = getattr(skipped, "affinity_bypasses", 0) + 1
+            self._lanes[name].remove(job)
+            return name, job
+
+    def lane_sizes(self) -> dict[str, int]:
+        with self._lock:
+            return {name: len(lane) for name, lane in self._lanes.items() if lane}
+
+    def _next(self, respect_caps: bool):
+        best = (None, None)
+        best_rank = None
+        with self._lock:
+            for name, lane in self._lanes.items():
+                if not lane or (respect_caps and not self.policy.has_capacity(name)):
+                    continue
+                rank = self.policy.rank(name, lane[0].enqueued_at)
+                if best_rank is None or rank < best_rank:
+                    best, best_rank = (name, lane[0]), rank
+        return best
+
+    def _select(self, prefer):
+        """Return ``((lane, job), jobs passed over)`` for the next job to hand out.
+
+        Without *prefer* that is the next available job.  With it, the first
+        of the next ``prefer.window`` available jobs that *prefer* matches is
+        taken instead, unless a job ahead of it may not be passed over again.
+        """
+        if prefer is None:
+            return self._next(respect_caps=True), ()
+        with self._lock:
+            candidates = self._ordered(limit=prefer.window, respect_caps=True)
+            if not candidates:
+                return (None, None), ()
+            for index, (name, job) in enumerate(candidates):
+                if prefer.matches(job):
+                    return (name, job), [skipped for _, skipped in candidates[:index]]
+                if not prefer.may_bypass(job):
+                    break
+            return candidates[0], ()
+
+    def _ordered(self, limit: int | None = None, respect_caps: bool = False) -> list:
+        """``(lane, job)`` pairs in dispatch order, optionally only the first *limit*."""
+        with self._lock:
+            cursors = {
+                name: 0
+                for name, lane in self._lanes.items()
+                if lane and (not respect_caps or self.policy.has_capacity(name))
+            }
+            total = sum(len(self._lanes[name]) for name in cursors)
+            if limit is not None:
+                total = min(total, limit)
+            ordered = []
+            while len(ordered) < total:
+                name = min(
+                    cursors,
+                    key=lambda lane: self.policy.rank(
+                        lane, self._lanes[lane][cursors[lane]].enqueued_at
+                    ),
+                )
+                ordered.append((name, self._lanes[name][cursors[name]]))
+                cursors[name] += 1
+                if cursors[name] >= len(self._lanes[name]):
+                    del cursors[name]
+            return ordered
+
+
+def _load_policy() -> LanePolicy:
+    try:
+        return LanePolicy.from_config()
+    except Exception:
+        logger.warning("Could not load job lane config; using defaults.", exc_info=True)
+        return LanePolicy()
+
+
+lane_policy = _load_policy()
+
+
+def _register_metrics() -> None:
+    from discord_tron_master.classes import metrics
+
+    metrics.metrics_registry.callback_gauge(
+        "lane_in_progress",
+        "In-progress jobs across all workers, by priority lane.",
+        ("lane",),
+        lane_policy.in_progress_by_lane,
+    )
+
+
+_register_metrics()
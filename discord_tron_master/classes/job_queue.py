@@ -1,6 +1,7 @@
 import asyncio
-from collections import deque
 from discord_tron_master.classes.job import Job
+from discord_tron_master.classes.job_lanes import LaneQueue, lane_policy
+from discord_tron_master.classes.model_affinity import model_affinity
 from typing import List
 import logging
 
@@ -10,15 +11,18 @@ logger.setLevel("DEBUG")
 
 class JobQueue:
     def __init__(self, worker_id: str):
-        self.queue = deque()
+        # Waiting jobs, split into priority lanes; see classes/job_lanes.py.
+        self.queue = LaneQueue(lane_policy)
         self.in_progress = {}
+        # job_id -> lane, for in-progress jobs counted against a lane cap.
+        self.in_progress_lanes = {}
         self.worker_id = worker_id
         self.terminate = False
         self.item_added_event = asyncio.Event()  # Added an asyncio.Event
         logger.debug("JobQueue initialized")
 
     async def set_queue_from_list(self, job_list: List[Job]):
-        self.queue = deque(job_list)
+        self.queue = LaneQueue(lane_policy, job_list)
         logger.debug(f"JobQueue set from list, queue size: {len(self.queue)}")
 
     async def put(self, job: Job):
@@ -28,6 +32,9 @@ class JobQueue:
 
     async def stop(self):
         self.terminate = True
+        for lane in self.in_progress_lanes.values():
+            lane_policy.finished(lane)
+        self.in_progress_lanes.clear()
 
     async def preview(self) -> Job:
         """
@@ -42,7 +49,8 @@ class JobQueue:
         if self.queue is None or len(self.queue) == 0:
             # logger.debug("Queue is empty, returning None")
             return None
-        return self.queue[0]
+        # None while every waiting job's lane is at its in-progress cap.
+        return self.queue.peek_available(model_affinity.preference(self.worker_id))
 
     async def get_job_by_id(self, job_id: str) -> Job:
         """
@@ -77,9 +85,14 @@ class JobQueue:
         if len(self.queue) == 0:
             # logger.debug("Queue is empty, returning None")
             return None
-        logger.debug(f"Got job! Queue size: {len(self.queue)}")
-        job = self.queue.popleft()
+        # May take a job for an already-loaded model from just behind the head.
+        lane, job = self.queue.pop_available(model_affinity.preference(self.worker_id))
+        if job is None:
+            return None
+        logger.debug(f"Got {lane} job! Queue size: {len(self.queue)}")
         self.in_progress[job.id] = job
+        self.in_progress_lanes[job.id] = lane
+        lane_policy.started(lane)
         logger.debug(
             f"Job {job.id} retrieved from queue, now kept as self.in_progress: {self.in_progress}"
         )
@@ -132,6 +145,9 @@ class JobQueue:
         )
         if job_id in self.in_progress:
             del self.in_progress[job_id]
+            lane = self.in_progress_lanes.pop(job_id, None)
+            if lane is not None:
+                lane_policy.finished(lane)
             logger.debug(
                 f"(JobQueue.done) Job {job_id} marked as done, removed from in progress"
             )
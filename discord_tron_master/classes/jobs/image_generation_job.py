@@ -1,17 +1,18 @@
 from discord_tron_master.classes.job import Job
 import logging, json
-from discord_tron_master.models.transformers import Transformers
-from discord_tron_master.classes.app_config import AppConfig
-from discord_tron_master.models.schedulers import Schedulers
+from discord_tron_master.classes.model_catalog import model_catalog
 import time
 
-flask = AppConfig.get_flask()
-
 
 class ImageGenerationJob(Job):
     def __init__(self, author_id: str, payload, extra_payload: dict = None):
         super().__init__(
-            "gpu", "image_generation", "generate_image", author_id, payload
+            "gpu",
+            "image_generation",
+            "generate_image",
+            author_id,
+            payload,
+            user_config=(extra_payload or {}).get("user_config"),
         )
         self.extra_payload = extra_payload
         self.date_created = time.time()
@@ -31,41 +32,40 @@ class ImageGenerationJob(Job):
             message_flags = self.extra_payload.get("message_flags", {})
             image_data = self.extra_payload.get("image_data")
         else:
-            user_config = config.get_user_config(user_id=ctx.author.id)
+            user_config = self.user_config
             message_flags = {}
             image_data = None
         discord_context = self.context_to_dict(ctx)
         if isinstance(message_flags, dict) and message_flags.get("zork_scene"):
             # Keep the marker on discord_context in case worker responses only echo this sub-object.
             discord_context["zork_scene"] = True
-        with flask.app_context():
-            message = {
-                "job_type": self.job_type,
-                "job_id": self.id,
-                "module_name": self.module_name,
-                "module_command": self.module_command,
-                "discord_context": discord_context,
-                "overridden_user_id": overridden_user_id,
-                "image_prompt": prompt,
-                "prompt": prompt,
-                "discord_first_message": self.discordmsg_to_dict(discord_first_message),
-                "config": user_config,
-                "model_config": self.get_transformer_details(user_config),
-                "message_flags": message_flags,
-            }
-            if isinstance(image_data, str) and image_data.strip():
-                message["image_data"] = image_data.strip()
-            elif isinstance(image_data, list):
-                cleaned = []
-                for item in image_data:
-                    if not isinstance(item, str):
-                        continue
-                    value = item.strip()
-                    if not value:
-                        continue
-                    cleaned.append(value)
-                if cleaned:
-                    message["image_data"] = cleaned
+        message = {
+            "job_type": self.job_type,
+            "job_id": self.id,
+            "module_name": self.module_name,
+            "module_command": self.module_command,
+            "discord_context": discord_context,
+            "overridden_user_id": overridden_user_id,
+            "image_prompt": prompt,
+            "prompt": prompt,
+            "discord_first_message": self.discordmsg_to_dict(discord_first_message),
+            "config": user_config,
+            "model_config": self.get_transformer_details(user_config),
+            "message_flags": message_flags,
+        }
+        if isinstance(image_data, str) and image_data.strip():
+            message["image_data"] = image_data.strip()
+        elif isinstance(image_data, list):
+            cleaned = []
+            for item in image_data:
+                if not isinstance(item, str):
+                    continue
+                value = item.strip()
+                if not value:
+                    continue
+                cleaned.append(value)
+            if cleaned:
+                message["image_data"] = cleaned
         return message
 
     async def execute(self):
@@ -96,12 +96,11 @@ class ImageGenerationJob(Job):
 
     def get_transformer_details(self, user_config):
         model_id = user_config["model"]
-        app = AppConfig.flask
-        with app.app_context():
-            transformer = Transformers.get_by_full_model_id(model_id)
+        # Served from memory; see classes/model_catalog.py.
+        transformer = model_catalog.transformer(model_id)
         if transformer is None:
             logging.warning(
                 f"No transformer row found for model '{model_id}'. Sending empty model_config."
             )
             return {}
-        return transformer.to_dict()
+        return transformer
@@ -4,8 +4,10 @@ from discord_tron_master.classes.app_config import AppConfig
 
 
 class LlamaPredictionJob(Job):
-    def __init__(self, author_id: str, payload):
-        super().__init__("llama", "llama", "predict", author_id, payload)
+    def __init__(self, author_id: str, payload, user_config: dict = None):
+        super().__init__(
+            "llama", "llama", "predict", author_id, payload, user_config=user_config
+        )
         self.date_created = time.time()
 
     async def format_payload(self):
@@ -16,7 +18,7 @@ class LlamaPredictionJob(Job):
         elif num_artefacts == 6:
             bot, config, ctx, prompt, discord_first_message, image = self.payload
         logging.info(f"Formatting message for payload: {self.payload}")
-        user_config = config.get_user_config(user_id=ctx.author.id)
+        user_config = self.user_config
         message = {
             "job_type": self.job_type,
             "job_id": self.id,
@@ -5,7 +5,7 @@ import uuid
 
 
 class OllamaCompletionJob:
-    def __init__(self, payload: dict):
+    def __init__(self, payload: dict, timeout_seconds: float | None = None):
         self.id = str(uuid.uuid4())
         self.job_id = self.id
         self.job_type = "ollama"
@@ -21,6 +21,12 @@ class OllamaCompletionJob:
         self.executed_date = None
         self.acknowledged = False
         self.acknowledged_date = None
+        if timeout_seconds is None:
+            from discord_tron_master.classes.app_config import AppConfig
+
+            timeout_seconds = AppConfig().get_ollama_timeout_seconds()
+        # Read once here; the queue monitor checks resubmission on every tick.
+        self.timeout_seconds = float(timeout_seconds)
 
     def set_worker(self, worker):
         self.worker = worker
@@ -34,7 +40,7 @@ class OllamaCompletionJob:
 
     def needs_resubmission(self):
         if not all(self.is_acknowledged()) and self.executed:
-            if (time.time() - self.executed_date) > 15:
+            if (time.time() - self.executed_date) > self.timeout_seconds:
                 self.executed = False
                 self.executed_date = None
                 return True
@@ -64,3 +70,62 @@ class OllamaCompletionJob:
             f"Ollama job {self.job_id} reassigned to {new_worker} ({reassignment_stage})."
         )
         return True
+
+
+class OllamaBatchJob(OllamaCompletionJob):
+    """
+    Several completions for one model, sent to the worker as one message.
+
+    Requests join with ``add`` while the job waits in the worker's queue.
+    ``execute`` seals the batch through ``on_seal``, which returns the
+    requests still worth sending (not cancelled, not past their deadline),
+    and sends them as a single ``complete_batch`` message.  The worker
+    answers each request with ``complete_result`` as before.
+    """
+
+    def __init__(
+        self,
+        model: str | None,
+        max_size: int,
+        on_seal=None,
+        timeout_seconds: float | None = None,
+    ):
+        super().__init__({"model": model, "author_id": "system"}, timeout_seconds)
+        self.model = model
+        self.max_size = max(1, int(max_size))
+        self.module_command = "complete_batch"
+        self.requests = []
+        self.sealed = False
+        self.on_seal = on_seal
+
+    def add(self, request: dict) -> bool:
+        """Join the batch; False once it is sealed or full."""
+        if self.sealed or len(self.requests) >= self.max_size:
+            return False
+        self.requests.append(request)
+        return True
+
+    async def execute(self):
+        if self.executed and not self.needs_resubmission():
+            logging.warning(f"Ollama job {self.job_id} has already been executed. Ignoring.")
+            return
+        if not self.sealed:
+            self.sealed = True
+            if self.on_seal is not None:
+                self.requests = self.on_seal(self)
+        if not self.requests:
+            # Everyone gave up while the batch was queued; nothing to send.
+            logging.debug(f"Ollama batch {self.job_id} is empty at dispatch; dropping it.")
+            self.worker.complete_job(self)
+            return
+        self.executed = True
+        self.executed_date = time.time()
+        message = {
+            "job_type": self.job_type,
+            "job_id": self.id,
+            "module_name": self.module_name,
+            "module_command": self.module_command,
+            "model": self.model,
+            "requests": self.requests,
+        }
+        await self.worker.send_websocket_message(json.dumps(message))
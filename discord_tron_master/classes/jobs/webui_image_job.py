@@ -56,6 +56,8 @@ class WebUIImageGenerationJob:
         self.webui_job_id = webui_job_id
         self.reference_images = reference_images or []
         self.extra_metadata = dict(metadata or {})
+        # Built once here so format_payload, which runs on dispatch, does no disk I/O.
+        self.user_config = self._build_user_config()
 
         # Job lifecycle state expected by queue_manager / worker.
         self.worker = None
@@ -144,7 +146,7 @@ class WebUIImageGenerationJob:
         for k, v in self.extra_metadata.items():
             message_flags.setdefault(k, v)
 
-        user_config = self._build_user_config()
+        user_config = self.user_config
 
         return {
             "job_type": self.job_type,
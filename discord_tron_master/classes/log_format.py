@@ -1,4 +1,4 @@
-import logging, os
+import atexit, copy, logging, logging.handlers, os, queue
 from colorama import Fore, Back, Style, init
 from discord_tron_master.classes.app_config import AppConfig
 
@@ -21,6 +21,23 @@ class ColorizedFormatter(logging.Formatter):
         return f"{level_color}{message}{reset_color}"
 
 
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Hand records to the listener thread with only the message merged.
+
+    The stock ``prepare`` runs the full formatter (and traceback rendering) on
+    the logging thread.  Records stay in-process here, so only ``msg % args``
+    is resolved up front, while the arguments still reflect the caller's state,
+    and the colourised formatting, tracebacks and stream I/O happen on the
+    listener thread.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
 # Initialize colorama
 init(autoreset=True)
 
@@ -37,4 +54,10 @@ new_handler.setFormatter(
 for handler in logger.handlers[:]:
     logger.removeHandler(handler)
 if not logger.handlers:
-    logger.addHandler(new_handler)
+    log_queue = queue.SimpleQueue()
+    queue_listener = logging.handlers.QueueListener(
+        log_queue, new_handler, respect_handler_level=True
+    )
+    queue_listener.start()
+    atexit.register(queue_listener.stop)
+    logger.addHandler(_DeferredQueueHandler(log_queue))
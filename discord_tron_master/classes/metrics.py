@@ -0,0 +1,567 @@
+"""Low-overhead runtime metrics with a Prometheus text exposition.
+
+Recording never takes a lock: every thread that touches a metric gets its own
+shard of slots, and scrapes sum the shards.  A lock is only taken the first
+time a thread records into a metric (to register its shard) and when a new
+label combination is created.  Shards of threads that have exited are folded
+into a running total when the next shard registers or on the next scrape, so
+short-lived threads do not accumulate.  Histograms use fixed buckets chosen at
+construction time, so ``observe`` is a bisect plus two list writes.
+
+Gauges that describe existing state (queue depths, semaphore capacity) are
+better registered with ``set_function`` and read at scrape time than updated
+on every change.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+
+class _ShardedSlots:
+    """A fixed number of float slots, written per thread and summed on read."""
+
+    __slots__ = ("_size", "_local", "_shards", "_retired", "_lock")
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: list[tuple[threading.Thread, list[float]]] = []
+        # Sums of the shards of threads that have exited.
+        self._retired = [0.0] * size
+        self._lock = threading.Lock()
+
+    def shard(self) -> list[float]:
+        shard = getattr(self._local, "slots", None)
+        if shard is None:
+            shard = [0.0] * self._size
+            with self._lock:
+                self._reclaim()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.slots = shard
+        return shard
+
+    def _reclaim(self) -> None:
+        """Fold the shards of exited threads into ``_retired``; call with the lock held."""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+                continue
+            for index, value in enumerate(shard):
+                self._retired[index] += value
+        self._shards = live
+
+    def snapshot(self) -> list[float]:
+        with self._lock:
+            self._reclaim()
+            totals = list(self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            for index, value in enumerate(shard):
+                totals[index] += value
+        return totals
+
+
+class _CounterChild:
+    __slots__ = ("_slots",)
+
+    def __init__(self):
+        self._slots = _ShardedSlots(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._slots.shard()[0] += amount
+
+    def value(self) -> float:
+        return self._slots.snapshot()[0]
+
+    def samples(self, name: str):
+        yield name + "_total", (), self.value()
+
+
+class _GaugeChild:
+    """A gauge is either ``set``, moved with ``inc``/``dec``, or computed by a function."""
+
+    __slots__ = ("_base", "_slots", "_function")
+
+    def __init__(self):
+        self._base = 0.0
+        self._slots = _ShardedSlots(1)
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self._base = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._slots.shard()[0] += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._slots.shard()[0] -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def value(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return self._base + self._slots.snapshot()[0]
+
+    def samples(self, name: str):
+        yield name, (), self.value()
+
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_slots")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self._buckets = buckets
+        # One slot per bucket, one for +Inf, then sum.
+        self._slots = _ShardedSlots(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        shard = self._slots.shard()
+        shard[bisect.bisect_left(self._buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def snapshot(self) -> tuple[list[tuple[float, float]], float, float]:
+        """Return ``(cumulative_buckets, count, sum)``."""
+        values = self._slots.snapshot()
+        cumulative = []
+        running = 0.0
+        for bound, count in zip(self._buckets + (math.inf,), values[:-1]):
+            running += count
+            cumulative.append((bound, running))
+        return cumulative, running, values[-1]
+
+    def samples(self, name: str):
+        cumulative, count, total = self.snapshot()
+        for bound, value in cumulative:
+            yield name + "_bucket", (("le", _format_bound(bound)),), value
+        yield name + "_count", (), count
+        yield name + "_sum", (), total
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram: _HistogramChild):
+        self._histogram = histogram
+        self._started = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._started)
+        return False
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values) -> None:
+        with self._lock:
+            self._children.pop(tuple(str(value) for value in values), None)
+
+    def _unlabelled(self):
+        return self._children[()]
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for key, child in list(self._children.items()):
+            base_labels = tuple(zip(self.labelnames, key))
+            try:
+                samples = list(child.samples(self.name))
+            except Exception:
+                logger.debug("Failed collecting metric %s%s", self.name, key, exc_info=True)
+                continue
+            for sample_name, extra_labels, value in samples:
+                lines.append(
+                    f"{sample_name}{_format_labels(base_labels + extra_labels)} {_format_value(value)}"
+                )
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabelled().inc(amount)
+
+    def value(self) -> float:
+        return self._unlabelled().value()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._unlabelled().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._unlabelled().dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._unlabelled().set_function(function)
+
+    def value(self) -> float:
+        return self._unlabelled().value()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(float(bound) for bound in buckets if bound != math.inf))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._unlabelled().observe(value)
+
+    def time(self) -> _Timer:
+        return self._unlabelled().time()
+
+    def snapshot(self) -> tuple[list[tuple[float, float]], float, float]:
+        return self._unlabelled().snapshot()
+
+
+class _CallbackGauge(_Metric):
+    """A labelled gauge whose samples all come from one callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames, collect: Callable[[], dict]):
+        super().__init__(name, documentation, labelnames)
+        self._collect = collect
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        try:
+            values = self._collect() or {}
+        except Exception:
+            logger.debug("Failed collecting metric %s", self.name, exc_info=True)
+            return lines
+        for key, value in values.items():
+            if not isinstance(key, tuple):
+                key = (key,)
+            labels = tuple(zip(self.labelnames, (str(part) for part in key)))
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self, namespace: str = "dtm"):
+        self.namespace = namespace
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, factory: Callable[[str], _Metric]) -> _Metric:
+        full_name = f"{self.namespace}_{name}" if self.namespace else name
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = factory(full_name)
+                self._metrics[full_name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(name, lambda full: Counter(full, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(name, lambda full: Gauge(full, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(
+            name, lambda full: Histogram(full, documentation, labelnames, buckets)
+        )
+
+    def callback_gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str],
+        collect: Callable[[], dict],
+    ) -> _CallbackGauge:
+        """Register (or replace the callback of) a gauge read from *collect* at scrape time.
+
+        *collect* returns ``{label_value_or_tuple: value}``.
+        """
+        metric = self._register(
+            name, lambda full: _CallbackGauge(full, documentation, labelnames, collect)
+        )
+        metric._collect = collect
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(text: str) -> str:
+    return str(text).replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class MetricsServer:
+    """Standalone ``/metrics`` endpoint for scrapers that can't reach the Flask API."""
+
+    def __init__(self, registry: MetricsRegistry):
+        self._registry = registry
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self, host: str, port: int) -> None:
+        if self._server is not None:
+            return
+        registry = self._registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - stdlib callback name
+                if self.path.split("?", 1)[0].rstrip("/") != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                encoded = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug("Metrics server: " + format, *args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        self._server = server
+        self._thread = threading.Thread(
+            target=server.serve_forever, name="metrics_server", daemon=True
+        )
+        self._thread.start()
+        logger.info("Started metrics endpoint at http://%s:%s/metrics", host, port)
+
+    def stop(self) -> None:
+        server, thread = self._server, self._thread
+        self._server = None
+        self._thread = None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        if thread is not None:
+            thread.join(timeout=2)
+
+
+metrics_registry = MetricsRegistry()
+
+# -- Instrumented surfaces -----------------------------------------------------
+
+jobs_enqueued = metrics_registry.counter(
+    "jobs_enqueued", "Jobs placed on a worker queue.", ("job_type",)
+)
+admission_rejections = metrics_registry.counter(
+    "admission_rejections", "Jobs turned away at enqueue, by reason.", ("job_type", "reason")
+)
+jobs_stolen = metrics_registry.counter(
+    "jobs_stolen", "Waiting jobs taken over by an idle worker from a busier peer.", ("job_type",)
+)
+jobs_assigned = metrics_registry.counter(
+    "jobs_assigned", "Jobs taken off a worker queue and sent to the worker.", ("job_type",)
+)
+job_assignment_latency = metrics_registry.histogram(
+    "job_assignment_latency_seconds",
+    "Time from enqueue until Worker.process_jobs sends the job.",
+    ("job_type",),
+)
+job_ack_delay = metrics_registry.histogram(
+    "job_ack_delay_seconds",
+    "Time from a job being sent until the worker acknowledged it.",
+    ("job_type",),
+)
+jobs_resubmitted = metrics_registry.counter(
+    "jobs_resubmitted", "Jobs re-sent because the worker did not acknowledge them.", ("job_type",)
+)
+jobs_overdue = metrics_registry.counter(
+    "jobs_overdue", "Acknowledged jobs that passed their completion deadline.", ("job_type",)
+)
+model_swaps = metrics_registry.counter(
+    "model_swaps", "Jobs sent to a worker that last ran a different model.", ("worker_id",)
+)
+jobs_unacknowledged = metrics_registry.gauge(
+    "jobs_unacknowledged", "In-progress jobs not yet acknowledged, by worker.", ("worker_id",)
+)
+completion_latency = metrics_registry.histogram(
+    "completion_latency_seconds",
+    "GPT.turbo_completion latency per backend, including semaphore wait.",
+    ("backend", "outcome"),
+)
+completion_semaphore_wait = metrics_registry.histogram(
+    "completion_semaphore_wait_seconds",
+    "Time spent waiting for a per-backend completion slot.",
+    ("backend",),
+)
+completion_inflight = metrics_registry.gauge(
+    "completion_inflight", "Completions holding a per-backend semaphore slot.", ("backend",)
+)
+completion_slots = metrics_registry.gauge(
+    "completion_slots", "Per-backend completion concurrency limit.", ("backend",)
+)
+model_selections = metrics_registry.counter(
+    "model_selections",
+    "Automatic model selections, by source (memo, rules, neighbours, llm, coalesced, fallback).",
+    ("source",),
+)
+model_selection_agreement = metrics_registry.counter(
+    "model_selection_agreement",
+    "Sampled local model selections re-checked against the LLM.",
+    ("source", "outcome"),
+)
+user_history_rows = metrics_registry.counter(
+    "user_history_rows",
+    "User history rows handled by the write-behind buffer, by outcome (written, failed, dropped).",
+    ("outcome",),
+)
+user_history_pending = metrics_registry.gauge(
+    "user_history_pending", "User history rows buffered and not yet written."
+)
+websocket_messages = metrics_registry.counter(
+    "websocket_messages",
+    "WebSocket hub messages: in/out for the command protocol, dispatch for jobs sent to workers.",
+    ("direction",),
+)
+websocket_clients = metrics_registry.gauge(
+    "websocket_clients", "Connected WebSocket hub clients."
+)
+stream_first_visible = metrics_registry.histogram(
+    "stream_first_visible_seconds",
+    "Time from starting a streamed reply until its first text was visible in Discord.",
+    ("consumer",),
+)
+stream_edits = metrics_registry.counter(
+    "stream_edits",
+    "Discord sends and edits made for streamed previews, by outcome (sent, edited, rate_limited, failed).",
+    ("consumer", "outcome"),
+)
+completion_cache_requests = metrics_registry.counter(
+    "completion_cache_requests",
+    "Cacheable completions, by outcome (hit, coalesced, miss); hits and coalesced calls skip the backend.",
+    ("outcome",),
+)
+completion_cache_evictions = metrics_registry.counter(
+    "completion_cache_evictions", "Cached completions evicted, by reason (ttl, size).", ("reason",)
+)
+completion_cache_entries = metrics_registry.gauge(
+    "completion_cache_entries", "Completions currently cached."
+)
+webui_echo_events = metrics_registry.counter(
+    "webui_echo_events", "Webui echo outbox events handled, by outcome (consumed, retry).", ("outcome",)
+)
+webui_echo_latency = metrics_registry.histogram(
+    "webui_echo_latency_seconds",
+    "Time from the web UI writing an echo outbox event until Discord delivery finished.",
+)
+webui_echo_db_round_trips = metrics_registry.counter(
+    "webui_echo_db_round_trips",
+    "Database round trips made by the webui echo consumer, by query (fetch, routes, record).",
+    ("query",),
+)
@@ -0,0 +1,157 @@
+"""Model affinity for GPU workers.
+
+Loading a different checkpoint costs a worker far more than most jobs take
+to run, so the master keeps track of the models each worker ran most
+recently and uses them in two places:
+
+* routing: ``WorkerManager`` adds ``swap_cost`` to a worker's predicted
+  backlog when the job's model differs from the one that worker will have
+  loaded by the time it reaches the job;
+* dispatch: ``JobQueue`` lets a worker take a job for a warm model from the
+  first ``reorder_window`` waiting jobs ahead of the head of the queue.  A
+  job is never passed over more than ``max_bypass`` times, or at all once it
+  has waited ``max_bypass_seconds``, so fairness and the lanes' aging still
+  hold.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from discord_tron_master.classes import metrics
+from discord_tron_master.classes.service_times import job_model
+
+logger = logging.getLogger(__name__)
+
+
+class AffinityPreference:
+    """Which waiting jobs a worker would rather run next, and how far it may look."""
+
+    __slots__ = ("warm", "window", "max_bypass", "max_bypass_seconds")
+
+    def __init__(self, warm: tuple, window: int, max_bypass: int, max_bypass_seconds: float):
+        self.warm = warm
+        self.window = window
+        self.max_bypass = max_bypass
+        self.max_bypass_seconds = max_bypass_seconds
+
+    def matches(self, job: Any) -> bool:
+        model = job_model(job)
+        return model is not None and model in self.warm
+
+    def may_bypass(self, job: Any) -> bool:
+        if getattr(job, "affinity_bypasses", 0) >= self.max_bypass:
+            return False
+        enqueued_at = getattr(job, "enqueued_at", None)
+        return enqueued_at is None or time.monotonic() - enqueued_at < self.max_bypass_seconds
+
+
+class ModelAffinity:
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        swap_penalty_seconds: float = 45.0,
+        warm_models: int = 1,
+        reorder_window: int = 4,
+        max_bypass: int = 3,
+        max_bypass_seconds: float = 60.0,
+    ):
+        self.enabled = bool(enabled)
+        self.swap_penalty_seconds = float(swap_penalty_seconds)
+        self.warm_model_count = max(1, int(warm_models))
+        self.reorder_window = max(1, int(reorder_window))
+        self.max_bypass = max(0, int(max_bypass))
+        self.max_bypass_seconds = float(max_bypass_seconds)
+        self._lock = threading.Lock()
+        # worker_id -> most recently used models, newest last
+        self._recent: dict[str, deque] = {}
+
+    @classmethod
+    def from_config(cls, config=None) -> "ModelAffinity":
+        if config is None:
+            from discord_tron_master.classes.app_config import AppConfig
+
+            config = AppConfig()
+        raw = config.get_model_affinity_config()
+        return cls(
+            enabled=raw.get("enabled", True),
+            swap_penalty_seconds=raw.get("swap_penalty_seconds") or 0.0,
+            warm_models=raw.get("warm_models") or 1,
+            reorder_window=raw.get("reorder_window") or 1,
+            max_bypass=raw.get("max_bypass") or 0,
+            max_bypass_seconds=raw.get("max_bypass_seconds") or 0.0,
+        )
+
+    def loaded(self, worker_id: str, job: Any) -> bool:
+        """Note that *worker_id* is about to run *job*; returns True if that means a model swap."""
+        model = job_model(job)
+        if model is None:
+            return False
+        with self._lock:
+            recent = self._recent.get(worker_id)
+            if recent is None:
+                recent = self._recent[worker_id] = deque(maxlen=self.warm_model_count)
+            swapped = bool(recent) and model not in recent
+            if model in recent:
+                recent.remove(model)
+            recent.append(model)
+        if swapped:
+            metrics.model_swaps.labels(worker_id).inc()
+        return swapped
+
+    def warm_models(self, worker_id: str) -> tuple:
+        with self._lock:
+            recent = self._recent.get(worker_id)
+            return tuple(recent) if recent else ()
+
+    def forget(self, worker_id: str) -> None:
+        with self._lock:
+            self._recent.pop(worker_id, None)
+
+    def swap_cost(self, worker_id: str, job: Any, job_queue: Any = None) -> float:
+        """Seconds a model swap would add if *job* were queued on *worker_id* now."""
+        if not self.enabled:
+            return 0.0
+        model = job_model(job)
+        if model is None:
+            return 0.0
+        queued_models = []
+        if job_queue is not None:
+            for queued in list(job_queue.queue):
+                queued_model = job_model(queued)
+                if queued_model is not None:
+                    queued_models.append(queued_model)
+        if queued_models:
+            # The worker will have the last queued model loaded by then.
+            warm = (queued_models[-1],)
+        else:
+            warm = self.warm_models(worker_id)
+            if not warm:
+                return 0.0
+        return 0.0 if model in warm else self.swap_penalty_seconds
+
+    def preference(self, worker_id: str) -> AffinityPreference | None:
+        if not self.enabled or self.reorder_window <= 1 or self.max_bypass <= 0:
+            return None
+        warm = self.warm_models(worker_id)
+        if not warm:
+            return None
+        return AffinityPreference(
+            warm, self.reorder_window, self.max_bypass, self.max_bypass_seconds
+        )
+
+
+def _load_affinity() -> ModelAffinity:
+    try:
+        return ModelAffinity.from_config()
+    except Exception:
+        logger.warning("Could not load model affinity config; using defaults.", exc_info=True)
+        return ModelAffinity()
+
+
+model_affinity = _load_affinity()
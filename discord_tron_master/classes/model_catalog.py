@@ -0,0 +1,145 @@
+"""In-memory catalog of the ``transformers`` and ``schedulers`` tables.
+
+Job payloads carry the model's row from MySQL (``model_config``), and
+formatting runs on the bot's event loop, so it must not query the database
+per job.  ``model_catalog`` holds a snapshot of both tables as plain dicts:
+
+* it is warmed once at startup (``warm``);
+* the model and scheduler cogs call ``refresh`` on a worker thread after
+  they change a row;
+* a lookup for a model the snapshot does not know (or any lookup before the
+  catalog has loaded) schedules one background refresh, at most every
+  ``MISS_REFRESH_INTERVAL`` seconds, in case the row was added from
+  somewhere else.
+
+Lookups never touch the database themselves, so they are safe on the loop.
+The scheduler cog reads scheduler rows from here too.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCatalog:
+    MISS_REFRESH_INTERVAL = 60.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # "owner/model_id" -> Transformers.to_dict()
+        self._transformers: dict[str, dict] = {}
+        # name -> Schedulers.to_dict()
+        self._schedulers: dict[str, dict] = {}
+        self._loaded = False
+        # Advances on every successful load, so derived data knows when to rebuild.
+        self.version = 0
+        self._refreshing = False
+        self._last_miss_refresh = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def warm(self, app=None) -> bool:
+        """Load both tables; returns False (and keeps the old snapshot) on failure."""
+        return self.refresh(app)
+
+    def refresh(self, app=None) -> bool:
+        from discord_tron_master.classes.app_config import AppConfig
+        from discord_tron_master.models.schedulers import Schedulers
+        from discord_tron_master.models.transformers import Transformers
+
+        app = app or AppConfig.get_flask()
+        if app is None:
+            logger.warning("Cannot load the model catalog before the Flask app exists.")
+            return False
+        started = time.perf_counter()
+        try:
+            with app.app_context():
+                transformers = {
+                    f"{row.model_owner}/{row.model_id}": row.to_dict()
+                    for row in Transformers.get_all()
+                }
+                schedulers = {row.name: row.to_dict() for row in Schedulers.get_all()}
+        except Exception:
+            logger.warning("Could not load the model catalog", exc_info=True)
+            return False
+        with self._lock:
+            self._transformers = transformers
+            self._schedulers = schedulers
+            self._loaded = True
+            self.version += 1
+        logger.info(
+            "Loaded %s model(s) and %s scheduler(s) into the catalog in %.1fms",
+            len(transformers),
+            len(schedulers),
+            (time.perf_counter() - started) * 1000,
+        )
+        return True
+
+    def transformer(self, full_model_id: str) -> dict | None:
+        """The ``Transformers`` row for ``owner/model_id`` as a dict, or None."""
+        with self._lock:
+            row = self._transformers.get(full_model_id)
+        if row is None:
+            self._refresh_after_miss()
+            return None
+        return dict(row)
+
+    def models_matching(self, cues) -> list[str]:
+        """
+        Approved ``owner/model_id``s whose tags or description mention any of
+        *cues*; models tagged with one come first.
+        """
+        cues = [str(cue).lower() for cue in cues]
+        tagged, described = [], []
+        with self._lock:
+            rows = list(self._transformers.items())
+        for full_model_id, row in rows:
+            if not row.get("approved"):
+                continue
+            tags = {t.strip().lower() for t in str(row.get("tags") or "").split(",")}
+            description = str(row.get("description") or "").lower()
+            if any(cue in tags for cue in cues):
+                tagged.append(full_model_id)
+            elif any(cue in description for cue in cues):
+                described.append(full_model_id)
+        return tagged + described
+
+    def scheduler(self, name: str) -> dict | None:
+        """The ``Schedulers`` row called *name* as a dict, or None."""
+        with self._lock:
+            row = self._schedulers.get(name)
+        if row is None:
+            self._refresh_after_miss()
+            return None
+        return dict(row)
+
+    def schedulers(self) -> list[dict]:
+        if not self._loaded:
+            self._refresh_after_miss()
+        with self._lock:
+            return [dict(row) for row in self._schedulers.values()]
+
+    def _refresh_after_miss(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._refreshing or now - self._last_miss_refresh < self.MISS_REFRESH_INTERVAL:
+                return
+            self._refreshing = True
+            self._last_miss_refresh = now
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="model_catalog_refresh", daemon=True).start()
+
+
+model_catalog = ModelCatalog()
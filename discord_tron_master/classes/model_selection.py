@@ -0,0 +1,394 @@
+"""Automatic model and resolution selection without an LLM call per prompt.
+
+``model_selector.select(prompt)`` returns ``(resolution, model)`` like
+``GPT.auto_model_select``, trying cheaper sources first:
+
+1. a memo of recent decisions, keyed by the normalized prompt, so every copy
+   of a ``!generate-x`` prompt after the first is free;
+2. keyword rules (anime, "high quality", typography...) that route to the
+   catalog model tagged or described for that kind of prompt, once at least
+   ``min_rule_hits`` of one rule's keywords appear;
+3. a nearest-neighbour vote over past LLM decisions, by token overlap.
+
+Only when neither local source reaches ``min_confidence`` does the LLM run.
+Concurrent requests for the same prompt share one LLM call.  A fraction
+(``audit_rate``) of local decisions is re-checked against the LLM in the
+background, and the outcome is counted in ``model_selection_agreement``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Awaitable, Callable
+
+from discord_tron_master.classes import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "ptx0/terminus-xl-gamma-v2-1"
+
+# Prompts with any of a rule's keywords go to the first approved catalog model
+# tagged with one of its cues, or whose description mentions one (see
+# ModelCatalog.models_matching).  Configured rules may name a "model" instead.
+DEFAULT_RULES = [
+    {
+        "cues": ["anime", "manga", "cartoon"],
+        "keywords": [
+            "anime", "manga", "cartoon", "comic", "ghibli", "watercolour",
+            "watercolor", "chibi", "cel shaded", "waifu",
+        ],
+    },
+    {
+        "cues": ["high quality"],
+        "keywords": ["high quality", "highest quality", "best quality"],
+    },
+    {
+        "cues": ["typography"],
+        "keywords": [
+            "typography", "lettering", "logo", "that says", "with the words",
+            "with the text", "book cover", "poster", "signage",
+        ],
+    },
+    {
+        "cues": ["photo"],
+        "keywords": [
+            "photo", "photograph", "cinematic", "film still", "movie still",
+            "35mm", "dslr", "portrait photo", "kodachrome",
+        ],
+    },
+]
+
+# Orientation cues; the sizes are entries of ResolutionHelper.resolutions.
+ORIENTATIONS = {
+    "portrait": (
+        {"width": 832, "height": 1216},
+        ["portrait", "full body", "standing", "tall", "book cover", "poster", "phone wallpaper"],
+    ),
+    "landscape": (
+        {"width": 1344, "height": 768},
+        ["landscape", "panorama", "panoramic", "scenery", "wide shot", "cinematic", "vista", "skyline", "desktop wallpaper"],
+    ),
+    "square": (
+        {"width": 1024, "height": 1024},
+        ["icon", "avatar", "profile picture", "album cover", "logo", "square"],
+    ),
+}
+
+_STOPWORDS = frozenset(
+    "a an and the of in on at to with for from by is are be as it its this that "
+    "very some into over under".split()
+)
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_FLAG_RE = re.compile(r"(?:^|\s)(?:--|!)[a-z0-9_-]+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase, drop ``--flags``, punctuation and repeated whitespace."""
+    text = _FLAG_RE.sub(" ", (prompt or "").lower())
+    return " ".join(_TOKEN_RE.findall(text))
+
+
+def _tokens(normalized: str) -> frozenset:
+    return frozenset(t for t in normalized.split() if t not in _STOPWORDS)
+
+
+def _parse_resolution(value) -> dict | None:
+    if isinstance(value, dict):
+        try:
+            return {"width": int(value["width"]), "height": int(value["height"])}
+        except (KeyError, TypeError, ValueError):
+            return None
+    if isinstance(value, str) and "x" in value:
+        try:
+            width, height = value.lower().split("x", 1)
+            return {"width": int(width), "height": int(height)}
+        except ValueError:
+            return None
+    return None
+
+
+class Decision:
+    __slots__ = ("resolution", "model", "confidence", "source")
+
+    def __init__(self, resolution: dict, model: str, confidence: float, source: str):
+        self.resolution = resolution
+        self.model = model
+        self.confidence = confidence
+        self.source = source
+
+    def as_tuple(self) -> tuple[dict, str]:
+        return dict(self.resolution), self.model
+
+
+class ModelSelector:
+    def __init__(
+        self,
+        llm: Callable[[str], Awaitable[tuple]] | None = None,
+        *,
+        enabled: bool = True,
+        min_confidence: float = 0.6,
+        min_rule_hits: int = 2,
+        cache_size: int = 2048,
+        cache_ttl_seconds: float = 86400.0,
+        neighbour_samples: int = 1000,
+        neighbour_min_similarity: float = 0.5,
+        audit_rate: float = 0.05,
+        rules: list[dict] | None = None,
+        default_resolution: dict | None = None,
+    ):
+        self._llm = llm
+        self.enabled = bool(enabled)
+        self.min_confidence = float(min_confidence)
+        self.min_rule_hits = max(1, int(min_rule_hits))
+        self.cache_size = max(1, int(cache_size))
+        self.cache_ttl_seconds = float(cache_ttl_seconds)
+        self.neighbour_min_similarity = float(neighbour_min_similarity)
+        self.audit_rate = max(0.0, min(1.0, float(audit_rate)))
+        self.default_resolution = _parse_resolution(default_resolution) or {
+            "width": 1024,
+            "height": 1024,
+        }
+        self._rules = [
+            rule
+            for rule in (rules if rules is not None else DEFAULT_RULES)
+            if isinstance(rule, dict) and (rule.get("model") or rule.get("cues"))
+        ]
+        # (catalog version, [(model, keywords)])
+        self._resolved_rules: tuple[int, list] | None = None
+        self._audits: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        # normalized prompt -> (Decision, stored at)
+        self._memo: OrderedDict[str, tuple[Decision, float]] = OrderedDict()
+        # (tokens, model, resolution) of past LLM decisions
+        self._samples: deque = deque(maxlen=max(1, int(neighbour_samples)))
+        self._pending: dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_config(cls, config=None) -> "ModelSelector":
+        if config is None:
+            from discord_tron_master.classes.app_config import AppConfig
+
+            config = AppConfig()
+        raw = config.get_model_selection_config()
+        return cls(
+            enabled=raw.get("enabled", True),
+            min_confidence=raw.get("min_confidence", 0.6),
+            min_rule_hits=raw.get("min_rule_hits") or 2,
+            cache_size=raw.get("cache_size") or 2048,
+            cache_ttl_seconds=raw.get("cache_ttl_seconds") or 86400.0,
+            neighbour_samples=raw.get("neighbour_samples") or 1000,
+            neighbour_min_similarity=raw.get("neighbour_min_similarity", 0.5),
+            audit_rate=raw.get("audit_rate") or 0.0,
+            rules=raw.get("rules") or None,
+            default_resolution=raw.get("default_resolution"),
+        )
+
+    # -- Public API ------------------------------------------------------------
+
+    async def select(self, prompt: str) -> tuple[dict, str]:
+        """``(resolution, model)`` for *prompt*."""
+        if not self.enabled:
+            return (await self._ask_llm(prompt)).as_tuple()
+        key = normalize_prompt(prompt)
+        decision = self._remembered(key)
+        if decision is not None:
+            metrics.model_selections.labels("memo").inc()
+            return decision.as_tuple()
+        decision = self.classify(key)
+        if decision.confidence >= self.min_confidence:
+            self._remember(key, decision)
+            metrics.model_selections.labels(decision.source).inc()
+            if random.random() < self.audit_rate:
+                task = asyncio.ensure_future(self._audit(prompt, decision))
+                self._audits.add(task)
+                task.add_done_callback(self._audits.discard)
+            return decision.as_tuple()
+        pending = self._pending.get(key)
+        if pending is not None:
+            metrics.model_selections.labels("coalesced").inc()
+            return (await asyncio.shield(pending)).as_tuple()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            decision = await self._ask_llm(prompt, fallback=decision)
+            future.set_result(decision)
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't warn about an unretrieved exception.
+            future.exception()
+            raise
+        finally:
+            self._pending.pop(key, None)
+        metrics.model_selections.labels(decision.source).inc()
+        if decision.source == "llm":
+            self._remember(key, decision)
+            self.learn(key, decision)
+        return decision.as_tuple()
+
+    def classify(self, normalized: str) -> Decision:
+        """The best local guess for an already-normalized prompt."""
+        rule = self._by_rules(normalized)
+        neighbour = self._by_neighbours(normalized)
+        best = max(
+            (d for d in (rule, neighbour) if d is not None),
+            key=lambda d: d.confidence,
+            default=None,
+        )
+        if best is None:
+            return Decision(self._resolution_for(normalized), DEFAULT_MODEL, 0.0, "default")
+        return best
+
+    def learn(self, normalized: str, decision: Decision) -> None:
+        tokens = _tokens(normalized)
+        if tokens:
+            with self._lock:
+                self._samples.append((tokens, decision.model, dict(decision.resolution)))
+
+    # -- Local sources ---------------------------------------------------------
+
+    def rules(self) -> list[tuple[str, tuple]]:
+        """``(model, keywords)`` per rule, with cues resolved against ``model_catalog``."""
+        from discord_tron_master.classes.model_catalog import model_catalog
+
+        version = model_catalog.version
+        resolved = self._resolved_rules
+        if resolved is not None and resolved[0] == version:
+            return resolved[1]
+        rules = []
+        for rule in self._rules:
+            model = rule.get("model")
+            if not model:
+                matches = model_catalog.models_matching(rule.get("cues", ()))
+                if not matches:
+                    continue
+                model = matches[0]
+            rules.append((model, tuple(k.lower() for k in rule.get("keywords", ()))))
+        self._resolved_rules = (version, rules)
+        return rules
+
+    def _by_rules(self, normalized: str) -> Decision | None:
+        padded = f" {normalized} "
+        hits = Counter()
+        for model, keywords in self.rules():
+            for keyword in keywords:
+                if f" {keyword} " in padded:
+                    hits[model] += 1
+        if not hits:
+            return None
+        (model, count), *rest = hits.most_common()
+        others = sum(c for _, c in rest)
+        if count < self.min_rule_hits:
+            # A lone keyword ("poster", "photo") is only a hint: it stays the
+            # fallback if the LLM fails, but never skips it.
+            confidence = 0.0
+        elif others:
+            # Mixed cues are left to the LLM.
+            confidence = 0.9 * count / (count + others)
+        else:
+            confidence = min(0.95, 0.75 + 0.1 * count)
+        return Decision(self._resolution_for(normalized), model, confidence, "rules")
+
+    def _by_neighbours(self, normalized: str) -> Decision | None:
+        tokens = _tokens(normalized)
+        if not tokens:
+            return None
+        with self._lock:
+            samples = list(self._samples)
+        scored = []
+        for sample_tokens, model, resolution in samples:
+            overlap = len(tokens & sample_tokens)
+            if not overlap:
+                continue
+            similarity = overlap / len(tokens | sample_tokens)
+            if similarity >= self.neighbour_min_similarity:
+                scored.append((similarity, model, resolution))
+        if not scored:
+            return None
+        scored.sort(key=lambda s: s[0], reverse=True)
+        top = scored[:5]
+        votes = Counter()
+        for similarity, model, _ in top:
+            votes[model] += similarity
+        model, weight = votes.most_common(1)[0]
+        share = weight / sum(votes.values())
+        resolution = next(r for _, m, r in top if m == model)
+        return Decision(dict(resolution), model, share * top[0][0], "neighbours")
+
+    def _resolution_for(self, normalized: str) -> dict:
+        padded = f" {normalized} "
+        for resolution, cues in ORIENTATIONS.values():
+            if any(f" {cue} " in padded for cue in cues):
+                return dict(resolution)
+        return dict(self.default_resolution)
+
+    # -- Memo ------------------------------------------------------------------
+
+    def _remembered(self, key: str) -> Decision | None:
+        with self._lock:
+            entry = self._memo.get(key)
+            if entry is None:
+                return None
+            decision, stored_at = entry
+            if time.monotonic() - stored_at > self.cache_ttl_seconds:
+                del self._memo[key]
+                return None
+            self._memo.move_to_end(key)
+            return decision
+
+    def _remember(self, key: str, decision: Decision) -> None:
+        with self._lock:
+            self._memo[key] = (decision, time.monotonic())
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.cache_size:
+                self._memo.popitem(last=False)
+
+    # -- LLM -------------------------------------------------------------------
+
+    async def _ask_llm(self, prompt: str, fallback: Decision | None = None) -> Decision:
+        llm = self._llm or _gpt_auto_model_select
+        try:
+            resolution, model = await llm(prompt)
+        except Exception:
+            logger.warning("Model selection via the LLM failed", exc_info=True)
+            resolution, model = None, None
+        resolution = _parse_resolution(resolution)
+        if resolution is None or not model or "/" not in model:
+            # GPT.auto_model_select signals a failed parse with a string resolution.
+            if fallback is not None:
+                return Decision(fallback.resolution, fallback.model, fallback.confidence, "fallback")
+            return Decision(dict(self.default_resolution), DEFAULT_MODEL, 0.0, "fallback")
+        return Decision(resolution, model, 1.0, "llm")
+
+    async def _audit(self, prompt: str, local: Decision) -> None:
+        try:
+            checked = await self._ask_llm(prompt)
+        except Exception:
+            return
+        if checked.source != "llm":
+            return
+        outcome = "agree" if checked.model == local.model else "disagree"
+        metrics.model_selection_agreement.labels(local.source, outcome).inc()
+        self.learn(normalize_prompt(prompt), checked)
+
+
+async def _gpt_auto_model_select(prompt: str):
+    from discord_tron_master.classes.openai.text import GPT
+
+    return await GPT().auto_model_select(prompt)
+
+
+def _load_selector() -> ModelSelector:
+    try:
+        return ModelSelector.from_config()
+    except Exception:
+        logger.warning("Could not load model selection config; using defaults.", exc_info=True)
+        return ModelSelector()
+
+
+model_selector = _load_selector()
@@ -13,17 +13,33 @@ if app is None:
 
 
 class ChatML:
+    """
+    A conversation's recent history, read and written through the
+    ``conversation_messages`` table.
+
+    Only the last ``history_window`` messages are kept: each new message is
+    appended as a single row and rows that fall out of the window are
+    deleted in the same transaction, so what is stored is what is used and
+    the cost of a message does not grow with the length of the
+    conversation.  Trimming for the token budget is one DELETE of the
+    oldest rows.  Token counts are stored with each message.
+    """
+
+    HISTORY_WINDOW = 200
+
     def __init__(
         self,
         conversation: Conversations,
         token_limit: int = 120000,
         config_user_id: int = None,
+        history_window: int = None,
     ):
         self.conversations = conversation
         self.user_id = conversation.owner
-        self.history = (
-            conversation.get_history(self.user_id) or Conversations.get_new_history()
-        )
+        self.history = Conversations.get_new_history()
+        self.history_window = history_window or self.HISTORY_WINDOW
+        # Loaded window of {"seq", "role", "content", "tokens"}, oldest first.
+        self.messages = None
         self.config_user_id = self.user_id if config_user_id is None else config_user_id
         self.user_config = config.get_user_config(self.config_user_id)
         # Pick up their current role from their profile.
@@ -48,6 +64,28 @@ class ChatML:
                 )
             return conversation
 
+    async def load_messages(self):
+        if self.messages is None:
+            with app.app_context():
+                rows = Conversations.get_messages(self.user_id, limit=self.history_window)
+                self.messages = [
+                    {
+                        "seq": row.seq,
+                        "role": row.role,
+                        "content": row.content,
+                        "tokens": (
+                            row.tokens
+                            if row.tokens is not None
+                            else self.get_message_token_count(row.to_message())
+                        ),
+                    }
+                    for row in rows
+                ]
+        return self.messages
+
+    def get_message_token_count(self, message: dict) -> int:
+        return self.tokenizer.get_token_count(json.dumps(message))
+
     async def validate_reply(self):
         # If we are too long, maybe we can clean it up.
         logging.debug(f"Validating reply")
@@ -69,23 +107,35 @@ class ChatML:
         logging.debug(f"Returning true by default. Maybe this should be a false..")
         return True
 
-    # Loop over the history and remove items until the new reply will fit with the current text.
+    # Drop the oldest history items until the new reply will fit with the current text.
     async def remove_history_until_reply_fits(self):
         logging.debug(f"Stripping conversation back until the reply fits.")
-        while await self.is_reply_too_long() and len(await self.get_history()) > 0:
-            logging.debug(f"Reply is too long. Removing oldest history item.")
-            await self.remove_oldest_history_item()
+        messages = await self.load_messages()
+        budget = self.token_limit - await self.get_reply_token_count() - 512
+        kept, total = len(messages), 0
+        for index in range(len(messages) - 1, -1, -1):
+            if total + messages[index]["tokens"] > budget:
+                break
+            total += messages[index]["tokens"]
+            kept = index
+        if kept > 0:
+            before_seq = messages[kept]["seq"] if kept < len(messages) else messages[-1]["seq"] + 1
+            with app.app_context():
+                removed = Conversations.truncate_history(self.user_id, before_seq=before_seq)
+            logging.debug(f"Removed {removed} history items older than seq {before_seq}.")
+            del messages[:kept]
         logging.debug(f"Cleanup is complete. Returning newly pruned history.")
         return await self.get_history()
 
     # Remove the oldest history item and return the new history.
     async def remove_oldest_history_item(self):
-        conversation = await self.get_conversation_or_create()
-        item = conversation.history.pop(0)
-        logging.debug(f"Removing oldest history item: {item}")
-        with app.app_context():
-            Conversations.set_history(self.user_id, conversation.history)
-            return Conversations.get_history(owner=self.user_id)
+        messages = await self.load_messages()
+        if messages:
+            item = messages.pop(0)
+            logging.debug(f"Removing oldest history item: {item}")
+            with app.app_context():
+                Conversations.truncate_history(self.user_id, before_seq=item["seq"] + 1)
+        return await self.get_history()
 
     # Look at the actual token counts of each item and compare against our limit.
     async def is_reply_too_long(self):
@@ -98,22 +148,21 @@ class ChatML:
         return False
 
     async def get_reply_token_count(self):
-        return self.tokenizer.get_token_count(json.dumps(self.reply))
+        return self.get_message_token_count(self.reply)
 
     async def get_history_token_count(self):
-        # Pad the value by 64 to accommodate for the metadata in the JSON we can't really count right here.
-        return (
-            self.tokenizer.get_token_count(json.dumps(await self.get_history())) + 512
-        )
+        # Pad the value by 512 to accommodate for the metadata in the JSON we can't really count right here.
+        return sum(message["tokens"] for message in await self.load_messages()) + 512
 
     # Format the history as a string for OpenAI.
     async def get_prompt(self):
         return json.dumps(await self.get_history())
 
     async def get_history(self):
-        conversation = await self.get_conversation_or_create()
-        logging.debug(f"Conversation: {conversation}")
-        return conversation.history
+        return [
+            {"role": message["role"], "content": message["content"]}
+            for message in await self.load_messages()
+        ]
 
     async def is_history_empty(self):
         history = await self.get_history()
@@ -139,11 +188,21 @@ class ChatML:
             raise ValueError(
                 f"I am sorry. It seems your reply would overrun the limits of reality and time. We are currently stuck at {self.token_limit} tokens, and your message used {await self.get_reply_token_count()} tokens. Please try again."
             )
+        tokens = await self.get_reply_token_count()
         with app.app_context():
-            conversation = await self.get_conversation_or_create()
-            conversation.history.append(self.reply)
-            self.conversations.set_history(self.user_id, conversation.history)
-            return conversation.history
+            row = Conversations.append_message(
+                self.user_id,
+                role,
+                self.reply["content"],
+                tokens=tokens,
+                keep_last=self.history_window,
+            )
+            seq = row.seq
+        messages = await self.load_messages()
+        messages.append({"seq": seq, **self.reply, "tokens": tokens})
+        if len(messages) > self.history_window:
+            del messages[: len(messages) - self.history_window]
+        return await self.get_history()
 
     # Clean the txt in a manner it can be inserted into the DB.
     @staticmethod
@@ -5,13 +5,17 @@ import os
 import re
 import subprocess
 import threading
+import time
 
 import openai
 from openai import OpenAI
 import requests
 
 from discord_tron_master.classes.app_config import AppConfig
+from discord_tron_master.classes import metrics
+from discord_tron_master.classes.completion_cache import completion_cache
 from discord_tron_master.classes.remote_ollama_broker import remote_ollama_broker
+from discord_tron_master.classes.streaming import ThreadDeltaRelay, VisibleTextFilter
 
 config = AppConfig()
 logger = logging.getLogger(__name__)
@@ -71,6 +75,7 @@ def _get_backend_semaphore(backend: str) -> asyncio.Semaphore:
         if sem is None:
             sem = asyncio.Semaphore(_BACKEND_CONCURRENCY_LIMIT)
             _BACKEND_SEMAPHORES[key] = sem
+            metrics.completion_slots.labels(key).set(_BACKEND_CONCURRENCY_LIMIT)
         return sem
 
 
@@ -90,6 +95,7 @@ class GPT:
         self.engine = "o3-mini"
         self.temperature = 0.9
         self.max_tokens = 4096
+        self.seed = None
         self.discord_bot_role = "You are a Discord bot."
         self.config = AppConfig()
         self.backend = "zai"
@@ -141,7 +147,7 @@ class GPT:
         system_role = f"{system_role}Natural language prompting works best with short and concise bits.\n"
         system_role = f"{system_role}Any additional output other than the prompt will damage the results. Stick to just the prompts."
         image_prompt_response = await self.turbo_completion(
-            system_role, prompt, temperature=1.18
+            system_role, prompt, temperature=1.18, cache=False
         )
         logger.setLevel(config.get_log_level())
         logger.debug(
@@ -149,6 +155,37 @@ class GPT:
         )
         return image_prompt_response
 
+    async def random_image_prompts(self, count: int, theme: str = None) -> list:
+        """*count* image captions from a single completion."""
+        if count <= 1:
+            return [await self.random_image_prompt(theme)] if count == 1 else []
+        prompt = (
+            f"Print {count} different image captions, one per line, "
+            "with no numbering, bullets or blank lines."
+        )
+        if theme is not None:
+            prompt = prompt + " Your theme for consideration: " + theme
+        system_role = "You are a Prompt Generator Bot, that strictly generates prompts, with no other output, to avoid distractions.\n"
+        system_role = f"{system_role}Your prompts look like these 3 examples:\n"
+        system_role = f"{system_role}A 1983 photograph of astonishing daisies in the rolling hills of Some Location. The image has beautiful quality and kodachrome style.\n"
+        system_role = f"{system_role}A high quality camera photo of great look up a rolling wave; the ocean is present in full view, as a surfer challenges himself by paddling out to the break.\n"
+        system_role = f"{system_role}digital artwork, feels like the first time, we went to the zoo, colourful and majestic, amazing clouds in the sky, epic\n"
+        system_role = f"{system_role}Natural language prompting works best with short and concise bits.\n"
+        system_role = f"{system_role}Any additional output other than the prompts will damage the results. Stick to just the prompts."
+        response = await self.turbo_completion(
+            system_role, prompt, temperature=1.18, cache=False
+        )
+        prompts = []
+        for line in (response or "").split("\n"):
+            line = re.sub(r"^\s*(?:\d+[.)]|[-*\u2022])\s*", "", line).strip().strip('"')
+            if line and "```" not in line:
+                prompts.append(line)
+        prompts = prompts[:count]
+        # Top up one at a time if the model returned fewer lines than asked.
+        while len(prompts) < count:
+            prompts.append(await self.random_image_prompt(theme))
+        return prompts
+
     async def auto_model_select(self, prompt: str, query_str: str = None):
         if query_str is None:
             query_str = (
@@ -188,8 +225,9 @@ class GPT:
             )
 
         system_role = "Print ONLY the specified JSON document WITHOUT any other markdown or formatting. Determine which model and resolution would work best for the user's prompt, ignoring any other issues. If anything but the JSON object and the defined keys are returned, THE APPLICATION WILL ERROR OUT."
+        # A classification: the same prompt may reuse an earlier answer.
         prediction = await self.turbo_completion(
-            system_role, query_str, temperature=1.18
+            system_role, query_str, temperature=1.18, cache=True
         )
         for line in prediction.split("\n"):
             if "```" in line:
@@ -218,7 +256,7 @@ class GPT:
 
         return (resolution, model_name)
 
-    async def discord_bot_response(self, prompt, ctx=None):
+    async def discord_bot_response(self, prompt, ctx=None, stream=None):
         user_role = self.discord_bot_role
         user_temperature = self.temperature
         if ctx is not None:
@@ -229,7 +267,7 @@ class GPT:
                 ctx.author.id, "temperature", self.temperature
             )
         return await self.turbo_completion(
-            user_role, prompt, temperature=user_temperature, max_tokens=4096
+            user_role, prompt, temperature=user_temperature, max_tokens=4096, stream=stream
         )
 
     @classmethod
@@ -242,8 +280,12 @@ class GPT:
 
     _OPENCODE_VERSION = "1.4.3"
 
-    def _send_zai_openai_request(self, message_log: list[dict]) -> str | None:
-        """Send a request to ZAI via the OpenAI-compatible coding endpoint."""
+    def _send_zai_openai_request(self, message_log: list[dict], stream=None) -> str | None:
+        """Send a request to ZAI via the OpenAI-compatible coding endpoint.
+
+        With a *stream* sink (see ``classes.streaming``), content is fed to it
+        chunk by chunk as the endpoint sends it.
+        """
         import uuid as _uuid
         api_key = _zai_get_fresh_token()
         session_id = str(_uuid.uuid4())
@@ -262,9 +304,19 @@ class GPT:
             messages=message_log,
             temperature=float(self.temperature),
             max_tokens=int(self.max_tokens),
-            stream=False,
+            stream=stream is not None,
+            **({"seed": int(self.seed)} if self.seed is not None else {}),
         )
-        text = (resp.choices[0].message.content or "").strip() if resp.choices else ""
+        if stream is not None:
+            parts = []
+            for chunk in resp:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    stream.feed(delta)
+            text = "".join(parts).strip()
+        else:
+            text = (resp.choices[0].message.content or "").strip() if resp.choices else ""
         logger.warning("ZAI OpenAI response: len=%d", len(text))
         return text or None
 
@@ -291,7 +343,7 @@ class GPT:
         return raw_model
 
     def _send_local_ollama_request(
-        self, role: str, prompt: str, *, thinking_enabled: bool = True,
+        self, role: str, prompt: str, *, thinking_enabled: bool = True, stream=None,
     ) -> str | None:
         base_url = self.config.get_ollama_base_url()
         model = self._resolve_ollama_model()
@@ -308,7 +360,7 @@ class GPT:
             headers["Authorization"] = f"Bearer {api_key}"
         body = {
             "model": model,
-            "stream": False,
+            "stream": stream is not None,
             "keep_alive": keep_alive,
             "messages": messages,
             "options": {
@@ -316,6 +368,8 @@ class GPT:
                 "num_predict": int(self.max_tokens),
             },
         }
+        if self.seed is not None:
+            body["options"]["seed"] = int(self.seed)
         if thinking_enabled:
             body["think"] = True
         response = requests.post(
@@ -323,14 +377,30 @@ class GPT:
             headers=headers,
             json=body,
             timeout=self.config.get_ollama_timeout_seconds(),
+            stream=stream is not None,
         )
         response.raise_for_status()
-        payload = response.json()
-        text = str(
-            payload.get("message", {}).get("content")
-            or payload.get("response")
-            or ""
-        ).strip()
+        if stream is not None:
+            # Newline-delimited JSON, one object per generated chunk.
+            parts = []
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                delta = chunk.get("message", {}).get("content") or chunk.get("response") or ""
+                if delta:
+                    parts.append(delta)
+                    stream.feed(delta)
+                if chunk.get("done"):
+                    break
+            text = "".join(parts).strip()
+        else:
+            payload = response.json()
+            text = str(
+                payload.get("message", {}).get("content")
+                or payload.get("response")
+                or ""
+            ).strip()
         # Strip <think>...</think> blocks from visible output.
         if text:
             import re
@@ -712,7 +782,21 @@ class GPT:
         raise ValueError(f"Unsupported GPT backend: {backend}")
 
     async def turbo_completion(self, role, prompt, **kwargs):
+        """
+        Complete *prompt* on the configured backend.
+
+        Pass ``stream=`` a sink (see ``classes.streaming``) to receive visible
+        text as it is generated; the full text is still returned.  The zai and
+        ollama backends stream; CLI backends deliver nothing until they finish.
+
+        Deterministic requests are answered from ``completion_cache`` when
+        possible; ``cache=True`` or ``cache=False`` overrides that policy.
+        Streamed requests always run, since a stored answer would never
+        reach the sink.
+        """
         thinking_enabled = kwargs.pop("thinking_enabled", True)
+        stream = kwargs.pop("stream", None)
+        use_cache = kwargs.pop("cache", None)
         if kwargs:
             self.set_values(**kwargs)
 
@@ -722,103 +806,171 @@ class GPT:
         if backend != "zai" and not effective_prompt.strip() and effective_role.strip():
             effective_prompt = effective_role.strip()
             effective_role = ""
+
+        async def complete():
+            return await self._timed_completion(
+                backend, effective_role, effective_prompt, thinking_enabled, stream
+            )
+
+        if stream is not None or not completion_cache.should_cache(
+            self.temperature, self.seed, use_cache
+        ):
+            return await complete()
+        key = completion_cache.key(
+            backend=backend,
+            model=self._resolve_model(backend),
+            role=effective_role,
+            prompt=effective_prompt,
+            temperature=float(self.temperature),
+            max_tokens=int(self.max_tokens),
+            thinking_enabled=bool(thinking_enabled),
+            seed=self.seed,
+        )
+        return await completion_cache.get_or_compute(key, complete)
+
+    def _resolve_model(self, backend: str) -> str | None:
+        if backend == "ollama":
+            return self._resolve_ollama_model()
+        if backend == "zai":
+            return self._resolve_zai_model()
+        return self._resolve_cli_model(backend)
+
+    async def _timed_completion(
+        self, backend, effective_role, effective_prompt, thinking_enabled, stream=None
+    ):
         semaphore = _get_backend_semaphore(backend)
-        async with semaphore:
-            if backend == "ollama":
-                # If an Ollama API key is configured, use the direct API
-                # (e.g. Ollama Cloud) instead of the worker cluster.
-                if self.config.get_ollama_api_key():
-                    try:
-                        return await asyncio.to_thread(
-                            lambda: self._send_local_ollama_request(
-                                effective_role,
-                                effective_prompt,
-                                thinking_enabled=thinking_enabled,
-                            ),
-                        )
-                    except Exception as exc:
-                        logger.error(f"Error sending request to Ollama API: {exc}")
-                        return None
+        started = time.perf_counter()
+        result = None
+        try:
+            async with semaphore:
+                metrics.completion_semaphore_wait.labels(backend).observe(
+                    time.perf_counter() - started
+                )
+                inflight = metrics.completion_inflight.labels(backend)
+                inflight.inc()
                 try:
-                    return await remote_ollama_broker.request_completion(
-                        role=effective_role,
-                        prompt=effective_prompt,
-                        model=self._resolve_ollama_model(),
-                        temperature=float(self.temperature),
-                        max_tokens=int(self.max_tokens),
-                        keep_alive=self.config.get_ollama_keep_alive(),
-                        timeout_seconds=self.config.get_ollama_timeout_seconds(),
+                    result = await self._complete_with_backend(
+                        backend,
+                        effective_role,
+                        effective_prompt,
+                        thinking_enabled,
+                        VisibleTextFilter(stream) if stream is not None else None,
                     )
-                except Exception as remote_exc:
-                    logger.warning(f"Remote Ollama worker unavailable or failed: {remote_exc}")
-                    try:
-                        return await asyncio.to_thread(
-                            lambda: self._send_local_ollama_request(
-                                effective_role,
-                                effective_prompt,
-                                thinking_enabled=thinking_enabled,
-                            ),
-                        )
-                    except Exception as local_exc:
-                        logger.error(f"Error sending request to Ollama: {local_exc}")
-                        return None
-
-            if backend == "zai":
-                message_log = [
-                    {"role": "assistant", "content": effective_role},
-                    {"role": "user", "content": effective_prompt},
-                ]
-                delay = 2.0
-                while True:
-                    try:
-                        content = await asyncio.to_thread(
-                            self._send_zai_openai_request,
-                            message_log,
-                        )
-                        return content or None
-                    except openai.RateLimitError:
-                        logger.warning(f"ZAI 429 rate-limited — retrying in {delay:.0f}s")
-                        await asyncio.sleep(delay)
-                        delay = min(delay * 2, 120.0)
-                    except Exception as e:
-                        logger.error(f"Error sending request to ZAI: {e}")
-                        return None
-
-            max_ttft_retries = 3
-            for attempt in range(1, max_ttft_retries + 1):
+                finally:
+                    inflight.dec()
+            return result
+        finally:
+            metrics.completion_latency.labels(
+                backend, "ok" if result else "empty"
+            ).observe(time.perf_counter() - started)
+
+    async def _complete_with_backend(
+        self, backend, effective_role, effective_prompt, thinking_enabled, stream=None
+    ):
+        # Backends that read their response on a worker thread feed through this.
+        relay = ThreadDeltaRelay(stream) if stream is not None else None
+        if backend == "ollama":
+            # If an Ollama API key is configured, use the direct API
+            # (e.g. Ollama Cloud) instead of the worker cluster.
+            if self.config.get_ollama_api_key():
                 try:
                     return await asyncio.to_thread(
-                        self._run_cli_backend, backend, effective_role, effective_prompt
+                        lambda: self._send_local_ollama_request(
+                            effective_role,
+                            effective_prompt,
+                            thinking_enabled=thinking_enabled,
+                            stream=relay,
+                        ),
                     )
-                except self._TTFTTimeout:
-                    logger.warning(
-                        f"{backend} TTFT timeout (attempt {attempt}/{max_ttft_retries}), retrying"
+                except Exception as exc:
+                    logger.error(f"Error sending request to Ollama API: {exc}")
+                    return None
+            try:
+                return await remote_ollama_broker.request_completion(
+                    role=effective_role,
+                    prompt=effective_prompt,
+                    model=self._resolve_ollama_model(),
+                    temperature=float(self.temperature),
+                    max_tokens=int(self.max_tokens),
+                    keep_alive=self.config.get_ollama_keep_alive(),
+                    timeout_seconds=self.config.get_ollama_timeout_seconds(),
+                    on_delta=stream.feed if stream is not None else None,
+                )
+            except Exception as remote_exc:
+                logger.warning(f"Remote Ollama worker unavailable or failed: {remote_exc}")
+                if stream is not None:
+                    stream.restart()
+                try:
+                    return await asyncio.to_thread(
+                        lambda: self._send_local_ollama_request(
+                            effective_role,
+                            effective_prompt,
+                            thinking_enabled=thinking_enabled,
+                            stream=relay,
+                        ),
+                    )
+                except Exception as local_exc:
+                    logger.error(f"Error sending request to Ollama: {local_exc}")
+                    return None
+
+        if backend == "zai":
+            message_log = [
+                {"role": "assistant", "content": effective_role},
+                {"role": "user", "content": effective_prompt},
+            ]
+            delay = 2.0
+            while True:
+                try:
+                    content = await asyncio.to_thread(
+                        self._send_zai_openai_request,
+                        message_log,
+                        relay,
                     )
-                    if attempt == max_ttft_retries:
-                        logger.error(f"{backend} TTFT timeout after all retries")
-                        return None
+                    return content or None
+                except openai.RateLimitError:
+                    if stream is not None:
+                        stream.restart()
+                    logger.warning(f"ZAI 429 rate-limited — retrying in {delay:.0f}s")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 120.0)
                 except Exception as e:
-                    logger.error(f"Error sending request to {backend}: {e}")
+                    logger.error(f"Error sending request to ZAI: {e}")
                     return None
-            return None
 
-    def retrieve_image(self, url: str):
-        import requests
+        max_ttft_retries = 3
+        for attempt in range(1, max_ttft_retries + 1):
+            try:
+                return await asyncio.to_thread(
+                    self._run_cli_backend, backend, effective_role, effective_prompt
+                )
+            except self._TTFTTimeout:
+                logger.warning(
+                    f"{backend} TTFT timeout (attempt {attempt}/{max_ttft_retries}), retrying"
+                )
+                if attempt == max_ttft_retries:
+                    logger.error(f"{backend} TTFT timeout after all retries")
+                    return None
+            except Exception as e:
+                logger.error(f"Error sending request to {backend}: {e}")
+                return None
+        return None
 
-        response = requests.get(url)
-        content = response.content
+    async def retrieve_image(self, url: str):
+        from discord_tron_master.classes.image_backends import image_backends, decode_image
 
-        from PIL import Image
-        from io import BytesIO
+        content = await image_backends.fetch(url)
+        return await image_backends.run(decode_image, content), content
 
-        return Image.open(BytesIO(content)), content
+    async def dalle_image_generate(self, prompt, user_config: dict):
+        from discord_tron_master.classes.image_backends import image_backends
 
-    def dalle_image_generate(self, prompt, user_config: dict):
         resolution = (
             f"{user_config.get('width', 1024)}x{user_config.get('height', 1024)}"
         )
         try:
-            response = openai.images.generate(
+            # The OpenAI SDK client here is blocking.
+            response = await image_backends.run(
+                openai.images.generate,
                 model="dall-e-3",
                 prompt=f"I NEED to test how the tool works with extremely simple prompts. DO NOT add any detail, just use it AS-IS: {prompt}",
                 size=resolution,
@@ -842,7 +994,7 @@ class GPT:
             )
             url = response.data[0].url
             logger.debug(f"Retrieving URL: {url}")
-            image_obj, image_data = self.retrieve_image(url)
+            image_obj, image_data = await self.retrieve_image(url)
             logger.debug(f"Result: {image_obj}")
             if not hasattr(image_obj, "size"):
                 logger.error(
@@ -1,11 +1,12 @@
 import logging
-import tiktoken
 
 logger = logging.getLogger(__name__)
 
 
 class TokenTester:
     def __init__(self, engine: str = "gpt-3.5-turbo-0613"):
+        import tiktoken
+
         self.tokenizer = tiktoken.encoding_for_model(engine)
 
     def tokenize(self, text):
@@ -1,10 +1,15 @@
-import asyncio, logging
+import asyncio, logging, threading, time
 from asyncio import Queue
 from typing import Dict, List
 from discord_tron_master.classes.worker_manager import WorkerManager
 from discord_tron_master.classes.worker import Worker
 from discord_tron_master.classes.job import Job
 from discord_tron_master.classes.job_queue import JobQueue
+from discord_tron_master.classes.job_lanes import current_lane
+from discord_tron_master.classes.admission import admission_controller
+from discord_tron_master.classes import metrics
+from discord_tron_master.classes.tracing import job_tracer
+from discord_tron_master.exceptions.admission import AdmissionRejected
 
 logger = logging.getLogger("QueueManager")
 logger.setLevel("DEBUG")
@@ -16,6 +21,23 @@ class QueueManager:
             {}
         )  # {"worker_id": {"queue": asyncio.Queue(), "supported_job_types": [...]}, ...}
         self.worker_manager = worker_manager
+        # Guards moving waiting jobs between queues; whoever removes a job
+        # from a waiting deque owns it, so a job is never assigned twice.
+        self._transfer_lock = threading.Lock()
+        metrics.metrics_registry.callback_gauge(
+            "queue_depth",
+            "Jobs per worker queue, split into queued and in-progress.",
+            ("worker_id", "state"),
+            self.queue_depths,
+        )
+
+    def queue_depths(self) -> Dict[tuple, int]:
+        depths = {}
+        for worker_id, worker_info in list(self.queues.items()):
+            job_queue = worker_info["queue"]
+            depths[(worker_id, "queued")] = len(job_queue.queue)
+            depths[(worker_id, "in_progress")] = len(job_queue.in_progress)
+        return depths
 
     def set_worker_manager(self, worker_manager):
         self.worker_manager = worker_manager
@@ -28,7 +50,10 @@ class QueueManager:
 
     # Remove all jobs from a given worker
     def remove_jobs_by_worker(self, worker_id):
-        self.queues[worker_id]["queue"].queue.clear()
+        job_queue = self.queues[worker_id]["queue"]
+        for job in list(job_queue.queue):
+            admission_controller.release(job.id)
+        job_queue.queue.clear()
 
     # Get supported job types that can currently be processed by registered workers
     def get_supported_job_types(self) -> List[str]:
@@ -49,6 +74,8 @@ class QueueManager:
     def remove_jobs_by_job_type(self, job_type):
         for worker_info in self.queues.values():
             if job_type in worker_info["supported_job_types"]:
+                for job in list(worker_info["queue"].queue):
+                    admission_controller.release(job.id)
                 worker_info["queue"].queue.clear()
 
     async def register_worker(self, worker_id, supported_job_types: List[str]):
@@ -86,6 +113,7 @@ class QueueManager:
             for job in queued_jobs:
                 job_type = job.job_type
                 logger.warn(f"Departing worker has active {job_type} job: {job}")
+                admission_controller.release(job.id)
                 job_lost_report = await job.job_lost()
                 logger.error(f"Job lost report: {job_lost_report}")
         logger.info(f"After unregistering worker, we are left with: {self.queues}")
@@ -100,10 +128,132 @@ class QueueManager:
         return self.queues[worker_id]["queue"].view()
 
     async def enqueue_job(self, worker: Worker, job: Job):
+        """Put *job* on *worker*'s queue; raises AdmissionRejected when the job is turned away."""
         worker_id = worker.worker_id
+        if getattr(job, "lane", None) is None:
+            job.lane = current_lane.get()
+        admission_controller.admit(job, self.queues)
         job.set_worker(worker)
+        job.enqueued_at = time.monotonic()
+        job_tracer.start(job.id, job_type=job.job_type)
+        job_tracer.mark(job.id, "enqueued")
         await self.queues[worker_id]["queue"].put(job)
+        metrics.jobs_enqueued.labels(job.job_type).inc()
+
+    async def enqueue_jobs(self, worker: Worker, jobs: List[Job]):
+        """Put *jobs* on *worker*'s queue together, in order.
+
+        Jobs are admitted in order up to the first rejection; the admitted
+        prefix is appended in one step so no other job lands between them.
+        Returns ``(enqueued jobs, AdmissionRejected or None)``.
+        """
+        worker_id = worker.worker_id
+        admitted = []
+        rejection = None
+        for job in jobs:
+            if getattr(job, "lane", None) is None:
+                job.lane = current_lane.get()
+            try:
+                admission_controller.admit(job, self.queues)
+            except AdmissionRejected as e:
+                rejection = e
+                break
+            admitted.append(job)
+        if not admitted:
+            return [], rejection
+        now = time.monotonic()
+        for job in admitted:
+            job.set_worker(worker)
+            job.enqueued_at = now
+            job_tracer.start(job.id, job_type=job.job_type)
+            job_tracer.mark(job.id, "enqueued")
+        job_queue = self.queues[worker_id]["queue"]
+        with self._transfer_lock:
+            job_queue.queue.extend(admitted)
+        job_queue.item_added_event.set()
+        for job in admitted:
+            metrics.jobs_enqueued.labels(job.job_type).inc()
+        return admitted, rejection
 
     async def dequeue_job(self, worker: Worker):
         worker_id = worker.worker_id
         return await self.queues[worker_id]["queue"].get()
+
+    def transfer_job(self, job: Job, source_worker_id: str, target_worker: Worker) -> bool:
+        """Move a waiting *job* to the back of *target_worker*'s queue.
+
+        Returns False if the job already left the source queue (it was taken
+        by its worker or moved elsewhere); in-progress jobs are never moved.
+        """
+        with self._transfer_lock:
+            source = self.queues.get(source_worker_id)
+            target = self.queues.get(target_worker.worker_id)
+            if source is None or target is None:
+                return False
+            try:
+                source["queue"].queue.remove(job)
+            except ValueError:
+                return False
+            job.set_worker(target_worker)
+            job.migrate()
+            target["queue"].queue.append(job)
+        return True
+
+    def reorder_waiting_jobs(self, worker_id: str, ordered_jobs: List[Job]) -> List[Job]:
+        """Reorder a worker's waiting jobs to follow *ordered_jobs*.
+
+        Jobs that left the queue since *ordered_jobs* was built are dropped,
+        and jobs that arrived since are kept at the back.
+        """
+        with self._transfer_lock:
+            job_queue = self.queues[worker_id]["queue"]
+            current = list(job_queue.queue)
+            current_ids = {job.id for job in current}
+            reordered = [job for job in ordered_jobs if job.id in current_ids]
+            placed = {job.id for job in reordered}
+            reordered.extend(job for job in current if job.id not in placed)
+            job_queue.queue.clear()
+            job_queue.queue.extend(reordered)
+        return reordered
+
+    def steal_job_for(self, worker: Worker):
+        """Give an idle *worker* the oldest job it can run from the most loaded peer.
+
+        Only jobs the thief could dispatch right away are taken: a supported
+        type it has room for, in a lane under its in-progress cap, picked in
+        the peer's own dispatch order.  A peer with a single waiting job and
+        nothing in progress is about to start that job itself, so it is left
+        alone.  Returns the stolen job, or None.
+        """
+        supported = worker.supported_job_types or {}
+
+        def runnable(job) -> bool:
+            return supported.get(job.job_type) is True and worker.can_assign_job_by_type(
+                job_type=job.job_type
+            )
+
+        best = None
+        best_key = None
+        for peer_id, worker_info in list(self.queues.items()):
+            if peer_id == worker.worker_id:
+                continue
+            job_queue = worker_info["queue"]
+            waiting = list(job_queue.queue)
+            if not waiting or (len(waiting) == 1 and not job_queue.in_progress):
+                continue
+            candidate = job_queue.queue.first_available(runnable)
+            if candidate is None:
+                continue
+            # Most waiting jobs first; on a tie, the peer holding the older job.
+            key = (len(waiting), -getattr(candidate, "enqueued_at", 0.0))
+            if best_key is None or key > best_key:
+                best, best_key = (peer_id, candidate), key
+        if best is None:
+            return None
+        peer_id, job = best
+        if not self.transfer_job(job, peer_id, worker):
+            return None
+        metrics.jobs_stolen.labels(job.job_type).inc()
+        job_tracer.event(job.id, "stolen", source=peer_id, worker_id=worker.worker_id)
+        logger.info(f"Worker {worker.worker_id} took job {job.id} from {peer_id}")
+        return job
@@ -1,17 +1,94 @@
+"""Completions served by remote Ollama workers.
+
+Each request waits on a future keyed by ``request_id``; the worker answers
+with ``ollama.complete_result`` and ``complete_request`` resolves it.
+
+Workers that advertise ``ollama_batch_size`` > 1 in their hardware limits
+get batched work: a request for a model joins that worker's open
+``OllamaBatchJob`` for the model, i.e. the batch still waiting in the
+worker's queue, until it is full.  The batch is sealed when the worker
+picks it up, so requests keep joining for exactly as long as they would
+have waited anyway and no timer adds latency.  Other workers get one job
+per request, as before.
+
+The broker keeps, per worker, the number of requests in flight and the
+model it last sent, and routes a request to the worker that would reach
+it soonest: in-flight requests divided by the worker's batch size, plus
+``swap_penalty_rounds`` if the worker would have to switch models.
+
+Callers that pass ``on_delta`` mark their request ``"stream": true``; the
+worker may then send ``ollama.complete_delta`` messages (``request_id`` and
+``delta``, or a ``deltas`` list of those) before the final result, and
+each delta is handed to ``on_delta`` on the caller's loop, in order.
+
+Every request carries an absolute ``deadline`` (epoch seconds) that the
+worker can honour.  A request whose caller times out or is cancelled is
+dropped from its batch if that has not been sent yet; otherwise batching
+workers are sent ``ollama.cancel`` for it.
+"""
+
 import asyncio
+import json
 import logging
+import threading
+import time
 import uuid
 
 from discord_tron_master.classes.app_config import AppConfig
-from discord_tron_master.classes.jobs.ollama_completion_job import OllamaCompletionJob
+from discord_tron_master.classes.jobs.ollama_completion_job import (
+    OllamaBatchJob,
+    OllamaCompletionJob,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class RemoteOllamaBroker:
     def __init__(self):
-        self._pending: dict[str, asyncio.Future] = {}
-        self._lock = asyncio.Lock()
+        # request_id -> (future, worker_id); futures belong to the caller's loop.
+        self._pending: dict[str, tuple[asyncio.Future, str]] = {}
+        # Requests and batches are touched from the bot's and the hub's loops.
+        self._lock = threading.Lock()
+        # (worker_id, model) -> OllamaBatchJob still waiting to be sent
+        self._open: dict[tuple[str, str | None], OllamaBatchJob] = {}
+        # request_id -> OllamaBatchJob it joined
+        self._batch_of: dict[str, OllamaBatchJob] = {}
+        self._in_flight: dict[str, int] = {}
+        self._loaded: dict[str, str | None] = {}
+        # request_id -> on_delta callback of a streaming request
+        self._streams: dict = {}
+
+    # -- Routing ---------------------------------------------------------------
+
+    def batch_size(self, worker, max_batch_size: int | None = None) -> int:
+        limits = getattr(worker, "hardware_limits", None) or {}
+        try:
+            advertised = int(limits.get("ollama_batch_size") or 1)
+        except (TypeError, ValueError):
+            advertised = 1
+        if max_batch_size is None:
+            max_batch_size = AppConfig().get_ollama_max_batch_size()
+        return max(1, min(advertised, max_batch_size))
+
+    def in_flight(self, worker_id: str) -> int:
+        return self._in_flight.get(worker_id, 0)
+
+    def _choose_worker(self, workers: list, model: str | None, config=None):
+        # Read once per choice, not once per candidate.
+        config = config or AppConfig()
+        max_batch_size = config.get_ollama_max_batch_size()
+        swap_penalty = config.get_ollama_swap_penalty_rounds()
+
+        def cost(worker):
+            loaded = self._loaded.get(worker.worker_id)
+            rounds = self.in_flight(worker.worker_id) / self.batch_size(worker, max_batch_size)
+            if loaded is not None and model is not None and loaded != model:
+                rounds += swap_penalty
+            return rounds
+
+        return min(workers, key=cost) if workers else None
+
+    # -- Requests --------------------------------------------------------------
 
     async def request_completion(
         self,
@@ -24,39 +101,69 @@ class RemoteOllamaBroker:
         keep_alive: str | None = None,
         timeout_seconds: int | None = None,
         author_id: str = "system",
+        on_delta=None,
     ) -> str:
         from discord_tron_master.bot import DiscordBot
 
         discord = DiscordBot.get_instance()
         if discord is None or discord.worker_manager is None or discord.queue_manager is None:
             raise RuntimeError("Discord worker system is not ready for remote Ollama completions.")
-        worker = discord.worker_manager.find_worker_with_fewest_queued_tasks_by_job_type("ollama")
+        model = str(model or "").strip() or None
+        config = AppConfig()
+        worker = self._choose_worker(
+            list(discord.worker_manager.workers_by_capability.get("ollama", [])), model, config
+        )
         if worker is None:
             raise RuntimeError("No Ollama workers are currently registered.")
         request_id = uuid.uuid4().hex
         loop = asyncio.get_running_loop()
         future = loop.create_future()
-        async with self._lock:
-            self._pending[request_id] = future
-        timeout_value = int(timeout_seconds or AppConfig().get_ollama_timeout_seconds())
+        timeout_value = int(timeout_seconds or config.get_ollama_timeout_seconds())
+        request = {
+            "request_id": request_id,
+            "author_id": str(author_id or "system"),
+            "role": str(role or ""),
+            "prompt": str(prompt or ""),
+            "model": model,
+            "temperature": float(temperature),
+            "max_tokens": int(max_tokens),
+            "keep_alive": str(keep_alive or "").strip() or None,
+            # Absolute, so it survives queueing and batching unchanged.
+            "deadline": time.time() + timeout_value,
+            "stream": on_delta is not None,
+        }
+        batch_size = self.batch_size(worker, config.get_ollama_max_batch_size())
+        new_job = None
+        with self._lock:
+            self._pending[request_id] = (future, worker.worker_id)
+            if on_delta is not None:
+                self._streams[request_id] = on_delta
+            self._in_flight[worker.worker_id] = self.in_flight(worker.worker_id) + 1
+            if batch_size > 1:
+                key = (worker.worker_id, model)
+                job = self._open.get(key)
+                if job is None or not job.add(request):
+                    job = new_job = OllamaBatchJob(
+                        model, batch_size, on_seal=self._seal, timeout_seconds=timeout_value
+                    )
+                    job.add(request)
+                    self._open[key] = job
+                self._batch_of[request_id] = job
+            else:
+                new_job = OllamaCompletionJob(request, timeout_seconds=timeout_value)
         try:
-            job = OllamaCompletionJob(
-                {
-                    "request_id": request_id,
-                    "author_id": str(author_id or "system"),
-                    "role": str(role or ""),
-                    "prompt": str(prompt or ""),
-                    "model": str(model or "").strip() or None,
-                    "temperature": float(temperature),
-                    "max_tokens": int(max_tokens),
-                    "keep_alive": str(keep_alive or "").strip() or None,
-                }
-            )
-            await discord.queue_manager.enqueue_job(worker, job)
+            if new_job is not None:
+                try:
+                    await discord.queue_manager.enqueue_job(worker, new_job)
+                except BaseException:
+                    self._discard(new_job, request_id)
+                    raise
             result = await asyncio.wait_for(future, timeout=timeout_value)
+        except BaseException:
+            await self._abandon(request_id, worker)
+            raise
         finally:
-            async with self._lock:
-                self._pending.pop(request_id, None)
+            self._finish(request_id)
         if not isinstance(result, dict):
             raise RuntimeError("Remote Ollama worker returned an invalid response.")
         if not result.get("ok"):
@@ -66,17 +173,139 @@ class RemoteOllamaBroker:
             raise RuntimeError("Remote Ollama worker returned empty content.")
         return text
 
+    def _seal(self, job: OllamaBatchJob) -> list:
+        """Called by a batch as it is sent; returns the requests still wanted."""
+        now = time.time()
+        with self._lock:
+            worker_id = job.worker.worker_id if job.worker is not None else None
+            for key, open_job in list(self._open.items()):
+                if open_job is job:
+                    del self._open[key]
+            live = []
+            for request in job.requests:
+                pending = self._pending.get(request["request_id"])
+                if pending is None or pending[0].done() or request["deadline"] <= now:
+                    continue
+                live.append(request)
+            if worker_id is not None and live:
+                self._loaded[worker_id] = job.model
+        if len(live) < len(job.requests):
+            logger.debug(
+                "Dropped %s abandoned request(s) from Ollama batch %s.",
+                len(job.requests) - len(live),
+                job.id,
+            )
+        return live
+
+    def _discard(self, job, request_id: str) -> None:
+        """A batch never reached the queue; fail whoever joined it after us."""
+        with self._lock:
+            for key, open_job in list(self._open.items()):
+                if open_job is job:
+                    del self._open[key]
+            if isinstance(job, OllamaBatchJob):
+                job.sealed = True
+                others = [r["request_id"] for r in job.requests if r["request_id"] != request_id]
+            else:
+                others = []
+        for other in others:
+            self._resolve(other, {"ok": False, "detail": "enqueue_failed"})
+
+    async def _abandon(self, request_id: str, worker) -> None:
+        """The caller gave up: pull the request from its batch, or tell the worker."""
+        with self._lock:
+            job = self._batch_of.get(request_id)
+            if job is None:
+                return
+            if not job.sealed:
+                job.requests = [r for r in job.requests if r["request_id"] != request_id]
+                return
+        try:
+            await worker.send_websocket_message(
+                json.dumps(
+                    {
+                        "job_type": "ollama",
+                        "module_name": "ollama",
+                        "module_command": "cancel",
+                        "job_id": job.id,
+                        "request_ids": [request_id],
+                    }
+                )
+            )
+        except Exception as e:
+            logger.debug(f"Could not send Ollama cancel for {request_id}: {e}")
+
+    def _finish(self, request_id: str) -> None:
+        with self._lock:
+            pending = self._pending.pop(request_id, None)
+            self._batch_of.pop(request_id, None)
+            self._streams.pop(request_id, None)
+            if pending is not None:
+                worker_id = pending[1]
+                remaining = self._in_flight.get(worker_id, 0) - 1
+                if remaining > 0:
+                    self._in_flight[worker_id] = remaining
+                else:
+                    self._in_flight.pop(worker_id, None)
+
     async def complete_request(self, payload: dict):
-        request_id = str((payload or {}).get("request_id") or "").strip()
+        payload = payload or {}
+        # Batching workers may answer several requests in one message.
+        if isinstance(payload.get("results"), list):
+            outcomes = [await self.complete_request(result) for result in payload["results"]]
+            return {"ok": all(outcome.get("ok") for outcome in outcomes)}
+        request_id = str(payload.get("request_id") or "").strip()
         if not request_id:
             return {"ok": False, "detail": "missing_request_id"}
-        async with self._lock:
-            future = self._pending.get(request_id)
-        if future is None:
+        if not self._resolve(request_id, payload):
             return {"ok": False, "detail": "request_not_found"}
-        if not future.done():
-            future.set_result(payload)
         return {"ok": True}
 
+    async def stream_delta(self, payload: dict):
+        payload = payload or {}
+        if isinstance(payload.get("deltas"), list):
+            outcomes = [await self.stream_delta(delta) for delta in payload["deltas"]]
+            return {"ok": all(outcome.get("ok") for outcome in outcomes)}
+        request_id = str(payload.get("request_id") or "").strip()
+        delta = payload.get("delta")
+        with self._lock:
+            pending = self._pending.get(request_id)
+            on_delta = self._streams.get(request_id)
+        if pending is None or on_delta is None:
+            return {"ok": False, "detail": "request_not_found"}
+        if delta:
+            # Same FIFO as the final result, so deltas always land before it.
+            pending[0].get_loop().call_soon_threadsafe(on_delta, str(delta))
+        return {"ok": True}
+
+    def _resolve(self, request_id: str, payload: dict) -> bool:
+        with self._lock:
+            pending = self._pending.get(request_id)
+        if pending is None:
+            return False
+        future = pending[0]
+
+        def resolve():
+            if not future.done():
+                future.set_result(payload)
+
+        # The waiter may be on another thread's loop.
+        future.get_loop().call_soon_threadsafe(resolve)
+        return True
+
+    def forget_worker(self, worker_id: str) -> None:
+        """The worker left: its queued batches are gone, so fail their requests now."""
+        with self._lock:
+            self._loaded.pop(worker_id, None)
+            for key in [key for key in self._open if key[0] == worker_id]:
+                del self._open[key]
+            lost = [
+                request_id
+                for request_id, (_, owner) in self._pending.items()
+                if owner == worker_id
+            ]
+        for request_id in lost:
+            self._resolve(request_id, {"ok": False, "detail": "worker_lost"})
+
 
 remote_ollama_broker = RemoteOllamaBroker()
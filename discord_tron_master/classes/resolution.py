@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from discord_tron_master.classes.app_config import AppConfig
 
 config = AppConfig()
@@ -55,50 +57,41 @@ class ResolutionHelper:
     ]
 
     def is_valid_resolution(self, width, height):
-        for res in ResolutionHelper.resolutions:
-            if res["width"] == width and res["height"] == height:
-                return True
-
-    def format_available_resolutions(self, user_id=None):
-        grouped_resolutions = self.group_and_sort_resolutions(
-            ResolutionHelper.resolutions
-        )
-        resolution_table = self.create_resolution_table(
-            grouped_resolutions, user_id
-        )
-        return f"```\n{resolution_table}\n```"
-
-    async def list_available_resolutions(self, user_id=None, resolution=None):
-        resolutions = ResolutionHelper.resolutions
-
+        return (width, height) in _valid_resolutions()
+
+    def format_available_resolutions(self, user_id=None, user_resolution=None):
+        """The resolution table, with the user's current resolution in bold.
+
+        Pass *user_resolution* when the caller already has the user's config;
+        otherwise it is read once from *user_id*.
+        """
+        if user_resolution is None and user_id is not None:
+            user_resolution = config.get_user_setting(user_id, "resolution")
+        highlight = None
+        if isinstance(user_resolution, dict):
+            highlight = (user_resolution.get("width"), user_resolution.get("height"))
+        if highlight not in _valid_resolutions():
+            # Nothing to mark; this also keeps the table cache catalog-sized.
+            highlight = None
+        return _rendered_table(highlight)
+
+    async def list_available_resolutions(self, user_id=None, resolution=None, user_resolution=None):
         if resolution is not None:
             width, height = map(int, resolution.split("x"))
-            return any(
-                r["width"] == width and r["height"] == height for r in resolutions
-            )
-        return self.format_available_resolutions(user_id=user_id)
+            return self.is_valid_resolution(width, height)
+        return self.format_available_resolutions(
+            user_id=user_id, user_resolution=user_resolution
+        )
 
     def group_and_sort_resolutions(self, resolutions):
-        # Group resolutions into three categories: Square, Landscape, and Portrait
-        grouped_resolutions = {"Square": [], "Landscape": [], "Portrait": []}
-        for r in resolutions:
-            if r["width"] == r["height"]:
-                category = "Square"
-            elif r["width"] > r["height"]:
-                category = "Landscape"
-            else:
-                category = "Portrait"
-            grouped_resolutions[category].append(r)
-
-        # Sort resolution groups by width and height
-        for category, resolutions in grouped_resolutions.items():
-            grouped_resolutions[category] = sorted(
-                resolutions, key=lambda r: (r["width"], r["height"])
-            )
-
-        return grouped_resolutions
-
-    def create_resolution_table(self, grouped_resolutions, user_id):
+        if resolutions is ResolutionHelper.resolutions:
+            # The catalog never changes; copy the lists so callers may edit them.
+            return {
+                category: list(items) for category, items in _grouped_resolutions().items()
+            }
+        return _group_and_sort(resolutions)
+
+    def create_resolution_table(self, grouped_resolutions, user_resolution=None):
         indicator = "**"  # Indicator variable
         indicator_length = len(indicator)
         max_rows = max(len(resolutions) for resolutions in grouped_resolutions.values())
@@ -131,7 +124,7 @@ class ResolutionHelper:
             row_text = "| "
             for ar, resolutions in grouped_resolutions.items():
                 res_str = self.get_resolution_string(
-                    resolutions, i, max_field_widths, ar, user_id, indicator
+                    resolutions, i, max_field_widths, ar, user_resolution, indicator
                 )
                 row_text += res_str + " | "
             resolution_table += row_text + "\n"
@@ -139,19 +132,17 @@ class ResolutionHelper:
         return resolution_table
 
     def get_resolution_string(
-        self, resolutions, i, max_field_widths, ar, user_id, indicator
+        self, resolutions, i, max_field_widths, ar, user_resolution, indicator
     ):
         if i < len(resolutions):
             r = resolutions[i]
             current_resolution_indicator = ""
-            if user_id is not None:
-                user_resolution = config.get_user_setting(user_id, "resolution")
-                if (
-                    user_resolution is not None
-                    and user_resolution["width"] == r["width"]
-                    and user_resolution["height"] == r["height"]
-                ):
-                    current_resolution_indicator = indicator
+            if (
+                user_resolution is not None
+                and user_resolution["width"] == r["width"]
+                and user_resolution["height"] == r["height"]
+            ):
+                current_resolution_indicator = indicator
             res_str = (
                 current_resolution_indicator
                 + f"{r['width']}x{r['height']}"
@@ -175,3 +166,48 @@ class ResolutionHelper:
 
         # Return the aspect ratio as a string in the format "width:height"
         return f"{ratio_width}:{ratio_height}"
+
+
+def _group_and_sort(resolutions):
+    # Group resolutions into three categories: Square, Landscape, and Portrait
+    grouped_resolutions = {"Square": [], "Landscape": [], "Portrait": []}
+    for r in resolutions:
+        if r["width"] == r["height"]:
+            category = "Square"
+        elif r["width"] > r["height"]:
+            category = "Landscape"
+        else:
+            category = "Portrait"
+        grouped_resolutions[category].append(r)
+
+    # Sort resolution groups by width and height
+    for category, resolutions in grouped_resolutions.items():
+        grouped_resolutions[category] = sorted(
+            resolutions, key=lambda r: (r["width"], r["height"])
+        )
+
+    return grouped_resolutions
+
+
+# ResolutionHelper.resolutions is static, so the lookups below are built once.
+@lru_cache(maxsize=1)
+def _valid_resolutions() -> frozenset:
+    return frozenset((r["width"], r["height"]) for r in ResolutionHelper.resolutions)
+
+
+@lru_cache(maxsize=1)
+def _grouped_resolutions() -> dict:
+    return {
+        category: tuple(items)
+        for category, items in _group_and_sort(ResolutionHelper.resolutions).items()
+    }
+
+
+@lru_cache(maxsize=None)
+def _rendered_table(highlight) -> str:
+    # Keyed by the highlighted (width, height), a catalog entry or None.
+    user_resolution = (
+        {"width": highlight[0], "height": highlight[1]} if highlight is not None else None
+    )
+    table = ResolutionHelper().create_resolution_table(_grouped_resolutions(), user_resolution)
+    return f"```\n{table}\n```"
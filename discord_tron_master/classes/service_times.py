@@ -0,0 +1,370 @@
+"""Learned service times and queue wait predictions.
+
+``WorkerManager.finish_payload`` reports how long each job took, measured
+from when it was sent to the worker until the worker finished it.  The
+samples are kept per ``(worker, job type, payload class)``, where the payload
+class captures what drives cost (model, megapixels and steps for images).
+They are also rolled up to coarser keys, so a new combination borrows the
+closest one that has enough samples.
+
+From those, ``service_time_estimator`` predicts how many seconds of work sit
+in front of a new job on each worker (``backlog_seconds``), and when each
+queued job should start and finish (``predict_queue``).  Statistics are
+persisted to ``data/service_times.db``.  ``start`` (called by ``__main__``)
+reloads them on the flusher thread, so the event loop never waits on SQLite;
+until they are in, predictions use the defaults.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+_DB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data")
+_DB_PATH = os.path.join(_DB_DIR, "service_times.db")
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS service_times (
+    worker_id      TEXT NOT NULL,
+    job_type       TEXT NOT NULL,
+    payload_class  TEXT NOT NULL,
+    count          INTEGER NOT NULL,
+    mean           REAL NOT NULL,
+    variance       REAL NOT NULL,
+    updated_at     REAL NOT NULL,
+    PRIMARY KEY (worker_id, job_type, payload_class)
+);
+"""
+
+ANY = "*"
+DEFAULT_SERVICE_SECONDS = 30.0
+
+
+def format_duration(seconds: float) -> str:
+    seconds = max(0, int(round(seconds)))
+    if seconds < 90:
+        return f"{seconds}s"
+    return f"{round(seconds / 60)} min"
+
+
+def _job_config(job: Any) -> dict | None:
+    extra_payload = getattr(job, "extra_payload", None)
+    if isinstance(extra_payload, dict) and isinstance(extra_payload.get("user_config"), dict):
+        return extra_payload["user_config"]
+    user_config = getattr(job, "user_config", None)
+    return user_config if isinstance(user_config, dict) else None
+
+
+def job_model(job: Any) -> str | None:
+    """The model a job will run on, when it is known before the job is formatted."""
+    config = _job_config(job)
+    model = config.get("model") if config is not None else None
+    return model or getattr(job, "model", None) or None
+
+
+def payload_class(job: Any) -> str:
+    """Bucket a job by the payload fields that drive its run time."""
+    config = _job_config(job)
+    model = job_model(job)
+    steps = getattr(job, "steps", None)
+    resolution = None
+    if config is not None:
+        steps = config.get("steps", steps)
+        resolution = config.get("resolution")
+    parts = []
+    if model:
+        parts.append(f"model={model}")
+    if isinstance(resolution, dict):
+        try:
+            megapixels = int(resolution.get("width")) * int(resolution.get("height")) / 1e6
+            parts.append(f"mp={round(megapixels * 4) / 4:g}")
+        except (TypeError, ValueError):
+            pass
+    if steps not in (None, ""):
+        try:
+            # Buckets of five steps keep the key space small.
+            parts.append(f"steps={int(math.ceil(int(steps) / 5.0) * 5)}")
+        except (TypeError, ValueError):
+            pass
+    if not parts:
+        parts.append(f"command={getattr(job, 'module_command', ANY)}")
+    return "|".join(parts)
+
+
+class _Stats:
+    """Exponentially weighted mean and variance; the first samples are averaged evenly."""
+
+    __slots__ = ("count", "mean", "variance", "updated_at")
+
+    MIN_ALPHA = 0.1
+
+    def __init__(self, count: int = 0, mean: float = 0.0, variance: float = 0.0, updated_at: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.variance = variance
+        self.updated_at = updated_at
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        alpha = max(1.0 / self.count, self.MIN_ALPHA)
+        delta = value - self.mean
+        self.mean += alpha * delta
+        self.variance = (1 - alpha) * (self.variance + alpha * delta * delta)
+        self.updated_at = time.time()
+
+    def merge(self, other: "_Stats") -> None:
+        """Fold in statistics gathered separately, weighting each side by its count."""
+        total = self.count + other.count
+        if total == 0:
+            return
+        mean = (self.mean * self.count + other.mean * other.count) / total
+        self.variance = (
+            self.count * (self.variance + (self.mean - mean) ** 2)
+            + other.count * (other.variance + (other.mean - mean) ** 2)
+        ) / total
+        self.mean = mean
+        self.count = total
+        self.updated_at = max(self.updated_at, other.updated_at)
+
+
+class ServiceTimeEstimator:
+    MIN_SAMPLES = 3
+    FLUSH_INTERVAL = 30.0
+    # An in-progress job that overran its estimate is assumed to need this
+    # fraction of its estimate again.
+    OVERRUN_FRACTION = 0.1
+
+    def __init__(self, db_path: str | None = None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._stats: dict[tuple[str, str, str], _Stats] = {}
+        self._dirty: set[tuple[str, str, str]] = set()
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._flusher: threading.Thread | None = None
+
+    # -- Learning --------------------------------------------------------------
+
+    def observe(self, worker_id: str, job_type: str, job_class: str, seconds: float) -> None:
+        if seconds is None or seconds < 0 or not math.isfinite(seconds):
+            return
+        keys = (
+            (str(worker_id), job_type, job_class),
+            (ANY, job_type, job_class),
+            (str(worker_id), job_type, ANY),
+            (ANY, job_type, ANY),
+        )
+        with self._lock:
+            for key in keys:
+                stats = self._stats.get(key)
+                if stats is None:
+                    stats = self._stats[key] = _Stats()
+                stats.add(float(seconds))
+                self._dirty.add(key)
+        self.start()
+
+    def observe_job(self, worker_id: str, job: Any, finished_at: float | None = None) -> float | None:
+        """Record a finished *job*; returns the measured seconds, or None if it was never sent."""
+        sent_at = getattr(job, "executed_date", None)
+        if not sent_at:
+            return None
+        seconds = (finished_at or time.time()) - sent_at
+        self.observe(worker_id, job.job_type, payload_class(job), seconds)
+        return seconds
+
+    # -- Prediction ------------------------------------------------------------
+
+    def expected(
+        self,
+        job_type: str,
+        worker_id: str | None = None,
+        job_class: str | None = None,
+        default: float | None = None,
+    ) -> float:
+        """Expected seconds for one job, from the most specific key with enough samples."""
+        self.start()
+        worker_key = str(worker_id) if worker_id is not None else ANY
+        class_key = job_class or ANY
+        candidates = (
+            (worker_key, job_type, class_key),
+            (ANY, job_type, class_key),
+            (worker_key, job_type, ANY),
+            (ANY, job_type, ANY),
+        )
+        with self._lock:
+            for key in candidates:
+                stats = self._stats.get(key)
+                if stats is not None and stats.count >= self.MIN_SAMPLES:
+                    return stats.mean
+        return DEFAULT_SERVICE_SECONDS if default is None else float(default)
+
+    def expected_for_job(
+        self,
+        job: Any,
+        worker_id: str | None = None,
+        default: Callable[[str], float] | None = None,
+    ) -> float:
+        return self.expected(
+            job.job_type,
+            worker_id,
+            payload_class(job),
+            default(job.job_type) if default is not None else None,
+        )
+
+    def _remaining(self, job: Any, worker_id: str, now: float, default) -> float:
+        expected = self.expected_for_job(job, worker_id, default)
+        sent_at = getattr(job, "executed_date", None)
+        if not sent_at:
+            return expected
+        return max(expected - (now - sent_at), expected * self.OVERRUN_FRACTION)
+
+    def backlog_seconds(
+        self,
+        worker_id: str,
+        job_queue: Any,
+        default: Callable[[str], float] | None = None,
+    ) -> float:
+        """Seconds of work ahead of a job added to *job_queue* now."""
+        if job_queue is None:
+            return 0.0
+        now = time.time()
+        total = 0.0
+        for job in list(job_queue.in_progress.values()):
+            total += self._remaining(job, worker_id, now, default)
+        for job in list(job_queue.queue):
+            total += self.expected_for_job(job, worker_id, default)
+        return total
+
+    def predict_queue(
+        self,
+        worker_id: str,
+        job_queue: Any,
+        default: Callable[[str], float] | None = None,
+    ) -> dict[str, tuple[float, float]]:
+        """Predicted wall-clock ``(start, finish)`` for every job on *job_queue*.
+
+        The worker runs one job at a time, so waiting jobs start in dispatch
+        order once the in-progress work is done.
+        """
+        predictions: dict[str, tuple[float, float]] = {}
+        if job_queue is None:
+            return predictions
+        now = time.time()
+        cursor = now
+        for job in list(job_queue.in_progress.values()):
+            started = getattr(job, "executed_date", None) or now
+            cursor += self._remaining(job, worker_id, now, default)
+            predictions[job.id] = (started, cursor)
+        for job in list(job_queue.queue):
+            start = cursor
+            cursor += self.expected_for_job(job, worker_id, default)
+            predictions[job.id] = (start, cursor)
+        return predictions
+
+    def predict_job(self, job: Any) -> tuple[float, float] | None:
+        """Predicted wall-clock ``(start, finish)`` for a queued or running *job*."""
+        worker = getattr(job, "worker", None)
+        if worker is None:
+            return None
+        return self.predict_queue(worker.worker_id, worker.job_queue).get(job.id)
+
+    def snapshot(self) -> dict[tuple[str, str, str], tuple[int, float, float]]:
+        with self._lock:
+            return {
+                key: (stats.count, stats.mean, math.sqrt(max(stats.variance, 0.0)))
+                for key, stats in self._stats.items()
+            }
+
+    # -- Persistence -----------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        path = self.db_path or _DB_PATH
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.executescript(_SCHEMA_SQL)
+        return conn
+
+    def load(self) -> None:
+        """Read the persisted statistics once, merging in anything observed meanwhile."""
+        with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                conn = self._connect()
+                try:
+                    rows = conn.execute(
+                        "SELECT worker_id, job_type, payload_class, count, mean, variance, updated_at "
+                        "FROM service_times"
+                    ).fetchall()
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                logger.warning("Could not load service time history", exc_info=True)
+                rows = []
+            with self._lock:
+                for worker_id, job_type, job_class, count, mean, variance, updated_at in rows:
+                    key = (worker_id, job_type, job_class)
+                    stats = _Stats(count, mean, variance, updated_at)
+                    current = self._stats.get(key)
+                    if current is not None:
+                        # Observed before the load finished; keep both.
+                        stats.merge(current)
+                    self._stats[key] = stats
+                self._loaded = True
+        logger.debug("Loaded %s service time statistic(s)", len(rows))
+
+    def flush(self) -> None:
+        # Writing before the load would replace the stored history.
+        self.load()
+        with self._lock:
+            if not self._dirty:
+                return
+            rows = []
+            for key in self._dirty:
+                stats = self._stats[key]
+                rows.append((*key, stats.count, stats.mean, stats.variance, stats.updated_at))
+            self._dirty.clear()
+        try:
+            conn = self._connect()
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO service_times "
+                    "(worker_id, job_type, payload_class, count, mean, variance, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            logger.warning("Could not persist service time statistics", exc_info=True)
+
+    def start(self) -> None:
+        """Start the flusher thread, which loads the persisted statistics first."""
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="service_time_flusher", daemon=True
+            )
+            self._flusher.start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self) -> None:
+        self.load()
+        while True:
+            time.sleep(self.FLUSH_INTERVAL)
+            self.flush()
+
+
+service_time_estimator = ServiceTimeEstimator()
@@ -1,5 +1,5 @@
-import requests
 from discord_tron_master.classes.app_config import AppConfig
+from discord_tron_master.classes.image_backends import image_backends
 
 config = AppConfig()
 
@@ -63,11 +63,18 @@ class StabilityAI:
             arguments["negative_prompt"] = user_config.get("negative_prompt", "")
         if seed >= 0:
             arguments["seed"] = seed
-        response = requests.post(
-            self.base_url, headers=self.headers, files={"none": ""}, data=arguments
+        import aiohttp
+
+        # The endpoint only accepts multipart/form-data.
+        form = aiohttp.FormData()
+        for key, value in arguments.items():
+            form.add_field(key, str(value))
+        form.add_field("none", b"", filename="none")
+        status, content = await image_backends.post(
+            self.base_url, headers=self.headers, data=form
         )
-        if response.status_code == 200:
-            return response.content
+        if status == 200:
+            return content
         else:
             # return black canvas
-            return requests.get("https://via.placeholder.com/1024x1024").content
+            return await image_backends.fetch("https://via.placeholder.com/1024x1024")
@@ -0,0 +1,191 @@
+"""Startup timing for the master process.
+
+``startup_profiler`` records named phases of the startup sequence,
+milestones measured from process start (``hub_accepting_workers``,
+``discord_ready``, ``first_command``...), and the time spent importing each
+module while the import timer is installed.  The numbers are logged once
+the bot is ready and exported as ``dtm_startup_*`` gauges.
+
+Set ``DTM_STARTUP_PROFILE=0`` to skip the import timer; phases and
+milestones are always recorded.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import importlib.abc
+import importlib.machinery
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_TIMED_LOADERS = (
+    importlib.machinery.SourceFileLoader,
+    importlib.machinery.SourcelessFileLoader,
+    importlib.machinery.ExtensionFileLoader,
+)
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """Times ``exec_module`` for every file-backed module imported while installed."""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self._profiler = profiler
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._local, "resolving", False):
+            return None
+        self._local.resolving = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.resolving = False
+        if isinstance(spec.loader, _TIMED_LOADERS):
+            self._wrap(spec.loader, fullname)
+        return spec
+
+    def _wrap(self, loader, fullname: str) -> None:
+        exec_module = loader.exec_module
+        local = self._local
+        profiler = self._profiler
+
+        def timed_exec_module(module):
+            stack = getattr(local, "stack", None)
+            if stack is None:
+                stack = local.stack = []
+            stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                return exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - started
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                profiler._record_import(fullname, elapsed, elapsed - children)
+
+        # An instance attribute, so ``isinstance`` checks on the loader still hold.
+        loader.exec_module = timed_exec_module
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._lock = threading.Lock()
+        self._phases: dict[str, float] = {}
+        self._milestones: dict[str, float] = {}
+        # module -> (inclusive seconds, self seconds)
+        self._imports: dict[str, tuple[float, float]] = {}
+        self._import_timer: _ImportTimer | None = None
+        self._reported = False
+
+    # -- Imports ---------------------------------------------------------------
+
+    def install_import_timer(self) -> None:
+        if os.environ.get("DTM_STARTUP_PROFILE", "1").strip().lower() in {"0", "false", "no", "off"}:
+            return
+        with self._lock:
+            if self._import_timer is not None:
+                return
+            self._import_timer = _ImportTimer(self)
+            sys.meta_path.insert(0, self._import_timer)
+
+    def uninstall_import_timer(self) -> None:
+        with self._lock:
+            timer, self._import_timer = self._import_timer, None
+        if timer is not None:
+            try:
+                sys.meta_path.remove(timer)
+            except ValueError:
+                pass
+
+    def _record_import(self, fullname: str, inclusive: float, own: float) -> None:
+        with self._lock:
+            self._imports[fullname] = (inclusive, own)
+
+    # -- Phases and milestones -------------------------------------------------
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._phases[name] = self._phases.get(name, 0.0) + elapsed
+
+    def milestone(self, name: str) -> float:
+        """Record seconds since process start the first time *name* is reached."""
+        now = time.perf_counter() - self.started_at
+        with self._lock:
+            return self._milestones.setdefault(name, now)
+
+    def phases(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._phases)
+
+    def milestones(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._milestones)
+
+    def slowest_imports(self, limit: int = 15) -> list[tuple[str, float, float]]:
+        """Return ``(module, inclusive_seconds, self_seconds)`` ordered by self time."""
+        with self._lock:
+            items = [(name, inclusive, own) for name, (inclusive, own) in self._imports.items()]
+        items.sort(key=lambda item: item[2], reverse=True)
+        return items[:limit]
+
+    def report(self, limit: int = 15) -> None:
+        """Log the startup breakdown once and stop timing imports."""
+        with self._lock:
+            if self._reported:
+                return
+            self._reported = True
+        self.uninstall_import_timer()
+        lines = ["Startup profile:"]
+        for name, seconds in sorted(self.milestones().items(), key=lambda item: item[1]):
+            lines.append(f"  milestone {name}: {seconds:.3f}s")
+        for name, seconds in self.phases().items():
+            lines.append(f"  phase {name}: {seconds:.3f}s")
+        slowest = self.slowest_imports(limit)
+        if slowest:
+            lines.append("  slowest imports (self / inclusive):")
+            for name, inclusive, own in slowest:
+                lines.append(f"    {name}: {own:.3f}s / {inclusive:.3f}s")
+        logger.info("\n".join(lines))
+
+
+startup_profiler = StartupProfiler()
+
+
+def _register_metrics() -> None:
+    from discord_tron_master.classes import metrics
+
+    metrics.metrics_registry.callback_gauge(
+        "startup_milestone_seconds",
+        "Seconds from process start until each startup milestone.",
+        ("milestone",),
+        startup_profiler.milestones,
+    )
+    metrics.metrics_registry.callback_gauge(
+        "startup_phase_seconds",
+        "Seconds spent in each startup phase.",
+        ("phase",),
+        startup_profiler.phases,
+    )
+
+
+_register_metrics()
@@ -0,0 +1,314 @@
+"""Streaming completions into Discord.
+
+``GPT.turbo_completion(..., stream=sink)`` hands text to *sink* as the
+backend generates it.  A sink has two methods:
+
+* ``feed(delta)`` with the next piece of visible text;
+* ``restart()`` when a new attempt begins (a retry or a fallback backend),
+  so text from the abandoned attempt can be thrown away.
+
+Both are called on the event loop that awaits the completion.  Backends
+that read their stream on a worker thread go through ``ThreadDeltaRelay``,
+and ``VisibleTextFilter`` keeps ``<think>`` blocks out of the sink.
+
+``DiscordStreamEditor`` is the Discord-side sink.  It posts a preview
+message on the first visible text and edits it as more arrives, at most
+once per ``edit_interval_seconds``; text fed between edits is coalesced
+into the next one, so edit volume does not grow with token rate.  When
+Discord answers 429 the interval doubles.  ``finish`` turns the preview
+into the final reply, or removes it when the reply needs several messages.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from typing import Callable
+
+from discord_tron_master.classes import metrics
+
+logger = logging.getLogger(__name__)
+
+_THINK_OPEN = "<think>"
+_THINK_BLOCK_RE = re.compile(r"<think>.*?</think>", re.DOTALL)
+_JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+MAX_EDIT_INTERVAL_SECONDS = 10.0
+
+
+def visible_text(raw: str) -> str:
+    """*raw* without ``<think>`` blocks, including one still open at the end."""
+    text = _THINK_BLOCK_RE.sub("", raw)
+    open_at = text.find(_THINK_OPEN)
+    if open_at >= 0:
+        text = text[:open_at]
+    # Hold back a tag that has only partly arrived.
+    for size in range(min(len(_THINK_OPEN) - 1, len(text)), 0, -1):
+        if text.endswith(_THINK_OPEN[:size]):
+            return text[:-size]
+    return text
+
+
+def partial_json_string(text: str, key: str) -> str | None:
+    """
+    The decoded value of string field *key* in a JSON object that may still
+    be arriving, as far as it has arrived; None if the field has not started.
+    """
+    match = re.search(r'"%s"\s*:\s*"' % re.escape(key), text)
+    if match is None:
+        return None
+    out = []
+    index, end = match.end(), len(text)
+    while index < end:
+        char = text[index]
+        if char == '"':
+            break
+        if char != "\\":
+            out.append(char)
+            index += 1
+            continue
+        if index + 1 >= end:
+            break
+        escape = text[index + 1]
+        if escape == "u":
+            if index + 6 > end:
+                break
+            try:
+                out.append(chr(int(text[index + 2 : index + 6], 16)))
+            except ValueError:
+                break
+            index += 6
+            continue
+        out.append(_JSON_ESCAPES.get(escape, escape))
+        index += 2
+    # Rejoin surrogate pairs from \\uXXXX escapes; drop a half-arrived one.
+    return "".join(out).encode("utf-16", "surrogatepass").decode("utf-16", "ignore")
+
+
+class ThreadDeltaRelay:
+    """Forwards a sink's calls from a worker thread to the loop it was created on."""
+
+    def __init__(self, stream, loop: asyncio.AbstractEventLoop | None = None):
+        self.stream = stream
+        self.loop = loop or asyncio.get_running_loop()
+
+    def feed(self, delta: str) -> None:
+        if delta:
+            self.loop.call_soon_threadsafe(self.stream.feed, delta)
+
+    def restart(self) -> None:
+        self.loop.call_soon_threadsafe(self.stream.restart)
+
+
+class VisibleTextFilter:
+    """Passes on only text outside ``<think>`` blocks."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._raw = ""
+        self._emitted = ""
+
+    def feed(self, delta: str) -> None:
+        self._raw += delta
+        visible = visible_text(self._raw)
+        if len(visible) > len(self._emitted) and visible.startswith(self._emitted):
+            self.stream.feed(visible[len(self._emitted) :])
+            self._emitted = visible
+
+    def restart(self) -> None:
+        self._raw = ""
+        self._emitted = ""
+        self.stream.restart()
+
+
+class DiscordStreamEditor:
+    def __init__(
+        self,
+        target,
+        *,
+        consumer: str,
+        prefix: str = "",
+        render: Callable[[str], str | None] | None = None,
+        edit_interval_seconds: float = 1.0,
+        min_chars: int = 24,
+        max_chars: int = 2000,
+    ):
+        """
+        Parameters
+        ----------
+        target
+            Message or context whose channel the preview is posted to.
+        consumer
+            Metrics label, e.g. ``chat`` or ``zork``.
+        render
+            Maps the text received so far to what should be shown, or None to
+            show nothing yet (e.g. pulling one field out of streamed JSON).
+        """
+        self.target = target
+        self.consumer = consumer
+        self.prefix = prefix
+        self.render = render
+        self.edit_interval_seconds = max(0.0, float(edit_interval_seconds))
+        self.min_chars = max(0, int(min_chars))
+        self.max_chars = int(max_chars)
+        self.message = None
+        self._text = ""
+        self._shown = ""
+        self._started = time.monotonic()
+        self._next_edit = 0.0
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._busy = False
+        self._closed = False
+
+    @classmethod
+    def from_config(cls, target, *, consumer: str, config=None, **kwargs):
+        """An editor using the ``streaming`` settings, or None when streaming is off."""
+        if config is None:
+            from discord_tron_master.classes.app_config import AppConfig
+
+            config = AppConfig()
+        raw = config.get_streaming_config()
+        if not raw.get("enabled"):
+            return None
+        return cls(
+            target,
+            consumer=consumer,
+            edit_interval_seconds=raw.get("edit_interval_seconds") or 0.0,
+            min_chars=raw.get("min_chars") or 0,
+            **kwargs,
+        )
+
+    # -- Sink ------------------------------------------------------------------
+
+    def feed(self, delta: str) -> None:
+        if self._closed or not delta:
+            return
+        self._text += delta
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self._wake.set()
+
+    def restart(self) -> None:
+        # The preview keeps showing the old attempt until the new one has text.
+        self._text = ""
+
+    # -- Preview ---------------------------------------------------------------
+
+    def preview(self) -> str | None:
+        text = self.render(self._text) if self.render is not None else self._text
+        text = (text or "").strip()
+        if not text:
+            return None
+        text = f"{self.prefix}{text}"
+        if len(text) > self.max_chars:
+            text = text[: self.max_chars - 2].rstrip() + " …"
+        return text
+
+    async def _run(self):
+        while not self._closed:
+            await self._wake.wait()
+            self._wake.clear()
+            delay = self._next_edit - time.monotonic()
+            if delay > 0:
+                # Everything fed while we wait goes into one edit.
+                await asyncio.sleep(delay)
+            if self._closed:
+                break
+            self._busy = True
+            try:
+                await self._show()
+            finally:
+                self._busy = False
+
+    async def _show(self):
+        from discord_tron_master.classes.discord.message_helpers import _send_with_retry
+
+        text = self.preview()
+        if text is None or text == self._shown:
+            return
+        if (
+            self.message is not None
+            and text.startswith(self._shown)
+            and len(text) - len(self._shown) < self.min_chars
+        ):
+            return
+        try:
+            if self.message is None:
+                self.message = await _send_with_retry(self.target, text)
+                metrics.stream_first_visible.labels(self.consumer).observe(
+                    time.monotonic() - self._started
+                )
+                metrics.stream_edits.labels(self.consumer, "sent").inc()
+            else:
+                await self.message.edit(content=text)
+                metrics.stream_edits.labels(self.consumer, "edited").inc()
+        except Exception as exc:
+            if getattr(exc, "status", None) != 429:
+                # A broken preview must not break the reply; finish() still runs.
+                metrics.stream_edits.labels(self.consumer, "failed").inc()
+                logger.debug(f"Streaming preview for {self.consumer} stopped: {exc}")
+                self._closed = True
+                return
+            metrics.stream_edits.labels(self.consumer, "rate_limited").inc()
+            self.edit_interval_seconds = min(
+                max(self.edit_interval_seconds * 2, 1.0), MAX_EDIT_INTERVAL_SECONDS
+            )
+            retry_after = float(getattr(exc, "retry_after", 0) or 0)
+            self._next_edit = time.monotonic() + max(retry_after, self.edit_interval_seconds)
+            self._wake.set()
+            return
+        self._shown = text
+        self._next_edit = time.monotonic() + self.edit_interval_seconds
+
+    async def _stop(self):
+        self._closed = True
+        task, self._task = self._task, None
+        if task is None:
+            return
+        if self._busy:
+            # Let an in-flight send land, so its message is not orphaned.
+            self._wake.set()
+        else:
+            task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception as exc:
+            logger.debug(f"Streaming preview for {self.consumer} failed: {exc}")
+
+    async def finish(self, final_text: str):
+        """
+        Show *final_text* in the preview message and return it, or return
+        None (after removing any preview) when the caller must send the reply.
+        """
+        await self._stop()
+        if self.message is None:
+            return None
+        if final_text and len(final_text) <= self.max_chars:
+            try:
+                if final_text != self._shown:
+                    await self.message.edit(content=final_text)
+                    metrics.stream_edits.labels(self.consumer, "edited").inc()
+                # The reply is the caller's now; a later abort() leaves it alone.
+                message, self.message = self.message, None
+                return message
+            except Exception as exc:
+                metrics.stream_edits.labels(self.consumer, "failed").inc()
+                logger.debug(f"Could not finalise streamed {self.consumer} reply: {exc}")
+        await self.abort()
+        return None
+
+    async def abort(self):
+        """Stop previewing and delete the preview message, if one was posted."""
+        await self._stop()
+        message, self.message = self.message, None
+        if message is not None:
+            try:
+                await message.delete()
+            except Exception as exc:
+                logger.debug(f"Could not delete streamed {self.consumer} preview: {exc}")
@@ -0,0 +1,193 @@
+"""Cheap logging helpers for the websocket and command hot paths.
+
+Worker messages can carry base64 images, so formatting one eagerly for a
+debug line that is then filtered out can allocate megabytes.  These helpers
+keep all of that work behind the logger's level check:
+
+* ``LazyPayload`` wraps a payload (a dict, a list, or a raw JSON string) and
+  only redacts, truncates and serialises it when a handler formats the record.
+* ``log_event`` emits ``event key=value ...`` lines with the fields attached
+  to the record as ``record.fields`` for structured handlers.
+* ``log_sampled`` lets a call site that fires on every message log only the
+  first and then every Nth occurrence, noting how many were suppressed.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from typing import Any
+
+REDACTED = "[redacted]"
+REDACT_KEYS = frozenset(
+    {
+        "access_token",
+        "api_key",
+        "authorization",
+        "callback_secret",
+        "client_secret",
+        "link_secret",
+        "password",
+        "refresh_token",
+        "secret",
+        "token",
+    }
+)
+# Keys whose values are bulk media; only their size is logged.
+BULK_KEYS = frozenset({"image", "images", "image_data", "audio_data", "video_data", "file"})
+
+MAX_STRING = 240
+MAX_ITEMS = 25
+MAX_DEPTH = 5
+
+
+def redact(value: Any, *, max_string: int = MAX_STRING, max_items: int = MAX_ITEMS, depth: int = MAX_DEPTH) -> Any:
+    """Return a copy of *value* that is safe and small enough to log."""
+    if isinstance(value, dict):
+        if depth <= 0:
+            return f"<dict len={len(value)}>"
+        result = {}
+        for index, (key, nested) in enumerate(value.items()):
+            if index >= max_items:
+                result["..."] = f"{len(value) - max_items} more key(s)"
+                break
+            key_text = str(key).lower()
+            if key_text in REDACT_KEYS:
+                result[key] = REDACTED
+            elif key_text in BULK_KEYS and nested is not None:
+                result[key] = _describe_bulk(nested)
+            else:
+                result[key] = redact(nested, max_string=max_string, max_items=max_items, depth=depth - 1)
+        return result
+    if isinstance(value, (list, tuple)):
+        if depth <= 0:
+            return f"<{type(value).__name__} len={len(value)}>"
+        items = [
+            redact(item, max_string=max_string, max_items=max_items, depth=depth - 1)
+            for item in value[:max_items]
+        ]
+        if len(value) > max_items:
+            items.append(f"... {len(value) - max_items} more item(s)")
+        return items
+    if isinstance(value, (bytes, bytearray)):
+        return f"<bytes len={len(value)}>"
+    if isinstance(value, str):
+        return _truncate(value, max_string)
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return _truncate(repr(value), max_string)
+
+
+def _describe_bulk(value: Any) -> str:
+    try:
+        size = len(value)
+    except TypeError:
+        return f"<{type(value).__name__}>"
+    return f"<{type(value).__name__} len={size}>"
+
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...<{len(text) - limit} more chars>"
+
+
+class LazyPayload:
+    """Defer redaction and serialisation of *payload* until the record is formatted.
+
+    A raw string that looks like JSON is parsed first so its fields can be
+    redacted; anything else is truncated.
+    """
+
+    __slots__ = ("payload", "max_string", "max_items")
+
+    def __init__(self, payload: Any, *, max_string: int = MAX_STRING, max_items: int = MAX_ITEMS):
+        self.payload = payload
+        self.max_string = max_string
+        self.max_items = max_items
+
+    def __str__(self) -> str:
+        payload = self.payload
+        if isinstance(payload, (str, bytes, bytearray)) and payload[:1] in ("{", "[", b"{", b"["):
+            try:
+                payload = json.loads(payload)
+            except ValueError:
+                pass
+        try:
+            return json.dumps(
+                redact(payload, max_string=self.max_string, max_items=self.max_items),
+                default=str,
+            )
+        except (TypeError, ValueError):
+            return _truncate(repr(payload), self.max_string)
+
+    __repr__ = __str__
+
+
+class _Fields:
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: dict):
+        self.fields = fields
+
+    def __str__(self) -> str:
+        parts = []
+        for key, value in self.fields.items():
+            if str(key).lower() in REDACT_KEYS:
+                value = REDACTED
+            elif isinstance(value, (dict, list, tuple)):
+                value = json.dumps(redact(value), default=str)
+            else:
+                value = redact(value)
+            parts.append(f"{key}={value}")
+        return " ".join(parts)
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields) -> None:
+    """Log ``event key=value ...``; nothing is formatted unless *level* is enabled."""
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(level, "%s %s", event, _Fields(fields), extra={"fields": fields}, stacklevel=2)
+
+
+class _SiteCounter:
+    __slots__ = ("seen", "suppressed")
+
+    def __init__(self):
+        self.seen = 0
+        self.suppressed = 0
+
+
+_sites: dict[Any, _SiteCounter] = {}
+_sites_lock = threading.Lock()
+
+
+def log_sampled(
+    logger: logging.Logger,
+    level: int,
+    msg: str,
+    *args,
+    every: int = 100,
+    key: Any = None,
+) -> None:
+    """Log the first and then every *every*-th call for one call site.
+
+    The call site is identified by *key*, or by the logger and message
+    template when no key is given.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    site_key = key if key is not None else (logger.name, msg)
+    counter = _sites.get(site_key)
+    if counter is None:
+        with _sites_lock:
+            counter = _sites.setdefault(site_key, _SiteCounter())
+    counter.seen += 1
+    if every > 1 and (counter.seen - 1) % every:
+        counter.suppressed += 1
+        return
+    suppressed, counter.suppressed = counter.suppressed, 0
+    if suppressed:
+        msg = f"{msg} [sampled 1/{every}, {suppressed} suppressed]"
+    logger.log(level, msg, *args, stacklevel=2)
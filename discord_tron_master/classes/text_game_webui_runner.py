@@ -61,6 +61,9 @@ class TextGameWebUIRunner:
         env["TEXT_GAME_WEBUI_DTM_IMAGE_API_URL"] = (
             self._config.get_text_game_webui_dtm_image_api_url()
         )
+        env["TEXT_GAME_WEBUI_DTM_OUTBOX_NOTIFY_URL"] = (
+            self._config.get_text_game_webui_dtm_image_bridge_url() + "/api/zork/outbox/notify"
+        )
         env["TEXT_GAME_WEBUI_TGE_RUNTIME_PROBE_LLM"] = (
             "1" if self._config.get_text_game_webui_runtime_probe_llm() else "0"
         )
@@ -68,14 +71,17 @@ class TextGameWebUIRunner:
             self._config.get_text_game_webui_runtime_probe_timeout_seconds()
         )
         existing_pythonpath = [part for part in str(env.get("PYTHONPATH") or "").split(os.pathsep) if part]
-        desired_pythonpath = [str(project_path), str(tge_project_path)]
+        # The DTM checkout goes after the sidecar's paths, only so the outbox
+        # notify hook (webui_outbox_hook) resolves.
+        dtm_root = Path(__file__).resolve().parents[2]
+        desired_pythonpath = [str(project_path), str(tge_project_path), str(dtm_root)]
         env["PYTHONPATH"] = os.pathsep.join(desired_pythonpath + existing_pythonpath)
         self._apply_llm_environment(env)
 
         command = [
             python_bin,
             "-m",
-            "uvicorn",
+            "discord_tron_master.classes.webui_outbox_hook",
             "app.main:app",
             "--host",
             str(host),
@@ -0,0 +1,406 @@
+"""Per-job lifecycle tracing.
+
+Every job is a trace whose id is ``Job.id``.  Stages record spans against that
+id: creation, queue wait, dispatch (payload formatting and the websocket
+send), the wait for the worker's acknowledgment, the worker run until
+``finish``, and delivery back to Discord.  Spans are written off-thread to a
+local exporter (SQLite by default, JSON lines optionally), so a slow job can
+be broken down stage by stage with ``SQLiteSpanExporter.breakdown``.  Spans
+still buffered at shutdown are flushed by ``__main__`` and at exit.
+
+Sampling is decided by hashing the job id.  The bot loop, the hub loop and
+the handlers for worker messages therefore reach the same decision from the
+job id alone, with no shared state.  With ``sample_rate`` at 0 every call
+returns after one comparison.
+"""
+
+from __future__ import annotations
+
+import atexit
+import collections
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_DB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data")
+_DB_PATH = os.path.join(_DB_DIR, "job_traces.db")
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS job_spans (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    trace_id     TEXT NOT NULL,
+    name         TEXT NOT NULL,
+    start_time   REAL NOT NULL,
+    duration     REAL NOT NULL,
+    attributes   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_job_spans_trace ON job_spans(trace_id);
+CREATE INDEX IF NOT EXISTS idx_job_spans_name_start ON job_spans(name, start_time);
+"""
+
+# The job whose work is running in this context, so nested helpers (such as
+# the websocket send) can attach spans without being handed the job.
+current_job_id: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "current_job_id", default=None
+)
+
+
+class Span:
+    __slots__ = ("trace_id", "name", "start_time", "duration", "attributes")
+
+    def __init__(self, trace_id: str, name: str, start_time: float, duration: float, attributes=None):
+        self.trace_id = trace_id
+        self.name = name
+        self.start_time = start_time
+        self.duration = duration
+        self.attributes = attributes or {}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    """Receives finished spans in batches on the tracer's writer thread."""
+
+    def export(self, spans: list[Span]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteSpanExporter(SpanExporter):
+    def __init__(self, db_path: str | None = None):
+        self.db_path = db_path or _DB_PATH
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA_SQL)
+            self._conn = conn
+        return self._conn
+
+    def export(self, spans: list[Span]) -> None:
+        rows = [
+            (
+                span.trace_id,
+                span.name,
+                span.start_time,
+                span.duration,
+                json.dumps(span.attributes) if span.attributes else None,
+            )
+            for span in spans
+        ]
+        with self._lock:
+            conn = self._get_conn()
+            conn.executemany(
+                "INSERT INTO job_spans (trace_id, name, start_time, duration, attributes) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+
+    def breakdown(self, trace_id: str) -> list[dict[str, Any]]:
+        """Return the spans of one job, oldest first."""
+        with self._lock:
+            rows = self._get_conn().execute(
+                "SELECT name, start_time, duration, attributes FROM job_spans "
+                "WHERE trace_id = ? ORDER BY start_time ASC, id ASC",
+                (str(trace_id),),
+            ).fetchall()
+        return [
+            {
+                "name": name,
+                "start_time": start_time,
+                "duration": duration,
+                "attributes": json.loads(attributes) if attributes else {},
+            }
+            for name, start_time, duration, attributes in rows
+        ]
+
+    def stage_summary(self, since: float | None = None) -> dict[str, dict[str, float]]:
+        """Return count, mean and max duration per stage, optionally since a wall-clock time."""
+        query = "SELECT name, COUNT(*), AVG(duration), MAX(duration) FROM job_spans"
+        params: tuple = ()
+        if since is not None:
+            query += " WHERE start_time >= ?"
+            params = (float(since),)
+        query += " GROUP BY name"
+        with self._lock:
+            rows = self._get_conn().execute(query, params).fetchall()
+        return {
+            name: {"count": count, "mean": mean, "max": maximum}
+            for name, count, mean, maximum in rows
+        }
+
+    def purge_older_than(self, seconds: float) -> int:
+        with self._lock:
+            cursor = self._get_conn().execute(
+                "DELETE FROM job_spans WHERE start_time < ?", (time.time() - seconds,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: list[Span]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as handle:
+            for span in spans:
+                handle.write(json.dumps(span.to_dict()) + "\n")
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("_tracer", "_trace_id", "_name", "_attributes", "_start", "_started")
+
+    def __init__(self, tracer: "JobTracer", trace_id: str, name: str, attributes: dict):
+        self._tracer = tracer
+        self._trace_id = trace_id
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self):
+        self._start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._attributes["error"] = exc_type.__name__
+        self._tracer._emit(
+            Span(
+                self._trace_id,
+                self._name,
+                self._start,
+                time.perf_counter() - self._started,
+                self._attributes,
+            )
+        )
+        return False
+
+    def set(self, **attributes) -> None:
+        self._attributes.update(attributes)
+
+
+class JobTracer:
+    FLUSH_INTERVAL_SECONDS = 2.0
+    FLUSH_BATCH_SIZE = 256
+    MAX_ACTIVE_TRACES = 10000
+
+    def __init__(self, sample_rate: float = 0.0, exporter: SpanExporter | None = None):
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate or 0.0)))
+        self._threshold = int(self.sample_rate * 0xFFFFFFFF)
+        self._exporter = exporter
+        self._buffer: collections.deque[Span] = collections.deque()
+        # trace_id -> {mark name: wall-clock time}
+        self._marks: collections.OrderedDict[str, dict[str, float]] = collections.OrderedDict()
+        self._marks_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._writer: threading.Thread | None = None
+        self._writer_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config=None) -> "JobTracer":
+        if config is None:
+            from discord_tron_master.classes.app_config import AppConfig
+
+            config = AppConfig()
+        exporter = None
+        kind = config.get_tracing_exporter()
+        if kind == "jsonl":
+            exporter = JsonLinesSpanExporter(
+                config.get_tracing_path() or os.path.join(_DB_DIR, "job_traces.jsonl")
+            )
+        elif kind == "sqlite":
+            exporter = SQLiteSpanExporter(config.get_tracing_path())
+        return cls(sample_rate=config.get_tracing_sample_rate(), exporter=exporter)
+
+    @property
+    def enabled(self) -> bool:
+        return self._threshold > 0 and self._exporter is not None
+
+    @property
+    def exporter(self) -> SpanExporter | None:
+        return self._exporter
+
+    def configure(self, *, sample_rate: float | None = None, exporter: SpanExporter | None = None) -> None:
+        if exporter is not None:
+            self._exporter = exporter
+        if sample_rate is not None:
+            self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+            self._threshold = int(self.sample_rate * 0xFFFFFFFF)
+
+    def is_sampled(self, trace_id) -> bool:
+        if self._threshold <= 0 or trace_id is None:
+            return False
+        if self._threshold >= 0xFFFFFFFF:
+            return True
+        digest = hashlib.blake2b(str(trace_id).encode("utf-8"), digest_size=4).digest()
+        return int.from_bytes(digest, "big") < self._threshold
+
+    # -- Recording -------------------------------------------------------------
+
+    def start(self, trace_id, **attributes) -> None:
+        """Open the trace for a job; repeated calls keep the first start time."""
+        if self._threshold <= 0 or not self.is_sampled(trace_id):
+            return
+        key = str(trace_id)
+        with self._marks_lock:
+            if key in self._marks:
+                return
+            self._marks[key] = {"created": time.time()}
+            while len(self._marks) > self.MAX_ACTIVE_TRACES:
+                self._marks.popitem(last=False)
+        if attributes:
+            self.event(key, "created", **attributes)
+
+    def mark(self, trace_id, name: str) -> None:
+        """Remember when a stage boundary was crossed, for a later ``span_since``."""
+        if self._threshold <= 0 or not self.is_sampled(trace_id):
+            return
+        key = str(trace_id)
+        with self._marks_lock:
+            marks = self._marks.get(key)
+            if marks is None:
+                marks = self._marks[key] = {"created": time.time()}
+            marks[name] = time.time()
+
+    def span_since(self, trace_id, mark: str, name: str, **attributes) -> None:
+        """Record a span from a previous ``mark`` until now."""
+        if self._threshold <= 0 or not self.is_sampled(trace_id):
+            return
+        key = str(trace_id)
+        with self._marks_lock:
+            marks = self._marks.get(key)
+            started = marks.get(mark) if marks else None
+        if started is None:
+            return
+        now = time.time()
+        self._emit(Span(key, name, started, max(0.0, now - started), attributes))
+
+    def span(self, name: str, trace_id=None, **attributes):
+        """Context manager timing a stage of *trace_id* (or the current job)."""
+        if self._threshold <= 0:
+            return _NOOP_SPAN
+        if trace_id is None:
+            trace_id = current_job_id.get()
+        if not self.is_sampled(trace_id):
+            return _NOOP_SPAN
+        return _ActiveSpan(self, str(trace_id), name, attributes)
+
+    def event(self, trace_id, name: str, **attributes) -> None:
+        """Record a zero-length span, e.g. a resubmission."""
+        if self._threshold <= 0 or not self.is_sampled(trace_id):
+            return
+        self._emit(Span(str(trace_id), name, time.time(), 0.0, attributes))
+
+    def finish(self, trace_id, **attributes) -> None:
+        """Close the trace with a ``job`` span covering its whole lifetime."""
+        if self._threshold <= 0 or not self.is_sampled(trace_id):
+            return
+        key = str(trace_id)
+        with self._marks_lock:
+            marks = self._marks.pop(key, None)
+        if not marks:
+            return
+        started = marks["created"]
+        self._emit(Span(key, "job", started, max(0.0, time.time() - started), attributes))
+
+    # -- Export ----------------------------------------------------------------
+
+    def _emit(self, span: Span) -> None:
+        if self._exporter is None:
+            return
+        self._buffer.append(span)
+        if self._writer is None:
+            self._start_writer()
+        if len(self._buffer) >= self.FLUSH_BATCH_SIZE:
+            self._flush_event.set()
+
+    def _start_writer(self) -> None:
+        with self._writer_lock:
+            if self._writer is not None:
+                return
+            self._writer = threading.Thread(
+                target=self._writer_loop, name="job_trace_writer", daemon=True
+            )
+            self._writer.start()
+        # The writer is a daemon thread; export what it has not reached yet.
+        atexit.register(self.flush)
+
+    def _writer_loop(self) -> None:
+        while True:
+            self._flush_event.wait(self.FLUSH_INTERVAL_SECONDS)
+            self._flush_event.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Export buffered spans now; returns how many were written."""
+        batch: list[Span] = []
+        while self._buffer:
+            try:
+                batch.append(self._buffer.popleft())
+            except IndexError:
+                break
+        if not batch or self._exporter is None:
+            return 0
+        try:
+            self._exporter.export(batch)
+        except Exception:
+            logger.warning("Failed exporting %s job trace span(s)", len(batch), exc_info=True)
+            return 0
+        return len(batch)
+
+
+def _load_tracer() -> JobTracer:
+    try:
+        return JobTracer.from_config()
+    except Exception:
+        logger.warning("Could not configure job tracing; tracing disabled.", exc_info=True)
+        return JobTracer()
+
+
+job_tracer = _load_tracer()
@@ -0,0 +1,192 @@
+"""Wake-on-release coordination for Zork turn claims.
+
+Only one turn per campaign may resolve at a time.  Waiters hold a ticket and
+are woken in FIFO order as soon as the current claim is released, instead of
+re-polling the claim store on a fixed interval.  An actor holds at most one
+ticket per campaign: further messages from them share it, and once one of
+them claims, the ticket goes to the back of the line for the rest.  Claims
+held outside this process (the engine's ``InflightTurn`` rows, written by the
+webui sidecar) can't notify us, so only the head ticket re-checks them, off
+the event loop, and only when the claim is due to expire or after
+``FALLBACK_POLL_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import itertools
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class TurnClaimTicket:
+    __slots__ = ("campaign_id", "actor_id", "seq", "loop", "wake", "holders")
+
+    def __init__(self, campaign_id: str, actor_id: str, seq: int, loop: asyncio.AbstractEventLoop):
+        self.campaign_id = campaign_id
+        self.actor_id = actor_id
+        self.seq = seq
+        self.loop = loop
+        self.wake = asyncio.Event()
+        # Messages from this actor currently waiting on the ticket.
+        self.holders = 1
+
+
+class TurnClaimCoordinator:
+    FALLBACK_POLL_SECONDS = 2.0
+    MIN_WAIT_SECONDS = 0.05
+
+    def __init__(self):
+        self._waiters: dict[str, collections.deque[TurnClaimTicket]] = {}
+        self._generations: dict[str, int] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._broadcasts = 0
+
+    def generation(self, campaign_id) -> int:
+        """Return a counter that advances on every release for *campaign_id*."""
+        with self._lock:
+            return self._generations.get(str(campaign_id), 0)
+
+    def waiting(self, campaign_id) -> int:
+        with self._lock:
+            return len(self._waiters.get(str(campaign_id), ()))
+
+    def enqueue(self, campaign_id, actor_id) -> TurnClaimTicket:
+        """Return *actor_id*'s ticket for *campaign_id*, joining the line if they have none."""
+        campaign_id, actor_id = str(campaign_id), str(actor_id)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            queue = self._waiters.setdefault(campaign_id, collections.deque())
+            for ticket in queue:
+                if ticket.actor_id == actor_id and ticket.loop is loop:
+                    ticket.holders += 1
+                    return ticket
+            ticket = TurnClaimTicket(campaign_id, actor_id, next(self._seq), loop)
+            queue.append(ticket)
+        return ticket
+
+    def dequeue(self, ticket: TurnClaimTicket, *, claimed: bool) -> None:
+        """Release one hold on *ticket*; if it left the head unclaimed, wake the next waiter.
+
+        A ticket other messages still hold stays in line, moving to the back
+        when this one claimed, so the actor waits their turn again.
+        """
+        with self._lock:
+            queue = self._waiters.get(ticket.campaign_id)
+            if queue is None:
+                return
+            was_head = bool(queue) and queue[0] is ticket
+            ticket.holders -= 1
+            if ticket.holders > 0:
+                if claimed and len(queue) > 1:
+                    try:
+                        queue.remove(ticket)
+                    except ValueError:
+                        return
+                    queue.append(ticket)
+                return
+            try:
+                queue.remove(ticket)
+            except ValueError:
+                return
+            if not queue:
+                self._waiters.pop(ticket.campaign_id, None)
+                return
+            successor = queue[0] if was_head and not claimed else None
+        if successor is not None:
+            self._wake(successor)
+
+    def notify_released(self, campaign_id) -> None:
+        """Record a release for *campaign_id* and wake the head waiter.
+
+        Safe to call from any thread.
+        """
+        key = str(campaign_id)
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            queue = self._waiters.get(key)
+            head = queue[0] if queue else None
+        if head is not None:
+            self._wake(head)
+
+    def wake_all(self) -> None:
+        """Wake every waiter, e.g. so queued turns can hand off during shutdown."""
+        with self._lock:
+            self._broadcasts += 1
+            tickets = [ticket for queue in self._waiters.values() for ticket in queue]
+            for key in list(self._generations):
+                self._generations[key] += 1
+        for ticket in tickets:
+            self._wake(ticket)
+
+    @staticmethod
+    def _wake(ticket: TurnClaimTicket) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is ticket.loop:
+            ticket.wake.set()
+            return
+        try:
+            ticket.loop.call_soon_threadsafe(ticket.wake.set)
+        except RuntimeError:
+            # Loop already closed; the waiter is gone with it.
+            pass
+
+    def _is_head(self, ticket: TurnClaimTicket) -> bool:
+        with self._lock:
+            queue = self._waiters.get(ticket.campaign_id)
+            return bool(queue) and queue[0] is ticket
+
+    async def wait_turn(
+        self,
+        ticket: TurnClaimTicket,
+        *,
+        since_generation: int,
+        claim_expires_in=None,
+    ) -> None:
+        """Wait until *ticket* is at the head and the claim may have been released.
+
+        Returns immediately if a release happened after *since_generation* was
+        read, as soon as a ticket that was waiting behind others reaches the
+        head, and for every waiter after ``wake_all``.  *claim_expires_in* is
+        an optional zero-argument callable that returns the seconds until an
+        externally held claim expires (or ``None``); it may block, so it runs
+        in a thread, and only for the head ticket.
+        """
+        broadcasts = self._broadcasts
+        queued = False
+        while True:
+            if self._broadcasts != broadcasts:
+                return
+            if self._is_head(ticket):
+                if queued or self.generation(ticket.campaign_id) != since_generation:
+                    return
+                # Cleared before the claim check, so a release during it still counts.
+                ticket.wake.clear()
+                timeout = self.FALLBACK_POLL_SECONDS
+                if claim_expires_in is not None:
+                    try:
+                        remaining = await asyncio.to_thread(claim_expires_in)
+                    except Exception:
+                        remaining = None
+                    if remaining is not None:
+                        timeout = min(timeout, max(self.MIN_WAIT_SECONDS, float(remaining)))
+                try:
+                    await asyncio.wait_for(ticket.wake.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                return
+            queued = True
+            ticket.wake.clear()
+            # Not our turn yet; the predecessor wakes us when it gives up, and
+            # a release wakes us once a predecessor that claimed has left.
+            await ticket.wake.wait()
+
+
+turn_claim_coordinator = TurnClaimCoordinator()
@@ -0,0 +1,224 @@
+"""In-flight turn tracking for graceful Zork restarts.
+
+The emulator bridge reports every claimed turn start and release here.  A
+shutdown waits on release notifications instead of polling, so it finishes
+as soon as the slowest active turn does.  Claims held outside this process
+(``InflightTurn`` rows from the webui) are only re-checked when one is due to
+expire or a release arrives.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data")
+_HANDOFF_PATH = os.path.join(_DATA_DIR, "zork_turn_handoff.json")
+
+
+class TurnHandoffRequested(Exception):
+    """Raised to a queued turn that should be checkpointed instead of started."""
+
+
+class TurnDrainCoordinator:
+    EXTERNAL_RECHECK_SECONDS = 5.0
+    MIN_WAIT_SECONDS = 0.05
+
+    def __init__(self, *, handoff_path: str | None = None):
+        self.handoff_path = handoff_path or _HANDOFF_PATH
+        self._lock = threading.Lock()
+        self._active: dict[tuple[str, str], float] = {}
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._draining = False
+        self._drain_started_at: float | None = None
+        self._drain_started_with = 0
+        self._completed_since_drain = 0
+
+    @property
+    def draining(self) -> bool:
+        return self._draining
+
+    def turn_started(self, campaign_id, actor_id) -> None:
+        with self._lock:
+            self._active[(str(campaign_id), str(actor_id))] = time.monotonic()
+
+    def turn_finished(self, campaign_id, actor_id) -> None:
+        with self._lock:
+            removed = self._active.pop((str(campaign_id), str(actor_id)), None)
+            if removed is not None and self._draining:
+                self._completed_since_drain += 1
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            self._wake(loop, event)
+
+    @staticmethod
+    def _wake(loop: asyncio.AbstractEventLoop, event: asyncio.Event) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            event.set()
+            return
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass
+
+    def request_drain(self) -> None:
+        with self._lock:
+            if self._draining:
+                return
+            self._draining = True
+            self._drain_started_at = time.monotonic()
+            self._drain_started_with = len(self._active)
+            self._completed_since_drain = 0
+
+    def cancel_drain(self) -> None:
+        with self._lock:
+            self._draining = False
+            self._drain_started_at = None
+
+    def active_turns(self) -> list[tuple[str, str, float]]:
+        """Return ``(campaign_id, actor_id, age_seconds)`` for each local in-flight turn."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (campaign_id, actor_id, now - started)
+                for (campaign_id, actor_id), started in self._active.items()
+            ]
+
+    def forget(self, campaign_ids=None) -> int:
+        """Drop tracked turns (all, or for *campaign_ids*) after their claims were cleared."""
+        with self._lock:
+            if campaign_ids is None:
+                count = len(self._active)
+                self._active.clear()
+                return count
+            wanted = {str(cid) for cid in campaign_ids}
+            keys = [key for key in self._active if key[0] in wanted]
+            for key in keys:
+                self._active.pop(key, None)
+            return len(keys)
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            ages = [now - started for started in self._active.values()]
+            return {
+                "draining": self._draining,
+                "active": len(ages),
+                "started_with": self._drain_started_with,
+                "completed": self._completed_since_drain,
+                "oldest_age_seconds": max(ages) if ages else 0.0,
+                "elapsed_seconds": (
+                    now - self._drain_started_at if self._drain_started_at is not None else 0.0
+                ),
+            }
+
+    async def wait_until_idle(
+        self,
+        timeout: float,
+        *,
+        external_claims_expire_in: Callable[[], Awaitable[float | None]] | None = None,
+        on_progress: Callable[[dict], Awaitable[None] | None] | None = None,
+    ) -> bool:
+        """Wait until no turns are in flight; returns ``False`` on timeout.
+
+        *external_claims_expire_in* is a coroutine function returning seconds
+        until the soonest claim held outside this process expires, or ``None``
+        when there are none; it is awaited on the loop, so a blocking lookup
+        belongs in ``asyncio.to_thread``.  It is only consulted once local
+        turns have drained.  *on_progress* receives ``status()`` and may be a
+        coroutine function, which is awaited.
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        entry = (loop, event)
+        deadline = loop.time() + max(0.0, float(timeout))
+        with self._lock:
+            self._waiters.add(entry)
+        try:
+            while True:
+                event.clear()
+                with self._lock:
+                    local_active = len(self._active)
+                if on_progress is not None:
+                    try:
+                        result = on_progress(self.status())
+                        if inspect.isawaitable(result):
+                            await result
+                    except Exception:
+                        logger.debug("Drain progress callback failed", exc_info=True)
+                wait_for = deadline - loop.time()
+                if local_active == 0:
+                    remaining = None
+                    if external_claims_expire_in is not None:
+                        try:
+                            remaining = await external_claims_expire_in()
+                        except Exception:
+                            logger.debug("External claim check failed", exc_info=True)
+                            remaining = None
+                    if remaining is None:
+                        return True
+                    wait_for = min(
+                        wait_for,
+                        max(self.MIN_WAIT_SECONDS, min(float(remaining), self.EXTERNAL_RECHECK_SECONDS)),
+                    )
+                if deadline - loop.time() <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=max(0.0, wait_for))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._lock:
+                self._waiters.discard(entry)
+
+    # -- Queued turn checkpointing ---------------------------------------------
+
+    def checkpoint_turns(self, items: list[dict]) -> None:
+        """Append queued turns to the handoff file for the next process to resume."""
+        if not items:
+            return
+        with self._lock:
+            existing = self._read_handoff()
+            existing.extend(items)
+            os.makedirs(os.path.dirname(self.handoff_path) or ".", exist_ok=True)
+            tmp_path = f"{self.handoff_path}.tmp"
+            with open(tmp_path, "w") as handle:
+                json.dump(existing, handle)
+            os.replace(tmp_path, self.handoff_path)
+        logger.info("Checkpointed %s queued turn(s) for handoff", len(items))
+
+    def take_checkpointed_turns(self) -> list[dict]:
+        """Return and remove any turns checkpointed by a previous process."""
+        with self._lock:
+            items = self._read_handoff()
+            try:
+                os.remove(self.handoff_path)
+            except FileNotFoundError:
+                pass
+        return items
+
+    def _read_handoff(self) -> list[dict]:
+        try:
+            with open(self.handoff_path, "r") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError):
+            logger.warning("Discarding unreadable turn handoff file", exc_info=True)
+            return []
+        return [item for item in data if isinstance(item, dict)] if isinstance(data, list) else []
+
+
+turn_drain_coordinator = TurnDrainCoordinator()
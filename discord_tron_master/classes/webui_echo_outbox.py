@@ -0,0 +1,295 @@
+"""Push-driven consumer for webui-to-Discord echo events.
+
+The webui sidecar writes ``webui_discord_echo`` rows to TGE's ``OutboxEvent``
+table.  The sidecar runs under ``webui_outbox_hook``, which pings the DTM bridge
+(``/api/zork/outbox/notify``) after every commit that wrote one, and the ping
+wakes the consumer immediately.  ``FALLBACK_POLL_SECONDS`` only covers lost
+pings and retries that come due.  Each wake drains the outbox in large
+batches off the event loop, records every batch's outcome in a single
+transaction, and reuses cached campaign-to-channel routes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+from discord_tron_master.classes.metrics import (
+    webui_echo_db_round_trips,
+    webui_echo_events,
+    webui_echo_latency,
+)
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPE = "webui_discord_echo"
+
+# Delivery outcomes returned by the deliver callback.
+CONSUMED = "consumed"
+RETRY = "pending"
+
+
+class WebUIEchoOutbox:
+    # Covers lost pings; also bounds how long a retried event waits past
+    # RETRY_DELAY_SECONDS.
+    FALLBACK_POLL_SECONDS = 15.0
+    BATCH_SIZE = 100
+    RETRY_DELAY_SECONDS = 30
+    ROUTE_TTL_SECONDS = 300.0
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._pending_wake = False
+        self._lock = threading.Lock()
+        self._routes: dict[str, tuple[str | None, float]] = {}
+
+    # -- Wakeups ---------------------------------------------------------------
+
+    def notify(self) -> None:
+        """Wake the consumer; safe to call from any thread."""
+        with self._lock:
+            loop, wake = self._loop, self._wake
+            if loop is None or wake is None:
+                self._pending_wake = True
+                return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            wake.set()
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass
+
+    # -- Routing cache ---------------------------------------------------------
+
+    def invalidate_route(self, campaign_id=None) -> None:
+        with self._lock:
+            if campaign_id is None:
+                self._routes.clear()
+            else:
+                self._routes.pop(str(campaign_id), None)
+
+    def _cached_route(self, campaign_id: str):
+        with self._lock:
+            entry = self._routes.get(campaign_id)
+        if entry is None or entry[1] <= time.monotonic():
+            return False, None
+        return True, entry[0]
+
+    def resolve_routes(self, session_factory, campaign_ids) -> dict[str, str | None]:
+        """Return the Discord channel for each campaign, loading misses in one query."""
+        from text_game_engine.persistence.sqlalchemy.models import (
+            Session as GameSession,
+        )
+
+        routes: dict[str, str | None] = {}
+        missing = []
+        for campaign_id in {str(cid) for cid in campaign_ids if cid is not None}:
+            hit, channel_id = self._cached_route(campaign_id)
+            if hit:
+                routes[campaign_id] = channel_id
+            else:
+                missing.append(campaign_id)
+        if not missing:
+            return routes
+        with session_factory() as session:
+            rows = (
+                session.query(
+                    GameSession.campaign_id,
+                    GameSession.surface,
+                    GameSession.surface_channel_id,
+                    GameSession.surface_thread_id,
+                )
+                .filter(
+                    GameSession.campaign_id.in_(missing),
+                    GameSession.enabled == True,  # noqa: E712
+                )
+                .order_by(GameSession.created_at.asc(), GameSession.id.asc())
+                .all()
+            )
+        webui_echo_db_round_trips.labels("routes").inc()
+        preferred: dict[str, str] = {}
+        fallback: dict[str, str] = {}
+        for campaign_id, surface, surface_channel_id, surface_thread_id in rows:
+            channel_id = str(surface_thread_id or surface_channel_id or "").strip()
+            if not channel_id:
+                continue
+            surface_text = str(surface or "").strip().lower()
+            target = preferred if surface_text.startswith("discord") else fallback
+            target.setdefault(str(campaign_id), channel_id)
+        expires = time.monotonic() + self.ROUTE_TTL_SECONDS
+        with self._lock:
+            for campaign_id in missing:
+                channel_id = preferred.get(campaign_id) or fallback.get(campaign_id)
+                self._routes[campaign_id] = (channel_id, expires)
+                routes[campaign_id] = channel_id
+        return routes
+
+    # -- Outbox access ---------------------------------------------------------
+
+    def fetch_batch(self, session_factory) -> list[dict[str, Any]]:
+        from sqlalchemy import or_
+        from text_game_engine.persistence.sqlalchemy.models import OutboxEvent
+
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        with session_factory() as session:
+            pending = (
+                session.query(
+                    OutboxEvent.id,
+                    OutboxEvent.campaign_id,
+                    OutboxEvent.payload_json,
+                    OutboxEvent.attempts,
+                    OutboxEvent.created_at,
+                )
+                .filter(
+                    OutboxEvent.event_type == EVENT_TYPE,
+                    OutboxEvent.status == "pending",
+                    or_(
+                        OutboxEvent.next_attempt_at.is_(None),
+                        OutboxEvent.next_attempt_at <= now,
+                    ),
+                )
+                .order_by(OutboxEvent.created_at.asc())
+                .limit(self.BATCH_SIZE)
+                .all()
+            )
+        webui_echo_db_round_trips.labels("fetch").inc()
+        return [
+            {
+                "id": str(row_id),
+                "campaign_id": str(campaign_id),
+                "payload_json": str(payload_json or ""),
+                "attempts": int(attempts or 0),
+                "created_at": created_at,
+            }
+            for row_id, campaign_id, payload_json, attempts, created_at in pending
+        ]
+
+    def record_outcomes(self, session_factory, outcomes: dict[str, str]) -> None:
+        """Persist a batch's delivery outcomes in one transaction."""
+        from text_game_engine.persistence.sqlalchemy.models import OutboxEvent
+
+        if not outcomes:
+            return
+        consumed = [event_id for event_id, status in outcomes.items() if status != RETRY]
+        retry = [event_id for event_id, status in outcomes.items() if status == RETRY]
+        next_attempt_at = datetime.datetime.now(datetime.timezone.utc).replace(
+            tzinfo=None
+        ) + datetime.timedelta(seconds=self.RETRY_DELAY_SECONDS)
+        with session_factory() as session:
+            if consumed:
+                session.query(OutboxEvent).filter(OutboxEvent.id.in_(consumed)).update(
+                    {
+                        OutboxEvent.attempts: OutboxEvent.attempts + 1,
+                        OutboxEvent.status: CONSUMED,
+                        OutboxEvent.next_attempt_at: None,
+                    },
+                    synchronize_session=False,
+                )
+            if retry:
+                session.query(OutboxEvent).filter(OutboxEvent.id.in_(retry)).update(
+                    {
+                        OutboxEvent.attempts: OutboxEvent.attempts + 1,
+                        OutboxEvent.status: RETRY,
+                        OutboxEvent.next_attempt_at: next_attempt_at,
+                    },
+                    synchronize_session=False,
+                )
+            session.commit()
+        webui_echo_db_round_trips.labels("record").inc()
+
+    async def drain(
+        self,
+        session_factory,
+        deliver: Callable[[dict[str, Any], str | None], Awaitable[str]],
+    ) -> int:
+        """Deliver every due event, batch by batch; returns the number processed."""
+        processed = 0
+        while True:
+            work = await asyncio.to_thread(self.fetch_batch, session_factory)
+            if not work:
+                return processed
+            routes = await asyncio.to_thread(
+                self.resolve_routes,
+                session_factory,
+                [item["campaign_id"] for item in work],
+            )
+            outcomes: dict[str, str] = {}
+            try:
+                for item in work:
+                    try:
+                        outcomes[item["id"]] = await deliver(
+                            item, routes.get(item["campaign_id"])
+                        )
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception:
+                        logger.exception(
+                            "Failed sending webui Discord mirror for campaign=%s event=%s",
+                            item["campaign_id"],
+                            item["id"],
+                        )
+                        outcomes[item["id"]] = RETRY
+                        self.invalidate_route(item["campaign_id"])
+            finally:
+                await asyncio.to_thread(self.record_outcomes, session_factory, outcomes)
+            self._observe(work, outcomes)
+            processed += len(work)
+            if len(work) < self.BATCH_SIZE:
+                return processed
+
+    @staticmethod
+    def _observe(work: list[dict[str, Any]], outcomes: dict[str, str]) -> None:
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        for item in work:
+            outcome = outcomes.get(item["id"], RETRY)
+            webui_echo_events.labels("retry" if outcome == RETRY else "consumed").inc()
+            created_at = item.get("created_at")
+            if outcome != RETRY and isinstance(created_at, datetime.datetime):
+                if created_at.tzinfo is not None:
+                    created_at = created_at.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+                webui_echo_latency.observe(max(0.0, (now - created_at).total_seconds()))
+
+    async def run(
+        self,
+        session_factory_getter: Callable[[], Any],
+        deliver: Callable[[dict[str, Any], str | None], Awaitable[str]],
+    ) -> None:
+        """Drain on every wakeup, and at least every ``FALLBACK_POLL_SECONDS``."""
+        wake = asyncio.Event()
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._wake = wake
+            if self._pending_wake:
+                self._pending_wake = False
+                wake.set()
+        try:
+            while True:
+                wake.clear()
+                try:
+                    await self.drain(session_factory_getter(), deliver)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Failed draining webui Discord mirror outbox")
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=self.FALLBACK_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._lock:
+                if self._wake is wake:
+                    self._loop = None
+                    self._wake = None
+
+
+webui_echo_outbox = WebUIEchoOutbox()
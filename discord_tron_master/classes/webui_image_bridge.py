@@ -8,6 +8,7 @@ from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Any
 
 from discord_tron_master.classes.app_config import AppConfig
+from discord_tron_master.exceptions.admission import AdmissionRejected
 from discord_tron_master.classes.jobs.webui_image_job import (
     DEFAULT_WEBUI_IMAGE_MODEL,
     WebUIImageGenerationJob,
@@ -58,6 +59,11 @@ def enqueue_webui_image_job(discord: Any, data: dict[str, Any]) -> tuple[dict[st
             loop,
         )
         future.result(timeout=5)
+    except AdmissionRejected as exc:
+        body = {"error": str(exc), "reason": exc.reason}
+        if exc.retry_after is not None:
+            body["retry_after"] = round(exc.retry_after)
+        return body, 429
     except Exception as exc:
         logger.exception("Failed to enqueue WebUI image job")
         return {"error": str(exc)}, 500
@@ -173,8 +179,16 @@ def apply_webui_backend_config(config: AppConfig, data: dict[str, Any]) -> tuple
     }, 200
 
 
+def notify_webui_outbox(data: dict[str, Any]) -> tuple[dict[str, Any], int]:
+    """Wake the Discord echo consumer after the web UI writes an outbox event."""
+    from discord_tron_master.classes.webui_echo_outbox import webui_echo_outbox
+
+    webui_echo_outbox.notify()
+    return {"ok": True}, 200
+
+
 class WebUIImageBridge:
-    """Small localhost API that lets the web UI enqueue jobs in the bot process."""
+    """Small localhost API that lets the web UI enqueue jobs and wake consumers in the bot process."""
 
     def __init__(self, config: AppConfig, discord: Any):
         self._config = config
@@ -185,11 +199,6 @@ class WebUIImageBridge:
     def start(self) -> None:
         if not self._config.is_text_game_webui_enabled():
             return
-        if (
-            self._config.get_text_game_webui_image_backend() != "dtm"
-            and not self._config.get_text_game_webui_sync_zork_backend()
-        ):
-            return
         if self._server is not None:
             return
 
@@ -202,7 +211,11 @@ class WebUIImageBridge:
         class Handler(BaseHTTPRequestHandler):
             def do_POST(self) -> None:  # noqa: N802 - stdlib callback name
                 path = self.path.rstrip("/")
-                if path not in {"/api/zork/image/generate", "/api/zork/backend/config"}:
+                if path not in {
+                    "/api/zork/image/generate",
+                    "/api/zork/backend/config",
+                    "/api/zork/outbox/notify",
+                }:
                     self._send_json({"error": "Not found"}, 404)
                     return
 
@@ -228,7 +241,9 @@ class WebUIImageBridge:
                     self._send_json({"error": "JSON body must be an object"}, 400)
                     return
 
-                if path == "/api/zork/backend/config":
+                if path == "/api/zork/outbox/notify":
+                    body, status = notify_webui_outbox(data)
+                elif path == "/api/zork/backend/config":
                     body, status = apply_webui_backend_config(config, data)
                 else:
                     body, status = enqueue_webui_image_job(discord, data)
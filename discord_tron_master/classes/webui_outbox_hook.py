@@ -0,0 +1,114 @@
+"""Outbox notify hook for the text-game-webui sidecar.
+
+``TextGameWebUIRunner`` starts the sidecar through this module rather than
+``python -m uvicorn``.  Before the web app is imported it registers SQLAlchemy
+session listeners: whenever a commit inserts a ``webui_discord_echo``
+``OutboxEvent``, the DTM bridge's ``/api/zork/outbox/notify`` is pinged from a
+background thread, so the bot's echo consumer wakes at once instead of on its
+fallback poll.  Runs in the sidecar's interpreter, so it only imports the
+standard library, SQLAlchemy and TGE.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import urllib.request
+
+from discord_tron_master.classes.webui_echo_outbox import EVENT_TYPE
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_URL_ENV = "TEXT_GAME_WEBUI_DTM_OUTBOX_NOTIFY_URL"
+LINK_SECRET_ENV = "TEXT_GAME_WEBUI_DTM_LINK_SECRET"
+_SESSION_FLAG = "dtm_outbox_notify"
+
+
+class OutboxNotifier:
+    """Pings the DTM bridge from one thread; commits made during a ping share the next one."""
+
+    TIMEOUT_SECONDS = 2.0
+
+    def __init__(self, url: str, secret: str):
+        self.url = url
+        self.secret = secret
+        self._pending = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def request(self) -> None:
+        self._pending.set()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="dtm-outbox-notify", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            self.send()
+
+    def send(self) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=b"{}",
+            method="POST",
+            headers={
+                "Content-Type": "application/json",
+                "X-DTM-Link-Secret": self.secret,
+            },
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.TIMEOUT_SECONDS) as response:
+                response.read()
+        except Exception as exc:
+            # The bot's fallback poll still picks the event up.
+            logger.debug("DTM outbox notify failed: %s", exc)
+
+
+def install(notifier, *, session_class=None, outbox_model=None) -> None:
+    """Call ``notifier.request()`` after every commit that inserted an echo event."""
+    from sqlalchemy import event
+
+    if session_class is None:
+        from sqlalchemy.orm import Session as session_class
+    if outbox_model is None:
+        from text_game_engine.persistence.sqlalchemy.models import OutboxEvent as outbox_model
+
+    def after_flush(session, flush_context):
+        for obj in session.new:
+            if isinstance(obj, outbox_model) and obj.event_type == EVENT_TYPE:
+                session.info[_SESSION_FLAG] = True
+                return
+
+    def after_commit(session):
+        if session.info.pop(_SESSION_FLAG, False):
+            notifier.request()
+
+    def after_rollback(session):
+        session.info.pop(_SESSION_FLAG, None)
+
+    event.listen(session_class, "after_flush", after_flush)
+    event.listen(session_class, "after_commit", after_commit)
+    event.listen(session_class, "after_rollback", after_rollback)
+
+
+def main() -> None:
+    url = os.environ.get(NOTIFY_URL_ENV, "").strip()
+    secret = os.environ.get(LINK_SECRET_ENV, "").strip()
+    if url and secret:
+        try:
+            install(OutboxNotifier(url, secret))
+        except Exception:
+            logger.warning("Outbox notify hook not installed; echoes fall back to polling", exc_info=True)
+    from uvicorn.main import main as uvicorn_main
+
+    uvicorn_main()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,12 @@ from typing import Callable, Dict, Any, List
 from asyncio import Queue
 import asyncio
 from discord_tron_master.classes.job import Job
+from discord_tron_master.classes import metrics
+from discord_tron_master.classes.admission import admission_controller
+from discord_tron_master.classes.deadlines import ACK, JobDeadlines
+from discord_tron_master.classes.model_affinity import model_affinity
+from discord_tron_master.classes.tracing import current_job_id, job_tracer
+from discord_tron_master.classes.structured_log import LazyPayload
 from discord_tron_master.exceptions.registration import RegistrationError
 
 logger = logging.getLogger("Worker")
@@ -38,6 +44,14 @@ class Worker:
         # Jobs we have assigned (by job type)
         self.assigned_jobs = {}
         self.websocket = None
+        # Called with this worker when its queue is empty; returns a job
+        # taken from a busier peer, or None.
+        self.work_stealer = None
+        # Ack and completion deadlines for the jobs sent to this worker.
+        self.deadlines = JobDeadlines()
+
+    def set_work_stealer(self, work_stealer: Callable):
+        self.work_stealer = work_stealer
 
     def assign_job(self, job: Job):
         if job.job_type not in self.assigned_jobs:
@@ -57,16 +71,25 @@ class Worker:
             return False
         logger.info(f"Job {job_id} is acknowledged by the remote side.")
         job.acknowledge()
+        self.deadlines.acknowledged(job)
+        if job.executed_date is not None:
+            metrics.job_ack_delay.labels(job.job_type).observe(
+                max(0.0, job.acknowledged_date - job.executed_date)
+            )
 
         return True
 
     def complete_job(self, job: Job):
+        self.deadlines.cancel(job.id)
+        admission_controller.release(job.id)
         if job.job_type in self.assigned_jobs:
             self.assigned_jobs[job.job_type].remove(job)
         if self.job_queue is not None:
             self.job_queue.done(job.id)
 
     def complete_job_by_id(self, job_id: str):
+        self.deadlines.cancel(job_id)
+        admission_controller.release(job_id)
         for job_type, jobs in self.assigned_jobs.items():
             for job in jobs:
                 if job.id == job_id:
@@ -140,10 +163,11 @@ class Worker:
             message = json.dumps(message)
         elif not isinstance(message, str):
             raise ValueError("Message must be a string or array.")
-        logger.info("Sending job to worker")
-        logger.debug(message)
+        logger.debug("Sending job to worker: %s", LazyPayload(message))
         try:
-            await self.websocket.send(message)
+            with job_tracer.span("websocket_send", bytes=len(message)):
+                await self.websocket.send(message)
+            metrics.websocket_messages.labels("dispatch").inc()
         except Exception as e:
             logger.error("Error sending websocket message: " + str(e))
             raise e
@@ -162,6 +186,8 @@ class Worker:
 
     async def stop(self):
         self.terminate = True
+        self.deadlines.clear()
+        metrics.jobs_unacknowledged.remove(self.worker_id)
         if self.job_queue is not None:
             await self.job_queue.stop()
 
@@ -199,6 +225,16 @@ class Worker:
                 )  # Use 'await' instead of synchronous call
                 if test_job is None:
                     # logger.debug(f"(Worker.process_jobs) No job to process for worker {self.worker_id}")
+                    # Only an empty queue steals: waiting jobs held back by a
+                    # lane cap would be stolen back and forth between workers.
+                    if (
+                        self.work_stealer is not None
+                        and len(self.job_queue.queue) == 0
+                        and not self.job_queue.in_progress
+                        and self.work_stealer(self) is not None
+                    ):
+                        await asyncio.sleep(0)
+                        continue
                     await asyncio.sleep(1)
                     continue
                 # logger.debug(f"(Worker.process_jobs) Preview task: {test_job}")
@@ -252,7 +288,17 @@ class Worker:
                 logger.info(
                     f"(Worker.process_jobs) Processing job {job.id} for worker {self.worker_id}"
                 )
-                await job.execute()
+                enqueued_at = getattr(job, "enqueued_at", None)
+                if enqueued_at is not None:
+                    metrics.job_assignment_latency.labels(job.job_type).observe(
+                        time.monotonic() - enqueued_at
+                    )
+                metrics.jobs_assigned.labels(job.job_type).inc()
+                model_affinity.loaded(self.worker_id, job)
+                job_tracer.span_since(
+                    job.id, "enqueued", "queue_wait", worker_id=self.worker_id
+                )
+                await self._execute_traced(job, "dispatch")
                 logger.info(f"(Worker.process_jobs) Job executed.")
                 await asyncio.sleep(0.001)  # Use 'await' for asynchronous sleep
             except Exception as e:
@@ -264,6 +310,18 @@ class Worker:
                 )
                 await asyncio.sleep(1)  # Use 'await' for asynchronous sleep
 
+    async def _execute_traced(self, job: Job, span_name: str):
+        token = current_job_id.set(job.id)
+        try:
+            with job_tracer.span(span_name, job.id, worker_id=self.worker_id):
+                result = await job.execute()
+        finally:
+            current_job_id.reset(token)
+        job_tracer.mark(job.id, "sent")
+        if job.executed and not job.is_acknowledged()[0]:
+            self.deadlines.expect_ack(job)
+        return result
+
     async def monitor_worker(self):
         logger.debug(
             f"(monitor_worker) Beginning worker monitoring for worker {self.worker_id}"
@@ -304,14 +362,36 @@ class Worker:
                 )
                 await asyncio.sleep(1)
                 continue
-            for job in self.job_queue.in_progress.values():
-                if not job.is_acknowledged()[0] and job.needs_resubmission():
-                    logger.info(
-                        f"Job {job.id} has not been acknowledged. Sending message to worker again."
+            for job_id, kind in self.deadlines.expired():
+                job = self.job_queue.in_progress.get(job_id)
+                if job is None:
+                    continue
+                if kind == ACK:
+                    await self._resubmit_unacknowledged(job)
+                else:
+                    logger.warning(
+                        f"Job {job.id} was acknowledged but has not finished within its completion deadline."
                     )
-                    await job.execute()
-            # Sleep for a while before checking again
-            await asyncio.sleep(10)
+                    metrics.jobs_overdue.labels(job.job_type).inc()
+                    job_tracer.event(job.id, "completion_overdue", worker_id=self.worker_id)
+            metrics.jobs_unacknowledged.labels(self.worker_id).set(
+                self.deadlines.pending_acks()
+            )
+            # Sleep until the next deadline, or until an earlier one is scheduled.
+            await self.deadlines.wait()
+
+    async def _resubmit_unacknowledged(self, job: Job):
+        if job.is_acknowledged()[0]:
+            return
+        logger.info(
+            f"Job {job.id} has not been acknowledged after {self.deadlines.attempts(job.id)} attempt(s). Sending message to worker again."
+        )
+        # Clear the sent state so execute() sends the job again.
+        job.executed = False
+        job.executed_date = None
+        metrics.jobs_resubmitted.labels(job.job_type).inc()
+        job_tracer.event(job.id, "resubmitted", worker_id=self.worker_id)
+        await self._execute_traced(job, "redispatch")
 
     async def start_monitoring(self):
         # Use 'asyncio.create_task' to run the 'process_jobs' and 'monitor_worker' coroutines
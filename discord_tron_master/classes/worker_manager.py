@@ -1,9 +1,14 @@
 from typing import Dict, Any, List
-import logging, websocket, traceback, asyncio, time
+import logging, websocket, traceback, time
 from discord_tron_master.classes.worker import Worker
 from discord_tron_master.exceptions.auth import AuthError
 from discord_tron_master.exceptions.registration import RegistrationError
 from discord_tron_master.classes.job import Job
+from discord_tron_master.classes.tracing import job_tracer
+from discord_tron_master.classes.service_times import service_time_estimator
+from discord_tron_master.classes.model_affinity import model_affinity
+from discord_tron_master.classes.remote_ollama_broker import remote_ollama_broker
+from discord_tron_master.classes.structured_log import log_sampled
 from threading import Thread
 
 logger = logging.getLogger("WorkerManager")
@@ -60,7 +65,16 @@ class WorkerManager:
         job_id = arguments["job_id"]
         if worker_id and job_id:
             worker = self.get_worker(worker_id)
+            job = (
+                worker.job_queue.in_progress.get(job_id)
+                if worker.job_queue is not None
+                else None
+            )
+            if job is not None:
+                service_time_estimator.observe_job(worker_id, job)
             worker.complete_job_by_id(job_id)
+            job_tracer.span_since(job_id, "acknowledged", "worker_run", worker_id=worker_id)
+            job_tracer.finish(job_id, worker_id=worker_id)
             logger.info("Finished job for worker " + worker_id)
             return {"status": "successfully finished job"}
         else:
@@ -79,6 +93,8 @@ class WorkerManager:
             if worker.job_queue is not None:
                 result = await worker.acknowledge_job(job_id)
             if result:
+                job_tracer.span_since(job_id, "sent", "ack_wait", worker_id=worker_id)
+                job_tracer.mark(job_id, "acknowledged")
                 logger.info("acknowledged job for worker " + worker_id)
                 return {"status": "successfully acknowledged job"}
             else:
@@ -96,42 +112,64 @@ class WorkerManager:
             )
 
     def find_worker_with_fewest_queued_tasks(self, job: Job):
-        return self.find_worker_with_fewest_queued_tasks_by_job_type(job.job_type)
+        return self.find_worker_with_fewest_queued_tasks_by_job_type(
+            job.job_type, job=job
+        )
 
     def find_worker_with_fewest_queued_tasks_by_job_type(
-        self, job_type: str, exclude_worker_id: str = None
+        self, job_type: str, exclude_worker_id: str = None, job: Job = None
     ):
+        """
+        Pick the capable worker that would finish a new job soonest.
+
+        Queued work is weighted by learned service times (see classes/service_times.py),
+        so with no history this is the worker with the fewest queued tasks.  When the
+        job is given, workers that would have to load a different model for it are
+        charged the swap penalty from classes/model_affinity.py.
+        """
         job_type = job_type
         min_queued_tasks = float("inf")
         selected_worker = self.find_first_worker(job_type)
         for worker_id, worker in self.workers.items():
             if exclude_worker_id and worker_id == exclude_worker_id:
                 logger.debug(
-                    f"Skipping worker {worker_id} because it is the excluded worker."
+                    "Skipping worker %s because it is the excluded worker.", worker_id
                 )
                 selected_worker = None
                 continue
-            logger.debug(f"worker_id: {worker_id}, worker: {worker}")
             if (
                 job_type in worker.supported_job_types
                 and worker.supported_job_types[job_type] is True
             ):
-                logger.info(f"Found valid worker for {job_type} job")
-                queued_tasks = self.queue_manager.worker_queue_length(worker)
+                queued_tasks = service_time_estimator.backlog_seconds(
+                    worker_id, worker.job_queue
+                ) + (
+                    service_time_estimator.expected_for_job(job, worker_id)
+                    + model_affinity.swap_cost(worker_id, job, worker.job_queue)
+                    if job is not None
+                    else service_time_estimator.expected(job_type, worker_id)
+                )
                 if queued_tasks < min_queued_tasks:
-                    logger.debug(
-                        f"Found worker with fewer queued tasks: {queued_tasks} < {min_queued_tasks}"
-                    )
                     min_queued_tasks = queued_tasks
                     selected_worker = worker
-                else:
-                    logger.debug(
-                        f"Worker {worker_id} has more or same queued tasks than current best: {queued_tasks} >= {min_queued_tasks}"
-                    )
             else:
-                logger.warn(
-                    f"Worker {worker_id} does not support job type {job_type}: {worker.supported_job_types}"
+                log_sampled(
+                    logger,
+                    logging.WARNING,
+                    "Worker %s does not support job type %s: %s",
+                    worker_id,
+                    job_type,
+                    worker.supported_job_types,
+                    key=("unsupported_job_type", worker_id, job_type),
                 )
+        log_sampled(
+            logger,
+            logging.DEBUG,
+            "Selected worker %s for %s job, predicted to finish in %.1fs.",
+            getattr(selected_worker, "worker_id", None),
+            job_type,
+            min_queued_tasks,
+        )
 
         return selected_worker
 
@@ -205,6 +243,8 @@ class WorkerManager:
 
     async def unregister_worker(self, worker_id):
         worker = self.workers.pop(worker_id, None)
+        model_affinity.forget(worker_id)
+        remote_ollama_broker.forget_worker(worker_id)
         if worker:
             supported_job_types = worker.supported_job_types
             for job_type in supported_job_types:
@@ -290,6 +330,7 @@ class WorkerManager:
         )
         await self.queue_manager.register_worker(worker_id, supported_job_types)
         await worker.set_job_queue(await self.queue_manager.create_queue(worker))
+        worker.set_work_stealer(self.queue_manager.steal_job_for)
         worker.set_websocket(websocket)
         await worker.start_monitoring()  # Use 'await' to call the async 'start_monitoring' method
         return {
@@ -454,7 +495,7 @@ class WorkerManager:
                         added_job_ids.add(jobs[i].id)
             # We now have a new list of jobs.
             # We need to replace the existing list of jobs with the new list.
-            asyncio.run(worker.job_queue.set_queue_from_list(new_jobs))
+            new_jobs = self.queue_manager.reorder_waiting_jobs(worker_id, new_jobs)
             logger.info(
                 f"(reorganize_queue_by_user_ids) Reorganized queue for worker {worker_id} to: {[f'author_id={job.author_id}, id={job.id}' for job in new_jobs]}"
             )
@@ -501,6 +542,9 @@ class WorkerManager:
                         logger.info(
                             f"(monitor_worker_queues) Found a less busy worker {new_worker.worker_id} for job {job.id}."
                         )
-                        job.migrate()
-                        asyncio.run(worker.complete_job(job))
-                        asyncio.run(self.queue_manager.enqueue_job(new_worker, job))
+                        if not self.queue_manager.transfer_job(
+                            job, worker_id, new_worker
+                        ):
+                            logger.info(
+                                f"(monitor_worker_queues) Job {job.id} is no longer waiting on {worker_id}; leaving it."
+                            )
@@ -1,11 +1,10 @@
 from io import BytesIO
 import discord as discord_lib
-import requests, logging, asyncio
+import logging, asyncio
 from discord_tron_master.classes.app_config import AppConfig
+from discord_tron_master.classes.image_backends import decode_image, image_backends
 from discord_tron_master.classes.openai.text import GPT
-from discord_tron_master.classes.stabilityai.api import StabilityAI
 from PIL import ImageDraw, ImageFont, Image
-from concurrent.futures import ThreadPoolExecutor
 
 
 def retrieve_vlm_caption(image_url) -> str:
@@ -141,17 +140,61 @@ def generate_lumina_image(prompt: str, use_5b: bool = False):
     return f"{client_url}file=/tmp/gradio/{split_pieces[-2]}/image.png"
 
 
+def _label_font():
+    try:
+        return ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 40)
+    except IOError:
+        return ImageFont.load_default()
+
+
+def compose_comparison(images: list) -> BytesIO:
+    """
+    Lay labelled images out side by side and encode the collage as PNG in memory.
+
+    :param images: [{"label": "Label", "data": Image}]; the first two are kept
+        at their own size, any others are resized to 1024x1024.
+    """
+    font = _label_font()
+    height = images[0]["data"].size[1]
+    tiles, new_width = [], 0
+    for index, image in enumerate(images):
+        data = image["data"]
+        if index >= 2:
+            data = data.resize((1024, 1024))
+        # Label the tile without touching the caller's image.
+        data = data.convert("RGB")
+        ImageDraw.Draw(data).text(
+            (10, 10),
+            image["label"],
+            (255, 255, 255),
+            font=font,
+            stroke_fill=(0, 0, 0),
+            stroke_width=4,
+        )
+        tiles.append((data, (new_width, int((height - data.size[1]) / 2))))
+        new_width += data.size[0]
+    new_image = Image.new("RGB", (new_width, height))
+    for data, position in tiles:
+        new_image.paste(data, position)
+    output = BytesIO()
+    new_image.save(output, format="PNG")
+    output.seek(0)
+    return output
+
+
 async def generate_image(ctx, prompt, user_id: int = None, extra_image: dict = None):
     """
     Generate images with DALLE-3 and Stable Diffusion 3 models, stitching them with an extra optional image.
 
+    Every backend is called concurrently; blocking clients and the collage
+    run on the shared image backend pool, so the event loop is never held up.
+
     :param ctx: The context object.
     :param prompt: The prompt to generate the images with.
-    :param extra_image: {"label": "Label", "data": Image}
+    :param extra_image: {"label": "Label", "data": Image or bytes} or {"label": "Label", "url": str}
 
     :return: None - Sends the message to the context.
     """
-    stabilityai = StabilityAI()
     config = AppConfig()
     user_config = config.get_user_config(
         user_id=user_id if user_id is not None else ctx.author.id
@@ -159,114 +202,65 @@ async def generate_image(ctx, prompt, user_id: int = None, extra_image: dict = N
 
     user_config["resolution"] = {"width": 1024, "height": 1024}
 
-    loop = asyncio.get_event_loop()
-    executor = ThreadPoolExecutor()
-
-    async def fetch_image(url):
-        return await loop.run_in_executor(
-            executor, lambda: Image.open(BytesIO(requests.get(url).content))
-        )
-
     async def generate_dalle_image():
-        dalle_image_data = await loop.run_in_executor(
-            executor,
-            lambda: GPT().dalle_image_generate(prompt=prompt, user_config=user_config),
+        dalle_image_data = await GPT().dalle_image_generate(
+            prompt=prompt, user_config=user_config
         )
         if not hasattr(dalle_image_data, "size"):
-            dalle_image_data = BytesIO(dalle_image_data)
-            dalle_image_data = Image.open(dalle_image_data)
+            dalle_image_data = await image_backends.run(decode_image, dalle_image_data)
         return dalle_image_data
 
+    async def generate_hub_image(hub_function, *args, **kwargs):
+        url = await image_backends.run(hub_function, *args, **kwargs)
+        return await image_backends.fetch_image(url)
+
     async def generate_pollinations_image():
-        url = generate_sd3_via_hub(prompt, user_id=user_id)
         try:
-            return await fetch_image(url)
+            return await generate_hub_image(generate_sd3_via_hub, prompt, user_id=user_id)
         except:
             return Image.new("RGB", (1024, 1024), (0, 0, 0))
 
-    async def generate_extra_images():
-        extra_images = []
-        try:
-            url_terminus = generate_terminus_via_hub(prompt, user_id=user_id)
-            extra_image_terminus = await fetch_image(url_terminus)
-            extra_images.append(
-                {"label": "Terminus XL Velocity V2 (WIP)", "data": extra_image_terminus}
-            )
-        except:
-            pass
-        try:
-            url_pixart = generate_pixart_via_hub(prompt, user_id=user_id)
-            extra_image_pixart = await fetch_image(url_pixart)
-            extra_images.append(
-                {"label": "PixArt 900M (WIP)", "data": extra_image_pixart}
-            )
-        except:
-            pass
-        return extra_images
+    async def load_extra_image():
+        if extra_image.get("url"):
+            return await image_backends.fetch_image(extra_image["url"])
+        data = extra_image["data"]
+        if not hasattr(data, "size"):
+            data = await image_backends.run(decode_image, data)
+        return data
+
+    extra_backends = [
+        ("Terminus XL Velocity V2 (WIP)", generate_terminus_via_hub),
+        ("PixArt 900M (WIP)", generate_pixart_via_hub),
+    ]
 
     try:
-        dalle_image, pollinations_image, extra_images = await asyncio.gather(
+        dalle_image, pollinations_image, *extra_results = await asyncio.gather(
             generate_dalle_image(),
             generate_pollinations_image(),
-            generate_extra_images(),
-        )
-
-        # Add "DALLE-3" and "Stable Diffusion 3" labels to upper left corner
-        try:
-            font = ImageFont.truetype(
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 40
-            )
-        except IOError:
-            font = ImageFont.load_default()
-
-        draw = ImageDraw.Draw(dalle_image)
-        draw.text(
-            (10, 10),
-            "DALL-E",
-            (255, 255, 255),
-            font=font,
-            stroke_fill=(0, 0, 0),
-            stroke_width=4,
-        )
-
-        draw = ImageDraw.Draw(pollinations_image)
-        draw.text(
-            (10, 10),
-            "SD3 2B",
-            (255, 255, 255),
-            font=font,
-            stroke_fill=(0, 0, 0),
-            stroke_width=4,
+            *(
+                generate_hub_image(hub_function, prompt, user_id=user_id)
+                for _, hub_function in extra_backends
+            ),
+            *([load_extra_image()] if extra_image is not None else []),
+            return_exceptions=True,
         )
-
-        width, height = dalle_image.size
-        new_width = width * 2
-
-        for extra_img in extra_images:
-            extra_img["data"] = extra_img["data"].resize((1024, 1024))
-            extra_img_vertical_position = int((height - extra_img["data"].size[1]) / 2)
-            extra_img["position"] = (new_width, extra_img_vertical_position)
-            new_width += extra_img["data"].size[0]
-
-        new_image = Image.new("RGB", (new_width, height))
-        new_image.paste(pollinations_image, (0, 0))
-        new_image.paste(dalle_image, (width, 0))
-
-        for extra_img in extra_images:
-            draw = ImageDraw.Draw(extra_img["data"])
-            draw.text(
-                (10, 10),
-                extra_img["label"],
-                (255, 255, 255),
-                font=font,
-                stroke_fill=(0, 0, 0),
-                stroke_width=4,
-            )
-            new_image.paste(extra_img["data"], extra_img["position"])
-
-        output = BytesIO()
-        new_image.save(output, format="PNG")
-        output.seek(0)
+        if isinstance(dalle_image, BaseException):
+            raise dalle_image
+        if isinstance(pollinations_image, BaseException):
+            raise pollinations_image
+        images = [
+            {"label": "SD3 2B", "data": pollinations_image},
+            {"label": "DALL-E", "data": dalle_image},
+        ]
+        labels = [label for label, _ in extra_backends]
+        if extra_image is not None:
+            labels.append(extra_image["label"])
+        for label, result in zip(labels, extra_results):
+            # A failed extra backend is left out of the collage.
+            if not isinstance(result, BaseException):
+                images.append({"label": label, "data": result})
+
+        output = await image_backends.run(compose_comparison, images)
 
         if hasattr(ctx, "channel"):
             await ctx.channel.send(file=discord_lib.File(output, "comparison.png"))
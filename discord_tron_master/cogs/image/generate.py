@@ -7,12 +7,21 @@ from discord_tron_master.cogs.image import generate_image
 from discord_tron_master.classes.app_config import AppConfig
 from discord_tron_master.models.user_history import UserHistory
 import discord_tron_master.classes.discord.message_helpers as helper
-import logging, traceback
+import asyncio, copy, logging, traceback
 
 logger = logging.getLogger("discord_tron.image.generate")
 logger.setLevel("DEBUG")
 from discord_tron_master.bot import DiscordBot
 from discord_tron_master.classes.jobs.image_generation_job import ImageGenerationJob
+from discord_tron_master.classes.job_lanes import BULK_LANE, current_lane, job_lane
+from discord_tron_master.classes.admission import admission_controller
+from discord_tron_master.classes.model_selection import model_selector
+from discord_tron_master.classes.history_writer import history_writer
+from discord_tron_master.classes.service_times import (
+    format_duration,
+    service_time_estimator,
+)
+from discord_tron_master.exceptions.admission import AdmissionRejected
 from discord_tron_master.bot import clean_traceback
 
 # For queue manager, etc.
@@ -71,17 +80,15 @@ class Generate(commands.Cog):
         if theme is not None:
             out_theme = out_theme + " " + theme
 
-        for i in range(0, int(count)):
-            worker = discord.worker_manager.find_first_worker("gpu")
-            if worker is None:
-                discord_first_message = await ctx.send(
-                    "No workers available. Image was **not** added to queue. 😭 aw, how sad. 😭"
-                )
+        # Sweeps go in the bulk lane so single prompts are not stuck behind them.
+        with job_lane(BULK_LANE):
+            if not await self._admission_precheck(ctx):
                 return
             gpt = GPT()
-            prompt = await gpt.random_image_prompt(out_theme)
-            logger.info(f"Random prompt generated by GPT: {prompt}")
-            await self.generate(ctx, prompt=prompt)
+            # One completion for the whole sweep instead of one per image.
+            prompts = await gpt.random_image_prompts(int(count), out_theme)
+            logger.info(f"Random prompts generated by GPT: {prompts}")
+            await self._submit_prompts(ctx, prompts)
 
     @commands.command(
         name="generate-x",
@@ -105,8 +112,8 @@ class Generate(commands.Cog):
             prompt = count + " " + prompt
             count = 3
 
-        for i in range(0, int(count)):
-            await self.generate(ctx, prompt=prompt)
+        with job_lane(BULK_LANE):
+            await self._generate_prompt(ctx, prompt, copies=int(count))
 
     @commands.command(
         name="compare",
@@ -151,7 +158,7 @@ class Generate(commands.Cog):
         prompt = prompt.replace("--sd3", "").strip()
         user_config = self.config.get_user_config(user_id=ctx.author.id)
         try:
-            image = stabilityai.generate_image(prompt, user_config, model="sd3-turbo")
+            image = await stabilityai.generate_image(prompt, user_config, model="sd3-turbo")
             logging.info("Sending SD3 image to channel.")
             await ctx.channel.send(file=discord_lib.File(BytesIO(image), "image.png"))
         except Exception as e:
@@ -161,8 +168,31 @@ class Generate(commands.Cog):
         name="generate", help="Generates an image based on the given prompt."
     )
     async def generate(self, ctx, *, prompt):
+        """Queue image jobs for *prompt*; returns False once new work is being turned away."""
         if guild_config.is_channel_banned(ctx.guild.id, ctx.channel.id):
             return
+        return await self._generate_prompt(ctx, prompt)
+
+    async def _admission_precheck(self, ctx) -> bool:
+        # Turn the request away before spending a GPT call on model selection.
+        rejection = admission_controller.check(
+            "gpu",
+            ctx.author.id,
+            getattr(ctx.guild, "id", None),
+            lane=current_lane.get(),
+            queues=discord.queue_manager.queues if discord.queue_manager else None,
+        )
+        if rejection is not None:
+            await ctx.send(f"{ctx.author.mention} {rejection}")
+            return False
+        return True
+
+    async def _generate_prompt(self, ctx, prompt, copies: int = 1):
+        """Queue *copies* jobs for each image in *prompt*; returns False if work was turned away."""
+        if not await self._admission_precheck(ctx):
+            return False
+        # The --sd3 paths reply directly and leave this empty.
+        prompts = []
         # If prompt has \n, we split:
         if (
             "\n" in prompt
@@ -183,15 +213,18 @@ class Generate(commands.Cog):
             stabilityai = StabilityAI()
             prompt = prompt.replace("--sd3", "").strip()
             user_config = self.config.get_user_config(user_id=ctx.author.id)
-            try:
-                image = stabilityai.generate_image(
-                    prompt, user_config, model="sd3-turbo"
-                )
-                await ctx.channel.send(
-                    file=discord_lib.File(BytesIO(image), "image.png")
-                )
-            except Exception as e:
-                await ctx.send(f"Error generating image: {e}")
+            # generate-x asks for one image per copy.
+            for _ in range(copies):
+                try:
+                    image = await stabilityai.generate_image(
+                        prompt, user_config, model="sd3-turbo"
+                    )
+                    await ctx.channel.send(
+                        file=discord_lib.File(BytesIO(image), "image.png")
+                    )
+                except Exception as e:
+                    await ctx.send(f"Error generating image: {e}")
+                    break
         elif "--sd3-full" in prompt:
             from discord_tron_master.classes.stabilityai.api import StabilityAI
 
@@ -200,78 +233,129 @@ class Generate(commands.Cog):
             # remove any other -- params
             prompt = prompt.split("--")[0]
             user_config = self.config.get_user_config(user_id=ctx.author.id)
-            try:
-                image = stabilityai.generate_image(prompt, user_config, model="sd3")
-                await ctx.channel.send(
-                    file=discord_lib.File(BytesIO(image), "image.png")
-                )
-            except Exception as e:
-                await ctx.send(f"Error generating image: {e}")
+            for _ in range(copies):
+                try:
+                    image = await stabilityai.generate_image(prompt, user_config, model="sd3")
+                    await ctx.channel.send(
+                        file=discord_lib.File(BytesIO(image), "image.png")
+                    )
+                except Exception as e:
+                    await ctx.send(f"Error generating image: {e}")
+                    break
         elif prompt == "unconditional" or prompt == "blank":
             prompts = [""]
         else:
             prompts = [prompt]
-        idx = 0
-        for _prompt in prompts:
-            try:
-                self.config.reload_config()
-                extra_payload = {
-                    "user_config": self.config.get_user_config(user_id=ctx.author.id),
-                    "user_id": ctx.author.id,
-                }
-                if extra_payload["user_config"].get("auto_model", True):
-                    # We are going to ask OpenAI which model to use for this user.
-                    gpt = GPT()
-                    auto_resolution, auto_model = await gpt.auto_model_select(_prompt)
-                    logger.info(f"Auto-model selected by GPT: {auto_model}")
-                    extra_payload["user_config"]["model"] = auto_model
-                    extra_payload["user_config"]["resolution"] = auto_resolution
-                discord_first_message = await DiscordBot.send_large_message(
-                    ctx=ctx, text=f"Job queuing: `" + _prompt + "`"
+        return await self._submit_prompts(
+            ctx, [p for p in prompts for _ in range(copies)]
+        )
+
+    async def _submit_prompts(self, ctx, prompts):
+        """Queue one image job per entry of *prompts* as a single batch.
+
+        User config is read once, model selection runs once per distinct
+        prompt, the placeholder messages go out concurrently, history is
+        written in one transaction and the jobs are enqueued together on
+        one worker so they run back to back.  Returns False if any of them
+        were turned away.
+        """
+        if not prompts:
+            return
+        try:
+            self.config.reload_config()
+            user_config = self.config.get_user_config(user_id=ctx.author.id)
+            selections = {}
+            if user_config.get("auto_model", True):
+                distinct = list(dict.fromkeys(prompts))
+                # Memoized/local when confident, otherwise asks the LLM.
+                chosen = await asyncio.gather(
+                    *(model_selector.select(_prompt) for _prompt in distinct)
                 )
-                job = ImageGenerationJob(
-                    ctx.author.id,
-                    (self.bot, self.config, ctx, _prompt, discord_first_message),
-                    extra_payload=extra_payload,
+                selections = dict(zip(distinct, chosen))
+                for _prompt, (_, auto_model) in selections.items():
+                    logger.info(f"Auto-model selected: {auto_model}")
+            messages = await asyncio.gather(
+                *(
+                    DiscordBot.send_large_message(
+                        ctx=ctx, text=f"Job queuing: `" + _prompt + "`"
+                    )
+                    for _prompt in prompts
                 )
-                # Get the worker that will process the job.
-                worker = discord.worker_manager.find_best_fit_worker(job)
-                if worker is None:
-                    await discord_first_message.edit(
-                        content="No workers available. Image was **not** added to queue. 😭 aw, how sad. 😭"
+            )
+            jobs = []
+            for _prompt, discord_first_message in zip(prompts, messages):
+                job_config = copy.deepcopy(user_config)
+                if _prompt in selections:
+                    auto_resolution, auto_model = selections[_prompt]
+                    job_config["model"] = auto_model
+                    job_config["resolution"] = auto_resolution
+                extra_payload = {"user_config": job_config, "user_id": ctx.author.id}
+                jobs.append(
+                    ImageGenerationJob(
+                        ctx.author.id,
+                        (self.bot, self.config, ctx, _prompt, discord_first_message),
+                        extra_payload=extra_payload,
                     )
-                    # Wait a few seconds before deleting:
-                    await discord_first_message.delete(delay=10)
-                    return
-                app = AppConfig.flask
-                with app.app_context():
-                    try:
-                        user_history = UserHistory.add_entry(
-                            user=ctx.author.id,
-                            message=int(
-                                f"{ctx.id if hasattr(ctx, 'id') else ctx.message.id}{idx}"
-                            ),
-                            prompt=_prompt,
-                            config_blob=extra_payload["user_config"],
-                        )
-                        idx += 1
-                    except Exception as e:
-                        logger.warning(
-                            f"Had trouble adding the user history entry: {e}"
+                )
+            # Get the worker that will process the batch.
+            worker = discord.worker_manager.find_best_fit_worker(jobs[0])
+            if worker is None:
+                await asyncio.gather(
+                    *(
+                        job.discord_first_message.edit(
+                            content="No workers available. Image was **not** added to queue. 😭 aw, how sad. 😭"
                         )
-                # Generate a "Job" object that will be put into the queue.
-                await discord_first_message.edit(
-                    content=f"Job {job.id} queued on {worker.worker_id}: `"
-                    + _prompt
-                    + "`"
+                        for job in jobs
+                    )
                 )
-                logger.info("Worker selected for job: " + str(worker.worker_id))
-                # Add it to the queue
-                await discord.queue_manager.enqueue_job(worker, job)
-            except Exception as e:
-                await ctx.send(
-                    f"Error generating image: {e}\n\nStack trace:\n{await clean_traceback(traceback.format_exc())}"
+                # Wait a few seconds before deleting:
+                for job in jobs:
+                    await job.discord_first_message.delete(delay=10)
+                return
+            eta = service_time_estimator.backlog_seconds(
+                worker.worker_id, worker.job_queue
+            )
+            logger.info("Worker selected for jobs: " + str(worker.worker_id))
+            # Add them to the queue
+            enqueued, rejection = await discord.queue_manager.enqueue_jobs(worker, jobs)
+            message_id = ctx.id if hasattr(ctx, "id") else ctx.message.id
+            # Only jobs that were queued get history; buffered and written in
+            # the background by the history writer.
+            history_writer.add_many(
+                [
+                    {
+                        "user": ctx.author.id,
+                        "message": int(f"{message_id}{idx}"),
+                        "prompt": job.payload[3],
+                        "config_blob": job.extra_payload["user_config"],
+                    }
+                    for idx, job in enumerate(enqueued)
+                ]
+            )
+            edits = []
+            for job in enqueued:
+                edits.append(
+                    job.discord_first_message.edit(
+                        content=f"Job {job.id} queued on {worker.worker_id}: `"
+                        + job.payload[3]
+                        + "`"
+                        + (f" (starts in ~{format_duration(eta)})" if eta >= 1 else "")
+                    )
+                )
+                eta += service_time_estimator.expected_for_job(job, worker.worker_id)
+            for job in jobs[len(enqueued):]:
+                edits.append(
+                    job.discord_first_message.edit(
+                        content=f"{ctx.author.mention} {rejection}"
+                    )
                 )
+            await asyncio.gather(*edits)
+            if rejection is not None:
+                return False
+        except Exception as e:
+            await ctx.send(
+                f"Error generating image: {e}\n\nStack trace:\n{await clean_traceback(traceback.format_exc())}"
+            )
 
     @commands.command(name="stats", help="View user generation statistics.")
     async def get_statistics(self, ctx, user_id=None):
@@ -530,25 +614,21 @@ class Generate(commands.Cog):
                     # Wait a few seconds before deleting:
                     await discord_first_message.delete(delay=10)
                     return
-                app = AppConfig.flask
-                with app.app_context():
-                    try:
-                        user_history = UserHistory.add_entry(
-                            user=user_id,
-                            message=int(
-                                f"{ctx.id if hasattr(ctx, 'id') else ctx.message.id}{idx}"
-                            ),
-                            prompt=_prompt,
-                            config_blob=user_config,
-                        )
-                        idx += 1
-                    except Exception as e:
-                        logger.warning(
-                            f"Had trouble adding the user history entry: {e}"
-                        )
+                history_writer.add(
+                    user=user_id,
+                    message=int(
+                        f"{ctx.id if hasattr(ctx, 'id') else ctx.message.id}{idx}"
+                    ),
+                    prompt=_prompt,
+                    config_blob=user_config,
+                )
+                idx += 1
                 logger.info("Worker selected for job: " + str(worker.worker_id))
                 # Add it to the queue
                 await discord.queue_manager.enqueue_job(worker, job)
+            except AdmissionRejected as e:
+                await discord_first_message.edit(content=f"{ctx.author.mention} {e}")
+                return False
             except Exception as e:
                 await ctx.send(
                     f"Error generating image: {e}\n\nStack trace:\n{await clean_traceback(traceback.format_exc())}"
@@ -14,6 +14,7 @@ from discord_tron_master.classes.jobs.promptless_variation_job import (
 from discord_tron_master.classes.jobs.prompt_variation_job import PromptVariationJob
 from discord_tron_master.classes.jobs.image_generation_job import ImageGenerationJob
 from discord_tron_master.classes.jobs.image_upscaling_job import ImageUpscalingJob
+from discord_tron_master.exceptions.admission import AdmissionRejected
 from discord_tron_master.bot import clean_traceback
 from discord_tron_master.cogs.image.generate import Generate
 from discord_tron_master.adapters.emulator_bridge import EmulatorBridge as ZorkEmulator
@@ -21,6 +22,7 @@ from discord_tron_master.adapters.emulator_bridge import EmulatorBridge as ZorkE
 # For queue manager, etc.
 discord_wrapper = DiscordBot.get_instance()
 from discord_tron_master.classes.openai.text import GPT
+from discord_tron_master.classes.streaming import DiscordStreamEditor
 
 
 # Commands used for Stable Diffusion image gen.
@@ -153,6 +155,7 @@ class Img2img(commands.Cog):
                     return
 
         # Handle conversation
+        preview = None
         try:
             gpt = GPT()
             from discord_tron_master.classes.openai.chat_ml import ChatML
@@ -168,14 +171,22 @@ class Img2img(commands.Cog):
                 )
                 chat_ml = ChatML(user_conversation, config_user_id=message.author.id)
             await chat_ml.add_user_reply(message.content)
+            preview = DiscordStreamEditor.from_config(
+                message,
+                consumer="chat",
+                prefix=message.author.mention + " ",
+                render=ChatML.clean,
+            )
             response = await gpt.discord_bot_response(
-                prompt=await chat_ml.get_prompt(), ctx=message
+                prompt=await chat_ml.get_prompt(), ctx=message, stream=preview
             )
             await chat_ml.add_assistant_reply(response)
-            await DiscordBot.send_large_message(
-                message, message.author.mention + " " + ChatML.clean(response)
-            )
+            reply = message.author.mention + " " + ChatML.clean(response)
+            if preview is None or await preview.finish(reply) is None:
+                await DiscordBot.send_large_message(message, reply)
         except Exception as e:
+            if preview is not None:
+                await preview.abort()
             await message.channel.send(
                 f"{message.author.mention} I am sorry, friend. I had an error while generating text inference: {e}"
             )
@@ -203,6 +214,11 @@ class Img2img(commands.Cog):
         extra_payload = None
         if user_config_override != None:
             extra_payload = user_config_override
+        if extra_payload is not None and "user_config" in extra_payload:
+            user_config = extra_payload["user_config"]
+        else:
+            # on_message reloaded the config before routing here.
+            user_config = self.config.get_user_config(user_id=author_id, reload=False)
         if "!upscale" in message.content:
             # Remove "!upscale" from the contents:
             message.content = message.content.replace("!upscale", "")
@@ -216,6 +232,7 @@ class Img2img(commands.Cog):
                     discord_first_message,
                     attachment.url,
                 ),
+                user_config=user_config,
             )
         elif message.content != "" or prompt_override is not None:
             prompt = message.content
@@ -237,6 +254,7 @@ class Img2img(commands.Cog):
                     attachment_url,
                 ),
                 extra_payload=extra_payload,
+                user_config=user_config,
             )
         else:
             # Default to image variation job
@@ -250,6 +268,7 @@ class Img2img(commands.Cog):
                     discord_first_message,
                     attachment.url,
                 ),
+                user_config=user_config,
             )
         # Get the worker that will process the job.
         worker = discord_wrapper.worker_manager.find_best_fit_worker(job)
@@ -262,4 +281,7 @@ class Img2img(commands.Cog):
             return
         logging.info("Worker selected for job: " + str(worker.worker_id))
         # Add it to the queue
-        await discord_wrapper.queue_manager.enqueue_job(worker, job)
+        try:
+            await discord_wrapper.queue_manager.enqueue_job(worker, job)
+        except AdmissionRejected as e:
+            await discord_first_message.edit(content=f"{mention_string} {e}")
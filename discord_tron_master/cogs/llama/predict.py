@@ -4,6 +4,7 @@ from discord_tron_master.classes.app_config import AppConfig
 from discord_tron_master.bot import DiscordBot
 from discord_tron_master.classes.jobs.llama_prediction_job import LlamaPredictionJob
 from discord_tron_master.bot import clean_traceback
+from discord_tron_master.exceptions.admission import AdmissionRejected
 
 # For queue manager, etc.
 discord = DiscordBot.get_instance()
@@ -31,11 +32,12 @@ class Predict(commands.Cog):
                 text="A worker has been selected for your query: `" + prompt + "`",
             )
 
-            self.config.reload_config()
+            user_config = self.config.get_user_config(user_id=ctx.author.id)
 
             job = LlamaPredictionJob(
                 ctx.author.id,
                 (self.bot, self.config, ctx, prompt, discord_first_message),
+                user_config=user_config,
             )
             # Get the worker that will process the job.
             worker = discord.worker_manager.find_best_fit_worker(job)
@@ -49,6 +51,8 @@ class Predict(commands.Cog):
             logging.info("Worker selected for job: " + str(worker.worker_id))
             # Add it to the queue
             await discord.queue_manager.enqueue_job(worker, job)
+        except AdmissionRejected as e:
+            await discord_first_message.edit(content=f"{ctx.author.mention} {e}")
         except Exception as e:
             await ctx.send(
                 f"Error generating image: {e}\n\nStack trace:\n{await clean_traceback(traceback.format_exc())}"
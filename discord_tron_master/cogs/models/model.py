@@ -1,8 +1,10 @@
 from discord.ext import commands
+import asyncio
 from asyncio import Lock
 from typing import List
 from discord_tron_master.classes.app_config import AppConfig
 from discord_tron_master.classes.guilds import Guilds as GuildConfig
+from discord_tron_master.classes.model_catalog import model_catalog
 from discord_tron_master.models.transformers import Transformers
 import logging
 
@@ -97,6 +99,7 @@ class Model(commands.Cog):
                 app = AppConfig.flask
                 with app.app_context():
                     transformer = Transformers.set_description(model_id, description)
+                    await asyncio.to_thread(model_catalog.refresh, app)
                     if not transformer:
                         message = "That model does not exist."
                     else:
@@ -185,6 +188,7 @@ class Model(commands.Cog):
             with app.app_context():
                 transformers = Transformers()
                 transformers.delete_by_full_model_id(full_model_name)
+                await asyncio.to_thread(model_catalog.refresh, app)
                 await ctx.send(
                     f"Sigh. Well, it is done. That model is now obliviated from existence."
                 )
@@ -253,6 +257,7 @@ class Model(commands.Cog):
                     tags="",
                     added_by=user_id,
                 )
+                await asyncio.to_thread(model_catalog.refresh, app)
         except Exception as e:
             logging.error(
                 f"Error while attempting to create new record: {e}, traceback: {traceback.format_exc()}"
@@ -1,7 +1,9 @@
 from discord.ext import commands
+import asyncio
 from asyncio import Lock
 from typing import List
 from discord_tron_master.classes.app_config import AppConfig
+from discord_tron_master.classes.model_catalog import model_catalog
 from discord_tron_master.models.schedulers import Schedulers
 import logging, traceback
 
@@ -17,15 +19,13 @@ class Scheduler(commands.Cog):
     async def scheduler_list(self, ctx):
         user_id = ctx.author.id
         user_config = self.config.get_user_config(user_id=user_id)
-        app = AppConfig.flask
-        with app.app_context():
-            all_schedulers = Schedulers.get_all()
+        all_schedulers = model_catalog.schedulers()
         wrapper = "```"
 
         def build_scheduler_output(scheduler):
             cluster = (
-                f"{scheduler.name} (`{scheduler.scheduler}`): {scheduler.description}\n"
-                f"!scheduler {scheduler.name}\n"
+                f"{scheduler['name']} (`{scheduler['scheduler']}`): {scheduler['description']}\n"
+                f"!scheduler {scheduler['name']}\n"
             )
             return cluster
 
@@ -72,6 +72,7 @@ class Scheduler(commands.Cog):
                 app = AppConfig.flask
                 with app.app_context():
                     scheduler = Schedulers.set_description(name, description)
+                    await asyncio.to_thread(model_catalog.refresh, app)
                     if not scheduler:
                         message = "That scheduler does not exist."
                     else:
@@ -82,8 +83,6 @@ class Scheduler(commands.Cog):
 
     @commands.command(name="scheduler", help="Set your currently-used scheduler.")
     async def scheduler(self, ctx, name: str = None):
-        app = AppConfig.flask
-
         if not name:
             current_scheduler = self.config.get_user_setting(
                 ctx.author.id, "scheduler", "default"
@@ -94,8 +93,7 @@ class Scheduler(commands.Cog):
                 await ctx.send("You do not have a scheduler set.")
             return
 
-        with app.app_context():
-            existing = Schedulers.get_by_name(name)
+        existing = model_catalog.scheduler(name)
         if not existing:
             await ctx.send(
                 "That scheduler is not registered for use. To make your horse cock porn, or whatever, use `!scheduler-add <scheduler> <image|text> <description>` where `image|text` determines whether it's a diffuser or language scheduler."
@@ -121,6 +119,7 @@ class Scheduler(commands.Cog):
             with app.app_context():
                 schedulers = Schedulers()
                 schedulers.delete_by_name(name)
+                await asyncio.to_thread(model_catalog.refresh, app)
                 await ctx.send(
                     f"Sigh. Well, it is done. That scheduler is now obliviated from existence."
                 )
@@ -154,6 +153,7 @@ class Scheduler(commands.Cog):
             with app.app_context():
                 new_record = Schedulers()
                 new_record.set_use_case(name=name, use_case=new_value)
+                await asyncio.to_thread(model_catalog.refresh, app)
         except Exception as e:
             logging.error(
                 f"Error while attempting to set scheduler use case: {e}, traceback: {traceback.format_exc()}"
@@ -209,6 +209,7 @@ class Scheduler(commands.Cog):
                     use_cases=use_cases,
                     description=description,
                 )
+                await asyncio.to_thread(model_catalog.refresh, app)
         except Exception as e:
             logging.error(
                 f"Error while attempting to create new record: {e}, traceback: {traceback.format_exc()}"
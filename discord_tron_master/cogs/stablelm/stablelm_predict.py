@@ -6,6 +6,7 @@ from discord_tron_master.classes.jobs.stablelm_prediction_job import (
     StableLMPredictionJob,
 )
 from discord_tron_master.bot import clean_traceback
+from discord_tron_master.exceptions.admission import AdmissionRejected
 
 # For queue manager, etc.
 discord = DiscordBot.get_instance()
@@ -28,11 +29,12 @@ class Stablelm_predict(commands.Cog):
                 text="A worker has been selected for your query: `" + prompt + "`",
             )
 
-            self.config.reload_config()
+            user_config = self.config.get_user_config(user_id=ctx.author.id)
 
             job = StableLMPredictionJob(
                 ctx.author.id,
                 (self.bot, self.config, ctx, prompt, discord_first_message),
+                user_config=user_config,
             )
             # Get the worker that will process the job.
             worker = discord.worker_manager.find_best_fit_worker(job)
@@ -46,6 +48,8 @@ class Stablelm_predict(commands.Cog):
             logging.info("Worker selected for job: " + str(worker.worker_id))
             # Add it to the queue
             await discord.queue_manager.enqueue_job(worker, job)
+        except AdmissionRejected as e:
+            await discord_first_message.edit(content=f"{ctx.author.mention} {e}")
         except Exception as e:
             await ctx.send(
                 f"Error generating image: {e}\n\nStack trace:\n{await clean_traceback(traceback.format_exc())}"
@@ -4,6 +4,7 @@ from discord_tron_master.classes.app_config import AppConfig
 from discord_tron_master.bot import DiscordBot
 from discord_tron_master.classes.jobs.bark_tts_job import BarkTtsJob
 from discord_tron_master.bot import clean_traceback
+from discord_tron_master.exceptions.admission import AdmissionRejected
 
 # For queue manager, etc.
 config = AppConfig()
@@ -136,11 +137,12 @@ class Audio_generation(commands.Cog):
                 text="A worker has been selected for your query: `" + prompt + "`",
             )
 
-            self.config.reload_config()
+            user_config = self.config.get_user_config(user_id=ctx.author.id)
 
             job = BarkTtsJob(
                 ctx.author.id,
                 (self.bot, self.config, ctx, prompt, discord_first_message),
+                user_config=user_config,
             )
             # Get the worker that will process the job.
             worker = discord.worker_manager.find_best_fit_worker(job)
@@ -154,6 +156,8 @@ class Audio_generation(commands.Cog):
             logging.info("Worker selected for job: " + str(worker.worker_id))
             # Add it to the queue
             await discord.queue_manager.enqueue_job(worker, job)
+        except AdmissionRejected as e:
+            await discord_first_message.edit(content=f"{ctx.author.mention} {e}")
         except Exception as e:
             await ctx.send(
                 f"Error generating image: {e}\n\nStack trace:\n{await clean_traceback(traceback.format_exc())}"
@@ -480,7 +480,7 @@ class Settings(commands.Cog):
         user_id = ctx.author.id
         user_config = config.get_user_config(user_id)
         available_resolutions = await resolution_helper.list_available_resolutions(
-            user_id=user_id
+            user_id=user_id, user_resolution=user_config.get("resolution")
         )
         if resolution is None:
             resolution = user_config.get("resolution")
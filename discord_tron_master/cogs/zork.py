@@ -18,7 +18,21 @@ from sqlalchemy import or_
 
 from discord_tron_master.bot import DiscordBot
 from discord_tron_master.classes.app_config import AppConfig
+from discord_tron_master.classes.turn_claims import turn_claim_coordinator
+from discord_tron_master.classes.turn_drain import (
+    TurnHandoffRequested,
+    turn_drain_coordinator,
+)
+from discord_tron_master.classes.webui_echo_outbox import (
+    CONSUMED as WEBUI_ECHO_CONSUMED,
+    webui_echo_outbox,
+)
 from discord_tron_master.adapters.emulator_bridge import EmulatorBridge as ZorkEmulator
+from discord_tron_master.adapters.tge_ports import (
+    reset_tge_completion_stream,
+    set_tge_completion_stream,
+)
+from discord_tron_master.classes.streaming import DiscordStreamEditor, partial_json_string
 from discord_tron_master.classes.zork_memory import ZorkMemory
 from text_game_engine.core.source_material_memory import SourceMaterialMemory
 
@@ -55,7 +69,6 @@ class Zork(commands.Cog):
     TURN_BUSY_TEXT = "Another turn is already resolving. Please retry."
     TURN_BUSY_RETRY_DELAY_SECONDS = 0.5
     RESTART_DRAIN_TIMEOUT_SECONDS = 600
-    WEBUI_DISCORD_ECHO_POLL_SECONDS = 2.0
     AUDIO_PREVIEW_MAX_CHARS = 1500
     AUDIO_FILE_EXTENSIONS = (".aac", ".flac", ".m4a", ".mp3", ".mp4", ".oga", ".ogg", ".wav", ".weba", ".webm")
     AUDIO_CONTENT_TYPE_PREFIXES = ("audio/", "video/")
@@ -559,6 +572,41 @@ class Zork(commands.Cog):
         self._ensure_turn_queue_worker(key)
         await self._add_queue_reaction(message)
 
+    @staticmethod
+    def _checkpoint_turn_item(item: dict) -> None:
+        message = item["message"]
+        turn_drain_coordinator.checkpoint_turns(
+            [
+                {
+                    "channel_id": str(getattr(message.channel, "id", "")),
+                    "message_id": str(getattr(message, "id", "")),
+                    "campaign_id": item["campaign_id"],
+                    "content": item["content"],
+                }
+            ]
+        )
+
+    async def _resume_checkpointed_turns(self) -> None:
+        items = turn_drain_coordinator.take_checkpointed_turns()
+        if not items:
+            return
+        resumed = 0
+        for item in items:
+            try:
+                channel = await DiscordBot.get_instance().find_channel(int(item["channel_id"]))
+                if channel is None:
+                    continue
+                message = await channel.fetch_message(int(item["message_id"]))
+                await self._enqueue_turn_message(
+                    message,
+                    campaign_id=str(item["campaign_id"]),
+                    content=str(item.get("content") or ""),
+                )
+                resumed += 1
+            except Exception:
+                logger.warning("Could not resume handed-off turn %s", item, exc_info=True)
+        logger.info("Resumed %s of %s handed-off queued turn(s)", resumed, len(items))
+
     async def _claim_turn_for_message(
         self,
         message,
@@ -567,29 +615,63 @@ class Zork(commands.Cog):
         retry_if_busy: bool,
     ) -> tuple[str | None, str | None]:
         timed_event_notice_sent = False
-        while True:
-            claimed_campaign_id, error_text = await ZorkEmulator.begin_turn_for_campaign(
-                message,
-                campaign_id,
-            )
-            if error_text is not None:
-                return None, error_text
-            if claimed_campaign_id is not None:
-                return claimed_campaign_id, None
-            timed_event_notice = ZorkEmulator.get_timed_event_in_progress_notice(
-                campaign_id,
-                message.author.id,
-            )
-            if timed_event_notice and not timed_event_notice_sent:
-                await self._send_large_message(
-                    message.channel,
-                    f"{message.author.mention}\n{timed_event_notice}",
-                    campaign_id=campaign_id,
+        ticket = None
+        claimed = False
+
+        def claim_expires_in():
+            return ZorkEmulator.inflight_claim_expires_in(campaign_id)
+
+        try:
+            while True:
+                if retry_if_busy and ZorkEmulator.is_draining():
+                    raise TurnHandoffRequested()
+                generation = turn_claim_coordinator.generation(campaign_id)
+                if (
+                    retry_if_busy
+                    and ticket is None
+                    and turn_claim_coordinator.waiting(campaign_id)
+                ):
+                    # Others are already queued; line up behind them instead
+                    # of trying to claim ahead of them.
+                    ticket = turn_claim_coordinator.enqueue(campaign_id, message.author.id)
+                    await turn_claim_coordinator.wait_turn(
+                        ticket,
+                        since_generation=generation,
+                        claim_expires_in=claim_expires_in,
+                    )
+                    continue
+                claimed_campaign_id, error_text = await ZorkEmulator.begin_turn_for_campaign(
+                    message,
+                    campaign_id,
                 )
-                timed_event_notice_sent = True
-            if not retry_if_busy:
-                return None, None
-            await asyncio.sleep(0.5)
+                if error_text is not None:
+                    return None, error_text
+                if claimed_campaign_id is not None:
+                    claimed = True
+                    return claimed_campaign_id, None
+                timed_event_notice = ZorkEmulator.get_timed_event_in_progress_notice(
+                    campaign_id,
+                    message.author.id,
+                )
+                if timed_event_notice and not timed_event_notice_sent:
+                    await self._send_large_message(
+                        message.channel,
+                        f"{message.author.mention}\n{timed_event_notice}",
+                        campaign_id=campaign_id,
+                    )
+                    timed_event_notice_sent = True
+                if not retry_if_busy:
+                    return None, None
+                if ticket is None:
+                    ticket = turn_claim_coordinator.enqueue(campaign_id, message.author.id)
+                await turn_claim_coordinator.wait_turn(
+                    ticket,
+                    since_generation=generation,
+                    claim_expires_in=claim_expires_in,
+                )
+        finally:
+            if ticket is not None:
+                turn_claim_coordinator.dequeue(ticket, claimed=claimed)
 
     async def _process_campaign_message(
         self,
@@ -696,18 +778,26 @@ class Zork(commands.Cog):
                 return
 
         reaction_added = await ZorkEmulator._add_processing_reaction(message)
+        preview = None
         try:
             while True:
-                narration = await ZorkEmulator.play_action(
-                    message,
-                    content,
-                    command_prefix=self._prefix(),
-                    campaign_id=claimed_campaign_id,
-                    manage_claim=False,
-                )
+                preview = self._narration_preview(message)
+                stream_token = set_tge_completion_stream(preview)
+                try:
+                    narration = await ZorkEmulator.play_action(
+                        message,
+                        content,
+                        command_prefix=self._prefix(),
+                        campaign_id=claimed_campaign_id,
+                        manage_claim=False,
+                    )
+                finally:
+                    reset_tge_completion_stream(stream_token)
                 if narration is None:
                     return
                 if self._is_turn_busy_text(narration):
+                    if preview is not None:
+                        await preview.abort()
                     if retry_if_busy:
                         await asyncio.sleep(self.TURN_BUSY_RETRY_DELAY_SECONDS)
                         continue
@@ -721,7 +811,11 @@ class Zork(commands.Cog):
                     claimed_campaign_id, message.author.id
                 )
                 msg = await self._send_action_reply(
-                    message, narration, campaign_id=claimed_campaign_id, notices=notices
+                    message,
+                    narration,
+                    campaign_id=claimed_campaign_id,
+                    notices=notices,
+                    preview=preview,
                 )
                 await self._notify_text_game_webui_turn_refresh(
                     campaign_id=claimed_campaign_id,
@@ -734,6 +828,8 @@ class Zork(commands.Cog):
                         )
                 break
         finally:
+            if preview is not None:
+                await preview.abort()
             if reaction_added:
                 await ZorkEmulator._remove_processing_reaction(message)
             ZorkEmulator.end_turn(claimed_campaign_id, message.author.id)
@@ -748,6 +844,8 @@ class Zork(commands.Cog):
                 item = await queue.get()
                 try:
                     while True:
+                        if ZorkEmulator.is_draining():
+                            raise TurnHandoffRequested()
                         timed_event_notice = ZorkEmulator.get_timed_event_in_progress_notice(
                             campaign_id,
                             actor_id,
@@ -761,6 +859,8 @@ class Zork(commands.Cog):
                         content=item["content"],
                         retry_if_busy=True,
                     )
+                except TurnHandoffRequested:
+                    self._checkpoint_turn_item(item)
                 finally:
                     queue.task_done()
                 if queue.empty():
@@ -988,6 +1088,7 @@ class Zork(commands.Cog):
             self._webui_discord_echo_task = asyncio.create_task(
                 self._webui_discord_echo_loop()
             )
+        await self._resume_checkpointed_turns()
 
     async def _send_large_message(
         self,
@@ -1022,161 +1123,74 @@ class Zork(commands.Cog):
         return msg
 
     async def _webui_discord_echo_loop(self):
-        while True:
-            try:
-                await self._drain_webui_discord_echo_once()
-            except asyncio.CancelledError:
-                raise
-            except Exception:
-                logger.exception("Failed draining webui Discord mirror outbox")
-            await asyncio.sleep(self.WEBUI_DISCORD_ECHO_POLL_SECONDS)
-
-    async def _drain_webui_discord_echo_once(self):
-        from text_game_engine.persistence.sqlalchemy.models import (
-            OutboxEvent,
-            Session as GameSession,
-        )
-
         ZorkEmulator._ensure_init()
-        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
-        with ZorkEmulator._session_factory() as session:
-            pending = (
-                session.query(OutboxEvent)
-                .filter(
-                    OutboxEvent.event_type == "webui_discord_echo",
-                    OutboxEvent.status == "pending",
-                    or_(
-                        OutboxEvent.next_attempt_at.is_(None),
-                        OutboxEvent.next_attempt_at <= now,
-                    ),
-                )
-                .order_by(OutboxEvent.created_at.asc())
-                .limit(10)
-                .all()
-            )
-            work = [
-                {
-                    "id": str(row.id),
-                    "campaign_id": str(row.campaign_id),
-                    "payload_json": str(row.payload_json or ""),
-                    "attempts": int(row.attempts or 0),
-                }
-                for row in pending
-            ]
-
-        for item in work:
-            status = "consumed"
-            next_attempt_at = None
-            try:
-                payload = json.loads(item["payload_json"] or "{}")
-                if not isinstance(payload, dict):
-                    payload = {}
-                actor_id = str(payload.get("actor_id") or "").strip()
-                aware_actor_ids = [
-                    str(raw_actor_id or "").strip()
-                    for raw_actor_id in list(payload.get("aware_actor_ids") or [])
-                    if str(raw_actor_id or "").strip()
-                ]
-                other_discord_aware_actor_ids = [
-                    aware_actor_id
-                    for aware_actor_id in aware_actor_ids
-                    if aware_actor_id != actor_id and self._is_probable_discord_actor_id(aware_actor_id)
-                ]
-                if not other_discord_aware_actor_ids:
-                    continue
-                scope = str(
-                    ((payload.get("turn_visibility") or {}) if isinstance(payload.get("turn_visibility"), dict) else {}).get("scope")
-                    or "public"
-                ).strip().lower()
-                if scope not in {"", "public", "local"}:
-                    continue
-                channel_id = self._resolve_campaign_discord_channel_id(item["campaign_id"])
-                if not channel_id:
-                    continue
-                bot_instance = DiscordBot.get_instance()
-                channel = await bot_instance.find_channel(int(channel_id)) if bot_instance is not None else None
-                if channel is None:
-                    continue
-                source_name = (
-                    str(payload.get("actor_display_name") or "").strip()
-                    or str(payload.get("actor_id") or "").strip()
-                    or "unknown"
-                )
-                narration = str(payload.get("narration") or "").strip()
-                scene_output = payload.get("scene_output")
-                rendered = self._format_scene_output_for_discord(narration, scene_output)
-                rendered = self._filter_narration(rendered)
-                rendered = self._prepend_webui_actor_input(
-                    rendered,
-                    source_name=source_name,
-                    action_text=str(payload.get("action_text") or "").strip(),
-                )
-                if not rendered:
-                    continue
-                text = f"-# webui event from {source_name}\n{rendered}"
-                await self._send_large_message(
-                    channel,
-                    text,
-                    campaign_id=item["campaign_id"],
-                )
-            except asyncio.CancelledError:
-                raise
-            except Exception:
-                logger.exception(
-                    "Failed sending webui Discord mirror for campaign=%s event=%s",
-                    item["campaign_id"],
-                    item["id"],
-                )
-                status = "pending"
-                next_attempt_at = datetime.datetime.now(datetime.timezone.utc).replace(
-                    tzinfo=None
-                ) + datetime.timedelta(seconds=30)
-            finally:
-                with ZorkEmulator._session_factory() as session:
-                    row = session.get(OutboxEvent, item["id"])
-                    if row is None:
-                        continue
-                    row.attempts = int(row.attempts or 0) + 1
-                    row.status = status
-                    row.next_attempt_at = next_attempt_at
-                    session.commit()
+        await webui_echo_outbox.run(
+            lambda: ZorkEmulator._session_factory,
+            self._deliver_webui_discord_echo,
+        )
 
-    def _resolve_campaign_discord_channel_id(self, campaign_id: str | int | None) -> str | None:
-        from text_game_engine.persistence.sqlalchemy.models import (
-            Session as GameSession,
+    async def _deliver_webui_discord_echo(self, item: dict, channel_id: str | None) -> str:
+        payload = json.loads(item["payload_json"] or "{}")
+        if not isinstance(payload, dict):
+            payload = {}
+        actor_id = str(payload.get("actor_id") or "").strip()
+        aware_actor_ids = [
+            str(raw_actor_id or "").strip()
+            for raw_actor_id in list(payload.get("aware_actor_ids") or [])
+            if str(raw_actor_id or "").strip()
+        ]
+        other_discord_aware_actor_ids = [
+            aware_actor_id
+            for aware_actor_id in aware_actor_ids
+            if aware_actor_id != actor_id and self._is_probable_discord_actor_id(aware_actor_id)
+        ]
+        if not other_discord_aware_actor_ids:
+            return WEBUI_ECHO_CONSUMED
+        scope = str(
+            ((payload.get("turn_visibility") or {}) if isinstance(payload.get("turn_visibility"), dict) else {}).get("scope")
+            or "public"
+        ).strip().lower()
+        if scope not in {"", "public", "local"}:
+            return WEBUI_ECHO_CONSUMED
+        if not channel_id:
+            return WEBUI_ECHO_CONSUMED
+        bot_instance = DiscordBot.get_instance()
+        channel = await bot_instance.find_channel(int(channel_id)) if bot_instance is not None else None
+        if channel is None:
+            return WEBUI_ECHO_CONSUMED
+        source_name = (
+            str(payload.get("actor_display_name") or "").strip()
+            or str(payload.get("actor_id") or "").strip()
+            or "unknown"
         )
+        narration = str(payload.get("narration") or "").strip()
+        scene_output = payload.get("scene_output")
+        rendered = self._format_scene_output_for_discord(narration, scene_output)
+        rendered = self._filter_narration(rendered)
+        rendered = self._prepend_webui_actor_input(
+            rendered,
+            source_name=source_name,
+            action_text=str(payload.get("action_text") or "").strip(),
+        )
+        if not rendered:
+            return WEBUI_ECHO_CONSUMED
+        text = f"-# webui event from {source_name}\n{rendered}"
+        await self._send_large_message(
+            channel,
+            text,
+            campaign_id=item["campaign_id"],
+        )
+        return WEBUI_ECHO_CONSUMED
 
+    def _resolve_campaign_discord_channel_id(self, campaign_id: str | int | None) -> str | None:
         if campaign_id is None:
             return None
         ZorkEmulator._ensure_init()
-        with ZorkEmulator._session_factory() as session:
-            rows = (
-                session.query(GameSession)
-                .filter(
-                    GameSession.campaign_id == str(campaign_id),
-                    GameSession.enabled == True,  # noqa: E712
-                )
-                .order_by(GameSession.created_at.asc(), GameSession.id.asc())
-                .all()
-            )
-        preferred = []
-        fallback = []
-        for row in rows:
-            channel_id = str(
-                getattr(row, "surface_thread_id", None)
-                or getattr(row, "surface_channel_id", None)
-                or ""
-            ).strip()
-            if not channel_id:
-                continue
-            surface = str(getattr(row, "surface", "") or "").strip().lower()
-            target = preferred if surface.startswith("discord") else fallback
-            target.append(channel_id)
-        if preferred:
-            return preferred[0]
-        if fallback:
-            return fallback[0]
-        return None
+        routes = webui_echo_outbox.resolve_routes(
+            ZorkEmulator._session_factory,
+            [campaign_id],
+        )
+        return routes.get(str(campaign_id))
 
     async def _is_image_admin(self, ctx) -> bool:
         user_roles = getattr(ctx.author, "roles", [])
@@ -1635,9 +1649,41 @@ class Zork(commands.Cog):
             out.append(f"{marker} {preset_key}")
         return out
 
+    def _narration_preview(self, ctx_like):
+        """A streaming preview of the turn's narration, or None when streaming is off."""
+        mention = getattr(getattr(ctx_like, "author", None), "mention", None)
+        return DiscordStreamEditor.from_config(
+            ctx_like,
+            consumer="zork",
+            prefix=f"{mention}\n" if mention else "",
+            render=self._render_streamed_narration,
+        )
+
+    @staticmethod
+    def _render_streamed_narration(text: str) -> str | None:
+        """The narration so far in a streamed turn completion, if it has any."""
+        stripped = text.lstrip()
+        if stripped.startswith("```"):
+            stripped = stripped.split("\n", 1)[1].lstrip() if "\n" in stripped else ""
+        if stripped.startswith("{"):
+            return partial_json_string(stripped, "narration")
+        if stripped.startswith("["):
+            # Tool calls, not prose.
+            return None
+        return stripped
+
     async def _send_action_reply(
-        self, ctx_like, narration: str, campaign_id: int = None, notices: list[str] | None = None
+        self,
+        ctx_like,
+        narration: str,
+        campaign_id: int = None,
+        notices: list[str] | None = None,
+        preview: DiscordStreamEditor | None = None,
     ):
+        if preview is not None and notices:
+            # Notices go above the narration, so the preview cannot become it.
+            await preview.abort()
+            preview = None
         for notice in notices or []:
             await self._send_large_message(ctx_like, f"[Notice] {notice}", campaign_id=campaign_id)
         if campaign_id is not None and self._should_format_scene_output(narration):
@@ -1649,12 +1695,15 @@ class Zork(commands.Cog):
             narration = self._format_scene_output_for_discord(narration, scene_output)
         narration = self._filter_narration(narration)
         mention = getattr(getattr(ctx_like, "author", None), "mention", None)
-        if mention:
-            msg = await self._send_large_message(
-                ctx_like, f"{mention}\n{narration}", campaign_id=campaign_id
-            )
-        else:
-            msg = await self._send_large_message(ctx_like, narration, campaign_id=campaign_id)
+        text = f"{mention}\n{narration}" if mention else narration
+        msg = None
+        if preview is not None:
+            payload = self._with_world_time(text, campaign_id, ctx_like=ctx_like)
+            msg = await preview.finish(payload)
+            if msg is not None:
+                await self._ensure_sms_notice_reactions(msg, payload)
+        if msg is None:
+            msg = await self._send_large_message(ctx_like, text, campaign_id=campaign_id)
         timer_bound = False
         if campaign_id is not None and msg is not None and self._contains_pending_timer_line(narration):
             timer_bound = bool(ZorkEmulator.register_timer_message(campaign_id, msg.id))
@@ -2535,21 +2584,26 @@ class Zork(commands.Cog):
             return
 
         reaction_added = await ZorkEmulator._add_processing_reaction(ctx)
+        preview = self._narration_preview(ctx)
         try:
-            narration = await ZorkEmulator.play_action(
-                ctx,
-                action,
-                command_prefix=self._prefix(),
-                campaign_id=campaign_id,
-                manage_claim=False,
-            )
+            stream_token = set_tge_completion_stream(preview)
+            try:
+                narration = await ZorkEmulator.play_action(
+                    ctx,
+                    action,
+                    command_prefix=self._prefix(),
+                    campaign_id=campaign_id,
+                    manage_claim=False,
+                )
+            finally:
+                reset_tge_completion_stream(stream_token)
             if narration is None:
                 return
             notices = ZorkEmulator.pop_turn_ephemeral_notices(
                 campaign_id, ctx.author.id
             )
             msg = await self._send_action_reply(
-                ctx, narration, campaign_id=campaign_id, notices=notices
+                ctx, narration, campaign_id=campaign_id, notices=notices, preview=preview
             )
             await self._notify_text_game_webui_turn_refresh(
                 campaign_id=campaign_id,
@@ -2561,6 +2615,8 @@ class Zork(commands.Cog):
                         campaign_id, ctx.message.id, msg.id
                     )
         finally:
+            if preview is not None:
+                await preview.abort()
             if reaction_added:
                 await ZorkEmulator._remove_processing_reaction(ctx)
             ZorkEmulator.end_turn(campaign_id, ctx.author.id)
@@ -4919,20 +4975,41 @@ class Zork(commands.Cog):
         if not await self.bot.is_owner(ctx.author):
             await ctx.send("This command is restricted to the bot owner.")
             return
-        await ctx.send(
+        status_message = await ctx.send(
             "Restart initiated. Rejecting new requests and draining in-flight turns..."
         )
         ZorkEmulator.request_shutdown()
+        last_reported = {"active": None}
+
+        async def _report_progress(status: dict) -> None:
+            if status_message is None or status["active"] == last_reported["active"]:
+                return
+            last_reported["active"] = status["active"]
+            await status_message.edit(
+                content=(
+                    "Restart initiated. Draining in-flight turns: "
+                    f"{status['completed']} finished, {status['active']} remaining "
+                    f"(oldest {status['oldest_age_seconds']:.0f}s)."
+                )
+            )
+
         drained = await ZorkEmulator.wait_for_drain(
-            timeout=self.RESTART_DRAIN_TIMEOUT_SECONDS
+            timeout=self.RESTART_DRAIN_TIMEOUT_SECONDS,
+            on_progress=_report_progress,
         )
+        # Let queued turns that were woken by the shutdown finish checkpointing.
+        queue_tasks = [task for task in self._turn_queue_tasks.values() if not task.done()]
+        if queue_tasks:
+            await asyncio.wait(queue_tasks, timeout=5)
         if drained:
             await ctx.send("All turns drained. Shutting down now.")
         else:
-            remaining = len(ZorkEmulator._inflight_turns)
-            cleared = ZorkEmulator.clear_all_inflight_claims()
+            stuck = turn_drain_coordinator.active_turns()
+            cleared = ZorkEmulator.clear_all_inflight_claims(
+                campaign_ids={campaign_id for campaign_id, _actor_id, _age in stuck}
+            )
             await ctx.send(
-                f"Drain timeout. {remaining} turn(s) still in-flight. "
+                f"Drain timeout. {len(stuck)} turn(s) still in-flight. "
                 f"Cleared {cleared} abandoned inflight claim(s) and forcing shutdown."
             )
         await self.bot.close()
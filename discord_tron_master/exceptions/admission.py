@@ -0,0 +1,11 @@
+class AdmissionRejected(Exception):
+    """Raised by QueueManager.enqueue_job when a job is turned away at ingress.
+
+    ``str(exc)`` is a message fit to show the user; ``retry_after`` is a hint
+    in seconds, or None when waiting will not help.
+    """
+
+    def __init__(self, message: str, *, reason: str, retry_after: float = None):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
@@ -0,0 +1,129 @@
+"""Move conversation history into an append-only conversation_messages table
+
+Revision ID: 3f8d2b6c1a47
+Revises: 7c1e4a9b2f30
+Create Date: 2026-10-19 14:00:00.000000
+
+Each conversations.history JSON blob is split into one row per message
+and the blob is reset to an empty list.  Messages are numbered per owner
+from 0 in list order; owner is not unique in conversations, so an owner's
+later rows (by id) continue the numbering after the earlier ones.
+The downgrade rebuilds the blobs from the rows.
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8d2b6c1a47'
+down_revision = '7c1e4a9b2f30'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 200
+
+conversations = sa.table(
+    'conversations',
+    sa.column('id', sa.Integer),
+    sa.column('owner', sa.BigInteger),
+    sa.column('history', sa.Text),
+)
+
+
+def _messages(history):
+    try:
+        history = json.loads(history) if isinstance(history, str) else history
+    except ValueError:
+        return []
+    if not isinstance(history, list):
+        return []
+    messages = []
+    for item in history:
+        if not isinstance(item, dict):
+            continue
+        content = item.get('content', item.get('message', ''))
+        if not isinstance(content, str):
+            content = json.dumps(content)
+        messages.append({'role': str(item.get('role') or 'user')[:32], 'content': content})
+    return messages
+
+
+def upgrade():
+    conversation_messages = op.create_table('conversation_messages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner', sa.BigInteger(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('role', sa.String(length=32), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('tokens', sa.Integer(), nullable=True),
+    sa.Column('created', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('owner', 'seq', name='uq_conversation_messages_owner_seq')
+    )
+    with op.batch_alter_table('conversation_messages', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_conversation_messages_owner'), ['owner'], unique=False)
+
+    bind = op.get_bind()
+    last_id = 0
+    # owner -> next seq, carried across batches.
+    next_seq = {}
+    while True:
+        rows = bind.execute(
+            sa.select(conversations.c.id, conversations.c.owner, conversations.c.history)
+            .where(conversations.c.id > last_id)
+            .order_by(conversations.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        inserts = []
+        for _, owner, history in rows:
+            for message in _messages(history):
+                seq = next_seq.get(owner, 0)
+                next_seq[owner] = seq + 1
+                inserts.append({'owner': owner, 'seq': seq, **message})
+        if inserts:
+            bind.execute(conversation_messages.insert(), inserts)
+        bind.execute(
+            conversations.update()
+            .where(conversations.c.id.in_([row[0] for row in rows]))
+            .values(history='[]')
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    conversation_messages = sa.table(
+        'conversation_messages',
+        sa.column('owner', sa.BigInteger),
+        sa.column('seq', sa.Integer),
+        sa.column('role', sa.String),
+        sa.column('content', sa.Text),
+    )
+    owners = [
+        row[0]
+        for row in bind.execute(sa.select(conversations.c.owner).distinct()).fetchall()
+    ]
+    for owner in owners:
+        history = [
+            {'role': role, 'content': content}
+            for role, content in bind.execute(
+                sa.select(conversation_messages.c.role, conversation_messages.c.content)
+                .where(conversation_messages.c.owner == owner)
+                .order_by(conversation_messages.c.seq)
+            ).fetchall()
+        ]
+        bind.execute(
+            conversations.update()
+            .where(conversations.c.owner == owner)
+            .values(history=json.dumps(history))
+        )
+
+    with op.batch_alter_table('conversation_messages', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_conversation_messages_owner'))
+
+    op.drop_table('conversation_messages')
@@ -0,0 +1,80 @@
+"""Store user_history.config_blob JSON-encoded once
+
+Revision ID: 7c1e4a9b2f30
+Revises: 550dfbf40243
+Create Date: 2026-10-19 12:00:00.000000
+
+UserHistory.add_entry used to encode config_blob twice, so existing rows
+hold a JSON string whose contents are the JSON object.  Unwrap those rows;
+rows that are already a JSON object (or not JSON at all) are left alone.
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e4a9b2f30'
+down_revision = '550dfbf40243'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+user_history = sa.table(
+    'user_history',
+    sa.column('id', sa.Integer),
+    sa.column('config_blob', sa.Text),
+)
+
+
+def _unwrap(config_blob):
+    """The once-encoded value for a doubly encoded blob, or None to leave it."""
+    try:
+        inner = json.loads(config_blob)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(inner, str):
+        return None
+    try:
+        json.loads(inner)
+    except ValueError:
+        return None
+    return inner
+
+
+def upgrade():
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(user_history.c.id, user_history.c.config_blob)
+            .where(user_history.c.id > last_id)
+            # Doubly encoded blobs are JSON strings, so they start with a quote.
+            .where(user_history.c.config_blob.like('"%'))
+            .order_by(user_history.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        updates = []
+        for row_id, config_blob in rows:
+            unwrapped = _unwrap(config_blob)
+            if unwrapped is not None:
+                updates.append({'row_id': row_id, 'config_blob': unwrapped})
+        if updates:
+            bind.execute(
+                user_history.update()
+                .where(user_history.c.id == sa.bindparam('row_id'))
+                .values(config_blob=sa.bindparam('config_blob')),
+                updates,
+            )
+
+
+def downgrade():
+    # Older code never decoded config_blob, so once-encoded rows work with
+    # it as they are; re-wrapping them would gain nothing.
+    pass
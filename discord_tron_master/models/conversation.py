@@ -1,5 +1,29 @@
 from .base import db
-import datetime, json
+from sqlalchemy.exc import IntegrityError
+import datetime, logging
+
+
+class ConversationMessages(db.Model):
+    """
+    One message of a conversation.  Rows are only ever appended (with the
+    next ``seq`` for their owner) or deleted from the front by truncation.
+    """
+
+    __tablename__ = "conversation_messages"
+    __table_args__ = (
+        db.UniqueConstraint("owner", "seq", name="uq_conversation_messages_owner_seq"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    owner = db.Column(db.BigInteger(), nullable=False, index=True)
+    seq = db.Column(db.Integer, nullable=False)
+    role = db.Column(db.String(32), nullable=False)
+    content = db.Column(db.Text(), nullable=False, default="")
+    # Token count of the message, so history budgets need no re-tokenising.
+    tokens = db.Column(db.Integer, nullable=True)
+    created = db.Column(db.DateTime, nullable=False, default=db.func.now())
+
+    def to_message(self) -> dict:
+        return {"role": self.role, "content": self.content}
 
 
 class Conversations(db.Model):
@@ -7,16 +31,20 @@ class Conversations(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     owner = db.Column(db.BigInteger(), unique=False, nullable=False)
     role = db.Column(db.String(255), nullable=False)
-    history = db.Column(db.Text(), nullable=False, default="{}")
+    # Legacy JSON blob; messages live in conversation_messages now.
+    history = db.Column(db.Text(), nullable=False, default="[]")
     created = db.Column(db.DateTime, nullable=False, default=db.func.now())
     updated = db.Column(db.DateTime, nullable=False, default=db.func.now())
 
+    APPEND_RETRIES = 5
+
     @staticmethod
     def get_all():
         return Conversations.query.all()
 
     @staticmethod
     def delete_all():
+        ConversationMessages.query.delete()
         all = Conversations.get_all()
         for conversation in all:
             db.session.delete(conversation)
@@ -24,18 +52,13 @@ class Conversations(db.Model):
 
     @staticmethod
     def clear_history_by_owner(owner: int):
-        conversation = Conversations.get_by_owner(owner)
-        import logging
-
-        logging.debug(f"Conversation before clearing: {conversation.history}")
-        conversation.history = json.dumps(Conversations.get_new_history())
-        logging.debug(f"Cleared conversation. New history: {conversation.history}")
-        # Update Flask DB timestamp
-        conversation.updated = db.func.now()
+        deleted = ConversationMessages.query.filter_by(owner=owner).delete()
+        logging.debug(f"Cleared conversation for {owner}: removed {deleted} messages.")
+        Conversations.query.filter_by(owner=owner).update({"updated": db.func.now()})
         db.session.commit()
 
     @staticmethod
-    def create(owner: int, role: str, history: dict = None):
+    def create(owner: int, role: str, history: list = None):
         existing_definition = Conversations.query.filter_by(owner=owner).first()
         if existing_definition is not None:
             return existing_definition
@@ -43,23 +66,140 @@ class Conversations(db.Model):
             raise ValueError(
                 "History must be provided when creating a new conversation"
             )
-        conversation = Conversations(owner=owner, role="", history=json.dumps(history))
+        conversation = Conversations(owner=owner, role="", history="[]")
         db.session.add(conversation)
         db.session.commit()
+        if history:
+            Conversations.append_messages(owner, history)
         return conversation
 
     @staticmethod
     def get_by_owner(owner: int):
-        conversation = Conversations.query.filter_by(owner=owner).first()
-        conversation.history = json.loads(conversation.history)
-        return conversation
+        return Conversations.query.filter_by(owner=owner).first()
+
+    @staticmethod
+    def _last_seq(owner: int) -> int:
+        last_seq = (
+            db.session.query(db.func.max(ConversationMessages.seq))
+            .filter(ConversationMessages.owner == owner)
+            .scalar()
+        )
+        return -1 if last_seq is None else last_seq
 
     @staticmethod
-    def set_history(owner: int, history: dict):
+    def append_messages(
+        owner: int, messages: list, tokens: list = None, keep_last: int = None
+    ) -> list:
+        """
+        Append ``{"role", "content"}`` messages after the owner's last one.
+
+        With ``keep_last``, rows older than the owner's last ``keep_last``
+        are deleted in the same transaction, so the table only holds what
+        readers of that window will ever load.
+
+        Concurrent appends for the same owner collide on (owner, seq); the
+        loser re-reads the last sequence number and tries again.
+        """
+        if not messages:
+            return []
+        for attempt in range(Conversations.APPEND_RETRIES):
+            last_seq = Conversations._last_seq(owner)
+            rows = [
+                ConversationMessages(
+                    owner=owner,
+                    seq=last_seq + 1 + idx,
+                    role=message.get("role", "user"),
+                    # Older system entries used "message" for the text.
+                    content=message.get("content", message.get("message", "")) or "",
+                    tokens=tokens[idx] if tokens else None,
+                )
+                for idx, message in enumerate(messages)
+            ]
+            try:
+                db.session.add_all(rows)
+                # The queries below autoflush the inserts, so a collision can
+                # surface here as well as at commit.
+                Conversations.query.filter_by(owner=owner).update(
+                    {"updated": db.func.now()}, synchronize_session=False
+                )
+                if keep_last is not None:
+                    first_kept = last_seq + len(messages) + 1 - max(1, keep_last)
+                    ConversationMessages.query.filter(
+                        ConversationMessages.owner == owner,
+                        ConversationMessages.seq < first_kept,
+                    ).delete(synchronize_session=False)
+                db.session.commit()
+                return rows
+            except IntegrityError:
+                db.session.rollback()
+                logging.debug(
+                    f"Sequence collision appending to conversation {owner}, attempt {attempt + 1}."
+                )
+        raise RuntimeError(f"Could not append to the conversation for {owner}.")
+
+    @staticmethod
+    def append_message(
+        owner: int, role: str, content: str, tokens: int = None, keep_last: int = None
+    ):
+        return Conversations.append_messages(
+            owner,
+            [{"role": role, "content": content}],
+            tokens=[tokens] if tokens is not None else None,
+            keep_last=keep_last,
+        )[0]
+
+    @staticmethod
+    def get_messages(owner: int, limit: int = None) -> list:
+        """
+        The owner's ``ConversationMessages`` rows in order; only the last ``limit`` if given.
+        """
+        query = ConversationMessages.query.filter_by(owner=owner)
+        if limit is None:
+            return query.order_by(ConversationMessages.seq.asc()).all()
+        rows = query.order_by(ConversationMessages.seq.desc()).limit(limit).all()
+        rows.reverse()
+        return rows
+
+    @staticmethod
+    def truncate_history(owner: int, before_seq: int = None, keep_last: int = None) -> int:
+        """
+        Delete the owner's messages older than ``before_seq``, or all but the
+        last ``keep_last``; returns how many were deleted.
+        """
+        if before_seq is None:
+            if keep_last is None:
+                raise ValueError("Either before_seq or keep_last must be given.")
+            if keep_last <= 0:
+                before_seq = Conversations._last_seq(owner) + 1
+            else:
+                before_seq = (
+                    db.session.query(ConversationMessages.seq)
+                    .filter(ConversationMessages.owner == owner)
+                    .order_by(ConversationMessages.seq.desc())
+                    .offset(keep_last - 1)
+                    .limit(1)
+                    .scalar()
+                )
+                if before_seq is None:
+                    return 0
+        deleted = (
+            ConversationMessages.query.filter(ConversationMessages.owner == owner)
+            .filter(ConversationMessages.seq < before_seq)
+            .delete(synchronize_session=False)
+        )
+        db.session.commit()
+        return deleted
+
+    @staticmethod
+    def set_history(owner: int, history: list):
+        """
+        Replace the whole history.  Prefer ``append_message`` and
+        ``truncate_history``, which do not rewrite existing messages.
+        """
         conversation = Conversations.get_by_owner(owner)
-        conversation.history = json.dumps(history)
-        conversation.updated = db.func.now()
+        ConversationMessages.query.filter_by(owner=owner).delete()
         db.session.commit()
+        Conversations.append_messages(owner, history)
         return conversation
 
     @staticmethod
@@ -69,12 +209,8 @@ class Conversations(db.Model):
         return [{"role": "system", "message": role}]
 
     @staticmethod
-    def get_history(owner: int):
-        conversation = Conversations.get_by_owner(owner)
-        # Unload it if it is a string:
-        if isinstance(conversation.history, str):
-            conversation.history = json.loads(conversation.history)
-        return conversation.history
+    def get_history(owner: int, limit: int = None) -> list:
+        return [row.to_message() for row in Conversations.get_messages(owner, limit)]
 
     @staticmethod
     def set_role(owner: int, role: str):
@@ -93,7 +229,7 @@ class Conversations(db.Model):
         return {
             "owner": self.owner,
             "role": self.role,
-            "history": self.history,
+            "history": Conversations.get_history(self.owner),
             "created": self.created,
             "updated": self.updated,
         }
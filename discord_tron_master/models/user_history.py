@@ -105,6 +105,28 @@ class UserHistory(db.Model):
         for user_history in all_user_history:
             db.session.delete(user_history)
 
+    @staticmethod
+    def encode_config(config_blob) -> str:
+        """``config_blob`` as stored: JSON-encoded once; strings are assumed to be encoded already."""
+        if isinstance(config_blob, str):
+            return config_blob
+        return json.dumps(config_blob if config_blob is not None else {})
+
+    @staticmethod
+    def new_row(
+        user: str, message: str, prompt: str, config_blob: dict = None, date_created=None
+    ) -> dict:
+        """Column values for one entry, for ``add_entries``."""
+        import time
+
+        return {
+            "user": str(user),
+            "message": str(message),
+            "prompt": prompt,
+            "config_blob": UserHistory.encode_config(config_blob),
+            "date_created": int(date_created or time.time()),
+        }
+
     @staticmethod
     def create(user: str, message: str, prompt: str, config_blob: dict = {}):
         import time
@@ -113,7 +135,7 @@ class UserHistory(db.Model):
             user=user,
             message=message,
             prompt=prompt,
-            config_blob=json.dumps(config_blob),
+            config_blob=UserHistory.encode_config(config_blob),
             date_created=int(time.time()),
         )
         db.session.add(user_history)
@@ -121,12 +143,23 @@ class UserHistory(db.Model):
         return user_history
 
     @staticmethod
-    def add_entry(user: str, message: str, prompt: str, config_blob: dict = {}):
-        result = UserHistory.create(
-            user, message, prompt, config_blob=json.dumps(config_blob)
-        )
+    def add_entries(rows: list) -> int:
+        """
+        Insert ``new_row`` dicts with one multi-row INSERT and a single commit.
+        """
+        if not rows:
+            return 0
+        try:
+            db.session.execute(UserHistory.__table__.insert(), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(rows)
 
-        return result
+    @staticmethod
+    def add_entry(user: str, message: str, prompt: str, config_blob: dict = {}):
+        return UserHistory.create(user, message, prompt, config_blob=config_blob)
 
     @staticmethod
     def get_user_statistics(user: str) -> dict:
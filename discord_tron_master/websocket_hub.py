@@ -6,6 +6,8 @@ from discord_tron_master.exceptions.registration import RegistrationError
 from discord_tron_master.models import User, OAuthToken
 from discord_tron_master.classes.command_processor import CommandProcessor
 from discord_tron_master.classes.app_config import AppConfig
+from discord_tron_master.classes import metrics
+from discord_tron_master.classes.structured_log import LazyPayload, log_event
 
 
 class WebSocketHub:
@@ -19,6 +21,9 @@ class WebSocketHub:
         self.queue_manager = None
         self.worker_manager = None
         self.discord = discord_bot
+        metrics.websocket_clients.set_function(lambda: len(self.connected_clients))
+        self._messages_in = metrics.websocket_messages.labels("in")
+        self._messages_out = metrics.websocket_messages.labels("out")
 
     async def set_queue_manager(self, queue_manager):
         self.queue_manager = queue_manager
@@ -46,23 +51,28 @@ class WebSocketHub:
         try:
             # Process incoming messages
             async for message in websocket:
+                self._messages_in.inc()
                 logging.debug(
-                    f"Received message from {websocket.remote_address}: {message}"
+                    "Received message from %s: %s",
+                    websocket.remote_address,
+                    LazyPayload(message),
                 )
                 decoded = json.loads(message)
                 if "worker_id" in decoded["arguments"]:
+                    if decoded["arguments"]["worker_id"] != worker_id:
+                        log_event(
+                            logging.getLogger(),
+                            logging.INFO,
+                            "websocket.worker_identified",
+                            worker_id=decoded["arguments"]["worker_id"],
+                            previous=worker_id,
+                        )
                     worker_id = decoded["arguments"]["worker_id"]
-                    logging.info(
-                        "Worker ID found in message. Updating worker ID to "
-                        + str(worker_id)
-                        + "."
-                    )
                 raw_result = await self.command_processor.process_command(
                     decoded, websocket
                 )
                 result = json.dumps(raw_result)
-                logging.debug(f"Raw result: {raw_result}")
-                logging.debug(f"JSON result: {result}")
+                logging.debug("Command result: %s", LazyPayload(raw_result))
                 # Did result error? If so, close the websocket connection:
                 registration_error = False
                 if isinstance(raw_result, str):
@@ -84,12 +94,17 @@ class WebSocketHub:
                     if raw_result is None:
                         raw_result = "No result was received. No execution occurred. Fuck right off!"
                         logging.error(
-                            f"Client requested some impossible task: {decoded}\nThe result was: {result}"
+                            "Client requested some impossible task: %s\nThe result was: %s",
+                            LazyPayload(decoded),
+                            result,
                         )
                 logging.debug(
-                    f"Sending message to {websocket.remote_address}: {result}"
+                    "Sending message to %s: %s",
+                    websocket.remote_address,
+                    LazyPayload(result),
                 )
                 await websocket.send(result)
+                self._messages_out.inc()
         except AuthError as e:
             logging.error(f"Client sent invalid auth credentials. Naughty!")
             await websocket.close(code=4002, reason=str(e))
@@ -135,6 +150,7 @@ class WebSocketHub:
     async def broadcast(self, message):
         for client in self.connected_clients:
             await client.send(message)
+            self._messages_out.inc()
 
     async def run(self, host="0.0.0.0", port=6789):
         logging.info(f"Running WebSocket Hub!")
@@ -0,0 +1,143 @@
+import tracemalloc
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+
+from discord_tron_master.classes import admission as admission_module
+from discord_tron_master.classes.admission import (
+    GUILD_LIMIT,
+    QUEUE_WAIT,
+    USER_LIMIT,
+    AdmissionController,
+)
+from discord_tron_master.classes.app_config import DEFAULT_CONFIG
+from discord_tron_master.classes.job_lanes import BULK_LANE, INTERACTIVE_LANE
+from discord_tron_master.classes.service_times import ServiceTimeEstimator
+from discord_tron_master.exceptions.admission import AdmissionRejected
+
+
+@pytest.fixture(autouse=True)
+def estimator(tmp_path, monkeypatch):
+    estimator = ServiceTimeEstimator(str(tmp_path / "service_times.db"))
+    monkeypatch.setattr(estimator, "start", lambda: None)
+    monkeypatch.setattr(admission_module, "service_time_estimator", estimator)
+    return estimator
+
+
+def _job(job_id, user=1, guild=None, job_type="gpu", lane=INTERACTIVE_LANE):
+    ctx = SimpleNamespace(guild=SimpleNamespace(id=guild) if guild is not None else None)
+    return SimpleNamespace(
+        id=job_id, job_type=job_type, author_id=user, lane=lane, payload=(None, None, ctx)
+    )
+
+
+def _queues(waiting, job_type="gpu"):
+    queue = SimpleNamespace(
+        queue=deque(_job(f"w{n}", job_type=job_type) for n in range(waiting)), in_progress={}
+    )
+    return {"w1": {"supported_job_types": {job_type: True}, "queue": queue}}
+
+
+def test_admission_is_off_unless_enabled():
+    assert DEFAULT_CONFIG["admission"]["enabled"] is False
+    controller = AdmissionController(max_inflight_per_user=1)
+    for n in range(20):
+        controller.admit(_job(f"j{n}"))
+    assert controller.inflight() == 0
+
+
+def test_per_user_and_per_guild_limits():
+    controller = AdmissionController(enabled=True, max_inflight_per_user=2, max_inflight_per_guild=3)
+    controller.admit(_job("a1", user=1, guild=7))
+    controller.admit(_job("a2", user=1, guild=7))
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit(_job("a3", user=1, guild=7))
+    assert rejected.value.reason == USER_LIMIT
+    controller.admit(_job("b1", user=2, guild=7))
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit(_job("b2", user=2, guild=7))
+    assert rejected.value.reason == GUILD_LIMIT
+    controller.release("a1")
+    controller.admit(_job("b2", user=2, guild=7))
+    assert controller.inflight() == 3
+
+
+def test_readmitting_a_job_does_not_take_a_second_slot():
+    controller = AdmissionController(enabled=True, max_inflight_per_user=2)
+    controller.admit(_job("a1"))
+    controller.admit(_job("a1"))
+    assert controller.inflight() == 1
+    controller.admit(_job("a2"))
+    controller.release("a1")
+    controller.release("a1")
+    assert controller.inflight() == 1
+
+
+def test_exempt_job_types_are_never_counted():
+    controller = AdmissionController(
+        enabled=True, max_inflight_per_user=1, exempt_job_types=["ollama"]
+    )
+    for n in range(5):
+        controller.admit(_job(f"l{n}", job_type="ollama"))
+    assert controller.inflight() == 0
+
+
+def test_projected_wait_rejects_and_bulk_is_deferred_first(estimator):
+    for _ in range(3):
+        estimator.observe("w1", "gpu", "command=None", 60.0)
+    controller = AdmissionController(
+        enabled=True, max_wait_seconds=600, bulk_max_wait_seconds=120, max_inflight_per_user=0
+    )
+    queues = _queues(waiting=5)
+    # Five jobs of a learned 60s each: 300s ahead.
+    assert controller.projected_wait("gpu", queues) == 300
+    assert controller.projected_wait("llama", queues) is None
+    assert controller.check("gpu", 1, queues=queues) is None
+    rejection = controller.check("gpu", 1, lane=BULK_LANE, queues=queues)
+    assert rejection.reason == QUEUE_WAIT
+    assert rejection.retry_after == 180
+    assert controller.check("gpu", 1, queues=_queues(waiting=11)).reason == QUEUE_WAIT
+
+
+def test_unlearned_job_types_fall_back_to_the_configured_estimate():
+    controller = AdmissionController(enabled=True, job_seconds={"gpu": 50}, default_job_seconds=5)
+    assert controller.projected_wait("gpu", _queues(waiting=4)) == 200
+
+
+def test_stale_slots_are_reclaimed(monkeypatch):
+    controller = AdmissionController(enabled=True, max_inflight_per_user=1, stale_after_seconds=10)
+    controller.admit(_job("lost"))
+    clock = [admission_module.time.monotonic() + 120]
+    monkeypatch.setattr(admission_module.time, "monotonic", lambda: clock[0])
+    controller.admit(_job("next"))
+    assert controller.inflight() == 1
+
+
+def test_an_overload_keeps_memory_bounded_by_the_limits():
+    users = 200
+    per_user = 5
+    controller = AdmissionController(enabled=True, max_inflight_per_user=per_user)
+    queue = deque()
+    tracemalloc.start()
+    try:
+        admitted = rejected = 0
+        for n in range(50000):
+            job = _job(f"j{n}", user=n % users)
+            try:
+                controller.admit(job)
+            except AdmissionRejected:
+                rejected += 1
+                continue
+            admitted += 1
+            queue.append(job)
+            # A worker finishes one job for every ten offered.
+            if n % 10 == 0 and queue:
+                controller.release(queue.popleft().id)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert controller.inflight() == len(queue) <= users * per_user
+    assert rejected > admitted
+    # The backlog, not the offered load, decides what is held: 1000 jobs at most.
+    assert peak < 2_000_000
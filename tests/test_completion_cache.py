@@ -0,0 +1,182 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from discord_tron_master.classes import metrics
+from discord_tron_master.classes.completion_cache import CompletionCache
+from discord_tron_master.classes.openai import text as text_module
+from discord_tron_master.classes.openai.text import GPT
+
+
+class MockBackend:
+    """Stands in for GPT._complete_with_backend and counts the calls that reach it."""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.calls = []
+
+    async def complete(self, backend, role, prompt, thinking_enabled, stream=None):
+        self.calls.append(prompt)
+        await asyncio.sleep(self.delay)
+        if "Prompt Generator" in role:
+            return f"caption {len(self.calls)}"
+        return json.dumps({"model": "acme/model", "resolution": "1024x1024"})
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = MockBackend()
+
+    async def complete_with_backend(gpt, *args):
+        return await backend.complete(*args)
+
+    monkeypatch.setattr(GPT, "_complete_with_backend", complete_with_backend)
+    # Each test runs its own event loops; the slot semaphores bind to one.
+    monkeypatch.setattr(text_module, "_BACKEND_SEMAPHORES", {})
+    monkeypatch.setattr(GPT, "_normalize_backend", lambda self: "ollama")
+    monkeypatch.setattr(GPT, "_resolve_model", lambda self, backend: "llama")
+    return backend
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = CompletionCache()
+    monkeypatch.setattr(text_module, "completion_cache", cache)
+    return cache
+
+
+def test_policy_caches_deterministic_requests_and_honours_overrides():
+    cache = CompletionCache()
+    assert cache.should_cache(0)
+    assert not cache.should_cache(0.7)
+    assert cache.should_cache(0.7, seed=1)
+    assert cache.should_cache(1.18, requested=True)
+    assert not cache.should_cache(0, requested=False)
+    assert not CompletionCache(enabled=False).should_cache(0, requested=True)
+
+
+def test_keys_ignore_field_order_but_not_values():
+    assert CompletionCache.key(prompt="a", temperature=0) == CompletionCache.key(temperature=0, prompt="a")
+    assert CompletionCache.key(prompt="a", seed=1) != CompletionCache.key(prompt="a", seed=2)
+
+
+def test_entries_are_bounded_by_count_bytes_and_age():
+    cache = CompletionCache(max_entries=3, max_bytes=10, ttl_seconds=0.05)
+
+    async def store(key, text):
+        return await cache.get_or_compute(key, lambda: asyncio.sleep(0, text))
+
+    async def run():
+        for n in range(5):
+            await store(f"k{n}", "ab")
+        assert len(cache) == 3
+        await store("big", "x" * 9)
+        assert len(cache) == 1
+        await store("huge", "x" * 11)
+        assert cache._lookup("huge") is None
+        await asyncio.sleep(0.06)
+        assert cache._lookup("big") is None
+
+    asyncio.run(run())
+
+
+def test_a_failed_owner_lets_its_waiters_retry():
+    cache = CompletionCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise RuntimeError("backend down")
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.get_or_compute("k", compute) for _ in range(4)), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert isinstance(results[0], RuntimeError)
+    assert results[1:] == ["ok"] * 3
+    # One waiter recomputes; the others coalesce onto it.
+    assert len(calls) == 2
+
+
+def test_identical_calls_on_two_loops_share_one_computation():
+    cache = CompletionCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "shared"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(asyncio.run(cache.get_or_compute("k", compute))))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["shared", "shared"]
+    assert len(calls) == 1
+
+
+def test_auto_model_select_reuses_answers_against_a_mock_backend(backend, cache):
+    hits = metrics.completion_cache_requests.labels("hit")
+    coalesced = metrics.completion_cache_requests.labels("coalesced")
+    before = hits.value() + coalesced.value()
+    prompts = [f"prompt {n}" for n in range(6)]
+
+    async def run():
+        # generate-x bursts: five copies of each prompt at once, then repeats.
+        for _ in range(2):
+            for prompt in prompts:
+                await asyncio.gather(*(GPT().auto_model_select(prompt) for _ in range(5)))
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    cached = time.perf_counter() - started
+    assert len(backend.calls) == len(prompts)
+    assert hits.value() + coalesced.value() - before == 60 - len(prompts)
+
+    cache.enabled = False
+    backend.calls.clear()
+    started = time.perf_counter()
+    asyncio.run(run())
+    uncached = time.perf_counter() - started
+    assert len(backend.calls) == 60
+    assert cached < uncached
+
+
+def test_requests_that_must_vary_always_reach_the_backend(backend, cache):
+    async def run():
+        captions = [await GPT().random_image_prompt() for _ in range(3)]
+        sink = type("Sink", (), {"feed": lambda self, delta: None, "restart": lambda self: None})()
+        for _ in range(2):
+            await GPT().turbo_completion("role", "same", temperature=0, stream=sink)
+        return captions
+
+    captions = asyncio.run(run())
+    assert len(set(captions)) == 3
+    assert len(backend.calls) == 5
+    assert len(cache) == 0
+
+
+def test_deterministic_requests_are_cached_by_default(backend, cache):
+    async def run():
+        answers = [await GPT().turbo_completion("role", "same", temperature=0) for _ in range(3)]
+        await GPT().turbo_completion("role", "same", temperature=0, max_tokens=10)
+        await GPT().turbo_completion("role", "same", temperature=0.9)
+        return answers
+
+    answers = asyncio.run(run())
+    assert len(set(answers)) == 1
+    # max_tokens is part of the key; temperature 0.9 is not cached.
+    assert len(backend.calls) == 3
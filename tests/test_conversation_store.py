@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+
+from discord_tron_master.classes.app_config import AppConfig
+from discord_tron_master.classes.database_handler import DatabaseHandler
+
+if DatabaseHandler.get_db() is None:
+    # The ORM models need a db object to declare against.
+    DatabaseHandler.database_instance = SQLAlchemy()
+
+from discord_tron_master.models.conversation import (  # noqa: E402
+    ConversationMessages,
+    Conversations,
+)
+
+db = DatabaseHandler.get_db()
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        Conversations.__table__.create(db.engine)
+        ConversationMessages.__table__.create(db.engine)
+        yield app
+
+
+@pytest.fixture
+def statements(app):
+    seen = []
+
+    def record(conn, cursor, statement, *args):
+        seen.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(db.engine, "before_cursor_execute", record)
+
+
+def _contents(owner, limit=None):
+    return [message["content"] for message in Conversations.get_history(owner, limit)]
+
+
+def test_appends_number_messages_per_owner(app):
+    Conversations.create(1, "", [{"role": "system", "message": "be nice"}])
+    Conversations.append_message(1, "user", "hi", tokens=3)
+    Conversations.append_message(2, "user", "other owner")
+    rows = Conversations.get_messages(1)
+    assert [(row.seq, row.role, row.content) for row in rows] == [
+        (0, "system", "be nice"),
+        (1, "user", "hi"),
+    ]
+    assert rows[1].tokens == 3
+    assert [row.seq for row in Conversations.get_messages(2)] == [0]
+
+
+def test_reading_a_window_returns_the_newest_messages_in_order(app):
+    Conversations.append_messages(1, [{"role": "user", "content": str(n)} for n in range(10)])
+    assert _contents(1, limit=3) == ["7", "8", "9"]
+
+
+def test_keep_last_prunes_in_the_same_append(app):
+    for n in range(10):
+        Conversations.append_message(1, "user", str(n), keep_last=4)
+    assert _contents(1) == ["6", "7", "8", "9"]
+
+
+def test_truncation_by_seq_or_count(app):
+    Conversations.append_messages(1, [{"role": "user", "content": str(n)} for n in range(10)])
+    assert Conversations.truncate_history(1, before_seq=3) == 3
+    assert Conversations.truncate_history(1, keep_last=2) == 5
+    assert _contents(1) == ["8", "9"]
+    assert Conversations.truncate_history(1, keep_last=5) == 0
+    with pytest.raises(ValueError):
+        Conversations.truncate_history(1)
+
+
+def test_a_sequence_collision_is_retried(app, monkeypatch):
+    Conversations.append_message(1, "user", "first")
+    last_seq = Conversations._last_seq
+    stale = iter([-1])
+    # The first attempt sees a stale last seq, as a concurrent appender would.
+    monkeypatch.setattr(
+        Conversations, "_last_seq", staticmethod(lambda owner: next(stale, None) or last_seq(owner))
+    )
+    Conversations.append_message(1, "user", "second")
+    assert _contents(1) == ["first", "second"]
+
+
+def test_clear_and_replace_history(app):
+    Conversations.create(1, "", [{"role": "user", "content": "old"}])
+    Conversations.set_history(1, [{"role": "user", "content": "new"}])
+    assert _contents(1) == ["new"]
+    Conversations.clear_history_by_owner(1)
+    assert _contents(1) == []
+
+
+def test_an_append_costs_the_same_however_long_the_chat(app, statements):
+    Conversations.append_messages(1, [{"role": "user", "content": "x"}] * 10)
+    Conversations.append_messages(2, [{"role": "user", "content": "x"}] * 5000)
+    costs = []
+    for owner in (1, 2):
+        del statements[:]
+        Conversations.append_message(owner, "user", "new", tokens=1, keep_last=200)
+        costs.append(len(statements))
+    assert costs[0] == costs[1]
+    del statements[:]
+    rows = Conversations.get_messages(2, limit=200)
+    assert len(rows) == 200
+    assert len(statements) == 1
+
+
+@pytest.fixture
+def chat_ml(app, monkeypatch):
+    monkeypatch.setattr(AppConfig, "flask", app)
+    from discord_tron_master.classes.openai import chat_ml
+
+    monkeypatch.setattr(chat_ml, "app", app)
+    # tiktoken's encodings are downloaded on first use; count words instead.
+    monkeypatch.setattr(chat_ml, "TokenTester", lambda: None)
+    monkeypatch.setattr(
+        chat_ml.ChatML,
+        "get_message_token_count",
+        lambda self, message: len(str(message.get("content", "")).split()) + 4,
+    )
+    return chat_ml
+
+
+def test_chat_ml_keeps_a_window_and_trims_for_the_budget(chat_ml):
+    Conversations.create(1, "", [])
+    chat = chat_ml.ChatML(Conversations.get_by_owner(1), token_limit=600, history_window=5)
+    for n in range(8):
+        asyncio.run(chat.add_user_reply(f"message {n}"))
+    assert [m["content"] for m in asyncio.run(chat.get_history())] == [
+        f"message {n}" for n in range(3, 8)
+    ]
+    assert _contents(1) == [f"message {n}" for n in range(3, 8)]
+    # 6 tokens each plus 512 of padding: a 60-token reply leaves room for 4.
+    asyncio.run(chat.add_user_reply(" ".join(["word"] * 56)))
+    assert len(asyncio.run(chat.get_history())) == 5
+    fresh = chat_ml.ChatML(Conversations.get_by_owner(1), token_limit=600, history_window=5)
+    assert asyncio.run(fresh.get_history()) == asyncio.run(chat.get_history())
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from discord_tron_master.classes.deadlines import TimerWheel
+
+# A power of two, so deadline / tick is exact and the bounds below are too.
+TICK = 0.125
+
+
+def _schedule_random(wheel, rng, count, now, spread):
+    deadlines = {}
+    for key in range(count):
+        # Mostly near-term, with some far enough out to cascade through every
+        # level and a few past the top level's span.
+        horizon = rng.choice((1.0, 60.0, spread))
+        deadlines[key] = now + rng.uniform(-1.0, horizon)
+        wheel.schedule(key, deadlines[key])
+    return deadlines
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_timers_fire_no_earlier_than_their_deadline_and_within_a_tick(seed):
+    rng = random.Random(seed)
+    wheel = TimerWheel(tick_seconds=TICK)
+    horizon = TICK * TimerWheel.SLOTS**TimerWheel.LEVELS
+    deadlines = _schedule_random(wheel, rng, 2000, 0.0, horizon * 1.5)
+    fired = {}
+    now = 0.0
+    while len(fired) < len(deadlines):
+        now += rng.choice((0.01, 0.3, 7.0, 300.0, 20000.0, horizon / 3))
+        for key, deadline in wheel.advance(now):
+            assert key not in fired
+            assert deadline == deadlines[key]
+            assert now >= deadline, "fired early"
+            fired[key] = now
+        for key, deadline in deadlines.items():
+            if key not in fired:
+                assert now < deadline + TICK, "fired late"
+    assert len(wheel) == 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sleeping_until_next_wakeup_is_never_late(seed):
+    rng = random.Random(seed)
+    wheel = TimerWheel(tick_seconds=TICK)
+    deadlines = _schedule_random(wheel, rng, 500, 0.0, 100000.0)
+    late = []
+    while len(wheel):
+        now = wheel.next_wakeup()
+        assert now is not None
+        for key, deadline in wheel.advance(now):
+            assert now >= deadline
+            # Timers already overdue when scheduled are due at once.
+            if now >= max(deadline, 0.0) + TICK:
+                late.append(key)
+            del deadlines[key]
+    assert not late
+    assert not deadlines
+    assert wheel.next_wakeup() is None
+
+
+def test_cancelled_and_rescheduled_timers():
+    wheel = TimerWheel(tick_seconds=TICK)
+    wheel.schedule("cancelled", 5.0)
+    wheel.schedule("moved", 5.0)
+    wheel.schedule("moved", 50.0)
+    assert wheel.cancel("cancelled")
+    assert not wheel.cancel("cancelled")
+    assert wheel.deadline("moved") == 50.0
+    assert wheel.advance(10.0) == []
+    assert wheel.advance(50.0) == [("moved", 50.0)]
+    assert len(wheel) == 0
+
+
+def test_past_deadline_fires_on_next_advance():
+    wheel = TimerWheel(tick_seconds=TICK, start=100.0)
+    wheel.schedule("overdue", 90.0)
+    assert wheel.next_wakeup() == wheel.now
+    assert wheel.advance(100.0) == [("overdue", 90.0)]
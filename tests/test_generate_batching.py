@@ -0,0 +1,166 @@
+import asyncio
+import sys
+import types
+from types import SimpleNamespace
+
+import pytest
+from flask_sqlalchemy import SQLAlchemy
+
+from discord_tron_master.classes.database_handler import DatabaseHandler
+from discord_tron_master.classes.service_times import ServiceTimeEstimator
+
+if DatabaseHandler.get_db() is None:
+    # The cog imports the ORM models, which need a db object to declare against.
+    DatabaseHandler.database_instance = SQLAlchemy()
+
+from discord_tron_master.cogs.image import generate as generate_module  # noqa: E402
+
+
+class FakeMessage:
+    def __init__(self, text):
+        self.text = text
+        self.edits = []
+
+    async def edit(self, content):
+        self.edits.append(content)
+
+    async def delete(self, delay=None):
+        pass
+
+
+class FakeCtx:
+    def __init__(self):
+        self.author = SimpleNamespace(id=1, mention="@user", name="user", discriminator="0")
+        self.guild = SimpleNamespace(id=7, name="guild")
+        self.channel = self
+        self.message = SimpleNamespace(id=500)
+        self.sent = []
+        self.files = []
+
+    async def send(self, content=None, file=None):
+        if file is not None:
+            self.files.append(file)
+        else:
+            self.sent.append(content)
+
+
+class FakeConfig:
+    def __init__(self):
+        self.user_config_reads = 0
+
+    def reload_config(self):
+        pass
+
+    def get_user_config(self, user_id):
+        self.user_config_reads += 1
+        return {"model": "ptx0/terminus", "auto_model": True, "resolution": {"width": 1024, "height": 1024}}
+
+
+class FakeSelector:
+    def __init__(self):
+        self.prompts = []
+
+    async def select(self, prompt):
+        self.prompts.append(prompt)
+        await asyncio.sleep(0.01)
+        return {"width": 832, "height": 1216}, "acme/model"
+
+
+class FakeQueueManager:
+    def __init__(self):
+        self.queues = {}
+        self.batches = []
+
+    async def enqueue_jobs(self, worker, jobs):
+        self.batches.append((worker, list(jobs)))
+        return list(jobs), None
+
+
+@pytest.fixture
+def cog(monkeypatch, tmp_path):
+    estimator = ServiceTimeEstimator(str(tmp_path / "service_times.db"))
+    monkeypatch.setattr(estimator, "start", lambda: None)
+    monkeypatch.setattr(generate_module, "service_time_estimator", estimator)
+    worker = SimpleNamespace(worker_id="w1", job_queue=None)
+    queue_manager = FakeQueueManager()
+    bot = SimpleNamespace(
+        worker_manager=SimpleNamespace(find_best_fit_worker=lambda job: worker),
+        queue_manager=queue_manager,
+    )
+    monkeypatch.setattr(generate_module, "discord", bot)
+    selector = FakeSelector()
+    monkeypatch.setattr(generate_module, "model_selector", selector)
+    history = []
+    monkeypatch.setattr(
+        generate_module, "history_writer", SimpleNamespace(add_many=history.extend)
+    )
+
+    async def send_large_message(ctx, text, **kwargs):
+        return FakeMessage(text)
+
+    monkeypatch.setattr(generate_module.DiscordBot, "send_large_message", send_large_message)
+    cog = generate_module.Generate.__new__(generate_module.Generate)
+    cog.bot = None
+    cog.config = FakeConfig()
+    cog.queue_manager = queue_manager
+    cog.selector = selector
+    cog.history = history
+    return cog
+
+
+def test_generate_x_queues_one_batch_with_one_selection(cog):
+    ctx = FakeCtx()
+    asyncio.run(cog._generate_prompt(ctx, "a red fox in snow", copies=5))
+    assert ctx.sent == []
+    [(worker, jobs)] = cog.queue_manager.batches
+    assert len(jobs) == 5
+    assert cog.selector.prompts == ["a red fox in snow"]
+    assert cog.config.user_config_reads == 1
+    assert {job.extra_payload["user_config"]["model"] for job in jobs} == {"acme/model"}
+    # Every job gets its own config copy.
+    assert len({id(job.extra_payload["user_config"]) for job in jobs}) == 5
+    assert len(cog.history) == 5
+    assert all("queued on w1" in job.discord_first_message.edits[0] for job in jobs)
+
+
+def test_multiline_prompts_select_once_per_distinct_line(cog):
+    ctx = FakeCtx()
+    asyncio.run(cog._generate_prompt(ctx, "a fox\na cat\n\na fox", copies=2))
+    [(_, jobs)] = cog.queue_manager.batches
+    assert [job.payload[3] for job in jobs] == ["a fox"] * 2 + ["a cat"] * 2 + ["a fox"] * 2
+    assert sorted(cog.selector.prompts) == ["a cat", "a fox"]
+
+
+def test_sd3_sends_one_image_per_copy(cog, monkeypatch):
+    calls = []
+
+    class StabilityAI:
+        async def generate_image(self, prompt, user_config, model):
+            calls.append((prompt, model))
+            return b"png"
+
+    api = types.ModuleType("discord_tron_master.classes.stabilityai.api")
+    api.StabilityAI = StabilityAI
+    monkeypatch.setitem(sys.modules, "discord_tron_master.classes.stabilityai.api", api)
+    ctx = FakeCtx()
+    asyncio.run(cog._generate_prompt(ctx, "a red fox --sd3", copies=3))
+    assert calls == [("a red fox", "sd3-turbo")] * 3
+    assert len(ctx.files) == 3
+    assert cog.queue_manager.batches == []
+
+
+def test_an_sd3_failure_stops_the_remaining_copies(cog, monkeypatch):
+    calls = []
+
+    class StabilityAI:
+        async def generate_image(self, prompt, user_config, model):
+            calls.append(prompt)
+            raise RuntimeError("quota")
+
+    api = types.ModuleType("discord_tron_master.classes.stabilityai.api")
+    api.StabilityAI = StabilityAI
+    monkeypatch.setitem(sys.modules, "discord_tron_master.classes.stabilityai.api", api)
+    ctx = FakeCtx()
+    asyncio.run(cog._generate_prompt(ctx, "a red fox --sd3", copies=4))
+    assert len(calls) == 1
+    assert ctx.sent == ["Error generating image: quota"]
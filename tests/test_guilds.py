@@ -0,0 +1,88 @@
+import json
+import os
+import time
+
+import pytest
+
+from discord_tron_master.classes.guilds import Guilds, _GuildStore
+
+
+def _guilds(path):
+    guilds = Guilds.__new__(Guilds)
+    guilds.config_path = str(path)
+    guilds._store = _GuildStore.for_path(str(path))
+    guilds.reload_config()
+    return guilds
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "guilds.json"
+    yield path
+    _GuildStore._stores.pop(str(path), None)
+
+
+def test_a_missing_file_is_created_with_the_defaults(path):
+    guilds = _guilds(path)
+    assert json.loads(path.read_text()) == {}
+    assert guilds.get_config_value("guilds") == {}
+    assert not guilds.is_guild_home_defined()
+
+
+def test_a_ban_is_on_disk_and_seen_at_once(path):
+    guilds = _guilds(path)
+    guilds.set_guild_banned_channel(7, 99)
+    assert guilds.is_channel_banned(7, 99)
+    assert not guilds.is_channel_banned(7, 100)
+    assert not guilds.is_channel_banned(8, 99)
+    assert json.loads(path.read_text())["guilds"]["7"]["banned_channels"] == [99]
+    # Every instance for the path shares the store.
+    assert _guilds(path).is_channel_banned(7, 99)
+    guilds.remove_guild_banned_channel(7, 99)
+    assert not guilds.is_channel_banned(7, 99)
+
+
+def test_an_external_edit_is_picked_up_after_the_stat_interval(path, monkeypatch):
+    guilds = _guilds(path)
+    path.write_text(json.dumps({"guilds": {"7": {"banned_channels": [5]}}, "extra": True}))
+    store = guilds._store
+    store._checked_at = time.monotonic()
+    assert not guilds.is_channel_banned(7, 5)
+    monkeypatch.setattr(store, "STAT_INTERVAL", 0)
+    assert guilds.is_channel_banned(7, 5)
+    assert guilds.get_config_value("extra") is True
+
+
+def test_returned_settings_are_copies(path):
+    guilds = _guilds(path)
+    guilds.set_guild_allowed_model(7, "ptx0/terminus")
+    allowed = guilds.get_guild_allowed_models(7)
+    allowed.append("acme/other")
+    assert guilds.get_guild_allowed_models(7) == ["ptx0/terminus"]
+
+
+def test_a_failed_write_leaves_the_old_file_and_no_temp_files(path):
+    guilds = _guilds(path)
+    guilds.set_guild_setting(7, "allowed_models", ["a"])
+    before = path.read_text()
+    with pytest.raises(TypeError):
+        guilds.set_guild_setting(7, "allowed_models", {object()})
+    assert path.read_text() == before
+    assert guilds.get_guild_allowed_models(7) == ["a"]
+    assert os.listdir(path.parent) == ["guilds.json"]
+
+
+def test_ban_checks_are_in_memory_lookups(path):
+    guilds = _guilds(path)
+    config = {
+        "guilds": {
+            str(guild): {"banned_channels": list(range(guild, guild + 20))}
+            for guild in range(5000)
+        }
+    }
+    guilds._store.save(config)
+    started = time.perf_counter()
+    for guild in range(5000):
+        assert guilds.is_channel_banned(guild, guild + 19)
+    # Re-parsing this 2 MB file took ~80ms per check before the store.
+    assert (time.perf_counter() - started) / 5000 < 20e-6
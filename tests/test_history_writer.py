@@ -0,0 +1,132 @@
+import time
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from discord_tron_master.classes import metrics
+from discord_tron_master.classes.database_handler import DatabaseHandler
+
+if DatabaseHandler.get_db() is None:
+    # The ORM models need a db object to declare against.
+    DatabaseHandler.database_instance = SQLAlchemy()
+
+from discord_tron_master.classes.history_writer import HistoryWriter  # noqa: E402
+from discord_tron_master.models.user_history import UserHistory  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db = DatabaseHandler.get_db()
+    db.init_app(app)
+    with app.app_context():
+        UserHistory.__table__.create(db.engine)
+    return app
+
+
+@pytest.fixture
+def inserts(monkeypatch):
+    """Counts INSERT statements and can make the next ones fail."""
+    calls = {"statements": 0, "fail": 0}
+    add_entries = UserHistory.add_entries
+
+    def counting(rows):
+        if calls["fail"]:
+            calls["fail"] -= 1
+            raise RuntimeError("database went away")
+        calls["statements"] += 1
+        return add_entries(rows)
+
+    monkeypatch.setattr(UserHistory, "add_entries", staticmethod(counting))
+    return calls
+
+
+def _stored(app):
+    with app.app_context():
+        return [(row.message, row.prompt) for row in UserHistory.query.order_by(UserHistory.id)]
+
+
+def _writer(app, **kwargs):
+    kwargs.setdefault("flush_interval_seconds", 60)
+    writer = HistoryWriter(app=app, **kwargs)
+    # Tests flush by hand unless they want the background thread.
+    writer._start = lambda: None
+    return writer
+
+
+def test_rows_are_written_in_order_with_one_insert_per_batch(app, inserts):
+    writer = _writer(app, batch_size=40)
+    for n in range(100):
+        writer.add(1, n, f"prompt {n}", {"model": "m"})
+    assert _stored(app) == []
+    assert writer.flush() == 100
+    assert inserts["statements"] == 3
+    assert _stored(app) == [(str(n), f"prompt {n}") for n in range(100)]
+    with app.app_context():
+        assert UserHistory.query.first().config_blob == '{"model": "m"}'
+
+
+def test_a_full_batch_wakes_the_background_thread(app, inserts):
+    writer = HistoryWriter(app=app, batch_size=10, flush_interval_seconds=60)
+    try:
+        writer.add_many([{"user": 1, "message": n, "prompt": "p"} for n in range(10)])
+        deadline = time.monotonic() + 5
+        while writer.pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.pending == 0
+        assert len(_stored(app)) == 10
+    finally:
+        writer.close()
+
+
+def test_a_failed_write_is_retried_in_order(app, inserts):
+    failed = metrics.user_history_rows.labels("failed")
+    before = failed.value()
+    writer = _writer(app, batch_size=5)
+    writer.add_many([{"user": 1, "message": n, "prompt": "p"} for n in range(8)])
+    inserts["fail"] = 1
+    assert writer.flush() == 0
+    assert writer.pending == 8
+    assert failed.value() == before + 5
+    writer.add(1, 8, "p")
+    assert writer.flush() == 9
+    assert [message for message, _ in _stored(app)] == [str(n) for n in range(9)]
+
+
+def test_an_outage_drops_the_oldest_rows_past_the_cap(app, inserts):
+    dropped = metrics.user_history_rows.labels("dropped")
+    before = dropped.value()
+    writer = _writer(app, batch_size=10, max_buffered=50)
+    inserts["fail"] = 1000
+    for n in range(80):
+        writer.add(1, n, "p")
+    assert writer.flush() == 0
+    assert writer.pending == 50
+    assert dropped.value() == before + 30
+    inserts["fail"] = 0
+    writer.flush()
+    assert [message for message, _ in _stored(app)] == [str(n) for n in range(30, 80)]
+
+
+def test_close_flushes_and_later_rows_write_through(app, inserts):
+    writer = _writer(app, batch_size=100)
+    writer.add(1, 1, "before close")
+    writer.close()
+    assert _stored(app) == [("1", "before close")]
+    writer.add(1, 2, "after close")
+    assert _stored(app)[-1] == ("2", "after close")
+
+
+def test_buffering_costs_the_caller_far_less_than_a_commit(app, inserts):
+    writer = _writer(app, batch_size=1000, max_buffered=10000)
+    started = time.perf_counter()
+    for n in range(1000):
+        writer.add(1, n, "prompt", {"model": "m", "steps": 30})
+    per_add = (time.perf_counter() - started) / 1000
+    assert inserts["statements"] == 0
+    # The caller only builds the row; the INSERT happens on the writer thread.
+    assert per_add < 50e-6
+    writer.flush()
+    assert inserts["statements"] == 1
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from io import BytesIO
+
+from aiohttp import web
+from PIL import Image
+
+from discord_tron_master.classes.image_backends import ImageBackendExecutor, decode_image
+
+
+class FakeConfig:
+    def __init__(self, raw):
+        self.raw = raw
+
+    def get_image_backend_config(self):
+        return self.raw
+
+
+def _png(size=(4, 3)):
+    buffer = BytesIO()
+    Image.new("RGB", size, (255, 0, 0)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_from_config_reads_the_pool_size_and_timeout():
+    backends = ImageBackendExecutor.from_config(
+        FakeConfig({"max_workers": 3, "http_timeout_seconds": 5})
+    )
+    assert (backends.max_workers, backends.http_timeout_seconds) == (3, 5.0)
+    assert ImageBackendExecutor(max_workers=0).max_workers == 1
+
+
+def test_blocking_calls_leave_the_loop_responsive():
+    backends = ImageBackendExecutor(max_workers=4)
+
+    async def run():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        threads = await asyncio.gather(
+            *(backends.run(lambda: time.sleep(0.2) or threading.current_thread().name) for _ in range(4))
+        )
+        beat.cancel()
+        return ticks, threads
+
+    try:
+        ticks, threads = asyncio.run(run())
+    finally:
+        backends.shutdown()
+    # A blocking call on the loop would have starved the heartbeat for 0.8s.
+    assert ticks >= 10
+    assert all(name.startswith("image_backend") for name in threads)
+
+
+def test_max_workers_bounds_concurrent_calls():
+    backends = ImageBackendExecutor(max_workers=2)
+    lock = threading.Lock()
+    running = {"now": 0, "peak": 0}
+
+    def call():
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        time.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+
+    async def burst():
+        await asyncio.gather(*(backends.run(call) for _ in range(10)))
+
+    try:
+        asyncio.run(burst())
+    finally:
+        backends.shutdown()
+    assert running["peak"] == 2
+
+
+def test_run_passes_arguments_and_raises_errors():
+    backends = ImageBackendExecutor(max_workers=1)
+
+    def fail():
+        raise ValueError("backend down")
+
+    async def run():
+        assert await backends.run(lambda a, b=0: a + b, 1, b=2) == 3
+        try:
+            await backends.run(fail)
+        except ValueError as e:
+            return str(e)
+
+    try:
+        assert asyncio.run(run()) == "backend down"
+    finally:
+        backends.shutdown()
+
+
+def test_decode_image_loads_the_pixels():
+    image = decode_image(_png())
+    assert image.size == (4, 3)
+    assert image.getpixel((0, 0)) == (255, 0, 0)
+
+
+def test_http_calls_share_one_session_per_loop():
+    backends = ImageBackendExecutor(max_workers=1, http_timeout_seconds=5)
+    png = _png((2, 2))
+
+    async def image(request):
+        return web.Response(body=png, content_type="image/png")
+
+    async def echo(request):
+        return web.Response(status=201, body=await request.read())
+
+    async def missing(request):
+        return web.Response(status=404)
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/image.png", image)
+        app.router.add_post("/echo", echo)
+        app.router.add_get("/missing", missing)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        base = f"http://127.0.0.1:{port}"
+        try:
+            fetched = await backends.fetch_image(f"{base}/image.png")
+            session = await backends._get_session()
+            posted = await backends.post(f"{base}/echo", data=b"payload")
+            assert await backends._get_session() is session
+            try:
+                await backends.fetch(f"{base}/missing")
+                raised = False
+            except Exception:
+                raised = True
+            await backends.close()
+            return fetched.size, posted, raised, session.closed
+        finally:
+            await runner.cleanup()
+
+    try:
+        size, posted, raised, closed = asyncio.run(run())
+    finally:
+        backends.shutdown()
+    assert size == (2, 2)
+    assert posted == (201, b"payload")
+    assert raised
+    assert closed
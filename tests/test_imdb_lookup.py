@@ -0,0 +1,136 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from discord_tron_master.adapters.tge_ports import IMDBLookupAdapter
+from discord_tron_master.classes.imdb_lookup import _MISS, IMDBLookupEngine
+
+
+class FakeIMDB:
+    """Stands in for ``IMDBLookupEngine._get``, answering suggestion URLs by query."""
+
+    def __init__(self, answers, delays=None):
+        self.answers = answers
+        self.delays = delays or {}
+        self.requests = []
+
+    async def get(self, session, url, headers, timeout):
+        query = url.rsplit("/", 1)[-1][: -len(".json")].replace("_", " ")
+        self.requests.append(query)
+        await asyncio.sleep(self.delays.get(query, 0.0))
+        answer = self.answers.get(query, 404)
+        if answer is None:
+            return None
+        if answer == 404:
+            return 404, ""
+        return 200, json.dumps({"d": [{"id": "tt1", "l": answer, "y": 2000}]})
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = IMDBLookupEngine(db_path=str(tmp_path / "imdb_cache.db"), timeout=1)
+
+    async def no_session():
+        return None
+
+    monkeypatch.setattr(engine, "_get_session", no_session)
+    return engine
+
+
+def _use(engine, monkeypatch, fake):
+    monkeypatch.setattr(engine, "_get", fake.get)
+    return fake
+
+
+def test_fallback_queries_are_most_specific_first():
+    assert IMDBLookupEngine.fallback_queries("The Expanse S02E03 Static") == [
+        "the expanse s02e03 static",
+        "the expanse static",
+        "the expanse s02e03",
+        "the expanse",
+    ]
+
+
+def test_cache_entries_expire(engine):
+    engine.cache_put("k", ["v"], ttl=60)
+    assert engine.cache_get("k") == ["v"]
+    engine.cache_put("k", ["v"], ttl=-1)
+    assert engine.cache_get("k") is _MISS
+    assert engine.purge_expired() == 1
+
+
+def test_the_most_specific_hit_wins_even_when_it_answers_last(engine, monkeypatch):
+    fake = _use(
+        engine,
+        monkeypatch,
+        FakeIMDB(
+            {"the expanse static": "Static", "the expanse": "The Expanse"},
+            delays={"the expanse static": 0.05},
+        ),
+    )
+    results = asyncio.run(engine.search("The Expanse Static"))
+    assert [r["title"] for r in results] == ["Static"]
+    assert sorted(fake.requests) == ["the expanse", "the expanse static"]
+
+
+def test_identical_searches_share_one_request_and_the_cache(engine, monkeypatch):
+    fake = _use(engine, monkeypatch, FakeIMDB({"dune": "Dune"}, delays={"dune": 0.02}))
+
+    async def run():
+        return await asyncio.gather(*(engine.search("Dune") for _ in range(10)))
+
+    assert all(r[0]["title"] == "Dune" for r in asyncio.run(run()))
+    assert fake.requests == ["dune"]
+    assert asyncio.run(engine.search("dune!"))[0]["title"] == "Dune"
+    assert fake.requests == ["dune"]
+    assert engine.cached_search("Dune")[0]["title"] == "Dune"
+
+
+def test_a_miss_is_only_cached_when_every_variant_answered(engine, monkeypatch):
+    fake = _use(engine, monkeypatch, FakeIMDB({"no such film": None}))
+    assert asyncio.run(engine.search("No Such Film")) == []
+    assert engine.cached_search("No Such Film") is _MISS
+    fake.answers = {}
+    assert asyncio.run(engine.search("No Such Film")) == []
+    assert engine.cached_search("No Such Film") == []
+
+
+def _on_a_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def test_cache_io_runs_off_the_engine_loop(engine, monkeypatch):
+    _use(engine, monkeypatch, FakeIMDB({"dune": "Dune"}))
+    on_loop = []
+
+    def spy(method):
+        def wrapper(*args):
+            on_loop.append(_on_a_loop())
+            return method(*args)
+
+        return wrapper
+
+    monkeypatch.setattr(engine, "cache_get", spy(engine.cache_get))
+    monkeypatch.setattr(engine, "cache_put", spy(engine.cache_put))
+    asyncio.run(engine.search("Dune"))
+    assert on_loop and not any(on_loop)
+
+
+def test_adapter_answers_cached_searches_without_the_engine_loop(engine, monkeypatch):
+    fake = _use(engine, monkeypatch, FakeIMDB({"alien": "Alien"}))
+    adapter = IMDBLookupAdapter(engine=engine)
+    started = time.monotonic()
+    assert adapter.search("Alien")[0]["title"] == "Alien"
+    assert time.monotonic() - started < engine.timeout
+    assert engine._loop is not None
+    engine._loop.call_soon_threadsafe(engine._loop.stop)
+    engine._loop = None
+    assert adapter.search("Alien")[0]["title"] == "Alien"
+    assert engine._loop is None
+    assert fake.requests == ["alien"]
@@ -0,0 +1,169 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+from discord_tron_master.classes import job_queue as job_queue_module
+from discord_tron_master.classes.job_lanes import BULK_LANE, INTERACTIVE_LANE, LanePolicy, LaneQueue
+from discord_tron_master.classes.model_affinity import AffinityPreference
+
+
+class FakeJob:
+    def __init__(self, job_id, *, lane=INTERACTIVE_LANE, model=None, enqueued_at=0.0):
+        """*enqueued_at* is in seconds relative to now."""
+        self.id = job_id
+        self.job_type = "gpu"
+        self.lane = lane
+        self.enqueued_at = time.monotonic() + enqueued_at
+        self.extra_payload = {"user_config": {"model": model}}
+
+    def __repr__(self):
+        return f"FakeJob({self.id})"
+
+
+def _policy(bulk_cap=None):
+    bulk = {"priority": 1}
+    if bulk_cap is not None:
+        bulk["max_in_progress"] = bulk_cap
+    # No aging, so dispatch order is plain FIFO across lanes.
+    return LanePolicy(
+        {INTERACTIVE_LANE: {"priority": 0}, BULK_LANE: bulk}, aging_seconds=0
+    )
+
+
+def _preference(warm, *, window=4, max_bypass=2, max_bypass_seconds=3600.0):
+    return AffinityPreference(tuple(warm), window, max_bypass, max_bypass_seconds)
+
+
+# -- Lane caps -------------------------------------------------------------------
+
+
+def test_capped_lane_is_skipped_until_a_slot_frees():
+    policy = _policy(bulk_cap=1)
+    queue = LaneQueue(policy)
+    queue.extend(
+        [
+            FakeJob("b1", lane=BULK_LANE, enqueued_at=1),
+            FakeJob("b2", lane=BULK_LANE, enqueued_at=2),
+            FakeJob("i1", enqueued_at=3),
+        ]
+    )
+    lane, job = queue.pop_available()
+    assert (lane, job.id) == (BULK_LANE, "b1")
+    policy.started(lane)
+    assert queue.peek_available().id == "i1"
+    assert queue.pop_available()[1].id == "i1"
+    assert queue.pop_available() == (None, None)
+    # Caps never hide jobs from the deque-style view.
+    assert [job.id for job in queue] == ["b2"]
+    policy.finished(BULK_LANE)
+    assert queue.pop_available()[1].id == "b2"
+
+
+def test_first_available_skips_capped_lanes_and_rejected_jobs():
+    policy = _policy(bulk_cap=0)
+    queue = LaneQueue(policy)
+    queue.extend(
+        [
+            FakeJob("b1", lane=BULK_LANE, enqueued_at=1),
+            FakeJob("i1", model="flux", enqueued_at=2),
+            FakeJob("i2", model="sdxl", enqueued_at=3),
+        ]
+    )
+    assert queue.first_available(lambda job: True).id == "i1"
+    assert queue.first_available(lambda job: job.id != "i1").id == "i2"
+    assert queue.first_available(lambda job: False) is None
+
+
+def test_finished_never_goes_negative():
+    policy = _policy(bulk_cap=1)
+    policy.finished(BULK_LANE)
+    assert policy.in_progress_by_lane()[BULK_LANE] == 0
+    assert policy.has_capacity(BULK_LANE)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_job_queue_keeps_lane_counts_in_step(monkeypatch, seed):
+    rng = random.Random(seed)
+    policy = _policy(bulk_cap=2)
+    monkeypatch.setattr(job_queue_module, "lane_policy", policy)
+
+    async def run():
+        queues = [job_queue_module.JobQueue(f"w{n}") for n in range(3)]
+        for step in range(600):
+            job_queue = rng.choice(queues)
+            action = rng.random()
+            if action < 0.45:
+                lane = rng.choice((INTERACTIVE_LANE, BULK_LANE))
+                await job_queue.put(FakeJob(f"j{step}", lane=lane, enqueued_at=step))
+            elif action < 0.8:
+                await job_queue.get()
+            elif job_queue.in_progress:
+                job_queue.done(rng.choice(list(job_queue.in_progress)))
+            in_progress = {INTERACTIVE_LANE: 0, BULK_LANE: 0}
+            for each in queues:
+                for lane in each.in_progress_lanes.values():
+                    in_progress[lane] += 1
+            assert policy.in_progress_by_lane() == in_progress
+            assert in_progress[BULK_LANE] <= 2
+        for each in queues:
+            await each.stop()
+        assert policy.in_progress_by_lane() == {INTERACTIVE_LANE: 0, BULK_LANE: 0}
+
+    asyncio.run(run())
+
+
+# -- Affinity bypass limits --------------------------------------------------------
+
+
+def test_warm_job_is_taken_from_within_the_window():
+    queue = LaneQueue(_policy())
+    queue.extend(
+        [
+            FakeJob("cold", model="flux", enqueued_at=1),
+            FakeJob("warm", model="sdxl", enqueued_at=2),
+        ]
+    )
+    assert queue.pop_available(_preference(["sdxl"]))[1].id == "warm"
+    head = queue.pop_available(_preference(["sdxl"]))[1]
+    assert head.id == "cold"
+    assert head.affinity_bypasses == 1
+
+
+def test_warm_job_beyond_the_window_is_not_taken():
+    queue = LaneQueue(_policy())
+    queue.extend(
+        [FakeJob(f"cold{n}", model="flux", enqueued_at=n) for n in range(4)]
+        + [FakeJob("warm", model="sdxl", enqueued_at=10)]
+    )
+    assert queue.pop_available(_preference(["sdxl"], window=4))[1].id == "cold0"
+
+
+def test_a_job_is_passed_over_at_most_max_bypass_times():
+    queue = LaneQueue(_policy())
+    queue.append(FakeJob("head", model="flux", enqueued_at=0))
+    queue.extend(FakeJob(f"warm{n}", model="sdxl", enqueued_at=1 + n) for n in range(5))
+    taken = [queue.pop_available(_preference(["sdxl"], max_bypass=2))[1].id for _ in range(3)]
+    assert taken == ["warm0", "warm1", "head"]
+
+
+def test_a_job_that_waited_too_long_is_not_passed_over():
+    queue = LaneQueue(_policy())
+    queue.append(FakeJob("old", model="flux", enqueued_at=-120))
+    queue.append(FakeJob("warm", model="sdxl"))
+    preference = _preference(["sdxl"], max_bypass_seconds=60)
+    assert queue.pop_available(preference)[1].id == "old"
+
+
+def test_bypass_respects_lane_caps():
+    policy = _policy(bulk_cap=0)
+    queue = LaneQueue(policy)
+    queue.extend(
+        [
+            FakeJob("cold", model="flux", enqueued_at=1),
+            FakeJob("warm-bulk", lane=BULK_LANE, model="sdxl", enqueued_at=2),
+        ]
+    )
+    assert queue.pop_available(_preference(["sdxl"]))[1].id == "cold"
+    assert queue.pop_available(_preference(["sdxl"])) == (None, None)
@@ -0,0 +1,102 @@
+import threading
+import time
+import urllib.request
+
+from discord_tron_master.classes.metrics import MetricsRegistry, MetricsServer
+
+
+def test_counters_and_gauges_render_in_prometheus_text():
+    registry = MetricsRegistry(namespace="t")
+    jobs = registry.counter("jobs", "Jobs seen.", ("job_type",))
+    depth = registry.gauge("depth", "Queue depth.")
+    jobs.labels("gpu").inc()
+    jobs.labels(job_type="gpu").inc(2)
+    depth.set(4)
+    depth.dec()
+    text = registry.render()
+    assert "# TYPE t_jobs counter" in text
+    assert 't_jobs_total{job_type="gpu"} 3' in text
+    assert "t_depth 3" in text
+
+
+def test_registering_a_name_twice_returns_the_same_metric():
+    registry = MetricsRegistry(namespace="t")
+    assert registry.counter("jobs", "Jobs seen.") is registry.counter("jobs", "Jobs seen.")
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry(namespace="t")
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value)
+    buckets, count, total = latency.snapshot()
+    assert [value for _, value in buckets] == [1, 3, 4]
+    assert count == 4
+    assert total == 6.05
+    assert 't_latency_seconds_bucket{le="+Inf"} 4' in registry.render()
+
+
+def test_gauge_functions_and_callback_gauges_are_read_at_scrape_time():
+    registry = MetricsRegistry(namespace="t")
+    queue = [1, 2]
+    registry.gauge("queued", "Queued jobs.").set_function(lambda: len(queue))
+    registry.callback_gauge("lanes", "Jobs by lane.", ("lane",), lambda: {"bulk": 2})
+    queue.append(3)
+    text = registry.render()
+    assert "t_queued 3" in text
+    assert 't_lanes{lane="bulk"} 2' in text
+
+
+def test_a_failing_collector_does_not_break_the_scrape():
+    registry = MetricsRegistry(namespace="t")
+    registry.gauge("broken", "Broken.").set_function(lambda: 1 / 0)
+    registry.counter("fine", "Fine.").inc()
+    assert "t_fine_total 1" in registry.render()
+
+
+def test_counts_stay_exact_across_threads_and_dead_threads_are_folded():
+    registry = MetricsRegistry(namespace="t")
+    counter = registry.counter("events", "Events.")
+
+    def record():
+        for _ in range(1000):
+            counter.inc()
+
+    for _ in range(5):
+        threads = [threading.Thread(target=record) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert counter.value() == 100000
+    # Shards of the 100 exited threads were folded into one running total.
+    assert len(counter._unlabelled()._slots._shards) <= 1
+
+
+def test_recording_overhead_stays_small():
+    registry = MetricsRegistry(namespace="t")
+    counter = registry.counter("events", "Events.", ("kind",)).labels("a")
+    histogram = registry.histogram("latency_seconds", "Latency.")
+    count = 100000
+    started = time.perf_counter()
+    for _ in range(count):
+        counter.inc()
+        histogram.observe(0.02)
+    per_event = (time.perf_counter() - started) / (2 * count)
+    # Measured at well under 1us per event; leave room for slow CI machines.
+    assert per_event < 20e-6
+    assert counter.value() == count
+
+
+def test_standalone_server_serves_the_registry():
+    registry = MetricsRegistry(namespace="t")
+    registry.counter("pings", "Pings.").inc()
+    server = MetricsServer(registry)
+    server.start("127.0.0.1", 0)
+    try:
+        port = server._server.server_port
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            body = response.read().decode()
+        assert "t_pings_total 1" in body
+    finally:
+        server.stop()
@@ -0,0 +1,146 @@
+import asyncio
+import contextlib
+import sys
+import time
+import types
+from types import SimpleNamespace
+
+import pytest
+
+from discord_tron_master.classes import model_catalog as model_catalog_module
+from discord_tron_master.classes.jobs.image_generation_job import ImageGenerationJob
+from discord_tron_master.classes.jobs.llama_prediction_job import LlamaPredictionJob
+from discord_tron_master.classes.jobs.prompt_variation_job import PromptVariationJob
+from discord_tron_master.classes.model_catalog import ModelCatalog
+
+
+class Row:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+class FakeApp:
+    def __init__(self):
+        self.contexts = 0
+
+    @contextlib.contextmanager
+    def app_context(self):
+        self.contexts += 1
+        yield
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    tables = {
+        "transformers": [
+            Row(model_owner="ptx0", model_id="terminus", approved=True, tags="photo", description=""),
+            Row(model_owner="acme", model_id="anime", approved=True, tags="", description="Anime art"),
+            Row(model_owner="acme", model_id="draft", approved=False, tags="photo", description=""),
+        ],
+        "schedulers": [Row(name="euler", use_cases="default")],
+    }
+    for module, attr, key in (
+        ("transformers", "Transformers", "transformers"),
+        ("schedulers", "Schedulers", "schedulers"),
+    ):
+        fake = types.ModuleType(f"discord_tron_master.models.{module}")
+        table = type(attr, (), {"get_all": staticmethod(lambda key=key: list(tables[key]))})
+        setattr(fake, attr, table)
+        monkeypatch.setitem(sys.modules, f"discord_tron_master.models.{module}", fake)
+    return tables
+
+
+class FakeConfig:
+    def get_user_config(self, user_id):
+        raise AssertionError("formatting must not read config.json")
+
+
+def _payload(prompt="a cat"):
+    author = SimpleNamespace(id=1, name="user", discriminator="0")
+    ctx = SimpleNamespace(author=author, message=None, channel=None, guild=None)
+    first_message = SimpleNamespace(author=author, channel=None, guild=None, id=2)
+    return (None, FakeConfig(), ctx, prompt, first_message)
+
+
+def test_refresh_snapshots_both_tables_and_lookups_return_copies(tables):
+    catalog = ModelCatalog()
+    app = FakeApp()
+    assert catalog.refresh(app)
+    assert catalog.loaded and catalog.version == 1
+    row = catalog.transformer("ptx0/terminus")
+    row["approved"] = False
+    assert catalog.transformer("ptx0/terminus")["approved"] is True
+    assert catalog.scheduler("euler")["use_cases"] == "default"
+    assert [row["name"] for row in catalog.schedulers()] == ["euler"]
+    # Tagged models come first; unapproved ones never match.
+    assert catalog.models_matching(["photo", "anime"]) == ["ptx0/terminus", "acme/anime"]
+
+
+def test_a_failed_refresh_keeps_the_previous_snapshot(tables):
+    catalog = ModelCatalog()
+    catalog.refresh(FakeApp())
+    tables["transformers"] = None
+    assert not catalog.refresh(FakeApp())
+    assert catalog.transformer("ptx0/terminus") is not None
+    assert catalog.version == 1
+
+
+def test_misses_schedule_at_most_one_background_refresh(monkeypatch):
+    catalog = ModelCatalog()
+    refreshes = []
+    monkeypatch.setattr(catalog, "refresh", lambda app=None: refreshes.append(app))
+    started = []
+    monkeypatch.setattr(
+        model_catalog_module.threading,
+        "Thread",
+        lambda target, **kwargs: SimpleNamespace(start=lambda: started.append(target)),
+    )
+    for _ in range(100):
+        assert catalog.transformer("nobody/unknown") is None
+        assert catalog.scheduler("unknown") is None
+    assert len(started) == 1
+    started[0]()
+    assert refreshes == [None]
+    assert not catalog._refreshing
+
+
+def test_jobs_take_the_config_the_cog_already_read():
+    config = {"model": "ptx0/terminus", "steps": 20}
+    llama = LlamaPredictionJob(1, _payload(), user_config=config)
+    assert llama.user_config is config
+    variation = PromptVariationJob(
+        1, _payload() + ("http://image",), extra_payload={"user_config": config, "user_id": 1}
+    )
+    assert variation.user_config is config
+    message = asyncio.run(variation.format_payload())
+    assert message["config"] is config
+    assert message["overridden_user_id"] == 1
+
+
+def test_formatting_an_image_job_does_no_io_and_stays_cheap(tables, monkeypatch):
+    catalog = ModelCatalog()
+    app = FakeApp()
+    catalog.refresh(app)
+    monkeypatch.setattr(
+        "discord_tron_master.classes.jobs.image_generation_job.model_catalog", catalog
+    )
+    config = {"model": "ptx0/terminus", "steps": 20}
+    jobs = [
+        ImageGenerationJob(1, _payload(), {"user_config": config, "user_id": 1})
+        for _ in range(500)
+    ]
+
+    async def format_all():
+        started = time.perf_counter()
+        messages = [await job.format_payload() for job in jobs]
+        return messages, (time.perf_counter() - started) / len(jobs)
+
+    messages, per_job = asyncio.run(format_all())
+    assert messages[0]["model_config"]["model_id"] == "terminus"
+    # One app context for the startup load; formatting opened none.
+    assert app.contexts == 1
+    # Each format holds the loop for tens of microseconds, not a DB round trip.
+    assert per_job < 2e-3
@@ -0,0 +1,125 @@
+import asyncio
+
+from discord_tron_master.classes import metrics
+from discord_tron_master.classes.model_selection import (
+    DEFAULT_MODEL,
+    ModelSelector,
+    normalize_prompt,
+)
+
+RULES = [
+    {"model": "acme/anime", "keywords": ["anime", "manga", "chibi"]},
+    {"model": "acme/photo", "keywords": ["photo", "dslr", "35mm"]},
+]
+
+
+class FakeLLM:
+    def __init__(self, answer=({"width": 1024, "height": 1024}, "acme/llm"), delay=0.0):
+        self.answer = answer
+        self.delay = delay
+        self.prompts = []
+
+    async def __call__(self, prompt):
+        self.prompts.append(prompt)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+def _selector(llm, **kwargs):
+    kwargs.setdefault("audit_rate", 0.0)
+    return ModelSelector(llm, rules=RULES, **kwargs)
+
+
+def test_normalize_prompt_drops_flags_and_punctuation():
+    assert normalize_prompt("A Cat, sitting!  --ar 16:9 !nsfw") == "a cat sitting 16 9"
+
+
+def test_a_single_keyword_still_asks_the_llm():
+    llm = FakeLLM()
+    selector = _selector(llm)
+    resolution, model = asyncio.run(selector.select("a photo of a cat"))
+    assert model == "acme/llm"
+    assert llm.prompts == ["a photo of a cat"]
+
+
+def test_several_keywords_of_one_rule_are_answered_locally():
+    llm = FakeLLM()
+    selector = _selector(llm)
+    resolution, model = asyncio.run(selector.select("35mm dslr photo of a cat, portrait"))
+    assert model == "acme/photo"
+    assert resolution == {"width": 832, "height": 1216}
+    assert llm.prompts == []
+
+
+def test_the_rule_hit_threshold_is_configurable():
+    llm = FakeLLM()
+    selector = _selector(llm, min_rule_hits=1)
+    assert asyncio.run(selector.select("a photo of a cat"))[1] == "acme/photo"
+    assert llm.prompts == []
+
+
+def test_mixed_cues_go_to_the_llm():
+    llm = FakeLLM()
+    selector = _selector(llm)
+    asyncio.run(selector.select("anime manga photo dslr"))
+    assert len(llm.prompts) == 1
+
+
+def test_a_failed_llm_falls_back_to_the_local_hint():
+    selector = _selector(FakeLLM(answer=("1280x768", "not a model")))
+    resolution, model = asyncio.run(selector.select("a photo of a cat"))
+    assert model == "acme/photo"
+    assert resolution == {"width": 1024, "height": 1024}
+    resolution, model = asyncio.run(_selector(FakeLLM(RuntimeError())).select("a cat"))
+    assert (resolution, model) == ({"width": 1024, "height": 1024}, DEFAULT_MODEL)
+
+
+def test_repeats_and_concurrent_copies_share_one_llm_call():
+    llm = FakeLLM(delay=0.01)
+    selector = _selector(llm)
+
+    async def burst():
+        # generate-x sends the same prompt several times at once.
+        return await asyncio.gather(*(selector.select("a red fox in snow") for _ in range(8)))
+
+    answers = asyncio.run(burst())
+    assert {model for _, model in answers} == {"acme/llm"}
+    asyncio.run(selector.select("A red fox, in snow --steps 30"))
+    assert len(llm.prompts) == 1
+
+
+def test_past_llm_answers_vote_for_similar_prompts():
+    llm = FakeLLM(answer=({"width": 1344, "height": 768}, "acme/landscapes"))
+    selector = _selector(llm)
+    asyncio.run(selector.select("misty mountain lake at dawn"))
+    resolution, model = asyncio.run(selector.select("misty mountain lake at dusk"))
+    assert model == "acme/landscapes"
+    assert resolution == {"width": 1344, "height": 768}
+    assert len(llm.prompts) == 1
+
+
+def test_audits_count_agreement_in_the_background():
+    agreement = metrics.model_selection_agreement.labels("rules", "disagree")
+    before = agreement.value()
+    llm = FakeLLM()
+    selector = _selector(llm, audit_rate=1.0)
+
+    async def run():
+        answer = await selector.select("anime chibi fox")
+        await asyncio.gather(*selector._audits)
+        return answer
+
+    assert asyncio.run(run())[1] == "acme/anime"
+    assert len(llm.prompts) == 1
+    assert agreement.value() == before + 1
+
+
+def test_disabled_selection_always_asks_the_llm():
+    llm = FakeLLM()
+    selector = _selector(llm, enabled=False)
+    for _ in range(3):
+        asyncio.run(selector.select("anime chibi fox"))
+    assert len(llm.prompts) == 3
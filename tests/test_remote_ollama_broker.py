@@ -0,0 +1,209 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from flask_sqlalchemy import SQLAlchemy
+
+from discord_tron_master.classes.app_config import AppConfig
+from discord_tron_master.classes.database_handler import DatabaseHandler
+
+if DatabaseHandler.get_db() is None:
+    # The broker reaches the bot, whose modules declare ORM models.
+    DatabaseHandler.database_instance = SQLAlchemy()
+
+from discord_tron_master.bot import DiscordBot  # noqa: E402
+from discord_tron_master.classes.jobs.ollama_completion_job import (  # noqa: E402
+    OllamaBatchJob,
+    OllamaCompletionJob,
+)
+from discord_tron_master.classes.remote_ollama_broker import RemoteOllamaBroker  # noqa: E402
+
+
+class FakeWorker:
+    def __init__(self, worker_id, batch_size=1):
+        self.worker_id = worker_id
+        self.hardware_limits = {"ollama_batch_size": batch_size}
+        self.messages = []
+        self.completed = []
+
+    async def send_websocket_message(self, message):
+        self.messages.append(json.loads(message))
+
+    def complete_job(self, job):
+        self.completed.append(job)
+
+
+class FakeQueueManager:
+    def __init__(self):
+        self.jobs = []
+
+    async def enqueue_job(self, worker, job):
+        job.set_worker(worker)
+        self.jobs.append(job)
+
+
+@pytest.fixture
+def config(monkeypatch):
+    settings = {"max_batch_size": 8, "swap_penalty_rounds": 2, "timeout_seconds": 30}
+    monkeypatch.setattr(AppConfig, "reload_config", lambda self: setattr(self, "config", {}))
+    monkeypatch.setattr(AppConfig, "get_ollama_max_batch_size", lambda self: settings["max_batch_size"])
+    monkeypatch.setattr(
+        AppConfig, "get_ollama_swap_penalty_rounds", lambda self: settings["swap_penalty_rounds"]
+    )
+    monkeypatch.setattr(AppConfig, "get_ollama_timeout_seconds", lambda self: settings["timeout_seconds"])
+    return settings
+
+
+@pytest.fixture
+def bot(monkeypatch, config):
+    def install(*workers):
+        bot = SimpleNamespace(
+            worker_manager=SimpleNamespace(workers_by_capability={"ollama": list(workers)}),
+            queue_manager=FakeQueueManager(),
+        )
+        monkeypatch.setattr(DiscordBot, "discord_instance", bot)
+        return bot
+
+    return install
+
+
+def _request(broker, prompt, model="llama", **kwargs):
+    return broker.request_completion(
+        role="user", prompt=prompt, model=model, temperature=0.5, max_tokens=64, **kwargs
+    )
+
+
+async def _answer(broker, worker):
+    """Dispatch every queued job and answer each request with its prompt."""
+    results = []
+    for message in worker.messages:
+        for request in message.get("requests") or [message]:
+            results.append({"request_id": request["request_id"], "ok": True, "text": request["prompt"]})
+    worker.messages.clear()
+    return await broker.complete_request({"results": results})
+
+
+def test_requests_for_one_model_share_a_batch(bot):
+    worker = FakeWorker("w1", batch_size=4)
+    discord = bot(worker)
+    broker = RemoteOllamaBroker()
+
+    async def run():
+        tasks = [asyncio.create_task(_request(broker, f"p{n}")) for n in range(6)]
+        await asyncio.sleep(0)
+        assert broker.in_flight("w1") == 6
+        for job in discord.queue_manager.jobs:
+            await job.execute()
+        assert [len(m["requests"]) for m in worker.messages] == [4, 2]
+        assert {m["module_command"] for m in worker.messages} == {"complete_batch"}
+        await _answer(broker, worker)
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(run()) == [f"p{n}" for n in range(6)]
+    assert len(discord.queue_manager.jobs) == 2
+    assert broker.in_flight("w1") == 0
+
+
+def test_workers_without_batching_get_one_job_per_request(bot):
+    worker = FakeWorker("w1")
+    discord = bot(worker)
+    broker = RemoteOllamaBroker()
+
+    async def run():
+        tasks = [asyncio.create_task(_request(broker, f"p{n}")) for n in range(3)]
+        await asyncio.sleep(0)
+        for job in discord.queue_manager.jobs:
+            await job.execute()
+        assert {m["module_command"] for m in worker.messages} == {"complete"}
+        await _answer(broker, worker)
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(run()) == ["p0", "p1", "p2"]
+    assert all(type(job) is OllamaCompletionJob for job in discord.queue_manager.jobs)
+
+
+def test_routing_prefers_the_worker_with_the_model_loaded(bot, config):
+    broker = RemoteOllamaBroker()
+    busy, idle = FakeWorker("busy", batch_size=4), FakeWorker("idle", batch_size=4)
+    broker._loaded.update({"busy": "llama", "idle": "mistral"})
+    broker._in_flight["busy"] = 4
+    # One round of queueing beats a two-round model swap.
+    assert broker._choose_worker([busy, idle], "llama") is busy
+    config["swap_penalty_rounds"] = 0
+    assert broker._choose_worker([busy, idle], "llama") is idle
+    assert broker.batch_size(FakeWorker("big", batch_size=64)) == 8
+
+
+def test_a_cancelled_request_is_dropped_from_its_unsent_batch(bot):
+    worker = FakeWorker("w1", batch_size=4)
+    discord = bot(worker)
+    broker = RemoteOllamaBroker()
+
+    async def run():
+        keep = asyncio.create_task(_request(broker, "keep"))
+        drop = asyncio.create_task(_request(broker, "drop"))
+        await asyncio.sleep(0)
+        drop.cancel()
+        await asyncio.gather(drop, return_exceptions=True)
+        [job] = discord.queue_manager.jobs
+        await job.execute()
+        assert [r["prompt"] for r in worker.messages[0]["requests"]] == ["keep"]
+        await _answer(broker, worker)
+        return await keep
+
+    assert asyncio.run(run()) == "keep"
+
+
+def test_a_batch_everyone_left_is_never_sent(bot):
+    worker = FakeWorker("w1", batch_size=4)
+    discord = bot(worker)
+    broker = RemoteOllamaBroker()
+
+    async def run():
+        task = asyncio.create_task(_request(broker, "gone"))
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        [job] = discord.queue_manager.jobs
+        await job.execute()
+        return job
+
+    job = asyncio.run(run())
+    assert worker.messages == []
+    assert worker.completed == [job]
+
+
+def test_a_worker_leaving_fails_its_requests(bot):
+    worker = FakeWorker("w1", batch_size=4)
+    bot(worker)
+    broker = RemoteOllamaBroker()
+
+    async def run():
+        task = asyncio.create_task(_request(broker, "p"))
+        await asyncio.sleep(0)
+        broker.forget_worker("w1")
+        with pytest.raises(RuntimeError, match="worker_lost"):
+            await task
+
+    asyncio.run(run())
+    assert broker._open == {}
+
+
+def test_resubmission_uses_the_timeout_read_at_construction(config, monkeypatch):
+    job = OllamaBatchJob("llama", 4, timeout_seconds=30)
+    reads = []
+    monkeypatch.setattr(AppConfig, "__init__", lambda self: reads.append(1))
+    job.executed, job.executed_date = True, time.time() - 10
+    assert not job.needs_resubmission()
+    job.executed_date = time.time() - 31
+    assert job.needs_resubmission()
+    # The queue monitor polls this every tick; it must not reload config.json.
+    assert reads == []
+
+
+def test_jobs_default_to_the_configured_timeout(config):
+    config["timeout_seconds"] = 45
+    assert OllamaCompletionJob({}).timeout_seconds == 45
+    assert OllamaBatchJob("llama", 2).timeout_seconds == 45
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+from discord_tron_master.classes import resolution as resolution_module
+from discord_tron_master.classes.resolution import (
+    ResolutionHelper,
+    _group_and_sort,
+    _rendered_table,
+)
+
+
+def _uncached_table(user_resolution=None):
+    helper = ResolutionHelper()
+    table = helper.create_resolution_table(
+        _group_and_sort(ResolutionHelper.resolutions), user_resolution
+    )
+    return f"```\n{table}\n```"
+
+
+def test_validity_comes_from_the_catalog():
+    helper = ResolutionHelper()
+    assert helper.is_valid_resolution(1024, 1024)
+    assert helper.is_valid_resolution(1152, 960)
+    assert not helper.is_valid_resolution(1000, 1000)
+    assert asyncio.run(helper.list_available_resolutions(resolution="832x1216"))
+
+
+def test_the_cached_table_matches_a_fresh_render():
+    helper = ResolutionHelper()
+    user_resolution = {"width": 832, "height": 1216}
+    table = helper.format_available_resolutions(user_resolution=user_resolution)
+    assert table == _uncached_table(user_resolution)
+    assert "**832x1216**" in table
+    assert helper.format_available_resolutions() == _uncached_table()
+
+
+def test_an_unknown_resolution_is_not_highlighted_or_cached():
+    _rendered_table.cache_clear()
+    helper = ResolutionHelper()
+    for width in range(100, 600):
+        table = helper.format_available_resolutions(
+            user_resolution={"width": width, "height": width + 1}
+        )
+    assert "**" not in table
+    assert _rendered_table.cache_info().currsize == 1
+
+
+def test_the_table_reads_the_user_setting_once(monkeypatch):
+    reads = []
+
+    class Config:
+        def get_user_setting(self, user_id, key):
+            reads.append((user_id, key))
+            return {"width": 1024, "height": 1024}
+
+    monkeypatch.setattr(resolution_module, "config", Config())
+    table = ResolutionHelper().format_available_resolutions(user_id=42)
+    assert "**1024x1024**" in table
+    assert reads == [(42, "resolution")]
+
+
+def test_grouped_catalog_is_a_private_copy():
+    helper = ResolutionHelper()
+    grouped = helper.group_and_sort_resolutions(ResolutionHelper.resolutions)
+    assert grouped == _group_and_sort(ResolutionHelper.resolutions)
+    grouped["Square"].clear()
+    assert helper.group_and_sort_resolutions(ResolutionHelper.resolutions)["Square"]
+
+
+def test_a_cached_table_is_cheap():
+    helper = ResolutionHelper()
+    user_resolution = {"width": 1024, "height": 1024}
+    helper.format_available_resolutions(user_resolution=user_resolution)
+    started = time.perf_counter()
+    for _ in range(1000):
+        helper.format_available_resolutions(user_resolution=user_resolution)
+    # A fresh render takes milliseconds; the cached one a few microseconds.
+    assert (time.perf_counter() - started) / 1000 < 100e-6
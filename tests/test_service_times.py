@@ -0,0 +1,111 @@
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+
+from discord_tron_master.classes.service_times import (
+    DEFAULT_SERVICE_SECONDS,
+    ServiceTimeEstimator,
+    format_duration,
+    payload_class,
+)
+
+
+@pytest.fixture
+def estimator(tmp_path, monkeypatch):
+    estimator = ServiceTimeEstimator(str(tmp_path / "service_times.db"))
+    monkeypatch.setattr(estimator, "start", lambda: None)
+    return estimator
+
+
+def _job(job_id, *, model="sdxl", steps=30, width=1024, height=1024, executed_date=None):
+    config = {"model": model, "steps": steps, "resolution": {"width": width, "height": height}}
+    return SimpleNamespace(
+        id=job_id,
+        job_type="gpu",
+        extra_payload={"user_config": config},
+        executed_date=executed_date,
+    )
+
+
+def test_payload_class_buckets_model_megapixels_and_steps():
+    assert payload_class(_job("a", steps=28)) == "model=sdxl|mp=1|steps=30"
+    assert payload_class(_job("b", width=512, height=512)) == "model=sdxl|mp=0.25|steps=30"
+    assert payload_class(SimpleNamespace(module_command="tts")) == "command=tts"
+
+
+def test_predictions_use_the_most_specific_key_with_enough_samples(estimator):
+    job_class = payload_class(_job("a"))
+    assert estimator.expected("gpu", "w1", job_class) == DEFAULT_SERVICE_SECONDS
+    for seconds in (10, 10, 10):
+        estimator.observe("w1", "gpu", job_class, seconds)
+    for seconds in (40, 40, 40):
+        estimator.observe("w2", "gpu", job_class, seconds)
+    assert estimator.expected("gpu", "w1", job_class) == 10
+    assert estimator.expected("gpu", "w2", job_class) == 40
+    # A worker with no history borrows the fleet-wide figure for the class.
+    assert estimator.expected("gpu", "w3", job_class) == 25
+    assert estimator.expected("gpu", "w3", "model=other") == 25
+    assert estimator.expected("llama", "w1", default=7) == 7
+
+
+def test_the_mean_tracks_a_worker_that_got_slower(estimator):
+    for _ in range(20):
+        estimator.observe("w1", "gpu", "model=sdxl", 10)
+    for _ in range(20):
+        estimator.observe("w1", "gpu", "model=sdxl", 30)
+    assert estimator.expected("gpu", "w1", "model=sdxl") > 25
+
+
+def test_bad_samples_are_ignored(estimator):
+    for seconds in (None, -1, float("inf"), float("nan")):
+        estimator.observe("w1", "gpu", "model=sdxl", seconds)
+    assert estimator.snapshot() == {}
+
+
+def test_backlog_and_queue_predictions(estimator):
+    job_class = payload_class(_job("a"))
+    for _ in range(3):
+        estimator.observe("w1", "gpu", job_class, 20)
+    now = time.time()
+    running = _job("running", executed_date=now - 5)
+    queue = SimpleNamespace(in_progress={"running": running}, queue=deque([_job("q1"), _job("q2")]))
+    assert estimator.backlog_seconds("w1", queue) == pytest.approx(55, abs=0.5)
+    predictions = estimator.predict_queue("w1", queue)
+    assert predictions["running"][0] == running.executed_date
+    start, finish = predictions["q2"]
+    assert start == pytest.approx(now + 35, abs=0.5)
+    assert finish == pytest.approx(now + 55, abs=0.5)
+
+
+def test_an_overrunning_job_still_counts_for_something(estimator):
+    for _ in range(3):
+        estimator.observe("w1", "gpu", payload_class(_job("a")), 20)
+    late = _job("late", executed_date=time.time() - 100)
+    queue = SimpleNamespace(in_progress={"late": late}, queue=deque())
+    assert estimator.backlog_seconds("w1", queue) == pytest.approx(2)
+
+
+def test_statistics_survive_a_restart_and_merge_with_early_samples(tmp_path, monkeypatch):
+    path = str(tmp_path / "service_times.db")
+    first = ServiceTimeEstimator(path)
+    monkeypatch.setattr(first, "start", lambda: None)
+    for _ in range(4):
+        first.observe("w1", "gpu", "model=sdxl", 10)
+    first.flush()
+
+    second = ServiceTimeEstimator(path)
+    monkeypatch.setattr(second, "start", lambda: None)
+    # Observed before the history finished loading.
+    for _ in range(4):
+        second.observe("w1", "gpu", "model=sdxl", 30)
+    second.load()
+    count, mean, _ = second.snapshot()[("w1", "gpu", "model=sdxl")]
+    assert count == 8
+    assert mean == pytest.approx(20)
+
+
+def test_format_duration():
+    assert format_duration(42) == "42s"
+    assert format_duration(125) == "2 min"
@@ -0,0 +1,67 @@
+import subprocess
+import sys
+import time
+
+from discord_tron_master.classes.startup_profile import StartupProfiler
+
+
+def test_phases_accumulate_and_milestones_keep_the_first_time():
+    profiler = StartupProfiler()
+    for _ in range(2):
+        with profiler.phase("cog_imports"):
+            time.sleep(0.01)
+    first = profiler.milestone("discord_ready")
+    time.sleep(0.01)
+    assert profiler.milestone("discord_ready") == first
+    assert profiler.phases()["cog_imports"] >= 0.02
+    assert profiler.milestones() == {"discord_ready": first}
+
+
+def test_the_import_timer_records_self_and_inclusive_time(tmp_path, monkeypatch):
+    (tmp_path / "dtm_profiled_outer.py").write_text(
+        "import time, dtm_profiled_inner\ntime.sleep(0.02)\n"
+    )
+    (tmp_path / "dtm_profiled_inner.py").write_text("import time\ntime.sleep(0.03)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    profiler = StartupProfiler()
+    profiler.install_import_timer()
+    try:
+        import dtm_profiled_outer  # noqa: F401
+    finally:
+        profiler.uninstall_import_timer()
+        sys.modules.pop("dtm_profiled_outer", None)
+        sys.modules.pop("dtm_profiled_inner", None)
+    timings = {name: (inclusive, own) for name, inclusive, own in profiler.slowest_imports()}
+    outer_inclusive, outer_self = timings["dtm_profiled_outer"]
+    inner_inclusive, inner_self = timings["dtm_profiled_inner"]
+    assert inner_self >= 0.03
+    assert outer_inclusive >= outer_self + inner_inclusive - 0.005
+    assert 0.02 <= outer_self < 0.03 + 0.02
+    assert not any(finder is profiler._import_timer for finder in sys.meta_path)
+
+
+def test_the_import_timer_can_be_switched_off(monkeypatch):
+    monkeypatch.setenv("DTM_STARTUP_PROFILE", "0")
+    profiler = StartupProfiler()
+    profiler.install_import_timer()
+    assert profiler._import_timer is None
+
+
+def test_report_runs_once_and_stops_timing_imports():
+    profiler = StartupProfiler()
+    profiler.install_import_timer()
+    profiler.report()
+    assert profiler._import_timer is None
+    assert profiler._reported
+
+
+def test_importing_the_token_helpers_does_not_load_tiktoken():
+    code = (
+        "import sys\n"
+        "import discord_tron_master.classes.openai.tokens\n"
+        "print('tiktoken' in sys.modules)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,275 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from flask_sqlalchemy import SQLAlchemy
+
+from discord_tron_master.classes import metrics
+from discord_tron_master.classes.app_config import AppConfig
+from discord_tron_master.classes.database_handler import DatabaseHandler
+from discord_tron_master.classes.streaming import (
+    DiscordStreamEditor,
+    ThreadDeltaRelay,
+    VisibleTextFilter,
+    partial_json_string,
+    visible_text,
+)
+
+if DatabaseHandler.get_db() is None:
+    # The broker reaches the bot, whose modules declare ORM models.
+    DatabaseHandler.database_instance = SQLAlchemy()
+
+from discord_tron_master.bot import DiscordBot  # noqa: E402
+from discord_tron_master.classes.remote_ollama_broker import RemoteOllamaBroker  # noqa: E402
+
+
+class RateLimited(Exception):
+    status = 429
+    retry_after = 0
+
+
+class FakeMessage:
+    def __init__(self, channel, content):
+        self.channel = channel
+        self.content = content
+        self.deleted = False
+
+    async def edit(self, content):
+        self.channel.calls += 1
+        if self.channel.limited:
+            self.channel.limited -= 1
+            raise RateLimited()
+        self.content = content
+        self.channel.edits.append(content)
+
+    async def delete(self):
+        self.deleted = True
+
+
+class FakeChannel:
+    def __init__(self, limited=0):
+        self.channel = self
+        self.calls = 0
+        self.limited = limited
+        self.sent = []
+        self.edits = []
+
+    async def send(self, text):
+        self.calls += 1
+        message = FakeMessage(self, text)
+        self.sent.append(message)
+        return message
+
+
+class Recorder:
+    def __init__(self):
+        self.deltas = []
+        self.restarts = 0
+
+    def feed(self, delta):
+        self.deltas.append(delta)
+
+    def restart(self):
+        self.restarts += 1
+
+
+def test_visible_text_hides_think_blocks_and_partial_tags():
+    assert visible_text("<think>plan</think>Hello") == "Hello"
+    assert visible_text("Hello <think>still thinking") == "Hello "
+    assert visible_text("Hello <thi") == "Hello "
+
+
+def test_partial_json_string_decodes_what_has_arrived():
+    assert partial_json_string('{"other": 1', "narration") is None
+    assert partial_json_string('{"narration": "You see a \\"lamp\\"\\n', "narration") == 'You see a "lamp"\n'
+    assert partial_json_string('{"narration": "caf\\u00e9 \\u00', "narration") == "café "
+    assert partial_json_string('{"narration": "\\ud83d\\ude00"}', "narration") == "😀"
+    assert partial_json_string('{"narration": "half \\ud83d', "narration") == "half "
+
+
+def test_visible_text_filter_forwards_only_new_visible_text():
+    sink = Recorder()
+    stream = VisibleTextFilter(sink)
+    for delta in ["<thi", "nk>secret</th", "ink>Hel", "lo"]:
+        stream.feed(delta)
+    assert "".join(sink.deltas) == "Hello"
+    stream.restart()
+    stream.feed("Again")
+    assert sink.restarts == 1
+    assert sink.deltas[-1] == "Again"
+
+
+def test_thread_relay_delivers_on_the_loop_in_order():
+    sink = Recorder()
+
+    async def run():
+        relay = ThreadDeltaRelay(sink)
+        thread = threading.Thread(target=lambda: [relay.feed(str(n)) for n in range(50)])
+        thread.start()
+        await asyncio.to_thread(thread.join)
+        await asyncio.sleep(0)
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(run())
+    assert sink.deltas == [str(n) for n in range(50)]
+    assert loop_thread is threading.main_thread()
+
+
+def test_fast_tokens_are_coalesced_into_few_edits():
+    channel = FakeChannel()
+    text = "word " * 300
+
+    async def run():
+        editor = DiscordStreamEditor(channel, consumer="test", edit_interval_seconds=0.05, min_chars=0)
+        started = time.monotonic()
+        for token in text.split(" "):
+            editor.feed(token + " ")
+            await asyncio.sleep(0.001)
+        elapsed = time.monotonic() - started
+        message = await editor.finish(text.strip())
+        return elapsed, message
+
+    elapsed, message = asyncio.run(run())
+    assert message is channel.sent[0]
+    assert message.content == text.strip()
+    # One send, then at most one edit per interval, whatever the token rate.
+    assert len(channel.sent) == 1
+    assert len(channel.edits) <= elapsed / 0.05 + 2
+    assert len(channel.edits) < 300 / 10
+
+
+def test_a_rate_limit_doubles_the_interval():
+    channel = FakeChannel(limited=1)
+    rate_limited = metrics.stream_edits.labels("test429", "rate_limited")
+    before = rate_limited.value()
+
+    async def run():
+        editor = DiscordStreamEditor(channel, consumer="test429", edit_interval_seconds=0.0, min_chars=0)
+        editor.feed("first")
+        await asyncio.sleep(0.01)
+        editor.feed(" second")
+        await asyncio.sleep(0.01)
+        interval = editor.edit_interval_seconds
+        await editor.abort()
+        return interval
+
+    assert asyncio.run(run()) == 1.0
+    assert rate_limited.value() == before + 1
+    assert channel.sent[0].deleted
+
+
+def test_a_reply_too_long_for_one_message_drops_the_preview():
+    channel = FakeChannel()
+
+    async def run():
+        editor = DiscordStreamEditor(channel, consumer="test", edit_interval_seconds=0, max_chars=50)
+        editor.feed("x" * 40)
+        await asyncio.sleep(0.01)
+        return await editor.finish("x" * 80)
+
+    assert asyncio.run(run()) is None
+    assert channel.sent[0].deleted
+
+
+def test_nothing_is_posted_without_visible_text():
+    channel = FakeChannel()
+
+    async def run():
+        editor = DiscordStreamEditor(
+            channel,
+            consumer="test",
+            edit_interval_seconds=0,
+            render=lambda raw: partial_json_string(raw, "narration"),
+        )
+        editor.feed('{"tool": "look"')
+        await asyncio.sleep(0.01)
+        return await editor.finish("reply")
+
+    assert asyncio.run(run()) is None
+    assert channel.calls == 0
+
+
+class FakeConfig:
+    def __init__(self, raw):
+        self.raw = raw
+
+    def get_streaming_config(self):
+        return self.raw
+
+
+def test_from_config_can_switch_streaming_off():
+    assert DiscordStreamEditor.from_config(None, consumer="chat", config=FakeConfig({"enabled": False})) is None
+    editor = DiscordStreamEditor.from_config(
+        None, consumer="chat", config=FakeConfig({"enabled": True, "edit_interval_seconds": 2, "min_chars": 5})
+    )
+    assert (editor.edit_interval_seconds, editor.min_chars) == (2.0, 5)
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    monkeypatch.setattr(AppConfig, "reload_config", lambda self: setattr(self, "config", {}))
+    monkeypatch.setattr(AppConfig, "get_ollama_max_batch_size", lambda self: 8)
+    monkeypatch.setattr(AppConfig, "get_ollama_swap_penalty_rounds", lambda self: 2)
+    monkeypatch.setattr(AppConfig, "get_ollama_timeout_seconds", lambda self: 30)
+    jobs, messages = [], []
+
+    async def enqueue_job(worker, job):
+        job.set_worker(worker)
+        jobs.append(job)
+
+    async def send_websocket_message(message):
+        messages.append(json.loads(message))
+
+    worker = SimpleNamespace(
+        worker_id="w1",
+        hardware_limits={"ollama_batch_size": 4},
+        send_websocket_message=send_websocket_message,
+    )
+    monkeypatch.setattr(
+        DiscordBot,
+        "discord_instance",
+        SimpleNamespace(
+            worker_manager=SimpleNamespace(workers_by_capability={"ollama": [worker]}),
+            queue_manager=SimpleNamespace(enqueue_job=enqueue_job),
+        ),
+    )
+    return RemoteOllamaBroker(), jobs, messages
+
+
+def test_broker_deltas_arrive_in_order_before_the_result(broker):
+    broker, jobs, messages = broker
+    seen = []
+
+    async def run():
+        task = asyncio.create_task(
+            broker.request_completion(
+                role="user",
+                prompt="p",
+                model="llama",
+                temperature=0.5,
+                max_tokens=64,
+                on_delta=seen.append,
+            )
+        )
+        await asyncio.sleep(0)
+        await jobs[0].execute()
+        [request] = messages[0]["requests"]
+        assert request["stream"] is True
+        request_id = request["request_id"]
+        await broker.stream_delta({"deltas": [{"request_id": request_id, "delta": d} for d in "ab"]})
+        await broker.stream_delta({"request_id": request_id, "delta": "c"})
+        await broker.complete_request({"results": [{"request_id": request_id, "ok": True, "text": "abc"}]})
+        text = await task
+        seen.append("result")
+        return text, request_id
+
+    text, request_id = asyncio.run(run())
+    assert text == "abc"
+    assert seen == ["a", "b", "c", "result"]
+    assert asyncio.run(broker.stream_delta({"request_id": request_id, "delta": "late"})) == {
+        "ok": False,
+        "detail": "request_not_found",
+    }
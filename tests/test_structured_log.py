@@ -0,0 +1,95 @@
+import base64
+import json
+import logging
+import time
+
+import pytest
+
+from discord_tron_master.classes.structured_log import (
+    REDACTED,
+    LazyPayload,
+    log_event,
+    log_sampled,
+    redact,
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def capture():
+    logger = logging.getLogger("tests.structured_log")
+    logger.propagate = False
+    handler = ListHandler()
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    yield logger, handler
+    logger.removeHandler(handler)
+
+
+def _image_message():
+    image = base64.b64encode(b"\0" * 1_500_000).decode()
+    return {
+        "module_name": "image_generation",
+        "job_id": "j1",
+        "arguments": {"images": [image], "access_token": "hunter2"},
+    }
+
+
+def test_secrets_are_redacted_and_media_reduced_to_its_size():
+    safe = redact(_image_message())
+    assert safe["arguments"]["access_token"] == REDACTED
+    assert safe["arguments"]["images"] == "<list len=1>"
+    assert redact("x" * 1000).endswith("...<760 more chars>")
+
+
+def test_lazy_payload_parses_json_strings_before_redacting():
+    text = str(LazyPayload(json.dumps({"token": "abc", "prompt": "a cat"})))
+    assert json.loads(text) == {"token": REDACTED, "prompt": "a cat"}
+
+
+def test_a_filtered_debug_line_never_formats_the_payload(capture):
+    logger, handler = capture
+    logger.setLevel(logging.INFO)
+    message = json.dumps(_image_message())
+    started = time.perf_counter()
+    for _ in range(1000):
+        logger.debug("Received message: %s", LazyPayload(message))
+    per_call = (time.perf_counter() - started) / 1000
+    assert handler.records == []
+    # Serialising the 2 MB message eagerly costs hundreds of microseconds.
+    assert per_call < 50e-6
+
+
+def test_an_emitted_line_stays_small(capture):
+    logger, handler = capture
+    logger.debug("Received message: %s", LazyPayload(json.dumps(_image_message())))
+    line = handler.records[0].getMessage()
+    assert len(line) < 500
+    assert "hunter2" not in line
+
+
+def test_log_event_attaches_fields_and_redacts_them(capture):
+    logger, handler = capture
+    log_event(logger, logging.INFO, "job_sent", job_id="j1", secret="s")
+    record = handler.records[0]
+    assert record.getMessage() == f"job_sent job_id=j1 secret={REDACTED}"
+    assert record.fields == {"job_id": "j1", "secret": "s"}
+
+
+def test_log_sampled_logs_every_nth_call_and_counts_the_rest(capture):
+    logger, handler = capture
+    for n in range(7):
+        log_sampled(logger, logging.INFO, "tick %s", n, every=3, key="test-site")
+    assert [record.getMessage() for record in handler.records] == [
+        "tick 0",
+        "tick 3 [sampled 1/3, 2 suppressed]",
+        "tick 6 [sampled 1/3, 2 suppressed]",
+    ]
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from discord_tron_master.classes.tracing import (
+    JobTracer,
+    JsonLinesSpanExporter,
+    SQLiteSpanExporter,
+    current_job_id,
+)
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    exporter = SQLiteSpanExporter(str(tmp_path / "job_traces.db"))
+    yield exporter
+    exporter.close()
+
+
+def test_sampling_is_decided_by_the_job_id_alone():
+    tracer = JobTracer(sample_rate=0.25)
+    other = JobTracer(sample_rate=0.25)
+    decisions = [tracer.is_sampled(f"job-{n}") for n in range(4000)]
+    assert decisions == [other.is_sampled(f"job-{n}") for n in range(4000)]
+    assert 0.2 < sum(decisions) / len(decisions) < 0.3
+    assert not JobTracer(sample_rate=0).is_sampled("job-1")
+    assert JobTracer(sample_rate=1).is_sampled("job-1")
+
+
+def test_a_job_breaks_down_stage_by_stage(exporter):
+    tracer = JobTracer(sample_rate=1.0, exporter=exporter)
+    tracer.start("job-1", job_type="gpu")
+    tracer.mark("job-1", "enqueued")
+    tracer.span_since("job-1", "enqueued", "queue_wait", worker="w1")
+    token = current_job_id.set("job-1")
+    try:
+        with tracer.span("dispatch") as span:
+            span.set(bytes=10)
+    finally:
+        current_job_id.reset(token)
+    tracer.finish("job-1")
+    assert tracer.flush() == 4
+    spans = {span["name"]: span for span in exporter.breakdown("job-1")}
+    assert set(spans) == {"job", "created", "queue_wait", "dispatch"}
+    # The whole-job span starts when the trace opened and covers every stage.
+    assert spans["job"]["start_time"] <= spans["created"]["start_time"]
+    assert spans["job"]["duration"] >= spans["dispatch"]["duration"]
+    assert spans["created"]["attributes"] == {"job_type": "gpu"}
+    assert spans["queue_wait"]["attributes"] == {"worker": "w1"}
+    assert spans["dispatch"]["attributes"] == {"bytes": 10}
+    assert set(exporter.stage_summary()) == {"created", "queue_wait", "dispatch", "job"}
+
+
+def test_a_failed_stage_records_the_error(exporter):
+    tracer = JobTracer(sample_rate=1.0, exporter=exporter)
+    with pytest.raises(ValueError):
+        with tracer.span("dispatch", trace_id="job-2"):
+            raise ValueError("boom")
+    tracer.flush()
+    assert exporter.breakdown("job-2")[0]["attributes"] == {"error": "ValueError"}
+
+
+def test_an_unsampled_tracer_buffers_nothing(exporter):
+    tracer = JobTracer(sample_rate=0.0, exporter=exporter)
+    tracer.start("job-3")
+    tracer.event("job-3", "resubmitted")
+    with tracer.span("dispatch", trace_id="job-3"):
+        pass
+    tracer.finish("job-3")
+    assert not tracer._buffer
+    assert tracer._writer is None
+
+
+def test_open_traces_are_bounded():
+    tracer = JobTracer(sample_rate=1.0)
+    tracer.MAX_ACTIVE_TRACES = 10
+    for n in range(50):
+        tracer.start(f"job-{n}")
+    assert list(tracer._marks) == [f"job-{n}" for n in range(40, 50)]
+
+
+def test_jsonl_exporter_appends_one_span_per_line(tmp_path):
+    path = tmp_path / "traces" / "job_traces.jsonl"
+    tracer = JobTracer(sample_rate=1.0, exporter=JsonLinesSpanExporter(str(path)))
+    tracer.event("job-4", "resubmitted", attempt=2)
+    tracer.event("job-4", "resubmitted", attempt=3)
+    assert tracer.flush() == 2
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["attributes"]["attempt"] for line in lines] == [2, 3]
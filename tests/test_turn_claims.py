@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+
+from discord_tron_master.classes.turn_claims import TurnClaimCoordinator
+
+CAMPAIGN = "1"
+
+
+class Campaign:
+    """Mirrors the claim loop in the Zork cog against an in-memory claim."""
+
+    def __init__(self, coordinator, holder=None):
+        self.coordinator = coordinator
+        self.holder = holder
+        self.order = []
+
+    async def take_turn(self, actor, claim_expires_in=None):
+        coordinator = self.coordinator
+        ticket = None
+        claimed = False
+        try:
+            while True:
+                generation = coordinator.generation(CAMPAIGN)
+                if ticket is None and coordinator.waiting(CAMPAIGN):
+                    ticket = coordinator.enqueue(CAMPAIGN, actor)
+                    await coordinator.wait_turn(ticket, since_generation=generation)
+                    continue
+                if self.holder is None:
+                    self.holder = actor
+                    claimed = True
+                    self.order.append(actor)
+                    return
+                if ticket is None:
+                    ticket = coordinator.enqueue(CAMPAIGN, actor)
+                await coordinator.wait_turn(
+                    ticket,
+                    since_generation=generation,
+                    claim_expires_in=claim_expires_in,
+                )
+        finally:
+            if ticket is not None:
+                coordinator.dequeue(ticket, claimed=claimed)
+
+    def release(self):
+        self.holder = None
+        self.coordinator.notify_released(CAMPAIGN)
+
+
+def _coordinator(poll=30.0):
+    coordinator = TurnClaimCoordinator()
+    coordinator.FALLBACK_POLL_SECONDS = poll
+    return coordinator
+
+
+def test_a_release_wakes_the_waiter_without_polling():
+    campaign = Campaign(_coordinator(), holder="A")
+
+    async def run():
+        waiter = asyncio.create_task(campaign.take_turn("B"))
+        await asyncio.sleep(0.01)
+        started = time.monotonic()
+        campaign.release()
+        await asyncio.wait_for(waiter, 1)
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 0.1
+    assert campaign.order == ["B"]
+    assert campaign.coordinator.waiting(CAMPAIGN) == 0
+
+
+def test_waiters_take_turns_in_arrival_order():
+    campaign = Campaign(_coordinator(), holder="A")
+
+    async def run():
+        tasks = []
+        for actor in ("B", "C", "D"):
+            tasks.append(asyncio.create_task(campaign.take_turn(actor)))
+            await asyncio.sleep(0.01)
+        for _ in tasks:
+            campaign.release()
+            await asyncio.sleep(0.01)
+        await asyncio.wait_for(asyncio.gather(*tasks), 1)
+
+    asyncio.run(run())
+    assert campaign.order == ["B", "C", "D"]
+
+
+def test_an_actor_with_several_messages_rejoins_at_the_back():
+    campaign = Campaign(_coordinator(), holder="A")
+
+    async def run():
+        tasks = [asyncio.create_task(campaign.take_turn("B"))]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(campaign.take_turn("B")))
+        await asyncio.sleep(0.01)
+        assert campaign.coordinator.waiting(CAMPAIGN) == 1
+        tasks.append(asyncio.create_task(campaign.take_turn("C")))
+        await asyncio.sleep(0.01)
+        for _ in tasks:
+            campaign.release()
+            await asyncio.sleep(0.01)
+        await asyncio.wait_for(asyncio.gather(*tasks), 1)
+
+    asyncio.run(run())
+    assert campaign.order == ["B", "C", "B"]
+
+
+def test_a_release_from_another_thread_wakes_the_waiter():
+    campaign = Campaign(_coordinator(), holder="A")
+
+    async def run():
+        waiter = asyncio.create_task(campaign.take_turn("B"))
+        await asyncio.sleep(0.01)
+        threading.Thread(target=campaign.release).start()
+        await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(run())
+    assert campaign.order == ["B"]
+
+
+def test_an_external_claim_is_rechecked_when_it_expires_off_the_loop():
+    campaign = Campaign(_coordinator(), holder="webui")
+    checks = []
+
+    def expires_in():
+        checks.append(threading.current_thread() is threading.main_thread())
+        if len(checks) >= 3:
+            # The external claim lapses without anyone notifying us.
+            campaign.holder = None
+        return 0.01
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.wait_for(campaign.take_turn("B", claim_expires_in=expires_in), 1)
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 0.5
+    assert campaign.order == ["B"]
+    assert checks and not any(checks)
+
+
+def test_wake_all_releases_every_waiter():
+    coordinator = _coordinator()
+
+    async def run():
+        tickets = [coordinator.enqueue(CAMPAIGN, actor) for actor in ("A", "B", "C")]
+        generation = coordinator.generation(CAMPAIGN)
+        waits = [
+            asyncio.create_task(coordinator.wait_turn(ticket, since_generation=generation))
+            for ticket in tickets
+        ]
+        await asyncio.sleep(0.01)
+        assert not any(wait.done() for wait in waits)
+        coordinator.wake_all()
+        await asyncio.wait_for(asyncio.gather(*waits), 1)
+        for ticket in tickets:
+            coordinator.dequeue(ticket, claimed=False)
+
+    asyncio.run(run())
+    assert coordinator.waiting(CAMPAIGN) == 0
+
+
+def test_a_release_before_waiting_returns_at_once():
+    coordinator = _coordinator()
+
+    async def run():
+        ticket = coordinator.enqueue(CAMPAIGN, "A")
+        generation = coordinator.generation(CAMPAIGN)
+        coordinator.notify_released(CAMPAIGN)
+        await asyncio.wait_for(
+            coordinator.wait_turn(ticket, since_generation=generation), 0.1
+        )
+        coordinator.dequeue(ticket, claimed=False)
+
+    asyncio.run(run())
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+
+from discord_tron_master.classes.turn_drain import TurnDrainCoordinator
+
+
+def _coordinator(tmp_path):
+    return TurnDrainCoordinator(handoff_path=str(tmp_path / "zork_turn_handoff.json"))
+
+
+def test_drain_finishes_when_the_last_turn_releases(tmp_path):
+    coordinator = _coordinator(tmp_path)
+    coordinator.turn_started(1, "a")
+    coordinator.turn_started(2, "b")
+    coordinator.request_drain()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, coordinator.turn_finished, 1, "a")
+        loop.call_later(0.1, coordinator.turn_finished, 2, "b")
+        started = time.monotonic()
+        drained = await coordinator.wait_until_idle(30)
+        return drained, time.monotonic() - started
+
+    drained, elapsed = asyncio.run(run())
+    assert drained
+    assert elapsed < 0.5
+    assert coordinator.status()["completed"] == 2
+
+
+def test_drain_times_out_on_a_stuck_turn(tmp_path):
+    coordinator = _coordinator(tmp_path)
+    coordinator.turn_started(1, "a")
+    assert asyncio.run(coordinator.wait_until_idle(0.05)) is False
+    assert [turn[:2] for turn in coordinator.active_turns()] == [("1", "a")]
+
+
+def test_a_release_from_another_thread_ends_the_drain(tmp_path):
+    coordinator = _coordinator(tmp_path)
+    coordinator.turn_started(1, "a")
+
+    async def run():
+        threading.Timer(0.05, coordinator.turn_finished, (1, "a")).start()
+        return await coordinator.wait_until_idle(5)
+
+    assert asyncio.run(run())
+
+
+def test_external_claims_are_awaited_and_rechecked_as_they_expire(tmp_path):
+    coordinator = _coordinator(tmp_path)
+    checks = []
+
+    async def external_claims_expire_in():
+        checks.append(time.monotonic())
+        # Held outside the process for three checks, 20ms apart.
+        return 0.02 if len(checks) < 3 else None
+
+    async def run():
+        started = time.monotonic()
+        drained = await coordinator.wait_until_idle(
+            5, external_claims_expire_in=external_claims_expire_in
+        )
+        return drained, time.monotonic() - started
+
+    drained, elapsed = asyncio.run(run())
+    assert drained
+    assert len(checks) == 3
+    assert elapsed < 1.0
+
+
+def test_external_claims_are_only_checked_after_local_turns(tmp_path):
+    coordinator = _coordinator(tmp_path)
+    coordinator.turn_started(1, "a")
+    checked_with_active = []
+
+    async def external_claims_expire_in():
+        checked_with_active.append(len(coordinator.active_turns()))
+        return None
+
+    async def run():
+        asyncio.get_running_loop().call_later(0.05, coordinator.turn_finished, 1, "a")
+        return await coordinator.wait_until_idle(
+            5, external_claims_expire_in=external_claims_expire_in
+        )
+
+    assert asyncio.run(run())
+    assert checked_with_active == [0]
+
+
+def test_async_progress_callbacks_are_awaited(tmp_path):
+    coordinator = _coordinator(tmp_path)
+    coordinator.turn_started(1, "a")
+    coordinator.turn_started(1, "b")
+    coordinator.request_drain()
+    reported = []
+
+    async def on_progress(status):
+        await asyncio.sleep(0)
+        reported.append((status["completed"], status["active"]))
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.02, coordinator.turn_finished, 1, "a")
+        loop.call_later(0.04, coordinator.turn_finished, 1, "b")
+        return await coordinator.wait_until_idle(5, on_progress=on_progress)
+
+    assert asyncio.run(run())
+    assert reported == [(0, 2), (1, 1), (2, 0)]
+
+
+def test_checkpointed_turns_survive_to_the_next_process(tmp_path):
+    coordinator = _coordinator(tmp_path)
+    coordinator.checkpoint_turns([{"campaign_id": "1", "content": "look"}])
+    coordinator.checkpoint_turns([{"campaign_id": "2", "content": "north"}])
+    successor = _coordinator(tmp_path)
+    assert [item["content"] for item in successor.take_checkpointed_turns()] == ["look", "north"]
+    assert successor.take_checkpointed_turns() == []
+
+
+def test_an_unreadable_handoff_file_is_discarded(tmp_path):
+    coordinator = _coordinator(tmp_path)
+    (tmp_path / "zork_turn_handoff.json").write_text("{not json")
+    assert coordinator.take_checkpointed_turns() == []
+    assert not (tmp_path / "zork_turn_handoff.json").exists()
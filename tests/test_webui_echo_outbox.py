@@ -0,0 +1,226 @@
+import asyncio
+import datetime
+import json
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sqlalchemy = pytest.importorskip("sqlalchemy")
+from sqlalchemy import Boolean, Column, DateTime, Integer, String, Text, create_engine  # noqa: E402
+from sqlalchemy.orm import declarative_base, sessionmaker  # noqa: E402
+
+from discord_tron_master.classes import metrics  # noqa: E402
+from discord_tron_master.classes.webui_echo_outbox import (  # noqa: E402
+    CONSUMED,
+    EVENT_TYPE,
+    RETRY,
+    WebUIEchoOutbox,
+)
+from discord_tron_master.classes.webui_outbox_hook import OutboxNotifier, install  # noqa: E402
+
+Base = declarative_base()
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class OutboxEvent(Base):
+    """The columns of TGE's ``OutboxEvent`` the consumer reads and writes."""
+
+    __tablename__ = "outbox_events"
+    id = Column(Integer, primary_key=True)
+    campaign_id = Column(String(64))
+    event_type = Column(String(64))
+    status = Column(String(32), default="pending")
+    payload_json = Column(Text, default="{}")
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=_utcnow)
+
+
+class GameSession(Base):
+    __tablename__ = "sessions"
+    id = Column(Integer, primary_key=True)
+    campaign_id = Column(String(64))
+    surface = Column(String(32))
+    surface_channel_id = Column(String(64))
+    surface_thread_id = Column(String(64), nullable=True)
+    enabled = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=_utcnow)
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    models = types.ModuleType("text_game_engine.persistence.sqlalchemy.models")
+    models.OutboxEvent = OutboxEvent
+    models.Session = GameSession
+    for name in (
+        "text_game_engine",
+        "text_game_engine.persistence",
+        "text_game_engine.persistence.sqlalchemy",
+    ):
+        monkeypatch.setitem(sys.modules, name, types.ModuleType(name))
+    monkeypatch.setitem(sys.modules, models.__name__, models)
+    engine = create_engine(f"sqlite:///{tmp_path / 'tge.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(engine)
+    with factory() as session:
+        for campaign in range(3):
+            session.add(
+                GameSession(
+                    campaign_id=str(campaign),
+                    surface="discord_thread",
+                    surface_channel_id=f"chan-{campaign}",
+                )
+            )
+        session.commit()
+    return factory
+
+
+def _write_events(factory, count, event_type=EVENT_TYPE):
+    with factory() as session:
+        for n in range(count):
+            session.add(
+                OutboxEvent(
+                    campaign_id=str(n % 3),
+                    event_type=event_type,
+                    payload_json=json.dumps({"n": n}),
+                )
+            )
+        session.commit()
+
+
+def _round_trips():
+    return {
+        query: metrics.webui_echo_db_round_trips.labels(query).value()
+        for query in ("fetch", "routes", "record")
+    }
+
+
+def _statuses(factory):
+    with factory() as session:
+        return sorted(status for (status,) in session.query(OutboxEvent.status).all())
+
+
+def test_a_backlog_drains_in_a_few_round_trips(session_factory):
+    _write_events(session_factory, 250)
+    delivered = []
+
+    async def deliver(item, channel_id):
+        delivered.append((item["campaign_id"], channel_id))
+        return CONSUMED
+
+    before = _round_trips()
+    processed = asyncio.run(WebUIEchoOutbox().drain(session_factory, deliver))
+    after = _round_trips()
+    assert processed == 250
+    assert all(channel == f"chan-{campaign}" for campaign, channel in delivered)
+    # Three batches of up to 100, one routes query, one update per batch.
+    assert {query: after[query] - before[query] for query in after} == {
+        "fetch": 3,
+        "routes": 1,
+        "record": 3,
+    }
+    assert _statuses(session_factory) == [CONSUMED] * 250
+
+
+def test_failed_deliveries_are_retried_later(session_factory):
+    _write_events(session_factory, 2)
+    retries = metrics.webui_echo_events.labels("retry").value()
+
+    async def deliver(item, channel_id):
+        if json.loads(item["payload_json"])["n"] == 1:
+            raise RuntimeError("discord unavailable")
+        return CONSUMED
+
+    outbox = WebUIEchoOutbox()
+    assert asyncio.run(outbox.drain(session_factory, deliver)) == 2
+    assert _statuses(session_factory) == [CONSUMED, RETRY]
+    assert metrics.webui_echo_events.labels("retry").value() == retries + 1
+    # Not due yet, so a second drain finds nothing.
+    assert asyncio.run(outbox.drain(session_factory, deliver)) == 0
+
+
+def test_a_committed_echo_is_delivered_without_waiting_for_the_poll(session_factory):
+    outbox = WebUIEchoOutbox()
+    outbox.FALLBACK_POLL_SECONDS = 30.0
+    install(
+        types.SimpleNamespace(request=outbox.notify),
+        session_class=session_factory,
+        outbox_model=OutboxEvent,
+    )
+    latency_count = metrics.webui_echo_latency.snapshot()[1]
+
+    async def deliver(item, channel_id):
+        return CONSUMED
+
+    async def recorded():
+        while metrics.webui_echo_latency.snapshot()[1] == latency_count:
+            await asyncio.sleep(0.005)
+
+    async def run():
+        consumer = asyncio.create_task(outbox.run(lambda: session_factory, deliver))
+        # Let the first, empty drain finish so only the ping can wake it.
+        await asyncio.sleep(0.2)
+        started = time.monotonic()
+        await asyncio.to_thread(_write_events, session_factory, 1)
+        await asyncio.wait_for(recorded(), 5)
+        elapsed = time.monotonic() - started
+        consumer.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await consumer
+        return elapsed
+
+    assert asyncio.run(run()) < 1.0
+    assert _statuses(session_factory) == [CONSUMED]
+    assert metrics.webui_echo_latency.snapshot()[1] == latency_count + 1
+
+
+def test_the_hook_ignores_other_events_and_rolled_back_writes(session_factory):
+    requests = []
+    install(
+        types.SimpleNamespace(request=lambda: requests.append(1)),
+        session_class=session_factory,
+        outbox_model=OutboxEvent,
+    )
+    _write_events(session_factory, 1, event_type="something_else")
+    with session_factory() as session:
+        session.add(OutboxEvent(campaign_id="0", event_type=EVENT_TYPE))
+        session.flush()
+        session.rollback()
+    assert requests == []
+    _write_events(session_factory, 3)
+    assert requests == [1]
+
+
+def test_the_notifier_posts_to_the_bridge_with_the_link_secret():
+    received = []
+    seen = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):  # noqa: N802 - stdlib callback name
+            received.append((self.path, self.headers.get("X-DTM-Link-Secret")))
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+            seen.set()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/api/zork/outbox/notify"
+        OutboxNotifier(url, "s3cret").request()
+        assert seen.wait(5)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert received == [("/api/zork/outbox/notify", "s3cret")]
@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+import pytest
+
+from discord_tron_master.classes import job_queue as job_queue_module
+from discord_tron_master.classes.job_lanes import BULK_LANE, INTERACTIVE_LANE, LanePolicy
+from discord_tron_master.classes.queue_manager import QueueManager
+from discord_tron_master.classes.worker import Worker
+
+
+class FakeJob:
+    def __init__(self, job_id, *, job_type="gpu", lane=INTERACTIVE_LANE, age=0.0):
+        self.id = job_id
+        self.job_type = job_type
+        self.lane = lane
+        self.enqueued_at = time.monotonic() - age
+        self.extra_payload = {"user_config": {}}
+        self.worker = None
+        self.migrations = 0
+
+    def set_worker(self, worker):
+        self.worker = worker
+
+    def migrate(self):
+        self.migrations += 1
+
+
+@pytest.fixture(autouse=True)
+def policy(monkeypatch):
+    policy = LanePolicy(
+        {INTERACTIVE_LANE: {"priority": 0}, BULK_LANE: {"priority": 1, "max_in_progress": 0}},
+        aging_seconds=0,
+    )
+    monkeypatch.setattr(job_queue_module, "lane_policy", policy)
+    return policy
+
+
+def _cluster(*worker_ids, job_types=("gpu",)):
+    manager = QueueManager(None)
+    workers = {}
+
+    async def setup():
+        for worker_id in worker_ids:
+            worker = Worker(worker_id, {job_type: True for job_type in job_types}, {}, {})
+            await worker.set_job_queue(await manager.create_queue(worker))
+            workers[worker_id] = worker
+
+    asyncio.run(setup())
+    return manager, workers
+
+
+def _waiting(manager, worker_id):
+    return [job.id for job in manager.queues[worker_id]["queue"].queue]
+
+
+def test_an_idle_worker_takes_the_oldest_job_from_the_busiest_peer():
+    manager, workers = _cluster("busy", "less-busy", "idle")
+    manager.queues["busy"]["queue"].queue.extend(
+        [FakeJob("b1", age=3), FakeJob("b2", age=2), FakeJob("b3", age=1)]
+    )
+    manager.queues["less-busy"]["queue"].queue.extend([FakeJob("l1", age=9), FakeJob("l2", age=8)])
+    job = manager.steal_job_for(workers["idle"])
+    assert job.id == "b1"
+    assert job.worker is workers["idle"]
+    assert job.migrations == 1
+    assert _waiting(manager, "busy") == ["b2", "b3"]
+    assert _waiting(manager, "idle") == ["b1"]
+
+
+def test_a_peer_about_to_start_its_only_job_is_left_alone():
+    manager, workers = _cluster("peer", "idle")
+    manager.queues["peer"]["queue"].queue.append(FakeJob("only"))
+    assert manager.steal_job_for(workers["idle"]) is None
+    assert _waiting(manager, "peer") == ["only"]
+
+
+def test_jobs_the_thief_cannot_run_are_not_taken():
+    manager, workers = _cluster("peer", "idle")
+    manager.queues["peer"]["queue"].queue.extend(
+        [
+            FakeJob("llm", job_type="llama", age=3),
+            FakeJob("bulk", lane=BULK_LANE, age=2),
+            FakeJob("gpu", age=1),
+        ]
+    )
+    # "llama" is unsupported and the bulk lane is capped at zero.
+    assert manager.steal_job_for(workers["idle"]).id == "gpu"
+    assert manager.steal_job_for(workers["idle"]) is None
+
+
+def test_a_job_that_already_left_its_queue_is_not_moved():
+    manager, workers = _cluster("peer", "idle")
+    job = FakeJob("gone")
+    assert not manager.transfer_job(job, "peer", workers["idle"])
+    assert job.worker is None
+
+
+def test_a_busy_peer_can_lose_its_whole_backlog():
+    manager, workers = _cluster("loaded", "idle")
+    loaded = manager.queues["loaded"]["queue"]
+    loaded.queue.extend(FakeJob(f"j{n}", age=10 - n) for n in range(6))
+    loaded.in_progress["running"] = FakeJob("running")
+    stolen = []
+    while True:
+        job = manager.steal_job_for(workers["idle"])
+        if job is None:
+            break
+        stolen.append(job.id)
+    # The loaded worker is busy, so every waiting job is fair game, oldest first.
+    assert stolen == [f"j{n}" for n in range(6)]
+    assert _waiting(manager, "loaded") == []
+
+
+def test_a_worker_with_waiting_jobs_does_not_steal():
+    manager, workers = _cluster("peer", "thief")
+    manager.queues["peer"]["queue"].queue.extend([FakeJob("p1", age=2), FakeJob("p2", age=1)])
+    thief = workers["thief"]
+    thief.job_queue.queue.append(FakeJob("local-bulk", lane=BULK_LANE))
+    calls = []
+    thief.set_work_stealer(lambda worker: calls.append(worker))
+
+    async def run():
+        task = asyncio.create_task(thief.process_jobs())
+        await asyncio.sleep(0.05)
+        thief.terminate = True
+        await asyncio.wait_for(task, 2)
+
+    asyncio.run(run())
+    # The local bulk job is held back by its lane cap, but stealing would
+    # only bounce work between workers.
+    assert calls == []